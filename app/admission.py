@@ -0,0 +1,239 @@
+"""
+AI Support System - 准入控制与过载降级
+过载时在请求进入视图函数之前按优先级拒绝请求，保护尾延迟：
+- 令牌桶限流：每个客户端一个令牌桶，另有一个全局令牌桶；低优先级请求不能动用为高优先级保留的令牌
+- 排队时长：请求进入服务器到开始处理的等待时间（X-Request-Start，由反向代理、gunicorn worker
+  或asyncio适配器设置）超过该优先级允许的上限时返回503和Retry-After；处理线程全部繁忙时请求在
+  服务器的线程池队列中等待，在这里按实际等待时间降级
+- 并发限制（可选）：显式配置 max_concurrent 且小于处理线程数时，同时处理的请求数不超过该值，
+  超出的请求排队等待，高优先级先获得处理槽位；排队深度超过该优先级允许的比例时立即返回503
+- 优先级从高到低为 critical（健康检查、状态、指标）、read（GET读取）、write（创建/更新）、
+  bulk（批量导入、数据验证），过载时最先拒绝bulk
+
+限流与并发状态按worker进程独立维护，拒绝次数通过指标文件跨进程汇总。
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+PRIORITIES = ('critical', 'read', 'write', 'bulk')
+SHED_REASONS = ('client_rate', 'global_rate', 'queue_delay', 'queue_full', 'queue_timeout')
+
+# 各优先级可使用的排队深度和排队时长比例，以及全局令牌桶中为更高优先级保留的容量比例
+QUEUE_SHARES = {'critical': 1.0, 'read': 1.0, 'write': 0.5, 'bulk': 0.25}
+TOKEN_RESERVES = {'critical': 0.0, 'read': 0.0, 'write': 0.1, 'bulk': 0.25}
+# 记录请求到达时间的请求头（nginx: proxy_set_header X-Request-Start "t=${msec}"）
+REQUEST_START_HEADER = 'X-Request-Start'
+
+
+class Rejection(NamedTuple):
+    """拒绝结果：HTTP状态码、原因和建议的重试等待秒数"""
+    status: int
+    reason: str
+    retry_after: int
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，burst 为容量"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float, reserve: float = 0.0) -> float:
+        """取一个令牌，成功返回0，否则返回令牌足够前需要等待的秒数
+
+        reserve 为本次不能动用的令牌数（保留给更高优先级）。
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens - 1.0 >= reserve:
+            self.tokens -= 1.0
+            return 0.0
+        return (reserve + 1.0 - self.tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """按优先级排队的并发限制器"""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = [0] * len(PRIORITIES)
+        self._cond = threading.Condition()
+
+    def _can_run(self, priority: int) -> bool:
+        """max_concurrent 为0表示不限制并发"""
+        return (self.max_concurrent <= 0 or self.active < self.max_concurrent) and not any(self.waiting[:priority])
+
+    def acquire(self, priority: int, queue_share: float) -> Optional[str]:
+        """获取处理槽位，成功返回None，否则返回拒绝原因"""
+        with self._cond:
+            if self._can_run(priority) and not self.waiting[priority]:
+                self.active += 1
+                return None
+            if sum(self.waiting) >= self.max_queue * queue_share:
+                return 'queue_full'
+            self.waiting[priority] += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while not self._can_run(priority):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return 'queue_timeout'
+                    self._cond.wait(remaining)
+                self.active += 1
+                return None
+            finally:
+                self.waiting[priority] -= 1
+                # 本请求离开队列后，等待中的低优先级请求可能可以继续
+                self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+
+
+def request_queue_delay(value: Optional[str], now: float) -> Optional[float]:
+    """根据 X-Request-Start 计算请求已等待的秒数，缺失或无法解析时返回None
+
+    支持 t=<秒>（nginx $msec）以及毫秒、微秒时间戳；有多个值时取最早的一个（第一个）。
+    """
+    if not value:
+        return None
+    value = value.split(',', 1)[0].strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, now - started)
+
+
+class AdmissionController:
+    """准入控制器：先检查令牌桶，再获取并发槽位"""
+
+    def __init__(self, enabled: bool = True, max_concurrent: int = 0, max_queue: int = 32,
+                 queue_timeout: float = 1.0, max_queue_delay: float = 0.5, retry_after: int = 1,
+                 global_rate: float = 0.0, global_burst: float = 0.0,
+                 client_rate: float = 0.0, client_burst: float = 0.0, max_clients: int = 10000):
+        self.enabled = enabled
+        self.max_queue_delay = max_queue_delay
+        self.retry_after = retry_after
+        self.limiter = ConcurrencyLimiter(max_concurrent, max_queue, queue_timeout)
+        now = time.monotonic()
+        self.global_bucket = TokenBucket(global_rate, global_burst or global_rate, now) if global_rate > 0 else None
+        self.client_rate = client_rate
+        self.client_burst = client_burst or client_rate
+        self.max_clients = max_clients
+        self._clients: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._priority_index = {priority: i for i, priority in enumerate(PRIORITIES)}
+        self.admitted = [0] * len(PRIORITIES)
+        self.shed: Dict[str, List[int]] = {reason: [0] * len(PRIORITIES) for reason in SHED_REASONS}
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        """根据环境变量创建（ADMISSION_*；速率、并发上限、排队时长为0表示不限制）"""
+        return cls(
+            enabled=os.environ.get('ADMISSION_ENABLED', 'true').lower() == 'true',
+            max_concurrent=int(os.environ.get('ADMISSION_MAX_CONCURRENT', 0)),
+            max_queue=int(os.environ.get('ADMISSION_MAX_QUEUE', 32)),
+            queue_timeout=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 1.0)),
+            max_queue_delay=float(os.environ.get('ADMISSION_MAX_QUEUE_DELAY', 0.5)),
+            retry_after=int(os.environ.get('ADMISSION_RETRY_AFTER', 1)),
+            global_rate=float(os.environ.get('ADMISSION_GLOBAL_RATE', 0)),
+            global_burst=float(os.environ.get('ADMISSION_GLOBAL_BURST', 0)),
+            client_rate=float(os.environ.get('ADMISSION_CLIENT_RATE', 0)),
+            client_burst=float(os.environ.get('ADMISSION_CLIENT_BURST', 0)),
+            max_clients=int(os.environ.get('ADMISSION_MAX_CLIENTS', 10000))
+        )
+
+    def _take_tokens(self, priority: str, client: str) -> Optional[Rejection]:
+        """critical请求不受令牌桶限制"""
+        if priority == 'critical':
+            return None
+        now = time.monotonic()
+        with self._lock:
+            if self.client_rate > 0:
+                bucket = self._clients.get(client)
+                if bucket is None:
+                    bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst, now)
+                    if len(self._clients) > self.max_clients:
+                        self._clients.popitem(last=False)
+                else:
+                    self._clients.move_to_end(client)
+                wait = bucket.take(now)
+                if wait:
+                    return Rejection(429, 'client_rate', max(1, int(wait + 0.999)))
+            if self.global_bucket is not None:
+                wait = self.global_bucket.take(now, TOKEN_RESERVES[priority] * self.global_bucket.burst)
+                if wait:
+                    return Rejection(503, 'global_rate', max(1, int(wait + 0.999)))
+        return None
+
+    def admit(self, priority: str, client: str, queue_delay: Optional[float] = None) -> Optional[Rejection]:
+        """准入检查，通过时返回None（之后必须调用release），否则返回拒绝结果
+
+        queue_delay 为请求开始处理前已在服务器中等待的秒数（见 request_queue_delay），
+        critical请求不按排队时长拒绝。
+        """
+        if not self.enabled:
+            return None
+        index = self._priority_index[priority]
+        rejection = None
+        if queue_delay is not None and self.max_queue_delay > 0 and priority != 'critical' \
+                and queue_delay > self.max_queue_delay * QUEUE_SHARES[priority]:
+            rejection = Rejection(503, 'queue_delay', self.retry_after)
+        if rejection is None:
+            rejection = self._take_tokens(priority, client)
+        if rejection is None:
+            reason = self.limiter.acquire(index, QUEUE_SHARES[priority])
+            if reason is None:
+                with self._lock:
+                    self.admitted[index] += 1
+                return None
+            rejection = Rejection(503, reason, self.retry_after)
+        with self._lock:
+            self.shed[rejection.reason][index] += 1
+        return rejection
+
+    def release(self) -> None:
+        if self.enabled:
+            self.limiter.release()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.admitted = [0] * len(PRIORITIES)
+            self.shed = {reason: [0] * len(PRIORITIES) for reason in SHED_REASONS}
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            admitted = list(self.admitted)
+            shed = {reason: list(counts) for reason, counts in self.shed.items()}
+        return {
+            'enabled': self.enabled,
+            'active': self.limiter.active,
+            'queued': sum(self.limiter.waiting),
+            'max_concurrent': self.limiter.max_concurrent,
+            'max_queue_delay': self.max_queue_delay,
+            'max_queue': self.limiter.max_queue,
+            'tracked_clients': len(self._clients),
+            'admitted': dict(zip(PRIORITIES, admitted)),
+            'shed': {reason: dict(zip(PRIORITIES, counts)) for reason, counts in shed.items()}
+        }
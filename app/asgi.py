@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+AI Support System - asyncio服务模式
+将 app/main.py 中的Flask应用适配为ASGI应用，由uvicorn的事件循环处理连接
+
+用法:
+    python -m app.asgi
+    # 或多进程
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:5000 app.asgi:application
+
+- 连接与keep-alive在事件循环中处理，Flask视图在线程池中执行（验证、评分不阻塞事件循环）
+- 请求体由事件循环逐块接收，经队列流式交给视图的 wsgi.input，不整体缓存；视图读取跟不上时暂停接收（背压），
+  超过 max_body_size 的请求返回413
+- 请求到达事件循环时记录 X-Request-Start（请求头中已有时保留），处理线程全部繁忙时，
+  准入控制按请求在线程池中的等待时间降级
+- 路由、处理函数和响应格式与同步模式完全相同
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.admission import REQUEST_START_HEADER
+from app.main import app, start_background_tasks
+
+_REQUEST_START_KEY = f"HTTP_{REQUEST_START_HEADER.upper().replace('-', '_')}"
+
+logger = logging.getLogger(__name__)
+
+_SENTINEL = object()
+
+
+class RequestBody(io.RawIOBase):
+    """请求体流：事件循环把 http.request 分块放入队列，处理线程通过 wsgi.input 按需读取
+
+    队列中未读取的字节达到 max_buffer 时 put 暂停，直到处理线程读走一部分（背压）；
+    接收结束后读到EOF，客户端断开或超过大小上限时在读完已接收的数据后抛出对应异常。
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_buffer: int):
+        super().__init__()
+        self._loop = loop
+        self._max_buffer = max_buffer
+        self._chunks: Deque[bytes] = deque()
+        self._offset = 0
+        self._buffered = 0
+        self._finished = False
+        self._error: Optional[Exception] = None
+        self._paused = False
+        self._resume = asyncio.Event()
+        self._cond = threading.Condition()
+        self.too_large = False
+
+    def readable(self) -> bool:
+        return True
+
+    # ---------- 事件循环侧 ----------
+
+    async def put(self, chunk: bytes) -> None:
+        with self._cond:
+            self._chunks.append(chunk)
+            self._buffered += len(chunk)
+            self._cond.notify_all()
+            paused = self._paused = self._buffered >= self._max_buffer
+            if paused:
+                self._resume.clear()
+        if paused:
+            await self._resume.wait()
+
+    def finish(self, error: Optional[Exception] = None) -> None:
+        with self._cond:
+            if self._finished:
+                return
+            self._finished = True
+            self._error = error
+            self.too_large = isinstance(error, RequestEntityTooLarge)
+            self._cond.notify_all()
+
+    # ---------- 处理线程侧 ----------
+
+    def readinto(self, buffer) -> int:
+        with self._cond:
+            while not self._chunks and not self._finished:
+                self._cond.wait()
+            if not self._chunks:
+                if self._error is not None:
+                    raise self._error
+                return 0
+            chunk = self._chunks[0]
+            n = min(len(buffer), len(chunk) - self._offset)
+            buffer[:n] = memoryview(chunk)[self._offset:self._offset + n]
+            self._offset += n
+            if self._offset == len(chunk):
+                self._chunks.popleft()
+                self._offset = 0
+            self._buffered -= n
+            if self._paused and self._buffered < self._max_buffer:
+                self._paused = False
+                self._loop.call_soon_threadsafe(self._resume.set)
+            return n
+
+
+class WSGIToASGI:
+    """在asyncio事件循环中承载WSGI应用的适配器
+
+    请求体在事件循环中异步接收并流式交给 wsgi.input（最多预读 body_buffer_size 字节）；
+    WSGI应用及响应迭代在线程池中执行，流式响应（如NDJSON批量接口）按块回传。
+    """
+
+    def __init__(self, wsgi_app: Callable, max_workers: int = 32,
+                 body_buffer_size: int = 1024 * 1024, max_body_size: int = 64 * 1024 * 1024,
+                 on_startup: Optional[Callable[[], None]] = None):
+        self.wsgi_app = wsgi_app
+        self.on_startup = on_startup
+        self.max_workers = max_workers
+        self.body_buffer_size = body_buffer_size
+        self.max_body_size = max_body_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi-handler')
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.on_startup is not None:
+                    self.on_startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _receive_body(self, receive: Callable, body: RequestBody) -> None:
+        """在事件循环中逐块接收请求体并放入队列"""
+        size = 0
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    body.finish(ClientDisconnected())
+                    return
+                chunk = message.get('body', b'')
+                if chunk:
+                    size += len(chunk)
+                    if size > self.max_body_size:
+                        body.finish(RequestEntityTooLarge())
+                        return
+                    await body.put(chunk)
+                if not message.get('more_body', False):
+                    body.finish()
+                    return
+        except asyncio.CancelledError:
+            body.finish(ClientDisconnected())
+            raise
+
+    async def _http(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        content_length = _content_length(scope)
+        if content_length is not None and content_length > self.max_body_size:
+            await self._send_too_large(send)
+            return
+
+        loop = asyncio.get_running_loop()
+        body = RequestBody(loop, self.body_buffer_size)
+        receiver = loop.create_task(self._receive_body(receive, body))
+        environ = build_environ(scope, io.BufferedReader(body), content_length)
+        # 反向代理未设置到达时间时以进入事件循环的时间为准，视图线程开始处理时即可算出排队时长
+        environ.setdefault(_REQUEST_START_KEY, f"t={time.time():.6f}")
+        response_start: List[Tuple[str, List[Tuple[str, str]]]] = []
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and response_start:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start[:] = [(status, headers)]
+            return lambda data: None
+
+        # 同一请求的调用与响应迭代共用一个上下文（Flask请求上下文基于contextvars，
+        # 流式响应的各块可能在不同线程中生成）
+        context = contextvars.copy_context()
+        try:
+            try:
+                result = await loop.run_in_executor(
+                    self.executor, context.run, self.wsgi_app, environ, start_response
+                )
+            except Exception:
+                # 视图读取请求体时超过大小上限
+                if not body.too_large:
+                    raise
+                await self._send_too_large(send)
+                return
+            try:
+                started = False
+                if isinstance(result, (list, tuple)):
+                    chunks: Iterable[bytes] = result
+                else:
+                    chunks = self._iterate(loop, context, iter(result))
+                try:
+                    async for chunk in _as_async(chunks):
+                        if not started:
+                            if body.too_large:
+                                break
+                            await self._send_start(send, response_start)
+                            started = True
+                        if chunk:
+                            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                except Exception:
+                    # 流式响应读取请求体时超过大小上限：尚未开始响应则返回413
+                    if started or not body.too_large:
+                        raise
+                if not started:
+                    if body.too_large:
+                        await self._send_too_large(send)
+                        return
+                    await self._send_start(send, response_start)
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(result, 'close'):
+                    await loop.run_in_executor(self.executor, context.run, result.close)
+        finally:
+            # 视图未读完请求体时停止接收
+            if not receiver.done():
+                receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+            body.finish(ClientDisconnected())
+
+    async def _iterate(self, loop: asyncio.AbstractEventLoop, context: contextvars.Context, iterator):
+        """在线程池中逐块迭代WSGI响应（流式生成器可能执行验证等耗时操作）"""
+        while True:
+            chunk = await loop.run_in_executor(self.executor, context.run, next, iterator, _SENTINEL)
+            if chunk is _SENTINEL:
+                return
+            yield chunk
+
+    @staticmethod
+    async def _send_too_large(send: Callable) -> None:
+        payload = json.dumps({
+            'success': False,
+            'message': '请求体过大',
+            'error': 'Request body exceeds the configured size limit',
+            'timestamp': datetime.now().isoformat()
+        }, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(payload)).encode('latin-1')),
+                        (b'connection', b'close')]
+        })
+        await send({'type': 'http.response.body', 'body': payload, 'more_body': False})
+
+    @staticmethod
+    async def _send_start(send: Callable, response_start) -> None:
+        status, headers = response_start[0]
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in headers]
+        })
+
+
+async def _as_async(chunks):
+    """统一同步列表和异步生成器的迭代方式"""
+    if hasattr(chunks, '__aiter__'):
+        async for chunk in chunks:
+            yield chunk
+    else:
+        for chunk in chunks:
+            yield chunk
+
+
+def _content_length(scope: Dict[str, Any]) -> Optional[int]:
+    """请求头中的Content-Length，缺失或无效时返回None（chunked请求体）"""
+    for raw_name, raw_value in scope.get('headers', []):
+        if raw_name.lower() == b'content-length':
+            try:
+                return int(raw_value)
+            except ValueError:
+                return None
+    return None
+
+
+def build_environ(scope: Dict[str, Any], body, content_length: Optional[int]) -> Dict[str, Any]:
+    """根据ASGI scope构建WSGI environ；未知长度的请求体以 wsgi.input_terminated 标记读到EOF为止"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if content_length is None:
+        environ['wsgi.input_terminated'] = True
+    else:
+        environ['CONTENT_LENGTH'] = str(content_length)
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_asgi_app(wsgi_app: Callable = app) -> WSGIToASGI:
+    """根据环境变量创建ASGI应用（ASYNC_WORKER_THREADS / ASYNC_BODY_BUFFER_SIZE / ASYNC_MAX_BODY_SIZE）"""
+    return WSGIToASGI(
+        wsgi_app,
+        max_workers=int(os.environ.get('ASYNC_WORKER_THREADS', min(64, (os.cpu_count() or 1) * 8))),
+        body_buffer_size=int(os.environ.get('ASYNC_BODY_BUFFER_SIZE', 1024 * 1024)),
+        max_body_size=int(os.environ.get('ASYNC_MAX_BODY_SIZE', 64 * 1024 * 1024)),
+        on_startup=start_background_tasks
+    )
+
+
+application = create_asgi_app()
+
+
+def main() -> None:
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("asyncio服务模式需要安装uvicorn: pip install uvicorn")
+
+    logger.info(f"Starting AI Support System (asyncio) on {app.config['HOST']}:{app.config['PORT']}")
+    uvicorn.run(
+        application,
+        host=app.config['HOST'],
+        port=app.config['PORT'],
+        lifespan='on',
+        timeout_keep_alive=int(os.environ.get('ASYNC_KEEP_ALIVE_TIMEOUT', 75)),
+        backlog=int(os.environ.get('ASYNC_BACKLOG', 4096)),
+        access_log=False
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+AI Support System - 用户档案批量导入工具
+将JSONL（每行一个档案）或JSON文件（单个档案或档案数组）并行导入档案存储
+
+用法:
+    python -m app.bulk_import profiles.jsonl --workers 8 --chunk-size 1000
+
+- 验证、评分和存储写入按块分发到进程池执行，绕开GIL
+- 每个已完成的块按输入顺序记录检查点，中断后重新执行即从检查点继续
+- 被拒绝的行写入旁路错误文件（默认 <输入文件>.errors.jsonl）
+- 输入行中带有 user_id 字段时使用该ID写入，否则按 (导入批次时间戳, 行号) 生成确定性ID；
+  批次时间戳保存在检查点中，中断后继续导入时重复处理的块覆盖写入同一档案，不会产生重复档案
+- 与在线创建相同按 --dedup（默认 DEDUP_MODE）查找近重复档案：flag 只计数，merge 合并到已有档案。
+  每个块开始时同步其他进程已写入的档案，同时处理中的其他块之间不互相查重，
+  需要完整去重时导入后执行 python -m app.dedup --apply
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import ValidationError
+from werkzeug.http import parse_date
+
+from app.dedup import DedupIndex
+from app.models import UserProfile
+from app.ids import WorkerLeaseStore, import_user_id
+from app.profiles import build_profile_record, calculate_profile_score, user_ids
+from app.store import ProfileStore, parse_database_url
+
+STAGES = ('parse', 'validate', 'score', 'dedup', 'store')
+DEDUP_MODES = ('off', 'flag', 'merge')
+
+# 子进程内的存储实例与去重索引（由进程池initializer创建）
+_worker_store: Optional[ProfileStore] = None
+_worker_dedup: Optional[DedupIndex] = None
+_dedup_mode = 'off'
+
+
+def init_worker(database_path: str, dedup_mode: str = 'off') -> None:
+    """进程池initializer：每个子进程打开自己的存储连接，并从该数据库分配用户ID的worker号"""
+    global _worker_store, _worker_dedup, _dedup_mode
+    _worker_store = ProfileStore(database_path, pool_size=1, timeout=60.0)
+    user_ids.use_store(WorkerLeaseStore(database_path, pool_size=1, timeout=60.0))
+    _dedup_mode = dedup_mode
+    _worker_dedup = DedupIndex.from_env() if dedup_mode != 'off' else None
+
+
+def merge_target(duplicates: List[Dict[str, Any]], records: List[tuple]) -> Tuple[Optional[str], Optional[datetime]]:
+    """merge模式下选择要合并进的已有档案（本块中尚未写入的记录优先），返回 (user_id, 原创建时间)"""
+    for item in duplicates:
+        user_id = item['user_id']
+        document = next((record[3] for record in reversed(records) if record[0] == user_id), None) \
+            or _worker_store.get_document(user_id)
+        if document is None:
+            _worker_dedup.remove(user_id)
+            continue
+        return user_id, parse_date(json.loads(document)['created_at'])
+    return None, None
+
+
+def import_chunk(chunk: List[Tuple[int, bytes]], epoch_ms: int) -> Dict[str, Any]:
+    """在子进程中解析、验证、评分、查重并写入一个块，返回计数、被拒行和分阶段耗时
+
+    epoch_ms 为导入批次时间戳，与行号一起生成没有user_id的行的ID。
+    """
+    timings = dict.fromkeys(STAGES, 0.0)
+    rejected = []
+    records = []
+    duplicates_found = merged = 0
+    if _worker_dedup is not None:
+        started = time.perf_counter()
+        # 同步其他进程已写入的块（首次调用时全量加载）
+        _worker_dedup.refresh(_worker_store, force=True)
+        timings['dedup'] += time.perf_counter() - started
+
+    for line_no, raw in chunk:
+        started = time.perf_counter()
+        try:
+            data = json.loads(raw)
+            if not isinstance(data, dict):
+                raise ValueError('Each record must be a JSON object')
+        except ValueError as e:
+            timings['parse'] += time.perf_counter() - started
+            rejected.append({'line': line_no, 'error': {'type': 'invalid_json', 'message': str(e)}})
+            continue
+        parsed = time.perf_counter()
+        timings['parse'] += parsed - started
+
+        # 验证、评分与构建记录（含 user_id 的验证）中的错误都只拒绝当前行，不让整个块失败
+        stage, mark = 'validate', parsed
+        try:
+            user_profile = UserProfile(**data)
+            now = time.perf_counter()
+            timings[stage] += now - mark
+            stage, mark = 'score', now
+            score = calculate_profile_score(user_profile)
+            now = time.perf_counter()
+            timings[stage] += now - mark
+            user_id = data.get('user_id') or import_user_id(epoch_ms, line_no)
+            fingerprint, created_at = None, None
+            if _worker_dedup is not None:
+                stage, mark = 'dedup', now
+                fingerprint = _worker_dedup.fingerprint_from_model(user_profile)
+                # 中断后继续导入时本行已写入的档案不算重复
+                duplicates = _worker_dedup.find(fingerprint, exclude=user_id)
+                if duplicates:
+                    duplicates_found += 1
+                    if _dedup_mode == 'merge':
+                        merged_into, created_at = merge_target(duplicates, records)
+                        if merged_into:
+                            user_id = merged_into
+                            merged += 1
+                now = time.perf_counter()
+                timings[stage] += now - mark
+            stage, mark = 'store', now
+            _, record = build_profile_record(user_profile, score, user_id=user_id, created_at=created_at)
+            if fingerprint is not None:
+                # 先登记签名，同一块中后续的重复行也能被发现
+                _worker_dedup.add(user_id, fingerprint)
+        except ValidationError as e:
+            timings[stage] += time.perf_counter() - mark
+            rejected.append({
+                'line': line_no,
+                'error': {
+                    'type': 'validation_error',
+                    'message': '数据验证失败',
+                    'details': e.errors(include_url=False, include_context=False, include_input=False)
+                },
+                'record': data
+            })
+            continue
+        except ValueError as e:
+            timings[stage] += time.perf_counter() - mark
+            rejected.append({'line': line_no, 'error': {'type': 'invalid_line', 'message': str(e)}, 'record': data})
+            continue
+        records.append(record)
+        timings[stage] += time.perf_counter() - mark
+
+    started = time.perf_counter()
+    if records:
+        _worker_store.put_many(records)
+    timings['store'] += time.perf_counter() - started
+
+    return {'imported': len(records), 'rejected': rejected, 'duplicates': duplicates_found, 'merged': merged,
+            'timings': timings}
+
+
+def iter_records(path: str, start_offset: int, start_line: int) -> Iterator[Tuple[int, int, bytes]]:
+    """逐条产出 (行号, 结束字节偏移, 原始JSON)
+
+    .json 文件整体加载（单个对象或对象数组），偏移量为记录序号；
+    其余文件按JSONL逐行读取，偏移量为该行结束处的字节位置。
+    """
+    if path.endswith('.json'):
+        with open(path, 'rb') as f:
+            document = json.load(f)
+        items = document if isinstance(document, list) else [document]
+        for index in range(start_line, len(items)):
+            yield index + 1, index + 1, json.dumps(items[index], ensure_ascii=False).encode('utf-8')
+        return
+
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        line_no = start_line
+        offset = start_offset
+        for raw in f:
+            line_no += 1
+            offset += len(raw)
+            if raw.strip():
+                yield line_no, offset, raw
+
+
+def iter_chunks(records: Iterator[Tuple[int, int, bytes]], chunk_size: int):
+    """将记录分块，产出 (块内容, 块末行号, 块末偏移)"""
+    chunk = []
+    line_no = offset = None
+    for line_no, offset, raw in records:
+        chunk.append((line_no, raw))
+        if len(chunk) >= chunk_size:
+            yield chunk, line_no, offset
+            chunk = []
+    if chunk:
+        yield chunk, line_no, offset
+
+
+def new_checkpoint() -> Dict[str, Any]:
+    return {'offset': 0, 'line': 0, 'imported': 0, 'rejected': 0, 'epoch_ms': time.time_ns() // 1_000_000}
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """读取检查点，不存在时从头开始"""
+    if not os.path.exists(path):
+        return new_checkpoint()
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    checkpoint.setdefault('epoch_ms', new_checkpoint()['epoch_ms'])
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """原子地写入检查点"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run_import(path: str, database_path: str, workers: int, chunk_size: int,
+               errors_path: str, checkpoint_path: str, resume: bool = True,
+               progress_every: int = 10, dedup_mode: str = 'off') -> Dict[str, Any]:
+    """执行导入，返回汇总统计；dedup_mode 为 flag/merge 时按块查找近重复档案"""
+    checkpoint = load_checkpoint(checkpoint_path) if resume else new_checkpoint()
+    epoch_ms = checkpoint['epoch_ms']
+    if checkpoint['line']:
+        print(f"从检查点继续: 第 {checkpoint['line']} 行之后 (offset={checkpoint['offset']})")
+
+    # 主进程先建表，避免子进程并发建表
+    ProfileStore(database_path).close()
+
+    timings = dict.fromkeys(STAGES, 0.0)
+    imported = rejected = duplicates = merged = 0
+    chunks_done = 0
+    started = time.perf_counter()
+
+    chunks = iter_chunks(iter_records(path, checkpoint['offset'], checkpoint['line']), chunk_size)
+    with open(errors_path, 'a' if resume else 'w', encoding='utf-8') as errors_file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                initargs=(database_path, dedup_mode)) as executor:
+        pending = deque()
+        max_in_flight = workers * 2
+        exhausted = False
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    chunk, last_line, last_offset = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((executor.submit(import_chunk, chunk, epoch_ms), last_line, last_offset))
+            if not pending:
+                break
+
+            # 按提交顺序收集结果，保证检查点之前的所有块均已完成
+            future, last_line, last_offset = pending.popleft()
+            result = future.result()
+
+            for item in result['rejected']:
+                errors_file.write(json.dumps(item, ensure_ascii=False) + '\n')
+            errors_file.flush()
+            for stage in STAGES:
+                timings[stage] += result['timings'][stage]
+            imported += result['imported']
+            rejected += len(result['rejected'])
+            duplicates += result['duplicates']
+            merged += result['merged']
+
+            checkpoint = {
+                'offset': last_offset,
+                'line': last_line,
+                'imported': checkpoint['imported'] + result['imported'],
+                'rejected': checkpoint['rejected'] + len(result['rejected']),
+                'epoch_ms': epoch_ms
+            }
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            chunks_done += 1
+            if progress_every and chunks_done % progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"已处理 {imported + rejected} 条, "
+                      f"{(imported + rejected) / elapsed:.0f} profiles/sec")
+
+    elapsed = time.perf_counter() - started
+    processed = imported + rejected
+    return {
+        'imported': imported,
+        'rejected': rejected,
+        'duplicates': duplicates,
+        'merged': merged,
+        'elapsed_seconds': round(elapsed, 3),
+        'profiles_per_second': round(processed / elapsed, 1) if elapsed else 0.0,
+        'stage_seconds': {stage: round(value, 3) for stage, value in timings.items()},
+        'stage_us_per_profile': {
+            stage: round(value / processed * 1e6, 1) if processed else 0.0
+            for stage, value in timings.items()
+        },
+        'checkpoint': checkpoint
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='并行批量导入用户档案',
+        epilog='查重只覆盖存储中已有的档案和同一块内的行，同时处理的不同块之间不互相查重；'
+               '需要完整去重时导入后执行 python -m app.dedup --apply')
+    parser.add_argument('input', help='JSONL文件（每行一个档案）或JSON文件')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///app.db'),
+                        help='档案存储地址（默认读取DATABASE_URL）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='进程数')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='每个块的档案数')
+    parser.add_argument('--errors', help='被拒绝行的输出文件（默认 <input>.errors.jsonl）')
+    parser.add_argument('--checkpoint', help='检查点文件（默认 <input>.checkpoint）')
+    parser.add_argument('--restart', action='store_true', help='忽略已有检查点，从头导入')
+    parser.add_argument('--dedup', choices=DEDUP_MODES, default=os.environ.get('DEDUP_MODE', 'flag'),
+                        help='近重复档案处理：off 不查重，flag 只计数，merge 合并到已有档案（默认读取DEDUP_MODE）')
+    args = parser.parse_args(argv)
+
+    summary = run_import(
+        args.input,
+        parse_database_url(args.database_url),
+        workers=max(1, args.workers),
+        chunk_size=max(1, args.chunk_size),
+        errors_path=args.errors or f"{args.input}.errors.jsonl",
+        checkpoint_path=args.checkpoint or f"{args.input}.checkpoint",
+        resume=not args.restart,
+        dedup_mode=args.dedup
+    )
+
+    print("=" * 50)
+    print(f"导入完成: {summary['imported']} 条成功, {summary['rejected']} 条被拒绝, "
+          f"{summary['duplicates']} 条近重复（{summary['merged']} 条已合并）")
+    print(f"耗时: {summary['elapsed_seconds']}s, 吞吐: {summary['profiles_per_second']} profiles/sec")
+    print("分阶段耗时 (秒 / 每条微秒):")
+    for stage in STAGES:
+        print(f"  {stage:<9} {summary['stage_seconds'][stage]:>10.3f}s "
+              f"{summary['stage_us_per_profile'][stage]:>10.1f}us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+AI Support System - 缓存
+- DocumentCache: 按user_id缓存存储中的档案文档字节，LRU淘汰 + TTL过期，附带强ETag
+- MemoCache: 按内容哈希缓存计算结果的有界LRU备忘表
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class CachedDocument(NamedTuple):
+    """缓存条目：档案文档字节、强ETag及过期时间"""
+    document: bytes
+    etag: str
+    expires_at: float
+
+
+def compute_etag(document: bytes) -> str:
+    """根据档案文档计算强ETag（不含引号），与快照中的文档摘要一致
+
+    只取决于存储的文档，不含响应信封中的timestamp，各worker、缓存过期前后对同一版本的档案给出相同的ETag。
+    """
+    return hashlib.blake2b(document, digest_size=16).hexdigest()
+
+
+class DocumentCache:
+    """LRU/TTL档案文档缓存
+
+    缓存存储中的文档而不是渲染后的响应体，响应信封（含timestamp）每次请求时拼接。
+    同时限制条目数和文档总字节数，超出时从最久未使用的条目开始淘汰。
+    缓存只在当前进程内有效，多worker部署时其他worker的旧条目由TTL兜底。
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, CachedDocument]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> 'DocumentCache':
+        """根据环境变量创建缓存实例"""
+        return cls(
+            max_entries=int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', 10000)),
+            max_bytes=int(os.environ.get('PROFILE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+            ttl=float(os.environ.get('PROFILE_CACHE_TTL', 60))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[CachedDocument]:
+        """读取缓存条目，命中时移到LRU队尾"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, document: bytes) -> CachedDocument:
+        """写入档案文档并返回带ETag的缓存条目"""
+        entry = CachedDocument(document, compute_etag(document), time.monotonic() + self.ttl)
+        if not self.enabled or len(document) > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(document)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, key: str) -> None:
+        """删除指定key（档案创建/更新后调用）"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def reset_stats(self) -> None:
+        """清零统计计数（如预热结束后）"""
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+            self.expirations = self.invalidations = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.document)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计（用于 /api/status）"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+def content_hash(data: Any, *params: Any) -> bytes:
+    """计算请求内容的规范化哈希：JSON按键排序、紧凑输出后与附加参数一起摘要"""
+    canonical = json.dumps([data, params], sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+class MemoCache:
+    """有界LRU备忘表
+
+    用于缓存确定性计算的结果（如相同请求体的验证结果），超出容量时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[bytes, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: bytes) -> Optional[Any]:
+        """读取缓存结果，命中时移到LRU队尾"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Any) -> None:
+        """写入结果，超出容量时淘汰最旧条目"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self) -> None:
+        """清零统计计数（如预热结束后）"""
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """备忘表统计（用于 /api/status）"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
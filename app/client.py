@@ -0,0 +1,434 @@
+"""
+AI Support System - API客户端
+供集成服务调用的客户端库（只依赖标准库）：
+
+- ProfileClient：同步客户端，线程安全，所有线程共用一个keep-alive连接池
+- AsyncProfileClient：asyncio客户端，在线程池中调用同一个ProfileClient，与同步调用共用连接池
+- 每次调用可单独设置超时；幂等调用（GET、验证）遇到连接错误、429/502/503/504 时按指数退避加随机抖动重试，
+  创建等非幂等调用只在服务端明确拒绝（429/503，请求未被处理）或连接未建立时重试
+- create_many / validate_many / get_many 按并发上限同时发出多个请求；创建优先使用服务端的
+  NDJSON批量接口（/api/user-profiles/batch），按块并发提交
+
+用法:
+    from app.client import ProfileClient
+    client = ProfileClient('http://localhost:5000')
+    user_id = client.create_profile(profile)['user_id']
+    results = client.create_many(profiles, concurrency=8)
+"""
+
+import json
+import time
+import queue
+import random
+import select
+import socket
+import asyncio
+import logging
+import threading
+import http.client
+from functools import partial
+from urllib.parse import urlencode, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# 服务端在处理之前拒绝的状态码（准入控制、任务队列已满），非幂等请求也可以安全重试
+REJECTED_STATUSES = frozenset({429, 503})
+
+
+class APIError(Exception):
+    """服务端返回错误状态码"""
+
+    def __init__(self, status: int, body: Any, retry_after: Optional[float] = None):
+        self.status = status
+        self.body = body
+        self.retry_after = retry_after
+        message = body.get('message') if isinstance(body, dict) else None
+        error = body.get('error') if isinstance(body, dict) else None
+        super().__init__(f"HTTP {status}: {message or ''} {error or ''}".strip())
+
+
+class APIResponse:
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+    """空闲连接上有可读数据（通常是服务端关闭连接的EOF）时视为已断开"""
+    if conn.sock is None:
+        return False
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class ConnectionPool:
+    """线程安全的HTTP keep-alive连接池
+
+    空闲超过 keepalive 秒的连接在取出时直接关闭（应小于服务端的keep-alive超时，gunicorn默认5秒），
+    已收到服务端关闭（套接字可读）的空闲连接也直接丢弃，避免使用已被服务端关闭的连接。
+    """
+
+    def __init__(self, base_url: str, max_size: int = 10, keepalive: float = 4.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or (443 if self.scheme == 'https' else 80)
+        self.base_path = parts.path.rstrip('/')
+        self.max_size = max_size
+        self.keepalive = keepalive
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """取出一个连接，返回 (连接, 是否复用的已有连接)"""
+        now = time.monotonic()
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if now - idle_since < self.keepalive and not _is_dropped(conn):
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                self.reused += 1
+                return conn, True
+            conn.close()
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        with self._lock:
+            self.created += 1
+        return cls(self.host, self.port, timeout=timeout), False
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        if self._idle.qsize() < self.max_size:
+            self._idle.put((conn, time.monotonic()))
+        else:
+            conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait()[0].close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        return {'idle': self._idle.qsize(), 'max_size': self.max_size,
+                'created': self.created, 'reused': self.reused}
+
+
+def _chunks(items: Sequence[Any], size: int) -> List[Sequence[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class ProfileClient:
+    """AI Support System 同步客户端"""
+
+    def __init__(self, base_url: str = 'http://localhost:5000', timeout: float = 10.0, retries: int = 3,
+                 backoff: float = 0.1, max_backoff: float = 5.0, pool_size: int = 10, keepalive: float = 4.0,
+                 headers: Optional[Dict[str, str]] = None):
+        self.pool = ConnectionPool(base_url, max_size=pool_size, keepalive=keepalive)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.headers = {'Accept': 'application/json', 'User-Agent': 'ai-support-client/1.0', **(headers or {})}
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __enter__(self) -> 'ProfileClient':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------- 请求与重试 ----------
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str],
+              timeout: float, idempotent: bool = False) -> APIResponse:
+        conn, reused = self.pool.acquire(timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not (reused and idempotent):
+                raise
+            # 复用的连接已被服务端关闭，换新连接重发一次；
+            # 无法确定服务端是否已处理，非幂等请求不自动重发，由调用方决定
+            conn, _ = self.pool.acquire(timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self.pool.release(conn)
+        return APIResponse(response.status, {name.lower(): value for name, value in response.getheaders()}, payload)
+
+    def _delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """指数退避加全抖动；服务端给出Retry-After时至少等待该时长"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    def request(self, method: str, path: str, json_body: Any = None, params: Optional[Dict[str, Any]] = None,
+                data: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None, idempotent: Optional[bool] = None) -> APIResponse:
+        """发送请求并按重试策略重试，返回最终响应（错误状态码抛出APIError）"""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        url = self.pool.base_path + path
+        if params:
+            url = f"{url}?{urlencode({k: str(v).lower() if isinstance(v, bool) else v for k, v in params.items()})}"
+        request_headers = dict(self.headers)
+        if json_body is not None:
+            data = json.dumps(json_body, ensure_ascii=False, default=str).encode('utf-8')
+            request_headers['Content-Type'] = 'application/json'
+        if headers:
+            request_headers.update(headers)
+        timeout = self.timeout if timeout is None else timeout
+
+        attempt = 0
+        while True:
+            try:
+                response = self._send(method, url, data, request_headers, timeout, idempotent)
+            except (ConnectionRefusedError, socket.gaierror) as e:
+                # 连接未建立，请求没有发出
+                error, retry_after = e, None
+            except (OSError, http.client.HTTPException) as e:
+                if not idempotent:
+                    raise
+                error, retry_after = e, None
+            else:
+                if response.status < 400 or response.status == 304:
+                    return response
+                body = response.json() if response.headers.get('content-type', '').startswith(
+                    'application/json') else response.body
+                retry_after = response.headers.get('retry-after')
+                retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+                error = APIError(response.status, body, retry_after)
+                retryable = response.status in (RETRY_STATUSES if idempotent else REJECTED_STATUSES)
+                if not retryable:
+                    raise error
+            if attempt >= self.retries:
+                raise error
+            delay = self._delay(attempt, retry_after)
+            logger.debug(f"Retrying {method} {path} in {delay:.2f}s after {error}")
+            time.sleep(delay)
+            attempt += 1
+
+    def _json(self, *args, **kwargs) -> Any:
+        return self.request(*args, **kwargs).json()
+
+    # ---------- 接口 ----------
+
+    def health(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self._json('GET', '/', timeout=timeout)
+
+    def status(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self._json('GET', '/api/status', timeout=timeout)
+
+    def create_profile(self, profile: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """创建档案，返回响应中的data（含user_id、score）"""
+        return self._json('POST', '/api/user-profile', json_body=profile, timeout=timeout)['data']
+
+    def submit_create(self, profile: Dict[str, Any], timeout: Optional[float] = None) -> str:
+        """以后台任务方式创建档案，返回job_id"""
+        return self._json('POST', '/api/user-profile', json_body=profile, params={'async': True},
+                          timeout=timeout)['data']['job_id']
+
+    def get_profile(self, user_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """读取档案，返回响应中的data"""
+        return self._json('GET', f"/api/user-profile/{user_id}", timeout=timeout)['data']
+
+    def patch_profile(self, user_id: str, patch: Any, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self._json('PATCH', f"/api/user-profile/{user_id}", json_body=patch, timeout=timeout)['data']
+
+    def validate_profile(self, user_id: str, profile: Dict[str, Any], timeout: Optional[float] = None,
+                         **params: Any) -> Dict[str, Any]:
+        """验证档案（format、include_skills等查询参数以关键字参数传入），返回完整响应体"""
+        # 验证没有副作用，按幂等调用重试
+        return self._json('POST', f"/api/user-profile/{user_id}/validate", json_body=profile,
+                          params=params, timeout=timeout, idempotent=True)
+
+    def get_job(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self._json('GET', f"/api/jobs/{job_id}", timeout=timeout)['data']
+
+    def wait_for_job(self, job_id: str, timeout: float = 60.0, interval: float = 0.2) -> Dict[str, Any]:
+        """轮询直到任务完成，返回任务状态（result为同步请求时的响应体）"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if job['status'] in ('succeeded', 'failed'):
+                return job
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout}s")
+            time.sleep(interval)
+
+    def search(self, timeout: Optional[float] = None, **params: Any) -> Dict[str, Any]:
+        return self._json('GET', '/api/user-profiles/search', params=params, timeout=timeout)
+
+    def match(self, requirement: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self._json('POST', '/api/user-profiles/match', json_body=requirement, timeout=timeout,
+                          idempotent=True)
+
+    def batch(self, profiles: Iterable[Dict[str, Any]], mode: str = 'create',
+              timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """通过NDJSON批量接口提交一批档案，返回逐行结果（line从1开始）"""
+        body = ''.join(json.dumps(profile, ensure_ascii=False, default=str) + '\n' for profile in profiles)
+        response = self.request('POST', '/api/user-profiles/batch', params={'mode': mode},
+                                data=body.encode('utf-8'), headers={'Content-Type': 'application/x-ndjson'},
+                                timeout=timeout, idempotent=mode == 'validate')
+        return [json.loads(line) for line in response.body.splitlines() if line.strip()]
+
+    # ---------- 并发调用 ----------
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any], concurrency: int = 8,
+            return_exceptions: bool = True) -> List[Any]:
+        """最多 concurrency 个调用同时进行，按输入顺序返回结果；单个调用失败时返回其异常"""
+        def call(item):
+            try:
+                return func(item)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            return list(executor.map(call, items))
+
+    def create_many(self, profiles: Sequence[Dict[str, Any]], concurrency: int = 8, use_batch: bool = True,
+                    batch_size: int = 200) -> List[Any]:
+        """并发创建多个档案，按输入顺序返回每个档案的结果
+
+        use_batch 为True时按 batch_size 分块并发提交到批量接口，每项为批量接口的逐行结果
+        （success、user_id、score 或 error）；否则逐个调用创建接口，每项为 create_profile 的返回值或异常。
+        """
+        if not use_batch:
+            return self.map(self.create_profile, profiles, concurrency)
+        results: List[Any] = []
+        for chunk, chunk_results in zip(_chunks(profiles, batch_size),
+                                        self.map(self.batch, _chunks(profiles, batch_size), concurrency)):
+            if isinstance(chunk_results, Exception):
+                results.extend([chunk_results] * len(chunk))
+            else:
+                results.extend(chunk_results)
+        return results
+
+    def validate_many(self, items: Iterable[Tuple[str, Dict[str, Any]]], concurrency: int = 8,
+                      **params: Any) -> List[Any]:
+        """并发验证 (user_id, 档案) 列表，按输入顺序返回响应体或异常"""
+        return self.map(lambda item: self.validate_profile(item[0], item[1], **params), items, concurrency)
+
+    def get_many(self, user_ids: Iterable[str], concurrency: int = 8) -> List[Any]:
+        """并发读取多个档案，按输入顺序返回data或异常"""
+        return self.map(self.get_profile, user_ids, concurrency)
+
+
+class AsyncProfileClient:
+    """asyncio客户端：在线程池中执行 ProfileClient 的调用，与同步调用共用连接池
+
+    线程数等于连接池大小，同时进行的请求数不会超过可复用的连接数。
+    """
+
+    def __init__(self, client: Optional[ProfileClient] = None, **kwargs: Any):
+        self.client = client or ProfileClient(**kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=self.client.pool.max_size,
+                                            thread_name_prefix='ai-support-client')
+
+    async def _call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    async def __aenter__(self) -> 'AsyncProfileClient':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> APIResponse:
+        return await self._call(self.client.request, method, path, **kwargs)
+
+    async def create_profile(self, profile: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._call(self.client.create_profile, profile, timeout)
+
+    async def get_profile(self, user_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._call(self.client.get_profile, user_id, timeout)
+
+    async def patch_profile(self, user_id: str, patch: Any, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._call(self.client.patch_profile, user_id, patch, timeout)
+
+    async def validate_profile(self, user_id: str, profile: Dict[str, Any], timeout: Optional[float] = None,
+                               **params: Any) -> Dict[str, Any]:
+        return await self._call(self.client.validate_profile, user_id, profile, timeout, **params)
+
+    async def get_job(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self._call(self.client.get_job, job_id, timeout)
+
+    async def batch(self, profiles: Iterable[Dict[str, Any]], mode: str = 'create',
+                    timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return await self._call(self.client.batch, list(profiles), mode, timeout)
+
+    async def gather(self, calls: Iterable[Callable[[], Any]], concurrency: int = 8,
+                     return_exceptions: bool = True) -> List[Any]:
+        """执行一组无参协程函数，最多 concurrency 个同时进行，按顺序返回结果"""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(call):
+            async with semaphore:
+                return await call()
+
+        return await asyncio.gather(*(run(call) for call in calls), return_exceptions=return_exceptions)
+
+    async def create_many(self, profiles: Sequence[Dict[str, Any]], concurrency: int = 8,
+                          use_batch: bool = True, batch_size: int = 200) -> List[Any]:
+        """与 ProfileClient.create_many 相同"""
+        if not use_batch:
+            return await self.gather([partial(self.create_profile, profile) for profile in profiles], concurrency)
+        chunks = _chunks(profiles, batch_size)
+        results: List[Any] = []
+        for chunk, chunk_results in zip(chunks, await self.gather([partial(self.batch, chunk) for chunk in chunks],
+                                                                  concurrency)):
+            if isinstance(chunk_results, Exception):
+                results.extend([chunk_results] * len(chunk))
+            else:
+                results.extend(chunk_results)
+        return results
+
+    async def validate_many(self, items: Iterable[Tuple[str, Dict[str, Any]]], concurrency: int = 8,
+                            **params: Any) -> List[Any]:
+        return await self.gather([partial(self.validate_profile, user_id, profile, **params)
+                                  for user_id, profile in items], concurrency)
+
+    async def get_many(self, user_ids: Iterable[str], concurrency: int = 8) -> List[Any]:
+        return await self.gather([partial(self.get_profile, user_id) for user_id in user_ids], concurrency)
@@ -0,0 +1,234 @@
+"""
+AI Support System - 档案紧凑内存表示
+在进程内常驻大量档案（百万级）时代替Pydantic模型对象：
+
+- 所有记录使用 __slots__，不带实例字典
+- 技能名、城市、学校、学位、专业、公司、职位等重复取值经字符串池共享，同一取值只保存一份
+- 技能按列存放：名称编码（array('I')）、等级（bytes）、经验年数（array('d')）
+- 日期保存为公历序数（date.toordinal()）
+- personal_info / preferences 的键组合（形状）在档案间共享，只保存取值元组；
+  其中只有 INTERNED_FREE_KEYS 列出的低基数字段（性别、期望地点等）的取值进入字符串池
+
+与API模型之间的转换：CompactProfile.from_model(UserProfile) / .to_model()。
+to_model 跳过校验（数据在转换为紧凑表示之前已经校验过），序列化结果与原模型一致。
+本模块是按需使用的库：服务端的读取路径直接返回存储中的JSON文档，不在进程内常驻模型对象。
+"""
+
+import threading
+from array import array
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models import Address, ContactInfo, Education, Skill, UserProfile, WorkExperience
+
+
+class StringPool:
+    """进程内共享的字符串池
+
+    intern() 返回同一取值的同一个字符串对象；code() 为取值分配整数编码，供数组列使用。
+    池只增不减，只应放入取值集合有限的字段。
+    """
+
+    def __init__(self, max_length: int = 64):
+        self.max_length = max_length
+        self._canonical: Dict[Any, Any] = {}
+        self._codes: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, value):
+        """返回共享的字符串对象；None和超长字符串原样返回"""
+        if value is None or len(value) > self.max_length:
+            return value
+        return self._canonical.setdefault(value, value)
+
+    def shape(self, keys: Tuple[str, ...]) -> Tuple[str, ...]:
+        """返回共享的字符串元组（字典的键组合、技能的认证列表）"""
+        return self._canonical.setdefault(keys, keys)
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._strings)
+                    self._strings.append(self.intern(value))
+                    self._codes[value] = code
+        return code
+
+    def string(self, code: int) -> str:
+        return self._strings[code]
+
+    def stats(self) -> Dict[str, int]:
+        return {'interned': len(self._canonical), 'coded': len(self._strings)}
+
+
+# 默认的进程级字符串池
+strings = StringPool()
+
+
+# personal_info / preferences 中取值集合有限的字段，其字符串取值进入字符串池；
+# 姓名等大多各不相同的取值不放入（池只增不减）
+INTERNED_FREE_KEYS = frozenset({'gender', 'work_location', 'work_type', 'company_size', 'industry'})
+
+
+def _intern_value(key: str, value: Any) -> Any:
+    if key in INTERNED_FREE_KEYS and type(value) is str:
+        return strings.intern(value)
+    return value
+
+
+def _copy_value(value: Any) -> Any:
+    """还原自由字段时复制可变取值，避免调用方修改影响常驻数据"""
+    if type(value) is dict:
+        return {key: _copy_value(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_copy_value(item) for item in value]
+    return value
+
+
+def _pack_dict(value: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[Any, ...]]:
+    return strings.shape(tuple(strings.intern(key) for key in value)), \
+        tuple(_intern_value(key, item) for key, item in value.items())
+
+
+def _unpack_dict(keys: Tuple[str, ...], values: Tuple[Any, ...]) -> Dict[str, Any]:
+    return {key: _copy_value(value) for key, value in zip(keys, values)}
+
+
+_object_setattr = object.__setattr__
+
+
+def _construct(cls, **fields):
+    """不经校验直接创建模型实例
+
+    等同于给出全部字段时的 model_construct，省去其逐字段查找别名和默认值的开销
+    （这些模型没有额外字段、私有属性和 model_post_init）。
+    """
+    model = cls.__new__(cls)
+    _object_setattr(model, '__dict__', fields)
+    _object_setattr(model, '__pydantic_fields_set__', set(fields))
+    _object_setattr(model, '__pydantic_extra__', None)
+    _object_setattr(model, '__pydantic_private__', None)
+    return model
+
+
+def _ordinal(value: Optional[date]) -> Optional[int]:
+    return value.toordinal() if value is not None else None
+
+
+def _date(value: Optional[int]) -> Optional[date]:
+    return date.fromordinal(value) if value is not None else None
+
+
+class CompactEducation:
+    __slots__ = ('school', 'degree', 'major', 'graduation', 'gpa')
+
+    def __init__(self, school: str, degree: str, major: str, graduation: int, gpa: Optional[float]):
+        self.school = school
+        self.degree = degree
+        self.major = major
+        self.graduation = graduation
+        self.gpa = gpa
+
+    @classmethod
+    def from_model(cls, education: Education) -> 'CompactEducation':
+        return cls(strings.intern(education.school), strings.intern(education.degree),
+                   strings.intern(education.major), education.graduation_date.toordinal(), education.gpa)
+
+    def to_model(self) -> Education:
+        return _construct(Education, school=self.school, degree=self.degree, major=self.major,
+                          graduation_date=date.fromordinal(self.graduation), gpa=self.gpa)
+
+
+class CompactWork:
+    __slots__ = ('company', 'position', 'start', 'end', 'description', 'achievements')
+
+    def __init__(self, company: str, position: str, start: int, end: Optional[int],
+                 description: str, achievements: Tuple[str, ...]):
+        self.company = company
+        self.position = position
+        self.start = start
+        self.end = end
+        self.description = description
+        self.achievements = achievements
+
+    @classmethod
+    def from_model(cls, work: WorkExperience) -> 'CompactWork':
+        return cls(strings.intern(work.company), strings.intern(work.position), work.start_date.toordinal(),
+                   _ordinal(work.end_date), work.description, tuple(work.achievements))
+
+    def to_model(self) -> WorkExperience:
+        return _construct(
+            WorkExperience,
+            company=self.company, position=self.position, start_date=date.fromordinal(self.start),
+            end_date=_date(self.end), description=self.description, achievements=list(self.achievements)
+        )
+
+
+class CompactProfile:
+    """一份档案的紧凑表示，字段与 UserProfile 一一对应"""
+
+    __slots__ = (
+        'personal_keys', 'personal_values',
+        'email', 'phone', 'wechat', 'qq',
+        'street', 'city', 'state', 'postal_code', 'country',
+        'skill_names', 'skill_levels', 'skill_years', 'skill_certifications',
+        'education', 'work_experience',
+        'preference_keys', 'preference_values',
+    )
+
+    @classmethod
+    def from_model(cls, profile: UserProfile) -> 'CompactProfile':
+        self = cls.__new__(cls)
+        self.personal_keys, self.personal_values = _pack_dict(profile.personal_info)
+
+        contact = profile.contact
+        self.email = contact.email
+        self.phone = contact.phone
+        self.wechat = contact.wechat
+        self.qq = contact.qq
+
+        address = profile.address
+        self.street = address.street
+        self.city = strings.intern(address.city)
+        self.state = strings.intern(address.state)
+        self.postal_code = address.postal_code
+        self.country = strings.intern(address.country)
+
+        skills = profile.skills
+        self.skill_names = array('I', [strings.code(skill.name) for skill in skills])
+        self.skill_levels = bytes(skill.level for skill in skills)
+        self.skill_years = array('d', [skill.years_experience for skill in skills])
+        # 多数技能没有认证，全部为空时不保存
+        certifications = tuple(strings.shape(tuple(map(strings.intern, skill.certifications))) for skill in skills)
+        self.skill_certifications = certifications if any(certifications) else None
+
+        self.education = tuple(map(CompactEducation.from_model, profile.education))
+        self.work_experience = tuple(map(CompactWork.from_model, profile.work_experience))
+        self.preference_keys, self.preference_values = _pack_dict(profile.preferences)
+        return self
+
+    def skills(self) -> List[Skill]:
+        certifications = self.skill_certifications or ((),) * len(self.skill_levels)
+        return [
+            _construct(Skill, name=strings.string(code), level=level, years_experience=years,
+                       certifications=list(certs))
+            for code, level, years, certs in zip(self.skill_names, self.skill_levels,
+                                                 self.skill_years, certifications)
+        ]
+
+    def to_model(self) -> UserProfile:
+        """还原为 UserProfile（不重新校验）"""
+        return _construct(
+            UserProfile,
+            personal_info=_unpack_dict(self.personal_keys, self.personal_values),
+            contact=_construct(ContactInfo, email=self.email, phone=self.phone, wechat=self.wechat, qq=self.qq),
+            address=_construct(Address, street=self.street, city=self.city, state=self.state,
+                               postal_code=self.postal_code, country=self.country),
+            skills=self.skills(),
+            education=[education.to_model() for education in self.education],
+            work_experience=[work.to_model() for work in self.work_experience],
+            preferences=_unpack_dict(self.preference_keys, self.preference_values)
+        )
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+AI Support System - 近重复档案检测
+对每个档案的联系方式、教育经历和工作经历文本提取特征片段（shingle），计算MinHash签名，
+并按带（band）切分签名建立LSH桶：
+- 两个档案的签名逐位相等的比例即特征片段集合Jaccard相似度的估计
+- 任一带完全相同的档案才成为候选，查询只需查找各带对应的桶，不做两两比较
+- 学校、公司职位等结构化特征按权重重复计入，避免长段工作描述淹没其余信息
+- 相似度达到阈值且姓名、邮箱、手机号至少一项相同才判为近重复：换了手机号的同一候选人仍能识别，
+  套用相同描述模板的不同候选人不会被误判
+
+创建/批量导入时按 DEDUP_MODE 标记（flag）或合并（merge）近重复档案；已有存储可离线去重:
+    python -m app.dedup --database-url sqlite:///app.db [--threshold 0.8] [--apply]
+"""
+
+import os
+import sys
+import json
+import zlib
+import argparse
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.fulltext import tokenize
+from app.models import UserProfile
+from app.store import ChangeFeed, ProfileStore, parse_database_url
+
+SEED = 20240601
+# 结构化特征（姓名、学校/学位/专业、公司/职位）计入的次数
+IDENTITY_WEIGHT = 8
+IDENTITY_FIELDS = ('name', 'email', 'phone')
+# 单个LSH桶最多保留的档案数，超出时淘汰最早加入的档案（大量档案套用同一模板时保持查询为常数级）
+MAX_BUCKET_SIZE = 64
+
+
+def _normalize(value: Any) -> str:
+    return str(value).strip().casefold() if value is not None else ''
+
+
+class Fingerprint(NamedTuple):
+    """档案指纹：MinHash签名与姓名/邮箱/手机号的哈希（缺失为0）"""
+    signature: np.ndarray
+    identity: np.ndarray
+
+
+def _features(name: Any, contact: Dict[str, Any], education: Iterable[Tuple[Any, Any, Any]],
+              work: Iterable[Tuple[Any, Any]], texts: Iterable[str]) -> Tuple[Set[str], Tuple[str, str, str]]:
+    """返回 (特征片段集合, (姓名, 邮箱, 手机号))"""
+    structured = set()
+    if _normalize(name):
+        structured.add(f"name:{_normalize(name)}")
+    for school, degree, major in education:
+        structured.add(f"edu:{_normalize(school)}|{_normalize(degree)}|{_normalize(major)}")
+    for company, position in work:
+        structured.add(f"work:{_normalize(company)}|{_normalize(position)}")
+
+    shingles = {f"{item}#{i}" for item in structured for i in range(IDENTITY_WEIGHT)}
+    for field in ('email', 'phone', 'wechat', 'qq'):
+        if _normalize(contact.get(field)):
+            shingles.add(f"{field}:{_normalize(contact.get(field))}")
+    shingles.update(f"text:{token}" for text in texts for token in tokenize(text))
+    return shingles, (_normalize(name), _normalize(contact.get('email')), _normalize(contact.get('phone')))
+
+
+def features_from_model(profile: UserProfile) -> Tuple[Set[str], Tuple[str, str, str]]:
+    """从已校验的UserProfile提取特征"""
+    return _features(
+        profile.personal_info.get('name'),
+        {'email': profile.contact.email, 'phone': profile.contact.phone,
+         'wechat': profile.contact.wechat, 'qq': profile.contact.qq},
+        ((e.school, e.degree, e.major) for e in profile.education),
+        ((w.company, w.position) for w in profile.work_experience),
+        (text for w in profile.work_experience for text in [w.description, *w.achievements])
+    )
+
+
+def features_from_document(document: Dict[str, Any]) -> Tuple[Set[str], Tuple[str, str, str]]:
+    """从存储文档（UserProfileResponse序列化结果）提取特征"""
+    profile = document.get('profile', document)
+    education = profile.get('education') or []
+    work = profile.get('work_experience') or []
+    return _features(
+        (profile.get('personal_info') or {}).get('name'),
+        profile.get('contact') or {},
+        ((e.get('school'), e.get('degree'), e.get('major')) for e in education),
+        ((w.get('company'), w.get('position')) for w in work),
+        (text for w in work for text in [w.get('description') or '', *(w.get('achievements') or [])])
+    )
+
+
+class MinHasher:
+    """MinHash签名：num_perm 个乘移位哈希 (a * x + b) >> 32 在特征片段的32位哈希上取最小值"""
+
+    def __init__(self, num_perm: int = 64, seed: int = SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, shingles: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        values = (self.a * hashes + self.b) >> np.uint64(32)
+        return values.min(axis=1).astype(np.uint32)
+
+    def fingerprint(self, features: Tuple[Set[str], Tuple[str, str, str]]) -> Fingerprint:
+        shingles, identity = features
+        return Fingerprint(
+            self.signature(shingles),
+            np.array([zlib.crc32(value.encode('utf-8')) if value else 0 for value in identity], dtype=np.uint32)
+        )
+
+
+class DedupIndex:
+    """MinHash LSH近重复索引（进程内）"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 initial_rows: int = 1024, refresh_interval: float = 1.0, refresh_overlap: float = 5.0):
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = MinHasher(num_perm)
+        self._band_mix = np.random.default_rng(SEED + 1).integers(
+            1, 1 << 63, size=num_perm // bands, dtype=np.uint64)
+        self._lock = threading.RLock()
+        self._feed = ChangeFeed(refresh_interval, refresh_overlap)
+        self._doc_ids: Dict[str, int] = {}
+        self._user_ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._signatures = np.zeros((max(1, initial_rows), num_perm), dtype=np.uint32)
+        self._identity = np.zeros((max(1, initial_rows), len(IDENTITY_FIELDS)), dtype=np.uint32)
+        # 每个带：桶键 -> 文档号（单个时直接存int，多个时存list，最多 MAX_BUCKET_SIZE 个）
+        self._buckets: List[Dict[int, Any]] = [{} for _ in range(bands)]
+
+    @classmethod
+    def from_env(cls) -> 'DedupIndex':
+        """根据环境变量创建（DEDUP_THRESHOLD / DEDUP_NUM_PERM / DEDUP_BANDS / DEDUP_INITIAL_ROWS）"""
+        return cls(
+            threshold=float(os.environ.get('DEDUP_THRESHOLD', 0.8)),
+            num_perm=int(os.environ.get('DEDUP_NUM_PERM', 64)),
+            bands=int(os.environ.get('DEDUP_BANDS', 16)),
+            initial_rows=int(os.environ.get('DEDUP_INITIAL_ROWS', 1024)),
+            refresh_interval=float(os.environ.get('SEARCH_INDEX_REFRESH_INTERVAL', 1.0)),
+            refresh_overlap=float(os.environ.get('SEARCH_INDEX_REFRESH_OVERLAP', 5.0))
+        )
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def fingerprint_from_model(self, profile: UserProfile) -> Fingerprint:
+        return self.hasher.fingerprint(features_from_model(profile))
+
+    def fingerprint_from_document(self, document: Dict[str, Any]) -> Fingerprint:
+        return self.hasher.fingerprint(features_from_document(document))
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        rows = signature.reshape(self.bands, -1).astype(np.uint64)
+        return (rows * self._band_mix).sum(axis=1).tolist()
+
+    # ---------- 增量更新 ----------
+
+    def add(self, user_id: str, fingerprint: Fingerprint) -> None:
+        """添加或替换一个档案的指纹（指纹未变化时不做任何操作）"""
+        signature = fingerprint.signature
+        with self._lock:
+            doc = self._doc_ids.get(user_id)
+            if doc is not None:
+                if (np.array_equal(self._signatures[doc], signature)
+                        and np.array_equal(self._identity[doc], fingerprint.identity)):
+                    return
+                self.remove(user_id)
+            if self._free:
+                doc = self._free.pop()
+                self._user_ids[doc] = user_id
+            else:
+                doc = len(self._user_ids)
+                self._user_ids.append(user_id)
+                if doc >= len(self._signatures):
+                    self._signatures = self._grow(self._signatures)
+                    self._identity = self._grow(self._identity)
+            self._doc_ids[user_id] = doc
+            self._signatures[doc] = signature
+            self._identity[doc] = fingerprint.identity
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                members = buckets.get(key)
+                if members is None:
+                    buckets[key] = doc
+                elif isinstance(members, list):
+                    if len(members) >= MAX_BUCKET_SIZE:
+                        del members[0]
+                    members.append(doc)
+                else:
+                    buckets[key] = [members, doc]
+
+    @staticmethod
+    def _grow(matrix: np.ndarray) -> np.ndarray:
+        grown = np.zeros((len(matrix) * 2, matrix.shape[1]), dtype=matrix.dtype)
+        grown[:len(matrix)] = matrix
+        return grown
+
+    def remove(self, user_id: str) -> bool:
+        """移除一个档案，返回是否存在"""
+        with self._lock:
+            doc = self._doc_ids.pop(user_id, None)
+            if doc is None:
+                return False
+            for buckets, key in zip(self._buckets, self._band_keys(self._signatures[doc])):
+                members = buckets.get(key)
+                if isinstance(members, list):
+                    if doc in members:
+                        members.remove(doc)
+                    if len(members) == 1:
+                        buckets[key] = members[0]
+                elif members == doc:
+                    del buckets[key]
+            self._user_ids[doc] = None
+            self._free.append(doc)
+            return True
+
+    def refresh(self, store, force: bool = False) -> int:
+        """从存储增量同步新增或更新的档案（首次调用时全量加载），返回处理的行数"""
+        if not force and not self._feed.due():
+            return 0
+        with self._lock:
+            if not force and not self._feed.due():
+                return 0
+            rows = 0
+            for user_id, document in self._feed.poll(store):
+                if document is None:
+                    self.remove(user_id)
+                else:
+                    self.add(user_id, self.fingerprint_from_document(json.loads(document)))
+                rows += 1
+            return rows
+
+    # ---------- 查询 ----------
+
+    def find(self, fingerprint: Fingerprint, exclude: Optional[str] = None,
+             limit: int = 5) -> List[Dict[str, Any]]:
+        """查找估计相似度不低于阈值且姓名/邮箱/手机号至少一项相同的档案，
+        按相似度从高到低返回 [{'user_id', 'similarity'}]"""
+        signature = fingerprint.signature
+        with self._lock:
+            candidates = set()
+            for buckets, key in zip(self._buckets, self._band_keys(signature)):
+                members = buckets.get(key)
+                if members is None:
+                    continue
+                if isinstance(members, list):
+                    candidates.update(members)
+                else:
+                    candidates.add(members)
+            exclude_doc = self._doc_ids.get(exclude) if exclude is not None else None
+            candidates.discard(exclude_doc)
+            if not candidates:
+                return []
+            docs = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (self._signatures[docs] == signature).mean(axis=1)
+            same_identity = ((self._identity[docs] == fingerprint.identity)
+                             & (fingerprint.identity != 0)).any(axis=1)
+            keep = (similarity >= self.threshold) & same_identity
+            docs, similarity = docs[keep], similarity[keep]
+            order = np.lexsort((docs, -similarity))[:limit]
+            return [{'user_id': self._user_ids[docs[i]], 'similarity': round(float(similarity[i]), 4)}
+                    for i in order.tolist()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'profiles': len(self._doc_ids),
+            'threshold': self.threshold,
+            'num_perm': self.hasher.num_perm,
+            'bands': self.bands,
+            'signature_bytes': int(self._signatures.nbytes + self._identity.nbytes),
+            'watermark': self._feed.watermark
+        }
+
+
+def find_duplicate_groups(store, index: DedupIndex) -> List[List[Tuple[str, str]]]:
+    """按updated_at从早到晚遍历存储，返回近重复档案组 [[(user_id, updated_at), ...]]，组内按时间排序"""
+    parent: Dict[str, str] = {}
+    updated: Dict[str, str] = {}
+
+    def root(user_id: str) -> str:
+        while parent[user_id] != user_id:
+            parent[user_id] = parent[parent[user_id]]
+            user_id = parent[user_id]
+        return user_id
+
+    for user_id, document, updated_at in store.iter_documents(updated_since=''):
+        fingerprint = index.fingerprint_from_document(json.loads(document))
+        parent[user_id] = user_id
+        updated[user_id] = updated_at
+        for match in index.find(fingerprint, limit=index.hasher.num_perm):
+            parent[root(match['user_id'])] = root(user_id)
+        index.add(user_id, fingerprint)
+
+    groups: Dict[str, List[str]] = {}
+    for user_id in parent:
+        groups.setdefault(root(user_id), []).append(user_id)
+    return [sorted(((user_id, updated[user_id]) for user_id in members), key=lambda item: item[1])
+            for members in groups.values() if len(members) > 1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='离线检测并清理近重复用户档案')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///app.db'),
+                        help='档案存储地址（默认读取DATABASE_URL）')
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('DEDUP_THRESHOLD', 0.8)),
+                        help='估计Jaccard相似度阈值')
+    parser.add_argument('--output', help='重复组报告输出文件（JSON）')
+    parser.add_argument('--apply', action='store_true', help='每组只保留最近更新的档案，删除其余档案')
+    args = parser.parse_args(argv)
+
+    store = ProfileStore(parse_database_url(args.database_url))
+    index = DedupIndex(threshold=args.threshold)
+    groups = find_duplicate_groups(store, index)
+    report = [{'keep': group[-1][0], 'duplicates': [user_id for user_id, _ in group[:-1]]} for group in groups]
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    duplicates = sum(len(item['duplicates']) for item in report)
+    deleted = 0
+    if args.apply:
+        for item in report:
+            deleted += sum(store.delete(user_id) for user_id in item['duplicates'])
+
+    print("=" * 50)
+    print(f"扫描档案: {len(index)} 条, 近重复组: {len(report)} 个, 重复档案: {duplicates} 条")
+    if args.apply:
+        print(f"已删除: {deleted} 条（每组保留最近更新的档案）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
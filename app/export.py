@@ -0,0 +1,194 @@
+"""
+AI Support System - 档案全量导出
+GET /api/user-profiles/export 的流式输出管道：存储逐批读取 -> 逐行转换 -> 按块缓冲 -> 可选gzip压缩。
+每个环节都是生成器，任何时刻只保留一批存储行和一个输出块，内存占用与档案总数无关。
+
+- NDJSON：每行直接输出存储中的档案文档（与 GET /api/user-profile/<user_id> 的data字段相同），不做解析
+- CSV（explode=columns）：每个档案一行，技能/教育/工作经历按 skills_1_name 形式展开为固定列数
+- CSV（explode=rows）：每个技能/教育/工作经历一行，以 user_id 关联档案
+日期字段由存储中的HTTP日期格式转换为ISO格式。
+"""
+
+import io
+import csv
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# 档案级字段：(列名, 所在段落, 字段名)；段落为空表示文档顶层字段
+PROFILE_FIELDS = (
+    ('user_id', None, 'user_id'), ('status', None, 'status'), ('score', None, 'score'),
+    ('created_at', None, 'created_at'), ('updated_at', None, 'updated_at'),
+    ('name', 'personal_info', 'name'), ('gender', 'personal_info', 'gender'), ('age', 'personal_info', 'age'),
+    ('email', 'contact', 'email'), ('phone', 'contact', 'phone'),
+    ('wechat', 'contact', 'wechat'), ('qq', 'contact', 'qq'),
+    ('street', 'address', 'street'), ('city', 'address', 'city'), ('state', 'address', 'state'),
+    ('postal_code', 'address', 'postal_code'), ('country', 'address', 'country'),
+)
+# personal_info / preferences 为自由字段，整体以JSON文本输出
+JSON_SECTIONS = ('personal_info', 'preferences')
+LIST_FIELDS = {
+    'skills': ('name', 'level', 'years_experience', 'certifications'),
+    'education': ('school', 'degree', 'major', 'graduation_date', 'gpa'),
+    'work_experience': ('company', 'position', 'start_date', 'end_date', 'description', 'achievements'),
+}
+DATE_FIELDS = frozenset({'graduation_date', 'start_date', 'end_date'})
+TIMESTAMP_FIELDS = frozenset({'created_at', 'updated_at'})
+ITEM_FIELDS = tuple(dict.fromkeys(field for fields in LIST_FIELDS.values() for field in fields))
+
+FORMATS = ('ndjson', 'csv')
+EXPLODE_MODES = ('columns', 'rows')
+
+Row = Tuple[str, str, str]
+
+
+_MONTHS = {name: f"{i:02d}" for i, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+
+def _iso_timestamp(value: str) -> str:
+    """HTTP日期（'Wed, 01 Jun 2020 00:00:00 GMT'，固定格式）按位置切分转换为ISO格式，其他格式原样返回"""
+    month = _MONTHS.get(value[8:11])
+    if month is None or len(value) != 29 or not value.endswith(' GMT'):
+        return value
+    return f"{value[12:16]}-{month}-{value[5:7]}T{value[17:25]}"
+
+
+def _iso_date(value: Any) -> Any:
+    if not value:
+        return ''
+    timestamp = _iso_timestamp(value)
+    return timestamp[:10] if timestamp is not value else value
+
+
+def _plain(value: Any) -> Any:
+    """单元格取值：列表以 '; ' 连接，None输出为空"""
+    if value is None:
+        return ''
+    if type(value) is list:
+        return '; '.join(map(str, value))
+    return value
+
+
+def _converter(field: str):
+    if field in DATE_FIELDS:
+        return _iso_date
+    if field in TIMESTAMP_FIELDS:
+        return lambda value: _iso_timestamp(value) if value else ''
+    return _plain
+
+
+# 各列表段落的 (字段名, 转换函数)，避免逐个单元格判断字段类型
+SECTION_CONVERTERS = {
+    section: tuple((field, _converter(field)) for field in fields) for section, fields in LIST_FIELDS.items()
+}
+PROFILE_CONVERTERS = tuple((section, field, _converter(field)) for _, section, field in PROFILE_FIELDS)
+# 复用同一个编码器，避免 json.dumps 带参数调用时每次新建
+_json_encoder = json.JSONEncoder(ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def _profile_cells(document: Dict[str, Any], profile: Dict[str, Any]) -> List[Any]:
+    cells = []
+    for section, field, convert in PROFILE_CONVERTERS:
+        source = document if section is None else (profile.get(section) or {})
+        cells.append(convert(source.get(field)))
+    for section in JSON_SECTIONS:
+        cells.append(_json_encoder.encode(profile.get(section) or {}))
+    return cells
+
+
+# ---------- CSV布局 ----------
+
+def csv_header(explode: str, max_items: int) -> List[str]:
+    if explode == 'rows':
+        return ['user_id', 'section', 'item_index', *ITEM_FIELDS]
+    header = [column for column, _, _ in PROFILE_FIELDS] + list(JSON_SECTIONS)
+    for section, fields in LIST_FIELDS.items():
+        header.append(f"{section}_count")
+        for i in range(1, max_items + 1):
+            header.extend(f"{section}_{i}_{field}" for field in fields)
+    return header
+
+
+def flatten_columns(document: Dict[str, Any], max_items: int) -> List[Any]:
+    """一个档案展开为一行，每个列表段落输出前 max_items 项"""
+    profile = document.get('profile') or {}
+    cells = _profile_cells(document, profile)
+    for section, converters in SECTION_CONVERTERS.items():
+        items = profile.get(section) or []
+        cells.append(len(items))
+        for item in items[:max_items]:
+            for field, convert in converters:
+                cells.append(convert(item.get(field)))
+        if len(items) < max_items:
+            cells.extend([''] * (len(converters) * (max_items - len(items))))
+    return cells
+
+
+def flatten_rows(document: Dict[str, Any]) -> Iterator[List[Any]]:
+    """一个档案的每个列表项展开为一行"""
+    profile = document.get('profile') or {}
+    user_id = document.get('user_id')
+    for section, converters in SECTION_CONVERTERS.items():
+        for index, item in enumerate(profile.get(section) or []):
+            cells = dict.fromkeys(ITEM_FIELDS, '')
+            for field, convert in converters:
+                cells[field] = convert(item.get(field))
+            yield [user_id, section, index, *cells.values()]
+
+
+# ---------- 流式管道 ----------
+
+def ndjson_chunks(rows: Iterable[Row], chunk_size: int) -> Iterator[bytes]:
+    """存储文档已是单行紧凑JSON（ASCII），直接拼接输出"""
+    parts: List[str] = []
+    size = 0
+    for _, document, _ in rows:
+        parts.append(document)
+        size += len(document) + 1
+        if size >= chunk_size:
+            parts.append('')
+            yield '\n'.join(parts).encode('ascii')
+            parts.clear()
+            size = 0
+    if parts:
+        parts.append('')
+        yield '\n'.join(parts).encode('ascii')
+
+
+def csv_chunks(rows: Iterable[Row], explode: str, max_items: int, chunk_size: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(csv_header(explode, max_items))
+    for _, document, _ in rows:
+        document = json.loads(document)
+        if explode == 'rows':
+            writer.writerows(flatten_rows(document))
+        else:
+            writer.writerow(flatten_columns(document, max_items))
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """增量gzip压缩（压缩器只保留固定大小的窗口）"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(rows: Iterable[Row], fmt: str = 'ndjson', explode: str = 'columns', max_items: int = 3,
+                  compress: bool = False, chunk_size: int = 64 * 1024, gzip_level: int = 6) -> Iterator[bytes]:
+    """组装导出管道，返回输出块的生成器"""
+    if fmt == 'csv':
+        chunks = csv_chunks(rows, explode, max_items, chunk_size)
+    else:
+        chunks = ndjson_chunks(rows, chunk_size)
+    return gzip_chunks(chunks, gzip_level) if compress else chunks
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+AI Support System - 工作经历全文检索
+对 work_experience 的 description 与 achievements 建立BM25倒排索引：
+- 分词：英文/数字按词切分（小写），中文按相邻两字切分（bigram），单字成段时保留单字
+- 倒排表按数组紧凑存储：离线构建或合并后的“基础段”为连续的 uint32 文档号 / uint16 词频数组，
+  新写入的档案进入按词追加的“增量段”（array），查询时两段一起参与计算
+- 更新档案时旧文档号标记删除、以新文档号重新写入（文本未变化时跳过）；compact() 合并增量段、
+  丢弃已删除的倒排项并重新连续编号文档号，由后台线程在超过阈值时执行（查询路径只做增量同步）
+- 打分用NumPy对每个查询词的倒排表向量化计算；文档频率超过 common_ratio 的常见词（如“负责”“系统”）
+  只对包含其他查询词的候选档案二分查找打分，不遍历整条倒排表；查询词全部为常见词时全部完整打分
+
+离线构建（写入 FULLTEXT_INDEX_PATH，服务启动后加载并只同步之后的增量）:
+    python -m app.fulltext build --database-url sqlite:///app.db --output fulltext.npz
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import hashlib
+import argparse
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import UserProfile
+from app.store import ChangeFeed, ProfileStore, parse_database_url
+
+K1 = 1.2
+B = 0.75
+SNIPPET_CHARS = 60
+MAX_TF = 65535
+# 增量段倒排项超过 max(COMPACT_MIN_POSTINGS, 基础段 * COMPACT_RATIO) 时后台合并
+COMPACT_MIN_POSTINGS = 200_000
+COMPACT_RATIO = 0.25
+# 已删除的文档号超过 max(COMPACT_MIN_DELETED, 存活档案数 * COMPACT_RATIO) 时后台合并
+COMPACT_MIN_DELETED = 10_000
+# 文档频率同时超过该值与 common_ratio 比例的词视为常见词（档案较少时全部完整打分）
+COMMON_MIN_DF = 1000
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+[+#]*|[㐀-鿿]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """英文/数字按词切分，中文连续片段切分为相邻两字"""
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.casefold()):
+        if run[0] < '㐀':
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def texts_from_model(profile: UserProfile) -> List[str]:
+    texts = []
+    for work in profile.work_experience:
+        texts.append(work.description)
+        texts.extend(work.achievements)
+    return texts
+
+
+def texts_from_document(document: Dict[str, Any]) -> List[str]:
+    profile = document.get('profile', document)
+    texts = []
+    for work in profile.get('work_experience', []):
+        texts.append(work.get('description') or '')
+        texts.extend(work.get('achievements') or [])
+    return texts
+
+
+def text_digest(texts: Iterable[str]) -> int:
+    """文本内容的64位摘要（跨进程稳定，随索引文件保存），用于跳过未变化的档案"""
+    digest = hashlib.blake2b(digest_size=8)
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\x1f')
+    return int.from_bytes(digest.digest(), 'little', signed=True)
+
+
+def make_snippet(document: Dict[str, Any], terms: Iterable[str]) -> Dict[str, Any]:
+    """从档案文档中找出命中查询词最多的一段文本，截取命中位置附近的片段"""
+    terms = set(terms)
+    profile = document.get('profile', document)
+    best = None
+    for work in profile.get('work_experience', []):
+        candidates = [('description', work.get('description') or '')]
+        candidates += [('achievements', text) for text in work.get('achievements') or []]
+        for field, text in candidates:
+            hits = sum(1 for token in tokenize(text) if token in terms)
+            if hits and (best is None or hits > best[0]):
+                best = (hits, field, text, work)
+    if best is None:
+        return {'snippet': '', 'field': None, 'company': None, 'position': None}
+
+    _, field, text, work = best
+    lowered = text.casefold()
+    positions = [lowered.find(term) for term in terms if term in lowered]
+    start = max(0, min(positions) - SNIPPET_CHARS // 4) if positions else 0
+    snippet = text[start:start + SNIPPET_CHARS]
+    return {
+        'snippet': ('…' if start else '') + snippet + ('…' if start + SNIPPET_CHARS < len(text) else ''),
+        'field': field,
+        'company': work.get('company'),
+        'position': work.get('position')
+    }
+
+
+class FullTextIndex:
+    """BM25倒排索引（进程内）"""
+
+    def __init__(self, refresh_interval: float = 1.0, refresh_overlap: float = 5.0,
+                 common_ratio: float = 0.01):
+        self.common_ratio = common_ratio
+        self._lock = threading.RLock()
+        # 同一时间只进行一次合并；先于 _lock 获取
+        self._compact_lock = threading.Lock()
+        # 加载离线索引时递增，进行中的合并据此放弃结果
+        self._generation = 0
+        self._feed = ChangeFeed(refresh_interval, refresh_overlap)
+        self._doc_ids: Dict[str, int] = {}
+        self._user_ids: List[Optional[str]] = []
+        self._doc_len = array('I')
+        self._doc_hash = array('q')
+        self._deleted = bytearray()
+        self._deleted_ids: Optional[np.ndarray] = None
+        self._live_docs = 0
+        self._live_len = 0
+        # 基础段：term -> (起始, 结束)，对应连续数组中的区间
+        self._base_offsets: Dict[str, Tuple[int, int]] = {}
+        self._base_docs = np.zeros(0, dtype=np.uint32)
+        self._base_tfs = np.zeros(0, dtype=np.uint16)
+        # 增量段：term -> (文档号数组, 词频数组)
+        self._delta: Dict[str, Tuple[array, array]] = {}
+        self._delta_postings = 0
+
+    @classmethod
+    def from_env(cls) -> 'FullTextIndex':
+        """根据环境变量创建，FULLTEXT_INDEX_PATH 指向离线构建的索引文件时先加载"""
+        index = cls(
+            refresh_interval=float(os.environ.get('SEARCH_INDEX_REFRESH_INTERVAL', 1.0)),
+            refresh_overlap=float(os.environ.get('SEARCH_INDEX_REFRESH_OVERLAP', 5.0)),
+            common_ratio=float(os.environ.get('FULLTEXT_COMMON_TERM_RATIO', 0.01))
+        )
+        path = os.environ.get('FULLTEXT_INDEX_PATH')
+        if path and os.path.exists(path):
+            index.load(path)
+        return index
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    # ---------- 增量更新 ----------
+
+    def add(self, user_id: str, texts: Iterable[str]) -> None:
+        """写入一个档案的工作经历文本（已存在时替换，文本未变化时不做任何操作）"""
+        texts = list(texts)
+        digest = text_digest(texts)
+        with self._lock:
+            doc = self._doc_ids.get(user_id)
+            if doc is not None and self._doc_hash[doc] == digest:
+                return
+        counts = Counter(token for text in texts for token in tokenize(text))
+        with self._lock:
+            self.remove(user_id)
+            if not counts:
+                return
+            doc = len(self._user_ids)
+            self._doc_ids[user_id] = doc
+            self._user_ids.append(user_id)
+            length = sum(counts.values())
+            self._doc_len.append(length)
+            self._doc_hash.append(digest)
+            self._deleted.append(0)
+            self._live_docs += 1
+            self._live_len += length
+            for term, tf in counts.items():
+                postings = self._delta.get(term)
+                if postings is None:
+                    postings = self._delta[term] = (array('I'), array('H'))
+                postings[0].append(doc)
+                postings[1].append(min(tf, MAX_TF))
+            self._delta_postings += len(counts)
+
+    def remove(self, user_id: str) -> bool:
+        """标记删除一个档案，返回是否存在"""
+        with self._lock:
+            doc = self._doc_ids.pop(user_id, None)
+            if doc is None:
+                return False
+            self._deleted[doc] = 1
+            self._deleted_ids = None
+            self._user_ids[doc] = None
+            self._live_docs -= 1
+            self._live_len -= self._doc_len[doc]
+            return True
+
+    def refresh(self, store, force: bool = False) -> int:
+        """从存储增量同步新增或更新的档案（未加载离线索引时首次调用全量构建），返回处理的行数"""
+        if not force and not self._feed.due():
+            return 0
+        with self._lock:
+            if not force and not self._feed.due():
+                return 0
+            rows = 0
+            for user_id, document in self._feed.poll(store):
+                if document is None:
+                    self.remove(user_id)
+                else:
+                    self.add(user_id, texts_from_document(json.loads(document)))
+                rows += 1
+            return rows
+
+    def needs_compaction(self) -> bool:
+        """增量段倒排项或已删除的文档号超过阈值时需要合并"""
+        dead = len(self._user_ids) - self._live_docs
+        return (self._delta_postings > max(COMPACT_MIN_POSTINGS, len(self._base_docs) * COMPACT_RATIO)
+                or dead > max(COMPACT_MIN_DELETED, self._live_docs * COMPACT_RATIO))
+
+    def compact_if_needed(self) -> bool:
+        """超过阈值时合并（由后台线程定期调用，不在查询路径执行），返回是否合并"""
+        if not self.needs_compaction():
+            return False
+        self.compact()
+        return True
+
+    # ---------- 合并与持久化 ----------
+
+    def compact(self) -> None:
+        """将增量段合并进基础段，丢弃已删除文档的倒排项，存活文档按原顺序重新编号
+
+        合并按开始时的文档号范围在锁外进行，查询与写入不等待；合并期间新写入的文档号接在合并结果之后，
+        期间删除的文档在合并结果中重新标记删除，离线加载了新索引时放弃本次合并结果。
+        """
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        with self._lock:
+            generation = self._generation
+            n_docs = len(self._user_ids)
+            deleted = np.frombuffer(bytes(self._deleted), dtype=np.uint8).astype(bool)
+            base_offsets, base_docs, base_tfs = self._base_offsets, self._base_docs, self._base_tfs
+            # 增量段只会追加，按当前长度截取即为合并范围内的倒排项
+            delta = {term: (np.frombuffer(docs, dtype=np.uint32).copy(),
+                            np.frombuffer(tfs, dtype=np.uint16).copy())
+                     for term, (docs, tfs) in self._delta.items()}
+
+        # 旧文档号 -> 新文档号；单调递增，倒排表重新编号后仍按文档号有序
+        renumber = (np.cumsum(~deleted) - 1).astype(np.uint32)
+        offsets: Dict[str, Tuple[int, int]] = {}
+        doc_parts: List[np.ndarray] = []
+        tf_parts: List[np.ndarray] = []
+        position = 0
+        for term in set(base_offsets) | set(delta):
+            start, end = base_offsets.get(term, (0, 0))
+            docs, tfs = base_docs[start:end], base_tfs[start:end]
+            if term in delta:
+                docs = np.concatenate([docs, delta[term][0]])
+                tfs = np.concatenate([tfs, delta[term][1]])
+            keep = ~deleted[docs]
+            docs, tfs = renumber[docs[keep]], tfs[keep]
+            if not len(docs):
+                continue
+            offsets[term] = (position, position + len(docs))
+            position += len(docs)
+            doc_parts.append(docs)
+            tf_parts.append(tfs)
+        merged_docs = np.concatenate(doc_parts) if doc_parts else np.zeros(0, dtype=np.uint32)
+        merged_tfs = np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.uint16)
+        live = np.flatnonzero(~deleted)
+        shift = n_docs - len(live)
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            # 合并期间写入的增量（文档号 >= n_docs）保留在增量段并前移编号
+            remaining: Dict[str, Tuple[array, array]] = {}
+            remaining_postings = 0
+            for term, (docs, tfs) in self._delta.items():
+                skip = len(delta[term][0]) if term in delta else 0
+                if len(docs) > skip:
+                    moved = np.frombuffer(docs, dtype=np.uint32)[skip:] - np.uint32(shift)
+                    remaining[term] = (array('I', moved.tobytes()), tfs[skip:])
+                    remaining_postings += len(docs) - skip
+            self._base_offsets = offsets
+            self._base_docs = merged_docs
+            self._base_tfs = merged_tfs
+            self._delta = remaining
+            self._delta_postings = remaining_postings
+
+            kept = live.tolist()
+            self._user_ids = [self._user_ids[doc] for doc in kept] + self._user_ids[n_docs:]
+            self._doc_ids = {user_id: doc for doc, user_id in enumerate(self._user_ids) if user_id is not None}
+            self._doc_len = array('I', np.frombuffer(self._doc_len, dtype=np.uint32)[live].tobytes()) \
+                + self._doc_len[n_docs:]
+            self._doc_hash = array('q', np.frombuffer(self._doc_hash, dtype=np.int64)[live].tobytes()) \
+                + self._doc_hash[n_docs:]
+            # 合并期间删除的文档在新编号下仍标记删除
+            self._deleted = bytearray(np.frombuffer(bytes(self._deleted[:n_docs]), dtype=np.uint8)[live].tobytes()) \
+                + self._deleted[n_docs:]
+            self._deleted_ids = None
+
+    def save(self, path: str) -> None:
+        """合并后写入npz文件（含同步水位线，加载后只需同步之后的增量）"""
+        with self._compact_lock, self._lock:
+            self._compact()
+            terms = list(self._base_offsets)
+            bounds = np.array([self._base_offsets[t] for t in terms], dtype=np.int64).reshape(-1, 2)
+            meta = {'terms': terms, 'user_ids': self._user_ids, 'watermark': self._feed.watermark}
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(tmp_path, meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+                     bounds=bounds, docs=self._base_docs, tfs=self._base_tfs,
+                     doc_len=np.frombuffer(self._doc_len, dtype=np.uint32).copy(),
+                     doc_hash=np.frombuffer(self._doc_hash, dtype=np.int64).copy(),
+                     deleted=np.frombuffer(bytes(self._deleted), dtype=np.uint8))
+            os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """加载离线构建的索引文件"""
+        with np.load(path) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            bounds = data['bounds']
+            with self._lock:
+                self._base_offsets = {term: (int(start), int(end))
+                                      for term, (start, end) in zip(meta['terms'], bounds)}
+                self._base_docs = data['docs']
+                self._base_tfs = data['tfs']
+                self._doc_len = array('I', data['doc_len'].tobytes())
+                # 旧版本的索引文件没有摘要，首次同步到这些档案时重新写入一次
+                self._doc_hash = array('q', data['doc_hash'].tobytes()) if 'doc_hash' in data.files \
+                    else array('q', bytes(8 * len(self._doc_len)))
+                self._deleted = bytearray(data['deleted'].tobytes())
+                self._deleted_ids = None
+                self._user_ids = meta['user_ids']
+                self._doc_ids = {user_id: doc for doc, user_id in enumerate(self._user_ids)
+                                 if user_id is not None}
+                self._live_docs = len(self._doc_ids)
+                self._live_len = sum(self._doc_len[doc] for doc in self._doc_ids.values())
+                self._delta = {}
+                self._delta_postings = 0
+                self._feed.watermark = meta['watermark']
+                self._generation += 1
+
+    # ---------- 查询 ----------
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """返回一个词在基础段与增量段中的全部倒排项（文档号递增、词频）"""
+        start, end = self._base_offsets.get(term, (0, 0))
+        docs, tfs = self._base_docs[start:end], self._base_tfs[start:end]
+        delta = self._delta.get(term)
+        if delta is not None:
+            docs = np.concatenate([docs, np.frombuffer(delta[0], dtype=np.uint32)])
+            tfs = np.concatenate([tfs, np.frombuffer(delta[1], dtype=np.uint16)])
+        return docs, tfs
+
+    def _deleted_docs(self) -> np.ndarray:
+        if self._deleted_ids is None:
+            self._deleted_ids = np.flatnonzero(np.frombuffer(bytes(self._deleted), dtype=np.uint8))
+        return self._deleted_ids
+
+    @staticmethod
+    def _weights(docs: np.ndarray, tfs: np.ndarray, idf: float, doc_len: np.ndarray,
+                 avg_len: float) -> np.ndarray:
+        """BM25单词得分：idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))"""
+        tf = tfs.astype(np.float32)
+        norm = doc_len[docs].astype(np.float32)
+        norm *= np.float32(K1 * B / avg_len)
+        norm += np.float32(K1 * (1 - B))
+        norm += tf
+        tf *= np.float32(idf * (K1 + 1))
+        tf /= norm
+        return tf
+
+    def _accumulate(self, postings, doc_len: np.ndarray, avg_len: float) -> Tuple[np.ndarray, np.ndarray]:
+        """完整累加若干词的得分，返回 (候选文档号, 得分)，已排除删除的文档
+
+        倒排项较少时先对文档号去重再累加，避免按全部文档数分配得分数组。
+        """
+        all_docs = np.concatenate([docs for _, docs, _ in postings])
+        weights = np.concatenate([self._weights(docs, tfs, idf, doc_len, avg_len) for idf, docs, tfs in postings])
+        if len(postings) == 1:
+            candidates, scores = all_docs, weights
+        elif len(all_docs) * 8 < len(self._user_ids):
+            candidates, inverse = np.unique(all_docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=weights).astype(np.float32)
+        else:
+            dense = np.bincount(all_docs, weights=weights)
+            candidates = np.flatnonzero(dense)
+            scores = dense[candidates].astype(np.float32)
+        deleted = self._deleted_docs()
+        if len(deleted):
+            keep = ~np.isin(candidates, deleted, assume_unique=True)
+            candidates, scores = candidates[keep], scores[keep]
+        return candidates.astype(np.uint32, copy=False), scores
+
+    def _score_candidates(self, candidates: np.ndarray, scores: np.ndarray, postings, doc_len: np.ndarray,
+                          avg_len: float) -> None:
+        """常见词只为候选档案加分：候选少时在倒排表中二分查找，候选多时按文档号映射到候选下标"""
+        slots = None
+        for idf, docs, tfs in postings:
+            if len(candidates) * 16 < len(docs):
+                positions = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+                found = docs[positions] == candidates
+                selected = positions[found]
+                scores[found] += self._weights(docs[selected], tfs[selected], idf, doc_len, avg_len)
+                continue
+            if slots is None:
+                slots = np.full(len(self._user_ids), -1, dtype=np.int32)
+                slots[candidates] = np.arange(len(candidates), dtype=np.int32)
+            hits = slots[docs]
+            found = hits >= 0
+            scores[hits[found]] += self._weights(docs[found], tfs[found], idf, doc_len, avg_len)
+
+    def search(self, query: str, top_k: int = 10) -> Tuple[int, List[Tuple[str, float]], List[str]]:
+        """BM25检索，返回 (候选档案数, [(user_id, 得分)], 查询词)
+
+        候选档案为包含任一非常见查询词的档案（查询词全部为常见词时为包含其中idf最高的词的档案），
+        常见词只为候选档案加分。
+        """
+        terms = Counter(tokenize(query))
+        with self._lock:
+            if not terms or not self._live_docs:
+                return 0, [], list(terms)
+            n_docs = self._live_docs
+            avg_len = self._live_len / n_docs
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)
+            primary, secondary = [], []
+            for term, query_tf in terms.items():
+                docs, tfs = self._postings(term)
+                if len(docs):
+                    df = min(len(docs), n_docs)
+                    idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)) * query_tf
+                    (secondary if df > max(COMMON_MIN_DF, n_docs * self.common_ratio) else primary).append((idf, docs, tfs))
+            if not primary and secondary:
+                # 全部为常见词时以idf最高的词确定候选
+                secondary.sort(key=lambda item: -item[0])
+                primary = [secondary.pop(0)]
+            if not primary:
+                return 0, [], list(terms)
+
+            candidates, candidate_scores = self._accumulate(primary, doc_len, avg_len)
+            self._score_candidates(candidates, candidate_scores, secondary, doc_len, avg_len)
+
+            total = len(candidates)
+            k = min(top_k, total)
+            if k == 0:
+                return 0, [], list(terms)
+            top = np.argpartition(candidate_scores, total - k)[total - k:]
+            top = top[np.lexsort((candidates[top], -candidate_scores[top]))]
+            return total, [(self._user_ids[candidates[i]], round(float(candidate_scores[i]), 4))
+                           for i in top.tolist()], list(terms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'documents': self._live_docs,
+            'terms': len(set(self._base_offsets) | set(self._delta)),
+            'base_postings': int(len(self._base_docs)),
+            'delta_postings': self._delta_postings,
+            'deleted_slots': len(self._user_ids) - self._live_docs,
+            'watermark': self._feed.watermark
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='离线构建工作经历全文索引')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help='从存储全量构建索引文件')
+    build.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///app.db'))
+    build.add_argument('--output', default=os.environ.get('FULLTEXT_INDEX_PATH', 'fulltext.npz'))
+    args = parser.parse_args()
+
+    store = ProfileStore(parse_database_url(args.database_url))
+    index = FullTextIndex()
+    rows = index.refresh(store, force=True)
+    index.save(args.output)
+    stats = index.stats()
+    print(f"indexed {rows} profiles -> {args.output}: {stats['documents']} documents, "
+          f"{stats['terms']} terms, {stats['base_postings']} postings")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
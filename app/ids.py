@@ -0,0 +1,223 @@
+"""
+AI Support System - 用户ID生成
+按时间排序、进程内单调递增的ID（ULID风格），多个worker进程同时生成也不会重复：
+
+    user_ + 16位Crockford Base32 = 毫秒时间戳（50位）| worker号（15位）| 毫秒内序号（15位）
+
+- 字符集按ASCII升序排列，ID的字典序即生成时间顺序，可按user_id范围扫描某段时间内创建的档案
+- worker号从存储中的租约表分配（同一数据库的所有进程之间唯一），fork出的子进程首次生成ID时
+  重新分配；租约定期续期，进程退出时释放，异常退出的进程的worker号在租约到期后回收
+- 同一毫秒内序号用尽或系统时钟回拨时，沿用上一个时间戳继续递增，不会等待也不会重复
+- worker号的高半区保留给批量导入：按 (导入批次时间戳, 行号) 确定性生成ID，中断后重新导入覆盖同一档案
+"""
+
+import os
+import time
+import atexit
+import socket
+import weakref
+import threading
+from typing import Dict, Optional, Tuple
+
+from app.store import ConnectionPool, parse_database_url
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+WORKER_BITS = 15
+SEQUENCE_BITS = 15
+MAX_WORKERS = 1 << WORKER_BITS
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# 租约只分配低半区的worker号，高半区与序号一起编码批量导入的行号
+IMPORT_WORKER_BASE = MAX_WORKERS >> 1
+MAX_IMPORT_LINES = IMPORT_WORKER_BASE << SEQUENCE_BITS
+
+LEASE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS id_worker_leases (
+        worker_id    INTEGER PRIMARY KEY,
+        owner        TEXT NOT NULL,
+        leased_until REAL NOT NULL,
+        last_ms      INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+)
+
+SQL_FIND_EXPIRED = (
+    "SELECT worker_id, last_ms FROM id_worker_leases WHERE leased_until < ? ORDER BY worker_id LIMIT 1"
+)
+SQL_NEXT_WORKER_ID = "SELECT COALESCE(MAX(worker_id) + 1, 0), 0 FROM id_worker_leases"
+SQL_LEASE = (
+    "INSERT OR REPLACE INTO id_worker_leases (worker_id, owner, leased_until, last_ms) VALUES (?, ?, ?, ?)"
+)
+SQL_RENEW = "UPDATE id_worker_leases SET leased_until = ?, last_ms = ? WHERE worker_id = ? AND owner = ?"
+# 释放时保留最后使用的时间戳，下一个使用该worker号的进程从其之后开始
+SQL_RELEASE = "UPDATE id_worker_leases SET leased_until = 0, last_ms = ? WHERE worker_id = ? AND owner = ?"
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+# 序号的3个字符按 高5位 + 低10位 查表拼接
+_SEQUENCE_HIGH = [_encode(i, 1) for i in range(32)]
+_SEQUENCE_LOW = [_encode(i, 2) for i in range(1024)]
+
+
+def import_user_id(epoch_ms: int, line_no: int, prefix: str = 'user_') -> str:
+    """批量导入中没有user_id的行使用的确定性ID（同一导入批次的同一行总是得到相同的ID）"""
+    if not 0 <= line_no < MAX_IMPORT_LINES:
+        raise ValueError(f"Line number {line_no} out of range for import IDs (max {MAX_IMPORT_LINES - 1})")
+    worker_id = IMPORT_WORKER_BASE + (line_no >> SEQUENCE_BITS)
+    return f"{prefix}{_encode(epoch_ms, 10)}{_encode(worker_id, 3)}{_encode(line_no & MAX_SEQUENCE, 3)}"
+
+
+def decode_timestamp(user_id: str) -> int:
+    """从ID中取出生成时的毫秒时间戳"""
+    value = 0
+    for char in user_id[-16:-6]:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+class WorkerLeaseStore:
+    """worker号租约表（独立的按进程连接池，可与档案存储使用同一个数据库文件）"""
+
+    def __init__(self, path: str, pool_size: int = 1, timeout: float = 5.0):
+        self.path = path
+        self._pool = ConnectionPool(path, LEASE_SCHEMA, pool_size, timeout)
+
+    def acquire(self, owner: str, lease: float) -> Tuple[int, int]:
+        """分配最小的空闲或已过期的worker号，返回 (worker号, 上一个使用者最后的时间戳)"""
+        now = time.time()
+        with self._pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(SQL_FIND_EXPIRED, (now,)).fetchone() or \
+                    conn.execute(SQL_NEXT_WORKER_ID).fetchone()
+                worker_id, last_ms = row
+                if worker_id >= IMPORT_WORKER_BASE:
+                    raise RuntimeError(f"No free ID worker slot (max {IMPORT_WORKER_BASE})")
+                conn.execute(SQL_LEASE, (worker_id, owner, now + lease, last_ms))
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        return worker_id, last_ms
+
+    def renew(self, worker_id: int, owner: str, lease: float, last_ms: int) -> bool:
+        """续期，租约已被其他进程接管时返回False"""
+        with self._pool.connection() as conn:
+            return conn.execute(SQL_RENEW, (time.time() + lease, last_ms, worker_id, owner)).rowcount > 0
+
+    def release(self, worker_id: int, owner: str, last_ms: int) -> None:
+        with self._pool.connection() as conn:
+            conn.execute(SQL_RELEASE, (last_ms, worker_id, owner))
+
+    def open_connections(self) -> int:
+        return self._pool.open_connections()
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+# 存活的ID生成器：fork后在子进程中重置、进程退出时释放worker号；弱引用，不阻止生成器被回收
+_generators: 'weakref.WeakSet[IdGenerator]' = weakref.WeakSet()
+
+
+def _reset_generators() -> None:
+    for generator in list(_generators):
+        generator._reset()
+
+
+def _release_generators() -> None:
+    for generator in list(_generators):
+        generator.release()
+
+
+os.register_at_fork(after_in_child=_reset_generators)
+atexit.register(_release_generators)
+
+
+class IdGenerator:
+    """进程内线程安全的ID生成器"""
+
+    def __init__(self, store: WorkerLeaseStore, prefix: str = 'user_', lease: float = 600.0):
+        self.store = store
+        self.prefix = prefix
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._reset()
+        _generators.add(self)
+
+    @classmethod
+    def from_env(cls) -> 'IdGenerator':
+        """租约表与档案存储在同一个数据库（DATABASE_URL），租约时长为 ID_WORKER_LEASE 秒"""
+        url = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+        return cls(WorkerLeaseStore(parse_database_url(url)),
+                   lease=float(os.environ.get('ID_WORKER_LEASE', 600)))
+
+    def use_store(self, store: WorkerLeaseStore) -> None:
+        """改用其他数据库的租约表（如批量导入工具指定的数据库）"""
+        with self._lock:
+            self.release()
+            self.store = store
+
+    def _reset(self) -> None:
+        """初始状态；fork后在子进程中调用，父进程的worker号不再沿用"""
+        self._lock = threading.Lock()
+        self.worker_id: Optional[int] = None
+        self._owner = None
+        self._renew_at = 0.0
+        self._last_ms = 0
+        self._sequence = 0
+        self._time_prefix = ''
+        self._worker_chars = ''
+
+    def _ensure_lease(self) -> None:
+        now = time.monotonic()
+        if now < self._renew_at:
+            return
+        if self.worker_id is None or not self.store.renew(self.worker_id, self._owner, self.lease, self._last_ms):
+            self._owner = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(4).hex()}"
+            self.worker_id, last_ms = self.store.acquire(self._owner, self.lease)
+            self._worker_chars = _encode(self.worker_id, 3)
+            # 从上一个使用者最后的时间戳之后开始，同一worker号下不会生成重复的ID
+            if last_ms >= self._last_ms:
+                self._last_ms = last_ms
+                self._sequence = MAX_SEQUENCE
+            self._time_prefix = f"{self.prefix}{_encode(self._last_ms, 10)}{self._worker_chars}"
+        self._renew_at = now + self.lease / 2
+
+    def next_id(self) -> str:
+        with self._lock:
+            self._ensure_lease()
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+                self._time_prefix = f"{self.prefix}{_encode(now_ms, 10)}{self._worker_chars}"
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                # 本毫秒序号用尽：借用下一毫秒
+                self._last_ms += 1
+                self._sequence = 0
+                self._time_prefix = f"{self.prefix}{_encode(self._last_ms, 10)}{self._worker_chars}"
+            sequence = self._sequence
+            return f"{self._time_prefix}{_SEQUENCE_HIGH[sequence >> 10]}{_SEQUENCE_LOW[sequence & 1023]}"
+
+    def release(self) -> None:
+        """释放worker号（进程退出时自动调用）"""
+        if self.worker_id is not None:
+            try:
+                self.store.release(self.worker_id, self._owner, self._last_ms)
+            except Exception:
+                pass
+            self.worker_id = None
+            self._renew_at = 0.0
+
+    def stats(self) -> Dict[str, object]:
+        return {'worker_id': self.worker_id, 'last_ms': self._last_ms, 'sequence': self._sequence}
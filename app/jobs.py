@@ -0,0 +1,301 @@
+"""
+AI Support System - 后台任务队列
+POST /api/user-profile 和 /validate 带 ?async=true 时只把请求放入队列并返回202，由本进程的后台线程
+执行验证、评分和写入，客户端通过 GET /api/jobs/<job_id> 轮询状态和结果。
+
+- 队列保存在本地SQLite中（默认与档案存储同一个数据库文件），不依赖外部消息中间件；
+  任何worker提交的任务都可由任意worker执行和查询
+- 排队任务数超过 JOBS_MAX_QUEUE 时拒绝提交（503 + Retry-After）
+- 执行中的任务带租约，worker进程退出后租约到期的任务由其他worker重新执行，超过最大次数后标记失败
+- 完成的任务结果保留 JOBS_RESULT_TTL 秒后删除
+"""
+
+import os
+import json
+import time
+import sqlite3
+import uuid
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from app.store import ConnectionPool, parse_database_url
+from app.logs import describe_error
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+JOB_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id      TEXT PRIMARY KEY,
+        kind        TEXT NOT NULL,
+        status      TEXT NOT NULL,
+        payload     TEXT,
+        result      TEXT,
+        status_code INTEGER,
+        attempts    INTEGER NOT NULL DEFAULT 0,
+        created_at  REAL NOT NULL,
+        started_at  REAL,
+        finished_at REAL,
+        lease_until REAL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at)",
+)
+
+# 排队数未超过上限时才插入（单条语句，多个进程同时提交也不会超出）
+SQL_SUBMIT = (
+    "INSERT INTO jobs (job_id, kind, status, payload, created_at) "
+    "SELECT ?, ?, 'queued', ?, ? WHERE (SELECT COUNT(*) FROM jobs WHERE status = 'queued') < ?"
+)
+# 领取最早的排队任务或租约已到期的执行中任务
+SQL_CLAIM = (
+    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, lease_until = ? "
+    "WHERE job_id = (SELECT job_id FROM jobs WHERE status = 'queued' "
+    "OR (status = 'running' AND lease_until < ?) ORDER BY created_at LIMIT 1) "
+    "RETURNING job_id, kind, payload, attempts"
+)
+# 只有仍持有该次租约的worker才能写入结果
+SQL_FINISH = (
+    "UPDATE jobs SET status = ?, result = ?, status_code = ?, finished_at = ?, payload = NULL, lease_until = NULL "
+    "WHERE job_id = ? AND status = 'running' AND attempts = ?"
+)
+SQL_GET_JOB = (
+    "SELECT job_id, kind, status, result, status_code, attempts, created_at, started_at, finished_at "
+    "FROM jobs WHERE job_id = ?"
+)
+SQL_COUNT_BY_STATUS = "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+SQL_PURGE = "DELETE FROM jobs WHERE finished_at < ?"
+
+# 处理函数：接收提交时的payload，返回 (HTTP状态码, 响应体JSON文本)，与同步请求的响应相同
+JobHandler = Callable[[Any], Tuple[int, str]]
+
+
+class QueueFull(Exception):
+    """排队任务数已达上限"""
+
+    def __init__(self, retry_after: int):
+        super().__init__('Job queue is full')
+        self.retry_after = retry_after
+
+
+class JobStore:
+    """任务表存储（独立的按进程连接池，默认与档案存储使用同一个数据库文件）"""
+
+    def __init__(self, path: str, pool_size: int = 4, timeout: float = 5.0):
+        self.path = path
+        self._pool = ConnectionPool(path, JOB_SCHEMA, pool_size, timeout)
+
+    @classmethod
+    def from_env(cls) -> 'JobStore':
+        """JOBS_DATABASE_URL 为空时与档案存储使用同一个数据库文件"""
+        url = os.environ.get('JOBS_DATABASE_URL') or os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+        return cls(parse_database_url(url), pool_size=int(os.environ.get('DATABASE_POOL_SIZE', 4)))
+
+    def connection(self) -> ContextManager[sqlite3.Connection]:
+        return self._pool.connection()
+
+    def open_connections(self) -> int:
+        return self._pool.open_connections()
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+class JobQueue:
+    """基于SQLite任务表的本地任务队列，每个进程启动 concurrency 个执行线程"""
+
+    def __init__(self, store: JobStore, concurrency: int = 2, max_queue: int = 1000,
+                 result_ttl: float = 3600.0, lease: float = 300.0, max_attempts: int = 3,
+                 poll_interval: float = 0.5, retry_after: int = 5):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retry_after = retry_after
+        self._handlers: Dict[str, JobHandler] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._pid = None
+        self._last_purge = 0.0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls) -> 'JobQueue':
+        """根据环境变量创建（JOBS_*）"""
+        return cls(
+            JobStore.from_env(),
+            concurrency=int(os.environ.get('JOBS_CONCURRENCY', 2)),
+            max_queue=int(os.environ.get('JOBS_MAX_QUEUE', 1000)),
+            result_ttl=float(os.environ.get('JOBS_RESULT_TTL', 3600)),
+            lease=float(os.environ.get('JOBS_LEASE_SECONDS', 300)),
+            max_attempts=int(os.environ.get('JOBS_MAX_ATTEMPTS', 3)),
+            poll_interval=float(os.environ.get('JOBS_POLL_INTERVAL', 0.5)),
+            retry_after=int(os.environ.get('JOBS_RETRY_AFTER', 5))
+        )
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    # ---------- 提交与查询 ----------
+
+    def submit(self, kind: str, payload: Any) -> str:
+        """放入队列并返回job_id，队列已满时抛出QueueFull"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+        job_id = uuid.uuid4().hex
+        with self.store.connection() as conn:
+            inserted = conn.execute(
+                SQL_SUBMIT, (job_id, kind, json.dumps(payload, ensure_ascii=False), time.time(), self.max_queue)
+            ).rowcount
+        if not inserted:
+            self.rejected += 1
+            raise QueueFull(self.retry_after)
+        self.submitted += 1
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务状态，结果已过期或不存在时返回None"""
+        with self.store.connection() as conn:
+            row = conn.execute(SQL_GET_JOB, (job_id,)).fetchone()
+        if row is None:
+            return None
+        job_id, kind, status, result, status_code, attempts, created_at, started_at, finished_at = row
+        if finished_at is not None and finished_at < time.time() - self.result_ttl:
+            return None
+        return {
+            'job_id': job_id,
+            'kind': kind,
+            'status': status,
+            'attempts': attempts,
+            'created_at': _isoformat(created_at),
+            'started_at': _isoformat(started_at),
+            'finished_at': _isoformat(finished_at),
+            'status_code': status_code,
+            'result': json.loads(result) if result is not None else None
+        }
+
+    # ---------- 执行 ----------
+
+    def start(self) -> None:
+        """在当前进程启动执行线程（gunicorn fork后由配置钩子调用，提交任务时也会自动启动）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.concurrency)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = pid
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止本进程的执行线程（正在执行的任务完成后退出）"""
+        if self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._purge()
+                if not self.run_once():
+                    # 其他进程提交的任务按轮询间隔发现，本进程提交的任务立即唤醒
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+            except Exception as e:
+                logger.error(f"Job worker error: {describe_error(e)}")
+                self._stopping.wait(self.poll_interval)
+
+    def run_once(self) -> bool:
+        """领取并执行一个任务，队列为空时返回False"""
+        now = time.time()
+        with self.store.connection() as conn:
+            row = conn.execute(SQL_CLAIM, (now, now + self.lease, now)).fetchone()
+        if row is None:
+            return False
+        job_id, kind, payload, attempts = row
+        if attempts > self.max_attempts:
+            self._finish(job_id, attempts, 'failed', 500, json.dumps({
+                'success': False,
+                'message': '任务执行失败',
+                'error': f"Job exceeded {self.max_attempts} attempts",
+                'timestamp': datetime.now().isoformat()
+            }, ensure_ascii=False))
+            return True
+
+        started = time.perf_counter()
+        try:
+            status_code, body = self._handlers[kind](json.loads(payload))
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {describe_error(e)}")
+            status_code, body = 500, json.dumps({
+                'success': False,
+                'message': '任务执行失败',
+                'error': str(e),
+                'timestamp': datetime.now().isoformat()
+            }, ensure_ascii=False)
+        self._finish(job_id, attempts, 'succeeded' if status_code < 400 else 'failed', status_code, body)
+        logger.info(f"Job {job_id} ({kind}) finished with {status_code} "
+                    f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return True
+
+    def _finish(self, job_id: str, attempts: int, status: str, status_code: int, body: str) -> None:
+        with self.store.connection() as conn:
+            conn.execute(SQL_FINISH, (status, body, status_code, time.time(), job_id, attempts))
+        if status == 'succeeded':
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def _purge(self) -> None:
+        """删除超过保留时间的任务结果（每个进程最多每分钟一次）"""
+        now = time.monotonic()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        with self.store.connection() as conn:
+            purged = conn.execute(SQL_PURGE, (time.time() - self.result_ttl,)).rowcount
+        if purged:
+            logger.info(f"Purged {purged} expired jobs")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.store.connection() as conn:
+            counts = dict(conn.execute(SQL_COUNT_BY_STATUS).fetchall())
+        return {
+            'workers': len(self._threads) if self._pid == os.getpid() else 0,
+            'max_queue': self.max_queue,
+            'jobs': {status: counts.get(status, 0) for status in JOB_STATUSES},
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'completed': self.completed,
+            'failed': self.failed
+        }
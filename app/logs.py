@@ -0,0 +1,225 @@
+"""
+AI Support System - 结构化日志
+- 请求线程只把日志记录放入有界队列，由后台线程格式化为JSON并写出；队列满时丢弃并计数，不阻塞请求
+- 每行一个JSON对象，带 request_id（取自请求头 X-Request-ID，没有时自动生成）
+- 按请求采样：未被采样的成功请求不输出INFO及以下级别的日志；WARNING及以上级别、
+  4xx/5xx请求的访问日志始终输出
+- 写入日志的请求数据先脱敏（邮箱、电话等联系方式）并截断过长的字符串和列表；
+  校验错误只记录字段位置和错误类型，不记录提交的字段值（describe_error）
+
+后台线程按进程启动，gunicorn fork出的worker在首次写日志时自动启动自己的线程。
+"""
+
+import os
+import sys
+import json
+import queue
+import random
+import atexit
+import logging
+import threading
+import contextvars
+import logging.handlers
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import ValidationError
+
+# 日志中替换为 *** 的字段名（不区分大小写）
+REDACTED_KEYS = frozenset({
+    'email', 'phone', 'wechat', 'qq', 'street', 'postal_code',
+    'password', 'token', 'secret', 'authorization', 'cookie', 'id_card',
+})
+MAX_ITEMS = 20
+MAX_DEPTH = 6
+
+# LogRecord自带的属性，其余属性（logger.info(..., extra={...})）作为JSON字段输出
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'force'}
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_sampled = contextvars.ContextVar('log_sampled', default=True)
+
+
+def redact(value: Any, max_chars: int = 256, _depth: int = 0) -> Any:
+    """脱敏并截断，返回可JSON序列化的副本"""
+    if _depth >= MAX_DEPTH:
+        return '...'
+    if isinstance(value, dict):
+        return {
+            key: '***' if str(key).lower() in REDACTED_KEYS else redact(item, max_chars, _depth + 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        items = [redact(item, max_chars, _depth + 1) for item in value[:MAX_ITEMS]]
+        if len(value) > MAX_ITEMS:
+            items.append(f"...(+{len(value) - MAX_ITEMS} items)")
+        return items
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else str(value)
+    if len(text) > max_chars:
+        return f"{text[:max_chars]}...(+{len(text) - max_chars} chars)"
+    return text
+
+
+def describe_error(error: Exception) -> str:
+    """异常的日志文本：pydantic校验错误不含 input_value（可能是邮箱、电话等个人信息）"""
+    if isinstance(error, ValidationError):
+        details = error.errors(include_url=False, include_context=False, include_input=False)
+        return f"{error.error_count()} validation errors for {error.title}: " \
+               f"{json.dumps(details, ensure_ascii=False, default=str)}"
+    return str(error)
+
+
+# ---------- 请求上下文 ----------
+
+def begin_request(request_id: Optional[str], sample_rate: float) -> str:
+    """请求开始时设置 request_id 并决定本请求的日志是否采样输出，返回 request_id"""
+    if not request_id or len(request_id) > 64 or not request_id.isprintable():
+        request_id = os.urandom(8).hex()
+    _request_id.set(request_id)
+    _sampled.set(sample_rate >= 1.0 or random.random() < sample_rate)
+    return request_id
+
+
+def end_request() -> None:
+    _request_id.set(None)
+    _sampled.set(True)
+
+
+class RequestContextFilter(logging.Filter):
+    """在写日志的线程中附加 request_id；未采样请求中的INFO及以下级别日志丢弃（force=True 的记录除外）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and not _sampled.get() and not getattr(record, 'force', False):
+            return False
+        record.request_id = _request_id.get()
+        return True
+
+
+# ---------- 格式化 ----------
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON；include_caller 为True时附带调用位置（模块:函数:行号）"""
+
+    def __init__(self, include_caller: bool = False):
+        super().__init__()
+        self.include_caller = include_caller
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        if self.include_caller:
+            entry['caller'] = f"{record.module}:{record.funcName}:{record.lineno}"
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """与原 basicConfig 相同的文本格式，附带 request_id；include_caller 为True时附带调用位置"""
+
+    def __init__(self, include_caller: bool = False):
+        caller = ' - %(module)s:%(funcName)s:%(lineno)d' if include_caller else ''
+        super().__init__(f'%(asctime)s - %(name)s - %(levelname)s{caller} - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        request_id = getattr(record, 'request_id', None)
+        return f"{text} [request_id={request_id}]" if request_id else text
+
+
+# ---------- 异步写出 ----------
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """把日志记录放入有界队列，由本进程的后台线程交给 target 写出"""
+
+    def __init__(self, target: logging.Handler, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._pid = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self) -> None:
+        """当前进程首次写日志时启动后台线程（fork后父进程的线程不存在，重新创建队列和线程）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = pid
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """请求线程中只合并消息参数，JSON格式化留给后台线程"""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.target.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """等待队列中已有的日志写出（测试与进程退出时使用）"""
+        if self._pid == os.getpid():
+            self._listener.stop()
+            self._listener.start()
+
+    def close(self) -> None:
+        if self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+        super().close()
+
+    def stats(self) -> Dict[str, int]:
+        return {'queued': self.queue.qsize(), 'max_queue': self.maxsize, 'dropped': self.dropped}
+
+
+def configure_logging() -> Optional[AsyncQueueHandler]:
+    """按环境变量配置根日志（LOG_LEVEL / LOG_FORMAT / LOG_ASYNC / LOG_QUEUE_SIZE / LOG_CALLER），返回异步handler"""
+    level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    include_caller = os.environ.get('LOG_CALLER', 'false').lower() == 'true'
+    stream = logging.StreamHandler(sys.stderr)
+    if os.environ.get('LOG_FORMAT', 'json').lower() == 'json':
+        stream.setFormatter(JsonFormatter(include_caller))
+    else:
+        stream.setFormatter(TextFormatter(include_caller))
+
+    handler: logging.Handler = stream
+    async_handler = None
+    if os.environ.get('LOG_ASYNC', 'true').lower() == 'true':
+        handler = async_handler = AsyncQueueHandler(stream, int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+        atexit.register(async_handler.close)
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return async_handler
@@ -4,19 +4,50 @@ AI Support System - 主应用文件
 一个简单的Flask API服务，用于测试部署流程
 """
 
-from flask import Flask, jsonify, request
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
-from datetime import datetime, date
+from flask import Flask, jsonify, request, Response, g, stream_with_context
+from werkzeug.http import http_date, parse_date
+from werkzeug.exceptions import HTTPException
+from pydantic import ValidationError
+from typing import Optional, Dict, Any
+from datetime import datetime, date, timedelta
 import os
+import sys
+import json
+import time
 import logging
+import threading
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# 以脚本方式运行（python app/main.py）时，将项目根目录加入模块搜索路径
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import (
+    Address, ContactInfo, Skill, Education, WorkExperience,
+    UserProfile, JobRequirement, partial_profile_model
+)
+from app.profiles import (
+    build_profile_record, calculate_profile_score, generate_user_id, generate_validation_report,
+    user_ids as id_generator
 )
+from app.admission import REQUEST_START_HEADER, AdmissionController, request_queue_delay
+from app.cache import DocumentCache, MemoCache, content_hash
+from app.metrics import Metrics
+from app.responses import Envelope, dumps, json_response, render_json
+from app.patching import PatchError, apply_patch
+from app.search import ProfileIndex, SearchQuery, terms_from_document, terms_from_model
+from app.matching import MatchingEngine, features_from_document, features_from_model
+from app.export import EXPLODE_MODES, FORMATS, export_chunks
+from app.fulltext import FullTextIndex, make_snippet, texts_from_document, texts_from_model
+from app.dedup import DedupIndex
+from app.store import BackgroundRefresher, ChangeFeed, ProfileStore
+from app.jobs import JobQueue, QueueFull
+from app.snapshot import SnapshotStore
+from app.logs import begin_request, configure_logging, describe_error, end_request, redact
+
+# 配置日志（LOG_LEVEL / LOG_FORMAT / LOG_ASYNC），默认输出JSON并由后台线程写出
+log_handler = configure_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('app.access')
 
 app = Flask(__name__)
 
@@ -24,71 +55,185 @@ app = Flask(__name__)
 app.config['DEBUG'] = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
 app.config['HOST'] = os.environ.get('FLASK_HOST', '0.0.0.0')
 app.config['PORT'] = int(os.environ.get('FLASK_PORT', 5000))
+app.config['BATCH_CHUNK_SIZE'] = int(os.environ.get('BATCH_CHUNK_SIZE', 200))
+app.config['BATCH_MAX_LINE_BYTES'] = int(os.environ.get('BATCH_MAX_LINE_BYTES', 1024 * 1024))
+app.config['SEARCH_MAX_PAGE_SIZE'] = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', 100))
+app.config['FULLTEXT_MAX_TOP_K'] = int(os.environ.get('FULLTEXT_MAX_TOP_K', 100))
+# 近重复档案处理：off（不检测）、flag（照常创建并在响应中标出）、merge（合并到最相似的已有档案）
+app.config['DEDUP_MODE'] = os.environ.get('DEDUP_MODE', 'flag')
+# 局部更新遇到并发修改（版本号变化）时的最大重试次数
+app.config['PATCH_MAX_RETRIES'] = int(os.environ.get('PATCH_MAX_RETRIES', 3))
+# 准入控制按该请求头区分客户端（如反向代理设置的 X-Real-IP），为空时使用连接的对端地址
+app.config['ADMISSION_CLIENT_HEADER'] = os.environ.get('ADMISSION_CLIENT_HEADER', '')
+# 全量导出的输出块大小、每批从存储读取的档案数和gzip压缩级别
+app.config['EXPORT_CHUNK_BYTES'] = int(os.environ.get('EXPORT_CHUNK_BYTES', 64 * 1024))
+app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+app.config['EXPORT_GZIP_LEVEL'] = int(os.environ.get('EXPORT_GZIP_LEVEL', 6))
+# 成功请求的日志采样比例（错误请求始终记录）、是否输出访问日志、日志中请求数据字符串的截断长度
+app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+app.config['LOG_ACCESS'] = os.environ.get('LOG_ACCESS', 'true').lower() == 'true'
+app.config['LOG_MAX_FIELD_CHARS'] = int(os.environ.get('LOG_MAX_FIELD_CHARS', 256))
 
-# Pydantic 模型定义
-class Address(BaseModel):
-    """地址信息模型"""
-    street: str = Field(..., description="街道地址", min_length=1, max_length=200)
-    city: str = Field(..., description="城市", min_length=1, max_length=50)
-    state: str = Field(..., description="省份/州", min_length=1, max_length=50)
-    postal_code: str = Field(..., description="邮政编码", min_length=5, max_length=10)
-    country: str = Field(default="中国", description="国家")
-    
+# 用户档案存储（DATABASE_URL，默认 sqlite:///app.db）
+profile_store = ProfileStore.from_env()
 
-class ContactInfo(BaseModel):
-    """联系信息模型"""
-    email: EmailStr = Field(..., description="邮箱地址")
-    phone: str = Field(..., description="电话号码", pattern=r'^1[3-9]\d{9}$')
-    wechat: Optional[str] = Field(None, description="微信号", max_length=50)
-    qq: Optional[str] = Field(None, description="QQ号", max_length=20)
-    
+# GET /api/user-profile/<user_id> 的响应缓存（PROFILE_CACHE_MAX_ENTRIES/MAX_BYTES/TTL）
+profile_cache = DocumentCache.from_env()
 
-class Skill(BaseModel):
-    """技能信息模型"""
-    name: str = Field(..., description="技能名称", min_length=1, max_length=50)
-    level: int = Field(..., description="技能等级", ge=1, le=10)
-    years_experience: float = Field(..., description="经验年数", ge=0, le=50)
-    certifications: List[str] = Field(default_factory=list, description="相关认证")
-    
+# 验证接口的备忘表：相同请求体和参数直接返回缓存的验证结果（VALIDATE_MEMO_MAX_ENTRIES）
+validation_memo = MemoCache(int(os.environ.get('VALIDATE_MEMO_MAX_ENTRIES', 4096)))
 
-class Education(BaseModel):
-    """教育背景模型"""
-    school: str = Field(..., description="学校名称", min_length=1, max_length=100)
-    degree: str = Field(..., description="学位", min_length=1, max_length=50)
-    major: str = Field(..., description="专业", min_length=1, max_length=50)
-    graduation_date: date = Field(..., description="毕业日期")
-    gpa: Optional[float] = Field(None, description="GPA", ge=0, le=4.0)
-    
+# 档案只读快照（SNAPSHOT_PATH 指向 python -m app.snapshot build 生成的文件时启用），各worker共享页缓存
+snapshot_store = SnapshotStore.from_env()
 
-class WorkExperience(BaseModel):
-    """工作经历模型"""
-    company: str = Field(..., description="公司名称", min_length=1, max_length=100)
-    position: str = Field(..., description="职位", min_length=1, max_length=50)
-    start_date: date = Field(..., description="开始日期")
-    end_date: Optional[date] = Field(None, description="结束日期")
-    description: str = Field(..., description="工作描述", min_length=10, max_length=1000)
-    achievements: List[str] = Field(default_factory=list, description="主要成就")
-    
+# 读取路径的后台同步：检查快照文件是否替换、同步其他进程的写入到覆盖层，
+# 并从响应缓存中移除其他进程删除的档案（如离线去重 --apply），不在GET请求中执行
+read_refresher = BackgroundRefresher(min(snapshot_store.check_interval, snapshot_store.refresh_interval),
+                                     name='read-refresh')
+deletion_feed = ChangeFeed()
+
+def invalidate_deleted_profiles() -> None:
+    for user_id in deletion_feed.poll_deleted(profile_store):
+        profile_cache.invalidate(user_id)
+
+read_refresher.add(lambda: snapshot_store.refresh(profile_store))
+read_refresher.add(invalidate_deleted_profiles)
+
+# 档案搜索倒排索引，首次搜索时从存储加载，之后增量更新
+profile_index = ProfileIndex.from_env()
+
+# 候选人匹配引擎，同样在首次匹配时加载、之后增量追加
+match_engine = MatchingEngine.from_env()
+
+# 工作经历全文索引（FULLTEXT_INDEX_PATH 指向离线构建的索引文件时启动即加载）
+fulltext_index = FullTextIndex.from_env()
+# 增量段或已删除文档超过阈值时在后台线程合并，查询只做增量同步
+fulltext_compactor = BackgroundRefresher(float(os.environ.get('FULLTEXT_COMPACT_INTERVAL', 10.0)),
+                                         name='fulltext-compact')
+fulltext_compactor.add(fulltext_index.compact_if_needed)
 
-class UserProfile(BaseModel):
-    """用户档案模型"""
-    personal_info: Dict[str, Any] = Field(..., description="个人信息")
-    contact: ContactInfo = Field(..., description="联系信息")
-    address: Address = Field(..., description="地址信息")
-    skills: List[Skill] = Field(..., description="技能列表", min_items=1)
-    education: List[Education] = Field(..., description="教育背景", min_items=1)
-    work_experience: List[WorkExperience] = Field(default_factory=list, description="工作经历")
-    preferences: Dict[str, Any] = Field(default_factory=dict, description="个人偏好")
+# 近重复档案的MinHash LSH索引，创建和批量导入时查找相似档案
+dedup_index = DedupIndex.from_env()
+
+# 后台任务队列（JOBS_*）：?async=true 的创建和验证请求在本进程的后台线程中执行
+job_queue = JobQueue.from_env()
+
+class WorkerStats:
+    """当前worker进程的运行统计（gunicorn fork后由配置钩子调用reset重置）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.requests_served = 0
     
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests_served += 1
+
+# 跨worker共享的指标（METRICS_MMAP_PATH / METRICS_MAX_WORKERS），通过 /metrics 导出
+metrics = Metrics.from_env()
+metrics.init_app(app)
+
+# 应用启动时间（preload模式下为master进程加载应用的时间）
+APP_STARTED_AT = time.time()
+worker_stats = WorkerStats()
+
+# 准入控制（ADMISSION_*）：过载时按优先级拒绝请求，保护健康检查和读取请求的延迟
+admission = AdmissionController.from_env()
+
+# 各接口的准入优先级；未列出的GET接口为read，其他为write
+ENDPOINT_PRIORITIES = {
+    'health_check': 'critical',
+    'get_status': 'critical',
+    'prometheus_metrics': 'critical',
+    'validate_user_profile': 'bulk',
+    'batch_user_profiles': 'bulk',
+    'export_user_profiles': 'bulk',
+}
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_id = begin_request(request.headers.get('X-Request-ID'), app.config['LOG_SAMPLE_RATE'])
+
+@app.before_request
+def admit_request():
+    """准入控制：客户端超出限流返回429，服务过载返回503，均带Retry-After"""
+    priority = ENDPOINT_PRIORITIES.get(request.endpoint) or \
+        ('read' if request.method in ('GET', 'HEAD') else 'write')
+    header = app.config['ADMISSION_CLIENT_HEADER']
+    client = (request.headers.get(header) if header else None) or request.remote_addr or ''
+    queue_delay = request_queue_delay(request.headers.get(REQUEST_START_HEADER), time.time())
+    rejection = admission.admit(priority, client, queue_delay)
+    if rejection is None:
+        g.admitted = True
+        return None
+    metrics.observe_shed(priority, rejection.reason)
+    response = jsonify({
+        'success': False,
+        'message': '请求过于频繁，请稍后重试' if rejection.status == 429 else '服务繁忙，请稍后重试',
+        'error': f"Request rejected by admission control: {rejection.reason}",
+        'timestamp': datetime.now().isoformat()
+    })
+    response.status_code = rejection.status
+    response.headers['Retry-After'] = str(rejection.retry_after)
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    if g.pop('admitted', False):
+        admission.release()
 
-class UserProfileResponse(BaseModel):
-    """用户档案响应模型"""
-    user_id: str = Field(..., description="用户ID")
-    profile: UserProfile = Field(..., description="用户档案")
-    created_at: datetime = Field(..., description="创建时间")
-    updated_at: datetime = Field(..., description="更新时间")
-    status: str = Field(..., description="状态")
-    score: float = Field(..., description="档案完整度评分", ge=0, le=100)
+@app.after_request
+def count_request(response):
+    """统计当前worker处理的请求数，记录路由延迟和状态码，并输出访问日志"""
+    worker_stats.record_request()
+    started = g.get('request_started')
+    duration = time.perf_counter() - started if started is not None else 0.0
+    if started is not None:
+        metrics.observe_request(request.endpoint, response.status_code, duration)
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    if app.config['LOG_ACCESS']:
+        log_access(response.status_code, duration)
+    return response
+
+@app.teardown_request
+def end_request_logging(exc):
+    end_request()
+
+def log_access(status: int, duration: float) -> None:
+    """访问日志：成功请求按采样比例输出，错误请求始终输出并附带脱敏后的请求体"""
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'status': status,
+        'duration_ms': round(duration * 1000, 3),
+    }
+    if status < 400:
+        access_logger.info('request', extra=fields)
+        return
+    fields['query'] = request.query_string.decode('latin-1')
+    try:
+        payload = request.get_json(silent=True)
+    except HTTPException:
+        # 请求体未能读取（客户端断开、超过大小上限）
+        payload = None
+    if payload is not None:
+        fields['payload'] = redact(payload, app.config['LOG_MAX_FIELD_CHARS'])
+    access_logger.log(logging.ERROR if status >= 500 else logging.INFO, 'request', extra={**fields, 'force': True})
+
+# 常量部分预先序列化的响应信封
+created_envelope = Envelope('用户档案创建成功')
+fetched_envelope = Envelope('获取用户档案成功')
+search_envelope = Envelope('搜索用户档案成功')
+merged_envelope = Envelope('检测到近重复档案，已合并到已有档案')
+patched_envelope = Envelope('用户档案更新成功')
 
 @app.route('/', methods=['GET'])
 def health_check():
@@ -103,22 +248,39 @@ def health_check():
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """获取系统状态"""
+    uptime_seconds = time.time() - APP_STARTED_AT
     return jsonify({
         'status': 'running',
-        'uptime': 'N/A',  # 实际项目中可以计算运行时间
+        'uptime': str(timedelta(seconds=int(uptime_seconds))),
+        'uptime_seconds': round(uptime_seconds, 3),
+        'worker': {
+            'pid': worker_stats.pid,
+            'started_at': datetime.fromtimestamp(worker_stats.started_at).isoformat(),
+            'requests_served': worker_stats.requests_served
+        },
         'environment': os.environ.get('ENVIRONMENT', 'development'),
         'server_info': {
             'host': app.config['HOST'],
             'port': app.config['PORT'],
             'debug': app.config['DEBUG']
-        }
+        },
+        'profile_cache': profile_cache.stats(),
+        'snapshot': snapshot_store.stats(),
+        'validate_memo': validation_memo.stats(),
+        'search_index': profile_index.stats(),
+        'match_engine': match_engine.stats(),
+        'fulltext_index': fulltext_index.stats(),
+        'dedup_index': dedup_index.stats(),
+        'admission': admission.stats(),
+        'jobs': job_queue.stats(),
+        'logging': log_handler.stats() if log_handler else None
     })
 
 @app.route('/api/echo', methods=['POST'])
 def echo():
     """回显接口，用于测试POST请求"""
     data = request.get_json()
-    return jsonify({
+    return json_response({
         'message': 'Echo received',
         'received_data': data,
         'timestamp': datetime.now().isoformat()
@@ -129,134 +291,456 @@ def create_user_profile():
     """创建用户档案接口 - 使用复杂的嵌套Pydantic模型"""
     try:
         # 获取请求数据
-        data = request.get_json()
+        with metrics.stage('parse'):
+            data = request.get_json()
         
-        # 验证数据是否符合UserProfile模型
-        user_profile = UserProfile(**data)
+        # ?async=true 时放入后台任务队列，立即返回202
+        if is_async_request():
+            # 提交时分配user_id并随任务保存，租约到期重新执行时写入同一份档案
+            return submit_job('create', {'user_id': generate_user_id(), 'data': data})
         
-        # 计算档案完整度评分
-        score = calculate_profile_score(user_profile)
+        envelope, response_data, status = create_profile(data)
+        with metrics.stage('serialize'):
+            return envelope.response(response_data, status=status)
         
-        # 生成用户ID（实际项目中应该从数据库生成）
-        user_id = f"user_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    except Exception as e:
+        logger.error(f"Error creating user profile: {describe_error(e)}")
+        return jsonify(creation_error(e)), 400
+
+@app.route('/api/user-profile/<user_id>', methods=['GET'])
+def get_user_profile(user_id):
+    """获取用户档案接口"""
+    try:
+        # 启用快照时在映射文件中查找，快照生成后的写入在覆盖层中，都没有时回退到存储
+        found = snapshot_store.get(user_id) if snapshot_store.active else None
+        if found is not None:
+            document, etag = found
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(fetched_envelope.render_raw_bytes(document), status=200,
+                                    mimetype='application/json')
+            response.set_etag(etag)
+            return response
         
-        # 创建响应数据
-        response_data = UserProfileResponse(
-            user_id=user_id,
-            profile=user_profile,
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            status="active",
-            score=score
-        )
+        entry = profile_cache.get(user_id)
+        if entry is None:
+            # 从存储中读取已校验过的档案文档，无需再次经过Pydantic校验
+            document = profile_store.get_document(user_id)
+            if document is None:
+                return jsonify({
+                    'success': False,
+                    'message': '用户档案不存在',
+                    'error': f"User profile not found: {user_id}",
+                    'timestamp': datetime.now().isoformat()
+                }), 404
+            entry = profile_cache.put(user_id, document.encode('utf-8'))
         
-        logger.info(f"Created user profile for user_id: {user_id}")
+        # If-None-Match 命中时返回304，不带响应体；否则将文档（已是紧凑的JSON文本）拼接进本次请求的响应信封
+        if request.if_none_match.contains(entry.etag):
+            response = Response(status=304)
+        else:
+            response = Response(fetched_envelope.render_raw_bytes(entry.document), status=200,
+                                mimetype='application/json')
+        response.set_etag(entry.etag)
+        return response
         
+    except Exception as e:
+        logger.error(f"Error getting user profile: {describe_error(e)}")
         return jsonify({
-            'success': True,
-            'message': '用户档案创建成功',
-            'data': response_data.dict(),
+            'success': False,
+            'message': '获取用户档案失败',
+            'error': str(e),
             'timestamp': datetime.now().isoformat()
-        }), 201
+        }), 500
+
+@app.route('/api/user-profile/<user_id>', methods=['PATCH'])
+def patch_user_profile(user_id):
+    """局部更新用户档案接口 - 只校验、重新评分和写入被修改的段落
+    
+    请求体为JSON对象时按 JSON Merge Patch 合并，为数组时按 JSON Patch 执行，
+    路径相对于档案本身（如 /skills/0/level）。
+    Headers: Prefer: return=representation 时返回完整档案，否则只返回评分与修改的段落
+    """
+    try:
+        with metrics.stage('parse'):
+            patch = request.get_json()
+        
+        for _ in range(app.config['PATCH_MAX_RETRIES']):
+            current = profile_store.get_versioned(user_id)
+            if current is None:
+                return jsonify({
+                    'success': False,
+                    'message': '用户档案不存在',
+                    'error': f"User profile not found: {user_id}",
+                    'timestamp': datetime.now().isoformat()
+                }), 404
+            text, version = current
+            document = json.loads(text)
+            
+            # 只校验被修改的段落，评分按段落增量更新
+            with metrics.stage('validate'):
+                result = apply_patch(document, patch)
+            if not result.sections:
+                updated = text
+                break
+            
+            now = datetime.now()
+            contact = json.loads(result.sections['contact']) if 'contact' in result.sections else {}
+            updated = profile_store.update_sections(
+                user_id, version, result.sections,
+                {'score': result.score, 'updated_at': http_date(now)},
+                now.isoformat(), email=contact.get('email'), phone=contact.get('phone')
+            )
+            if updated is not None:
+                profile_cache.invalidate(user_id)
+                snapshot_store.put(user_id, updated)
+                index_document(user_id, json.loads(updated))
+                break
+        else:
+            return jsonify({
+                'success': False,
+                'message': '用户档案更新冲突，请重试',
+                'error': f"User profile was modified concurrently: {user_id}",
+                'timestamp': datetime.now().isoformat()
+            }), 409
         
+        logger.info(f"Patched user profile {user_id}: {', '.join(result.sections) or 'no changes'}")
+        with metrics.stage('serialize'):
+            if 'return=representation' in request.headers.get('Prefer', ''):
+                return Response(patched_envelope.render_raw(updated), status=200, mimetype='application/json')
+            return patched_envelope.response({
+                'user_id': user_id,
+                'score': result.score,
+                'updated_sections': list(result.sections)
+            })
+        
+    except (PatchError, ValidationError) as e:
+        return jsonify({
+            'success': False,
+            'message': '数据验证失败',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 400
     except Exception as e:
-        logger.error(f"Error creating user profile: {str(e)}")
+        logger.error(f"Error patching user profile: {describe_error(e)}")
         return jsonify({
             'success': False,
-            'message': '用户档案创建失败',
+            'message': '用户档案更新失败',
             'error': str(e),
             'timestamp': datetime.now().isoformat()
         }), 400
 
-@app.route('/api/user-profile/<user_id>', methods=['GET'])
-def get_user_profile(user_id):
-    """获取用户档案接口"""
+@app.route('/api/user-profile/<user_id>/validate', methods=['POST'])
+def validate_user_profile(user_id):
+    """验证用户档案数据接口 - 支持Query Params"""
     try:
-        # 模拟从数据库获取用户档案（实际项目中应该查询数据库）
-        sample_profile = create_sample_profile()
+        # 获取请求数据
+        with metrics.stage('parse'):
+            data = request.get_json()
         
-        response_data = UserProfileResponse(
-            user_id=user_id,
-            profile=sample_profile,
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            status="active",
-            score=calculate_profile_score(sample_profile)
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('validate request', extra={
+                'query': request.args.to_dict(),
+                'payload': redact(data, app.config['LOG_MAX_FIELD_CHARS'])
+            })
         
-        return jsonify({
+        # ?async=true 时放入后台任务队列，立即返回202
+        if is_async_request():
+            return submit_job('validate', {'user_id': user_id, 'data': data, 'args': request.args.to_dict()})
+        
+        response_data, status = validate_profile_data(user_id, data, request.args)
+        with metrics.stage('serialize'):
+            return json_response(response_data, status)
+        
+    except Exception as e:
+        logger.error(f"Error validating user profile: {describe_error(e)}")
+        return jsonify(validation_error(e)), 400
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询后台任务状态，完成后result为同步请求时的响应体，status_code为其HTTP状态码"""
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'message': '任务不存在或结果已过期',
+                'error': f"Job not found: {job_id}",
+                'timestamp': datetime.now().isoformat()
+            }), 404
+        return json_response({
             'success': True,
-            'message': '获取用户档案成功',
-            'data': response_data.dict(),
+            'message': '获取任务状态成功',
+            'data': job,
             'timestamp': datetime.now().isoformat()
-        }), 200
+        })
         
     except Exception as e:
-        logger.error(f"Error getting user profile: {str(e)}")
+        logger.error(f"Error getting job: {describe_error(e)}")
         return jsonify({
             'success': False,
-            'message': '获取用户档案失败',
+            'message': '获取任务状态失败',
             'error': str(e),
             'timestamp': datetime.now().isoformat()
         }), 500
 
-@app.route('/api/user-profile/<user_id>/validate', methods=['POST'])
-def validate_user_profile(user_id):
-    """验证用户档案数据接口 - 支持Query Params"""
+@app.route('/api/user-profiles/batch', methods=['POST'])
+def batch_user_profiles():
+    """批量创建/验证用户档案接口 - 请求与响应均为NDJSON流
+    
+    每行一个UserProfile JSON文档，逐行解析和验证，每行输入对应一行结果。
+    Query Params: mode=create（默认，验证后写入存储）或 mode=validate（仅验证评分）
+    """
+    mode = request.args.get('mode', 'create')
+    if mode not in ('create', 'validate'):
+        return jsonify({
+            'success': False,
+            'message': '批量处理失败',
+            'error': f"Unsupported mode: {mode}",
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    
+    stream = request.stream
+    chunk_size = app.config['BATCH_CHUNK_SIZE']
+    max_line_bytes = app.config['BATCH_MAX_LINE_BYTES']
+    
+    def generate():
+        results = []
+        records = []
+        total = failed = 0
+        for line_no, line in enumerate(iter_ndjson_lines(stream, max_line_bytes), start=1):
+            if line is None:
+                results.append(batch_error(line_no, 'line_too_long',
+                                           f"Line exceeds {max_line_bytes} bytes"))
+            elif line.strip():
+                results.append(process_batch_line(line_no, line, mode, records))
+            else:
+                continue
+            
+            if len(results) >= chunk_size:
+                total, failed = total + len(results), failed + flush_batch(results, records)
+                yield ''.join(dump_ndjson(item) for item in results)
+                results.clear()
+        
+        if results:
+            total, failed = total + len(results), failed + flush_batch(results, records)
+            yield ''.join(dump_ndjson(item) for item in results)
+        
+        logger.info(f"Batch {mode} finished: {total} lines, {failed} failed")
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/user-profiles/search', methods=['GET'])
+def search_user_profiles():
+    """搜索用户档案接口 - 基于内存倒排索引的组合查询
+    
+    Query Params:
+        skill: 技能名，可重复；可写作 Python:7 指定最低等级
+        min_level: 未单独指定等级的技能的最低等级（默认1）
+        city / degree / work_location: 城市、学位、期望工作地点
+        page / page_size: 分页（默认第1页，每页20条）
+    """
     try:
-        # 获取请求数据
-        data = request.get_json()
+        min_level = int(request.args.get('min_level', 1))
+        skills = []
+        for value in request.args.getlist('skill'):
+            name, _, level = value.rpartition(':') if ':' in value else (value, '', '')
+            if name.strip():
+                skills.append((name, int(level) if level else min_level))
+        query = SearchQuery(
+            skills=tuple(skills),
+            city=request.args.get('city'),
+            degree=request.args.get('degree'),
+            work_location=request.args.get('work_location')
+        )
+        page = int(request.args.get('page', 1))
+        page_size = int(request.args.get('page_size', 20))
+        if query.empty:
+            raise ValueError('At least one of skill, city, degree, work_location is required')
+        if page < 1 or not 1 <= page_size <= app.config['SEARCH_MAX_PAGE_SIZE']:
+            raise ValueError(f"page must be >= 1 and page_size between 1 and {app.config['SEARCH_MAX_PAGE_SIZE']}")
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': '搜索参数错误',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    
+    try:
+        profile_index.refresh(profile_store)
+        total, user_ids = profile_index.search(query, (page - 1) * page_size, page_size)
+        documents = profile_store.get_documents(user_ids)
         
-        # 获取Query Params
-        include_skills = request.args.get('include_skills', 'true').lower() == 'true'
-        include_education = request.args.get('include_education', 'true').lower() == 'true'
-        include_work = request.args.get('include_work', 'true').lower() == 'true'
-        format_type = request.args.get('format', 'detailed')  # simple 或 detailed
-        print('现在有请求参数：', request.args)
-        # 验证数据
-        user_profile = UserProfile(**data)
-        print('现在有用户档案：', user_profile)
-        # 计算评分
-        score = calculate_profile_score(user_profile)
+        # 存储文档已是紧凑的JSON文本，按命中顺序直接拼接
+        results = ','.join(documents[user_id] for user_id in user_ids if user_id in documents)
+        data = f'{{"page":{page},"page_size":{page_size},"results":[{results}],"total":{total}}}'
+        return Response(search_envelope.render_raw(data), status=200, mimetype='application/json')
         
-        # 生成验证报告
-        validation_report = generate_validation_report(user_profile)
+    except Exception as e:
+        logger.error(f"Error searching user profiles: {describe_error(e)}")
+        return jsonify({
+            'success': False,
+            'message': '搜索用户档案失败',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/user-profiles/fulltext', methods=['GET'])
+def fulltext_search_user_profiles():
+    """工作经历全文检索接口 - 按BM25相关度返回前top_k个档案及命中片段
+    
+    Query Params:
+        q: 查询文本（中文按两字切分，英文按词匹配）
+        top_k: 返回条数（默认10）
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        top_k = int(request.args.get('top_k', 10))
+        if not query:
+            raise ValueError('q is required')
+        if not 1 <= top_k <= app.config['FULLTEXT_MAX_TOP_K']:
+            raise ValueError(f"top_k must be between 1 and {app.config['FULLTEXT_MAX_TOP_K']}")
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': '检索参数错误',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    
+    try:
+        fulltext_index.refresh(profile_store)
+        total, hits, terms = fulltext_index.search(query, top_k)
+        documents = profile_store.get_documents([user_id for user_id, _ in hits])
+        results = []
+        for user_id, score in hits:
+            if user_id in documents:
+                document = json.loads(documents[user_id])
+                results.append({
+                    'user_id': user_id,
+                    'name': (document.get('profile', {}).get('personal_info') or {}).get('name'),
+                    'score': score,
+                    **make_snippet(document, terms)
+                })
+        return json_response({
+            'success': True,
+            'message': '全文检索成功',
+            'data': {
+                'query': query,
+                'total': total,
+                'results': results
+            },
+            'timestamp': datetime.now().isoformat()
+        }, 200)
         
-        # 根据format参数决定返回格式
-        if format_type == 'simple':
-            response_data = {
-                'success': True,
-                'message': '数据验证成功',
-                'user_id': user_id,
-                'score': score,
-                'timestamp': datetime.now().isoformat()
-            }
-        else:  # detailed
-            response_data = {
+    except Exception as e:
+        logger.error(f"Error in fulltext search: {describe_error(e)}")
+        return jsonify({
+            'success': False,
+            'message': '全文检索失败',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/user-profiles/export', methods=['GET'])
+def export_user_profiles():
+    """全量导出用户档案接口 - 按user_id顺序流式输出，内存占用与档案数无关
+    
+    Query Params:
+        format: ndjson（默认，每行一个档案文档）或 csv
+        explode: csv的列表段落展开方式，columns（默认，展开为 skills_1_name 等列）或 rows（每个列表项一行）
+        max_items: explode=columns 时每个列表段落展开的项数（默认3，总数见 *_count 列）
+        gzip: true 时输出gzip压缩流
+        after: 只导出 user_id 大于该值的档案，用于中断后续传
+    """
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        explode = request.args.get('explode', 'columns')
+        max_items = int(request.args.get('max_items', 3))
+        compress = request.args.get('gzip', 'false').lower() == 'true'
+        after = request.args.get('after', '')
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if explode not in EXPLODE_MODES:
+            raise ValueError(f"explode must be one of {', '.join(EXPLODE_MODES)}")
+        if not 1 <= max_items <= 50:
+            raise ValueError('max_items must be between 1 and 50')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': '导出参数错误',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    
+    rows = profile_store.iter_by_user_id(after, app.config['EXPORT_BATCH_SIZE'])
+    chunks = export_chunks(rows, fmt, explode, max_items, compress,
+                           app.config['EXPORT_CHUNK_BYTES'], app.config['EXPORT_GZIP_LEVEL'])
+    
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            # 响应头已发出，只能记录错误并中断输出（客户端据最后一个完整行的user_id续传）
+            logger.error(f"Error exporting user profiles: {describe_error(e)}")
+            raise
+    
+    filename = f"user_profiles_{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    content_type = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv; charset=utf-8'
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = Response(stream_with_context(generate()), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/user-profiles/match', methods=['POST'])
+def match_user_profiles():
+    """候选人匹配接口 - 按岗位需求对全部档案打分，返回前top_k名及各项得分明细"""
+    try:
+        with metrics.stage('parse'):
+            data = request.get_json()
+        with metrics.stage('validate'):
+            job = JobRequirement(**data)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': '岗位需求格式错误',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    
+    try:
+        match_engine.refresh(profile_store)
+        with metrics.stage('score'):
+            candidates, results = match_engine.match(job)
+        with metrics.stage('serialize'):
+            return json_response({
                 'success': True,
-                'message': '数据验证成功',
-                'user_id': user_id,
-                'validation_report': validation_report,
-                'score': score,
-                'query_params': {
-                    'include_skills': include_skills,
-                    'include_education': include_education,
-                    'include_work': include_work,
-                    'format': format_type
+                'message': '候选人匹配成功',
+                'data': {
+                    'title': job.title,
+                    'candidates': candidates,
+                    'results': results
                 },
                 'timestamp': datetime.now().isoformat()
-            }
-        
-        return jsonify(response_data), 200
+            }, 200)
         
     except Exception as e:
-        logger.error(f"Error validating user profile: {str(e)}")
+        logger.error(f"Error matching user profiles: {describe_error(e)}")
         return jsonify({
             'success': False,
-            'message': '数据验证失败',
+            'message': '候选人匹配失败',
             'error': str(e),
             'timestamp': datetime.now().isoformat()
-        }), 400
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus指标接口（汇总所有worker进程）"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/test', methods=['GET'])
 def test_endpoint():
@@ -291,63 +775,307 @@ def internal_error(error):
     }), 500
 
 # 辅助函数
-def calculate_profile_score(profile: UserProfile) -> float:
-    """计算用户档案完整度评分"""
-    score = 0.0
-    max_score = 100.0
-    
-    # 个人信息 (20分)
-    if profile.personal_info:
-        score += 20.0
+def run_validation(data: Dict[str, Any], include_skills: bool = True, include_education: bool = True,
+                   include_work: bool = True, with_report: bool = True) -> Dict[str, Any]:
+    """验证档案数据并计算评分和验证报告，数据不合法时返回错误信息
+
+    未包含的列表段落跳过嵌套校验（评分和报告只使用其条目数），
+    with_report 为 False 时不生成验证报告（format=simple）。
+    """
+    model = partial_profile_model(include_skills, include_education, include_work)
+    try:
+        with metrics.stage('validate'):
+            user_profile = model(**data)
+    except ValidationError as e:
+        return {'error': str(e)}
+    with metrics.stage('score'):
+        result = {'score': calculate_profile_score(user_profile)}
+        if with_report:
+            result['validation_report'] = generate_validation_report(user_profile)
+        return result
+
+def validate_profile_data(user_id: str, data: Any, args) -> tuple:
+    """按查询参数验证档案数据并计算评分，返回 (响应体, HTTP状态码)"""
+    include_skills = args.get('include_skills', 'true').lower() == 'true'
+    include_education = args.get('include_education', 'true').lower() == 'true'
+    include_work = args.get('include_work', 'true').lower() == 'true'
+    format_type = args.get('format', 'detailed')  # simple 或 detailed
     
-    # 联系信息 (20分)
-    if profile.contact:
-        score += 20.0
+    # 相同请求体和参数的验证结果直接取自备忘表
+    memo_key = content_hash(data, format_type, include_skills, include_education, include_work)
+    result = validation_memo.get(memo_key)
+    if result is None:
+        result = run_validation(data, include_skills, include_education, include_work,
+                                with_report=format_type != 'simple')
+        validation_memo.put(memo_key, result)
     
-    # 地址信息 (15分)
-    if profile.address:
-        score += 15.0
+    if 'error' in result:
+        return {
+            'success': False,
+            'message': '数据验证失败',
+            'error': result['error'],
+            'timestamp': datetime.now().isoformat()
+        }, 400
     
-    # 技能信息 (20分)
-    if profile.skills:
-        score += min(20.0, len(profile.skills) * 5.0)
+    score = result['score']
     
-    # 教育背景 (15分)
-    if profile.education:
-        score += min(15.0, len(profile.education) * 7.5)
+    # 根据format参数决定返回格式
+    if format_type == 'simple':
+        return {
+            'success': True,
+            'message': '数据验证成功',
+            'user_id': user_id,
+            'score': score,
+            'timestamp': datetime.now().isoformat()
+        }, 200
+    return {
+        'success': True,
+        'message': '数据验证成功',
+        'user_id': user_id,
+        'validation_report': result['validation_report'],
+        'score': score,
+        'query_params': {
+            'include_skills': include_skills,
+            'include_education': include_education,
+            'include_work': include_work,
+            'format': format_type
+        },
+        'timestamp': datetime.now().isoformat()
+    }, 200
+
+def validation_error(e: Exception) -> Dict[str, Any]:
+    return {
+        'success': False,
+        'message': '数据验证失败',
+        'error': str(e),
+        'timestamp': datetime.now().isoformat()
+    }
+
+def create_profile(data: Any, user_id: Optional[str] = None) -> tuple:
+    """验证、评分、查重并写入存储和各索引，返回 (响应信封, 响应数据, HTTP状态码)
+
+    user_id 为后台任务提交时分配的ID：任务重新执行时覆盖上次已写入的同一份档案并保留其创建时间。
+    """
+    # 验证数据是否符合UserProfile模型
+    with metrics.stage('validate'):
+        user_profile = UserProfile(**data)
     
-    # 工作经历 (10分)
-    if profile.work_experience:
-        score += min(10.0, len(profile.work_experience) * 3.0)
+    # 计算档案完整度评分
+    with metrics.stage('score'):
+        score = calculate_profile_score(user_profile)
     
-    return round(score, 2)
-
-def generate_validation_report(profile: UserProfile) -> Dict[str, Any]:
-    """生成验证报告"""
-    report = {
-        "basic_info_complete": bool(profile.personal_info),
-        "contact_info_complete": bool(profile.contact),
-        "address_info_complete": bool(profile.address),
-        "skills_count": len(profile.skills),
-        "education_count": len(profile.education),
-        "work_experience_count": len(profile.work_experience),
-        "recommendations": []
-    }
+    # 查找近重复档案，merge模式下写入最相似且仍存在的已有档案
+    fingerprint, duplicates = find_duplicates(user_profile)
+    existing = None
+    if user_id is not None:
+        duplicates = [item for item in duplicates if item['user_id'] != user_id]
+        existing = profile_store.get_document(user_id)
+    if existing is not None:
+        # 任务上次执行已写入：覆盖同一份档案，不再合并到其他档案
+        merged_into, created_at = None, parse_date(json.loads(existing)['created_at'])
+    else:
+        merged_into, created_at = merge_target(duplicates)
     
-    # 生成建议
-    if len(profile.skills) < 3:
-        report["recommendations"].append("建议添加更多技能信息")
+    # 创建响应数据并持久化
+    with metrics.stage('serialize'):
+        response_data, record = build_profile_record(user_profile, score, user_id=merged_into or user_id,
+                                                     created_at=created_at)
+    profile_store.put(*record)
+    user_id = response_data.user_id
+    profile_cache.invalidate(user_id)
+    snapshot_store.put(user_id, record[3])
+    index_profile(user_id, user_profile, fingerprint)
     
-    if len(profile.education) < 1:
-        report["recommendations"].append("请添加教育背景信息")
+    if merged_into:
+        logger.info(f"Merged near-duplicate user profile into user_id: {user_id}")
+        return merged_envelope, {**response_data.__dict__, 'duplicates': duplicates}, 200
+    logger.info(f"Created user profile for user_id: {user_id}")
+    if duplicates:
+        return created_envelope, {**response_data.__dict__, 'duplicates': duplicates}, 201
+    return created_envelope, response_data, 201
+
+def creation_error(e: Exception) -> Dict[str, Any]:
+    return {
+        'success': False,
+        'message': '用户档案创建失败',
+        'error': str(e),
+        'timestamp': datetime.now().isoformat()
+    }
+
+def is_async_request() -> bool:
+    return request.args.get('async', 'false').lower() == 'true'
+
+def submit_job(kind: str, payload: Any) -> Response:
+    """放入后台任务队列，返回202和任务状态地址；队列已满时返回503"""
+    try:
+        job_id = job_queue.submit(kind, payload)
+    except QueueFull as e:
+        response = jsonify({
+            'success': False,
+            'message': '任务队列已满，请稍后重试',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    status_url = f"/api/jobs/{job_id}"
+    response = json_response({
+        'success': True,
+        'message': '任务已提交',
+        'data': {'job_id': job_id, 'kind': kind, 'status': 'queued', 'status_url': status_url},
+        'timestamp': datetime.now().isoformat()
+    }, 202)
+    response.headers['Location'] = status_url
+    return response
+
+def run_create_job(payload: Any) -> tuple:
+    """后台任务：与同步创建接口返回相同的响应体"""
+    if not (isinstance(payload, dict) and 'data' in payload and 'user_id' in payload):
+        # 升级前提交、payload只有档案数据的任务
+        payload = {'user_id': None, 'data': payload}
+    with app.app_context():
+        try:
+            envelope, response_data, status = create_profile(payload['data'], payload['user_id'])
+            return status, envelope.render(response_data)
+        except Exception as e:
+            logger.error(f"Error creating user profile: {describe_error(e)}")
+            return 400, dumps(creation_error(e))
+
+def run_validate_job(payload: Dict[str, Any]) -> tuple:
+    """后台任务：与同步验证接口返回相同的响应体"""
+    with app.app_context():
+        try:
+            response_data, status = validate_profile_data(payload['user_id'], payload['data'], payload['args'])
+            return status, render_json(response_data)
+        except Exception as e:
+            logger.error(f"Error validating user profile: {describe_error(e)}")
+            return 400, dumps(validation_error(e))
+
+job_queue.register('create', run_create_job)
+job_queue.register('validate', run_validate_job)
+
+def iter_ndjson_lines(stream, max_line_bytes: int):
+    """逐行读取NDJSON请求体，超长的行返回None并跳过其剩余内容"""
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes)
+            yield None
+            continue
+        yield line
+
+def batch_error(line_no: int, error_type: str, message: str, details=None) -> Dict[str, Any]:
+    """构建批量处理中单行的错误结果"""
+    error = {'type': error_type, 'message': message}
+    if details is not None:
+        error['details'] = details
+    return {'line': line_no, 'success': False, 'error': error}
+
+def process_batch_line(line_no: int, line: bytes, mode: str, records: list) -> Dict[str, Any]:
+    """解析并验证批量请求中的一行，create模式下将 (存储记录, 档案) 追加到records"""
+    try:
+        with metrics.stage('parse'):
+            data = json.loads(line)
+    except ValueError as e:
+        return batch_error(line_no, 'invalid_json', str(e))
+    if not isinstance(data, dict):
+        return batch_error(line_no, 'invalid_json', 'Each line must be a JSON object')
     
-    if not profile.work_experience:
-        report["recommendations"].append("建议添加工作经历")
+    try:
+        with metrics.stage('validate'):
+            user_profile = UserProfile(**data)
+    except ValidationError as e:
+        return batch_error(line_no, 'validation_error', '数据验证失败',
+                           e.errors(include_url=False, include_context=False, include_input=False))
     
-    if not profile.contact.wechat and not profile.contact.qq:
-        report["recommendations"].append("建议添加微信或QQ联系方式")
+    with metrics.stage('score'):
+        score = calculate_profile_score(user_profile)
+    if mode == 'validate':
+        return {'line': line_no, 'success': True, 'user_id': data.get('user_id'), 'score': score}
     
-    return report
+    fingerprint, duplicates = find_duplicates(user_profile)
+    merged_into, created_at = merge_target(duplicates, records)
+    response_data, record = build_profile_record(user_profile, score, user_id=merged_into, created_at=created_at)
+    if fingerprint is not None:
+        # 先登记签名，同一块中后续的重复行也能被发现；写入失败时在flush_batch中移除
+        dedup_index.add(response_data.user_id, fingerprint)
+    records.append((record, user_profile, fingerprint))
+    result = {'line': line_no, 'success': True, 'user_id': response_data.user_id, 'score': score}
+    if merged_into:
+        result['merged_into'] = merged_into
+    if duplicates:
+        result['duplicates'] = duplicates
+    return result
+
+def find_duplicates(user_profile: UserProfile, mode: Optional[str] = None):
+    """计算档案指纹并查找近重复档案，返回 (指纹, 近重复列表)；查重模式（默认 DEDUP_MODE）为off时返回 (None, [])"""
+    if (mode or app.config['DEDUP_MODE']) == 'off':
+        return None, []
+    dedup_index.refresh(profile_store)
+    with metrics.stage('dedup'):
+        fingerprint = dedup_index.fingerprint_from_model(user_profile)
+        return fingerprint, dedup_index.find(fingerprint)
+
+def merge_target(duplicates: list, pending: Optional[list] = None):
+    """merge模式下选择要合并进的已有档案，返回 (user_id, 原创建时间)，不合并时返回 (None, None)
+
+    去重索引中的档案可能已被删除（如离线去重 --apply），此时跳过并移出索引，不会把已删除的档案重新写回。
+    pending 为同一批量块中尚未写入存储的 (存储记录, 档案, 指纹) 列表。
+    """
+    if not duplicates or app.config['DEDUP_MODE'] != 'merge':
+        return None, None
+    for item in duplicates:
+        user_id = item['user_id']
+        document = next((record[3] for record, _, _ in reversed(pending or ()) if record[0] == user_id), None) \
+            or profile_store.get_document(user_id)
+        if document is None:
+            dedup_index.remove(user_id)
+            continue
+        return user_id, parse_date(json.loads(document)['created_at'])
+    return None, None
+
+def index_profile(user_id: str, user_profile: UserProfile, fingerprint=None) -> None:
+    """档案写入存储后，同步更新本进程的搜索索引、匹配矩阵、全文索引和去重索引"""
+    profile_index.add(user_id, terms_from_model(user_profile))
+    match_engine.add(user_id, features_from_model(user_profile))
+    fulltext_index.add(user_id, texts_from_model(user_profile))
+    if fingerprint is not None:
+        dedup_index.add(user_id, fingerprint)
+
+def index_document(user_id: str, document: Dict[str, Any]) -> None:
+    """按存储文档更新本进程的各索引（局部更新后没有完整的模型对象）"""
+    profile_index.add(user_id, terms_from_document(document))
+    match_engine.add(user_id, features_from_document(document))
+    fulltext_index.add(user_id, texts_from_document(document))
+    if app.config['DEDUP_MODE'] != 'off':
+        dedup_index.add(user_id, dedup_index.fingerprint_from_document(document))
+
+def flush_batch(results: list, records: list) -> int:
+    """将缓冲的存储记录写入存储，返回本块失败行数"""
+    if records:
+        try:
+            profile_store.put_many(record for record, _, _ in records)
+            for record, user_profile, fingerprint in records:
+                profile_cache.invalidate(record[0])
+                snapshot_store.put(record[0], record[3])
+                index_profile(record[0], user_profile, fingerprint)
+        except Exception as e:
+            logger.error(f"Error storing batch chunk: {describe_error(e)}")
+            for record, _, _ in records:
+                dedup_index.remove(record[0])
+            for i, item in enumerate(results):
+                if item['success']:
+                    results[i] = batch_error(item['line'], 'storage_error', str(e))
+        records.clear()
+    return sum(1 for item in results if not item['success'])
+
+def dump_ndjson(item: Dict[str, Any]) -> str:
+    """序列化为一行NDJSON"""
+    return dumps(item) + '\n'
 
 def create_sample_profile() -> UserProfile:
     """创建示例用户档案"""
@@ -425,9 +1153,28 @@ def create_sample_profile() -> UserProfile:
         }
     )
 
+def start_background_tasks() -> None:
+    """启动本进程的后台线程（任务队列、读取路径同步、全文索引合并）；gunicorn在worker初始化后调用，master预热时不启动"""
+    job_queue.start()
+    read_refresher.start()
+    fulltext_compactor.start()
+
+def database_stores() -> list:
+    """本进程使用的全部SQLite存储（档案、任务表、ID租约表）"""
+    return [profile_store, job_queue.store, id_generator.store]
+
+def close_connections() -> None:
+    """释放本进程的worker号并关闭全部SQLite连接；gunicorn master预热后、fork之前调用，连接不能跨fork使用"""
+    id_generator.release()
+    for store in database_stores():
+        store.close()
+
 if __name__ == '__main__':
     logger.info(f"Starting AI Support System on {app.config['HOST']}:{app.config['PORT']}")
     logger.info(f"Debug mode: {app.config['DEBUG']}")
+    # 调试模式的重载器父进程不处理请求，只在实际运行应用的子进程中启动
+    if not app.config['DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_tasks()
     
     app.run(
         host=app.config['HOST'],
@@ -0,0 +1,408 @@
+"""
+AI Support System - 候选人匹配引擎
+按岗位需求（技能最低等级/年数、工作地点、薪资范围）为全部档案打分并返回前k名：
+- 技能等级与经验年数（以0.1年为单位的整数）按技能稀疏存储：每个技能一列，只保存掌握该技能的档案行号
+  与等级、年数数组（容量倍增），内存与技能条目总数成正比，与技能词表大小无关；
+  打分时只读取岗位要求的技能列，向量化累加到全部档案的得分上
+- 新档案按行追加，更新时覆盖该行在各技能列中的条目（不再掌握的技能等级与年数清零），删除时标记为无效
+- 打分在锁外进行：持锁只取各数组当前长度的视图，写入不等待打分
+- 与搜索索引相同，首次匹配时从存储加载，之后通过ChangeFeed增量同步
+"""
+
+import os
+import json
+import threading
+from functools import lru_cache
+from array import array
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.models import JobRequirement, UserProfile
+from app.search import normalize
+from app.store import ChangeFeed
+
+# 单项技能得分中等级与年数的占比
+LEVEL_SHARE = 0.6
+YEARS_SHARE = 0.4
+# 未填写期望薪资时的薪资得分
+UNKNOWN_SALARY_SCORE = 0.5
+
+
+class MatchFeatures(NamedTuple):
+    """一个档案参与匹配的特征"""
+    skills: Tuple[Tuple[str, int, float], ...]
+    city: Optional[str]
+    work_location: Optional[str]
+    salary: Optional[float]
+
+
+def _salary(value: Any) -> Optional[float]:
+    try:
+        salary = float(value)
+    except (TypeError, ValueError):
+        return None
+    return salary if salary > 0 else None
+
+
+def features_from_model(profile: UserProfile) -> MatchFeatures:
+    """从已校验的UserProfile提取匹配特征"""
+    return MatchFeatures(
+        skills=tuple((skill.name, skill.level, skill.years_experience) for skill in profile.skills),
+        city=normalize(profile.address.city),
+        work_location=normalize(profile.preferences.get('work_location')),
+        salary=_salary(profile.preferences.get('salary_expectation'))
+    )
+
+
+def features_from_document(document: Dict[str, Any]) -> MatchFeatures:
+    """从存储文档（UserProfileResponse序列化结果）提取匹配特征"""
+    profile = document.get('profile', document)
+    preferences = profile.get('preferences') or {}
+    return MatchFeatures(
+        skills=tuple((s.get('name'), s.get('level', 1), s.get('years_experience', 0))
+                     for s in profile.get('skills', [])),
+        city=normalize((profile.get('address') or {}).get('city')),
+        work_location=normalize(preferences.get('work_location')),
+        salary=_salary(preferences.get('salary_expectation'))
+    )
+
+
+@lru_cache(maxsize=1024)
+def _level_table(min_level: int, min_years: int) -> np.ndarray:
+    """等级 0-10 对应的得分表；最低年数为0时年数部分直接计满分（未掌握该技能除外）"""
+    levels = np.arange(11, dtype=np.float32)
+    table = np.float32(LEVEL_SHARE) * np.minimum(levels / np.float32(min_level), np.float32(1.0))
+    if min_years <= 0:
+        table += np.float32(YEARS_SHARE)
+    table[0] = 0.0
+    table.flags.writeable = False
+    return table
+
+
+class _SkillColumn:
+    """一个技能的稀疏列：掌握该技能的档案行号及对应的等级、年数，按写入顺序追加（容量倍增）"""
+
+    __slots__ = ('rows', 'levels', 'years', 'size')
+
+    def __init__(self, capacity: int = 16):
+        self.rows = np.zeros(capacity, dtype=np.uint32)
+        self.levels = np.zeros(capacity, dtype=np.uint8)
+        self.years = np.zeros(capacity, dtype=np.uint16)
+        self.size = 0
+
+    def append(self, row: int) -> int:
+        """追加一个档案行，返回其在列中的位置；扩容时复制到新数组，已取出的视图不受影响"""
+        if self.size == len(self.rows):
+            capacity = len(self.rows) * 2
+            for attr in ('rows', 'levels', 'years'):
+                old = getattr(self, attr)
+                grown = np.zeros(capacity, dtype=old.dtype)
+                grown[:self.size] = old[:self.size]
+                setattr(self, attr, grown)
+        position = self.size
+        self.rows[position] = row
+        self.size += 1
+        return position
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.rows[:self.size], self.levels[:self.size], self.years[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.rows.nbytes + self.levels.nbytes + self.years.nbytes)
+
+
+class MatchingEngine:
+    """档案匹配引擎（进程内）"""
+
+    def __init__(self, initial_rows: int = 1024, refresh_interval: float = 1.0, refresh_overlap: float = 5.0):
+        self._lock = threading.RLock()
+        self._feed = ChangeFeed(refresh_interval, refresh_overlap)
+        self._rows: Dict[str, int] = {}
+        self._user_ids: List[Optional[str]] = []
+        self._skills: Dict[str, int] = {}
+        self._columns: List[_SkillColumn] = []
+        # 每行在技能列中的条目：交替存放 (技能列号, 列内位置)，更新时据此覆盖
+        self._row_entries: List[Optional[array]] = []
+        self._locations: Dict[str, int] = {}
+        self._n = 0
+        self._city = np.full(initial_rows, -1, dtype=np.int32)
+        self._work_location = np.full(initial_rows, -1, dtype=np.int32)
+        self._salary = np.full(initial_rows, np.nan, dtype=np.float32)
+        self._active = np.zeros(initial_rows, dtype=bool)
+
+    @classmethod
+    def from_env(cls) -> 'MatchingEngine':
+        """根据环境变量创建（与搜索索引共用 SEARCH_INDEX_REFRESH_INTERVAL / OVERLAP）"""
+        return cls(
+            initial_rows=int(os.environ.get('MATCH_INITIAL_ROWS', 1024)),
+            refresh_interval=float(os.environ.get('SEARCH_INDEX_REFRESH_INTERVAL', 1.0)),
+            refresh_overlap=float(os.environ.get('SEARCH_INDEX_REFRESH_OVERLAP', 5.0))
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # ---------- 容量 ----------
+
+    def _grow_rows(self, needed: int) -> None:
+        capacity = len(self._active)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+
+        def grow(array: np.ndarray, fill) -> np.ndarray:
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[:self._n] = array[:self._n]
+            return grown
+
+        self._city = grow(self._city, -1)
+        self._work_location = grow(self._work_location, -1)
+        self._salary = grow(self._salary, np.nan)
+        self._active = grow(self._active, False)
+
+    def _skill_column(self, name: str) -> Optional[int]:
+        key = normalize(name)
+        if not key:
+            return None
+        column = self._skills.get(key)
+        if column is None:
+            column = len(self._columns)
+            self._columns.append(_SkillColumn())
+            self._skills[key] = column
+        return column
+
+    def _location_code(self, value: Optional[str]) -> int:
+        if not value:
+            return -1
+        return self._locations.setdefault(value, len(self._locations))
+
+    # ---------- 增量更新 ----------
+
+    def add(self, user_id: str, features: MatchFeatures) -> None:
+        """追加一个档案，或覆盖已有档案的技能条目与其他特征"""
+        with self._lock:
+            # 同名技能取最高的等级与年数
+            values: Dict[int, Tuple[int, int]] = {}
+            for name, level, years in features.skills:
+                column = self._skill_column(name)
+                if column is not None:
+                    old_level, old_years = values.get(column, (0, 0))
+                    values[column] = (max(old_level, min(10, max(1, int(level)))),
+                                      max(old_years, round(float(years) * 10)))
+
+            row = self._rows.get(user_id)
+            if row is None:
+                row = self._n
+                self._grow_rows(row + 1)
+                self._n += 1
+                self._rows[user_id] = row
+                self._user_ids.append(user_id)
+                self._row_entries.append(array('I'))
+            entries = self._row_entries[row]
+            # 已有条目原位覆盖，不再掌握的技能清零（保留位置，再次写入时复用）
+            for i in range(0, len(entries), 2):
+                column, position = entries[i], entries[i + 1]
+                level, years = values.pop(column, (0, 0))
+                self._columns[column].levels[position] = level
+                self._columns[column].years[position] = years
+            for column, (level, years) in values.items():
+                skill = self._columns[column]
+                position = skill.append(row)
+                skill.levels[position] = level
+                skill.years[position] = years
+                entries.extend((column, position))
+
+            self._city[row] = self._location_code(features.city)
+            self._work_location[row] = self._location_code(features.work_location)
+            self._salary[row] = np.nan if features.salary is None else features.salary
+            self._active[row] = True
+
+    def remove(self, user_id: str) -> bool:
+        """将档案所在行标记为无效，返回是否存在"""
+        with self._lock:
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return False
+            self._active[row] = False
+            self._user_ids[row] = None
+            return True
+
+    def refresh(self, store, force: bool = False) -> int:
+        """从存储增量同步新增或更新的档案（首次调用时全量加载），返回处理的行数"""
+        if not force and not self._feed.due():
+            return 0
+        with self._lock:
+            if not force and not self._feed.due():
+                return 0
+            rows = 0
+            for user_id, document in self._feed.poll(store):
+                if document is None:
+                    self.remove(user_id)
+                else:
+                    self.add(user_id, features_from_document(json.loads(document)))
+                rows += 1
+            return rows
+
+    # ---------- 打分 ----------
+
+    def match(self, job: JobRequirement) -> Tuple[int, List[Dict[str, Any]]]:
+        """对全部档案打分，返回 (候选人数, 前top_k名及各项得分明细)
+
+        持锁只取当前行数与各数组的视图，打分在锁外进行；打分期间并发更新的档案可能按更新前或更新后的值计算。
+        """
+        with self._lock:
+            n = self._n
+            mask = self._active[:n].copy()
+            city, work_location, salary = self._city[:n], self._work_location[:n], self._salary[:n]
+            columns = []
+            for requirement in job.required_skills:
+                column = self._skills.get(normalize(requirement.name))
+                columns.append(None if column is None else self._columns[column].view())
+            location_code = self._locations.get(normalize(job.location), -2) if job.location else None
+            user_ids = self._user_ids
+
+        # 技能：每项要求只读取对应的技能列，等级得分查表，年数得分按比例，累加到对应档案
+        weight_sum = sum(requirement.weight for requirement in job.required_skills)
+        skill_total = np.zeros(n, dtype=np.float32)
+        for requirement, column in zip(job.required_skills, columns):
+            if column is None:
+                if job.require_all_skills:
+                    mask[:] = False
+                continue
+            rows, levels, years = column
+            min_years = round(requirement.min_years * 10)
+            weight = requirement.weight / weight_sum
+            # 不再掌握的技能等级与年数均为0，查表得分为0；每个档案在一列中只有一个条目
+            scores = np.take(_level_table(requirement.min_level, min_years) * np.float32(weight), levels)
+            if min_years > 0:
+                ratio = np.minimum(years, min_years).astype(np.float32)
+                ratio *= np.float32(weight * YEARS_SHARE / min_years)
+                scores += ratio
+            skill_total[rows] += scores
+            if job.require_all_skills:
+                qualified = levels >= requirement.min_level
+                if min_years > 0:
+                    qualified &= years >= min_years
+                has_skill = np.zeros(n, dtype=bool)
+                has_skill[rows[qualified]] = True
+                mask &= has_skill
+
+        weights = job.skills_weight + job.location_weight + job.salary_weight or 1.0
+        total = skill_total * np.float32(100.0 * job.skills_weight / weights)
+
+        # 地点：期望工作地点或所在城市一致
+        if location_code is not None:
+            location = work_location == location_code
+            location |= city == location_code
+            total += location * np.float32(100.0 * job.location_weight / weights)
+        else:
+            total += np.float32(100.0 * job.location_weight / weights)
+
+        # 薪资：期望在范围内得满分，高出上限或低于下限按偏离比例扣分，未填写期望薪资得固定分
+        if job.salary_min or job.salary_max:
+            salary_score = np.ones(n, dtype=np.float32)
+            if job.salary_max:
+                over = salary - np.float32(job.salary_max)
+                np.maximum(over, 0, out=over)
+                over *= np.float32(1.0 / job.salary_max)
+                salary_score -= over
+            if job.salary_min:
+                under = np.float32(job.salary_min) - salary
+                np.maximum(under, 0, out=under)
+                under *= np.float32(1.0 / job.salary_min)
+                salary_score -= under
+            np.maximum(salary_score, 0, out=salary_score)
+            np.nan_to_num(salary_score, copy=False, nan=UNKNOWN_SALARY_SCORE)
+            salary_score *= np.float32(100.0 * job.salary_weight / weights)
+            total += salary_score
+        else:
+            total += np.float32(100.0 * job.salary_weight / weights)
+
+        candidates = int(np.count_nonzero(mask))
+        k = min(job.top_k, candidates)
+        if k == 0:
+            return 0, []
+        # 只在候选人中取前k名，同分按档案写入顺序
+        rows = np.flatnonzero(mask) if candidates < n else None
+        scores = total if rows is None else total[rows]
+        top = np.argpartition(scores, candidates - k)[candidates - k:]
+        if rows is not None:
+            top = rows[top]
+        top = top[np.lexsort((top, -total[top]))]
+
+        # 前k名在各技能列中的等级与年数：按行号映射到名次下标后一次取出
+        slots = np.full(n, -1, dtype=np.int32)
+        slots[top] = np.arange(len(top), dtype=np.int32)
+        top_skills = []
+        for column in columns:
+            top_levels = np.zeros(len(top), dtype=np.uint8)
+            top_years = np.zeros(len(top), dtype=np.uint16)
+            if column is not None:
+                hits = slots[column[0]]
+                found = hits >= 0
+                top_levels[hits[found]] = column[1][found]
+                top_years[hits[found]] = column[2][found]
+            top_skills.append((top_levels.tolist(), top_years.tolist()))
+
+        results = []
+        for rank, row in enumerate(top.tolist()):
+            user_id = user_ids[row]
+            if user_id is None:
+                # 打分期间被删除
+                continue
+            skills = [(levels[rank], years[rank]) for levels, years in top_skills]
+            location = location_code is None or location_code in (work_location[row], city[row])
+            results.append({
+                'user_id': user_id,
+                'score': round(float(total[row]), 2),
+                'breakdown': self._breakdown(job, skills, float(salary[row]), location)
+            })
+        return candidates, results
+
+    @staticmethod
+    def _breakdown(job: JobRequirement, skills: List[Tuple[int, int]], salary: float,
+                   location: bool) -> Dict[str, Any]:
+        """单个候选人的各项得分明细（与向量化打分使用相同公式）"""
+        weight_sum = sum(requirement.weight for requirement in job.required_skills)
+        details = []
+        skills_score = 0.0
+        for requirement, (level, years) in zip(job.required_skills, skills):
+            min_years = round(requirement.min_years * 10)
+            score = float(_level_table(requirement.min_level, min_years)[level])
+            if min_years > 0:
+                score += YEARS_SHARE * min(years, min_years) / min_years
+            skills_score += score * requirement.weight / weight_sum
+            details.append({'name': requirement.name, 'level': level,
+                            'years_experience': years / 10, 'score': round(score * 100, 2)})
+
+        if not (job.salary_min or job.salary_max):
+            salary_score = 1.0
+        elif np.isnan(salary):
+            salary_score = UNKNOWN_SALARY_SCORE
+        else:
+            salary_score = 1.0
+            if job.salary_max:
+                salary_score -= max(salary - job.salary_max, 0.0) / job.salary_max
+            if job.salary_min:
+                salary_score -= max(job.salary_min - salary, 0.0) / job.salary_min
+            salary_score = max(0.0, salary_score)
+        return {
+            'skills': round(skills_score * 100, 2),
+            'location': 100.0 if location else 0.0,
+            'salary': round(salary_score * 100, 2),
+            'skill_details': details,
+            'salary_expectation': None if np.isnan(salary) else salary
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'profiles': len(self._rows),
+            'rows': self._n,
+            'skills': len(self._columns),
+            'capacity': int(len(self._active)),
+            'skill_entries': sum(column.size for column in self._columns),
+            'matrix_bytes': sum(column.nbytes for column in self._columns),
+            'watermark': self._feed.watermark
+        }
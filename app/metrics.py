@@ -0,0 +1,362 @@
+"""
+AI Support System - 指标采集
+按路由统计请求数、状态码和延迟直方图，并单独统计JSON解析、Pydantic校验、评分、序列化各阶段耗时，
+以及准入控制按优先级和原因拒绝的请求数。
+
+多个gunicorn worker通过同一个内存映射文件汇总指标：
+- 文件划分为固定布局的槽位，每个worker进程独占一个槽位，热路径上只做进程内加锁的浮点累加
+- 槽位0为归档槽位，worker退出后其计数在槽位被回收时并入归档，保证计数单调递增；
+  槽位用尽时多出的进程共用归档槽位，每次更新都持有文件锁（并记录警告，应调大 METRICS_MAX_WORKERS）
+- /metrics 读取时汇总所有槽位，输出Prometheus文本格式
+"""
+
+import os
+import mmap
+import time
+import logging
+import struct
+import hashlib
+import tempfile
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from app.admission import PRIORITIES, SHED_REASONS
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，仅支持单进程
+    fcntl = None
+
+# 延迟直方图桶上界（秒）
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STAGES = ('parse', 'validate', 'score', 'dedup', 'serialize')
+STATUSES = (200, 201, 204, 304, 400, 401, 403, 404, 405, 409, 413, 422, 429, 500, 503)
+UNMATCHED = '<unmatched>'
+
+# 文件头：magic、布局哈希、槽位数、每槽位double个数
+_HEADER = struct.Struct('<8sQQQ')
+_MAGIC = b'AISMETR1'
+_HIST_LEN = len(BUCKETS) + 3  # 各桶（含+Inf）、sum、count
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """阶段计时上下文：with metrics.stage('validate'): ..."""
+    __slots__ = ('_metrics', '_index', '_started')
+
+    def __init__(self, metrics: 'Metrics', index: int):
+        self._metrics = metrics
+        self._index = index
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics.observe_stage_index(self._index, time.perf_counter() - self._started)
+        return False
+
+
+class _SharedSlotLock:
+    """进程内锁加文件锁：多个进程共用归档槽位时，更新期间排斥其他进程（含回收槽位时的并入）"""
+    __slots__ = ('_lock', '_fd')
+
+    def __init__(self, lock: threading.Lock, fd: int):
+        self._lock = lock
+        self._fd = fd
+
+    def __enter__(self):
+        self._lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+        return False
+
+
+class Metrics:
+    """跨进程共享的指标注册表"""
+
+    def __init__(self, path: str, max_workers: int = 64):
+        self.path = path
+        self.max_workers = max_workers
+        self.routes: List[Tuple[str, str]] = []
+        self._route_index: Dict[str, int] = {}
+        self._status_index = {status: i for i, status in enumerate(STATUSES)}
+        self._stage_index = {stage: i for i, stage in enumerate(STAGES)}
+        self._priority_index = {priority: i for i, priority in enumerate(PRIORITIES)}
+        self._reason_index = {reason: i for i, reason in enumerate(SHED_REASONS)}
+        self._lock = threading.Lock()
+        # 热路径上的写锁：独占槽位时为进程内锁，共用归档槽位时为 _SharedSlotLock
+        self._write_lock = self._lock
+        self._shared_fd: Optional[int] = None
+        self._pid = None
+        self._values = None
+        self._slot = 0
+        self._slot_base = 0
+        self._app = None
+
+    @classmethod
+    def from_env(cls) -> 'Metrics':
+        """根据环境变量创建（METRICS_MMAP_PATH / METRICS_MAX_WORKERS）"""
+        default_path = os.path.join(
+            tempfile.gettempdir(), f"ai_support_metrics_{os.environ.get('FLASK_PORT', 5000)}.bin"
+        )
+        return cls(
+            os.environ.get('METRICS_MMAP_PATH', default_path),
+            max_workers=int(os.environ.get('METRICS_MAX_WORKERS', 64))
+        )
+
+    def init_app(self, app) -> None:
+        """绑定Flask应用，路由列表在首次记录时从url_map读取"""
+        self._app = app
+
+    # ---------- 布局 ----------
+
+    def _load_routes(self) -> None:
+        rules = {}
+        for rule in self._app.url_map.iter_rules():
+            if rule.endpoint != 'static':
+                rules.setdefault(rule.endpoint, rule.rule)
+        self.routes = sorted(rules.items()) + [(UNMATCHED, UNMATCHED)]
+        self._route_index = {endpoint: i for i, (endpoint, _) in enumerate(self.routes)}
+
+    def _layout(self) -> Tuple[int, int, int, int, int]:
+        """返回 (请求计数偏移, 路由直方图偏移, 阶段直方图偏移, 拒绝计数偏移, 槽位长度)，槽位第0个double为pid"""
+        counts = 1
+        route_hist = counts + len(self.routes) * (len(STATUSES) + 1)
+        stage_hist = route_hist + len(self.routes) * _HIST_LEN
+        shed = stage_hist + len(STAGES) * _HIST_LEN
+        slot_len = shed + len(SHED_REASONS) * len(PRIORITIES)
+        return counts, route_hist, stage_hist, shed, slot_len
+
+    def _layout_hash(self) -> int:
+        signature = repr((self.routes, BUCKETS, STAGES, STATUSES, SHED_REASONS, PRIORITIES,
+                          self.max_workers)).encode()
+        return int.from_bytes(hashlib.blake2b(signature, digest_size=8).digest(), 'little')
+
+    # ---------- 共享文件与槽位 ----------
+
+    def _ensure_open(self) -> None:
+        """当前进程首次使用时打开映射文件并占用槽位（fork后自动重新占用）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._load_routes()
+            self._counts, self._route_hist, self._stage_hist, self._shed, self._slot_len = self._layout()
+            size = _HEADER.size + (self.max_workers + 1) * self._slot_len * 8
+
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                self._flock(fd, True)
+                try:
+                    header = os.pread(fd, _HEADER.size, 0)
+                    expected = (_MAGIC, self._layout_hash(), self.max_workers + 1, self._slot_len)
+                    if len(header) < _HEADER.size or _HEADER.unpack(header) != expected \
+                            or os.fstat(fd).st_size != size:
+                        # 布局变化（如新增路由）或新文件：重新初始化
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, size)
+                        os.pwrite(fd, _HEADER.pack(*expected), 0)
+                    buffer = mmap.mmap(fd, size)
+                    self._values = memoryview(buffer)[_HEADER.size:].cast('d')
+                    self._slot = self._claim_slot(pid)
+                    self._slot_base = self._slot * self._slot_len
+                    if self._shared_fd is not None:
+                        # fork前父进程共用归档槽位时留下的文件描述符
+                        os.close(self._shared_fd)
+                        self._shared_fd = None
+                    self._write_lock = self._lock
+                    if self._slot == 0:
+                        self._shared_fd = os.dup(fd)
+                        self._write_lock = _SharedSlotLock(self._lock, self._shared_fd)
+                        logger.warning(f"All {self.max_workers} metrics slots are in use; process {pid} "
+                                       f"shares the archive slot under a file lock "
+                                       f"(increase METRICS_MAX_WORKERS)")
+                finally:
+                    self._flock(fd, False)
+            finally:
+                os.close(fd)
+            self._pid = pid
+
+    def _claim_slot(self, pid: int) -> int:
+        """占用空闲槽位；已退出进程的槽位先并入归档槽位再复用"""
+        values = self._values
+        for slot in range(1, self.max_workers + 1):
+            base = slot * self._slot_len
+            owner = int(values[base])
+            if owner == pid:
+                return slot
+            if owner and _process_alive(owner):
+                continue
+            if owner:
+                for i in range(1, self._slot_len):
+                    values[i] += values[base + i]
+            for i in range(1, self._slot_len):
+                values[base + i] = 0.0
+            values[base] = float(pid)
+            return slot
+        # 槽位用尽时写入归档槽位（由调用方改用文件锁）
+        return 0
+
+    def _flock(self, fd: int, acquire: bool) -> None:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if acquire else fcntl.LOCK_UN)
+
+    def discard_local(self) -> None:
+        """清零并释放当前进程的槽位（预热请求不计入指标）"""
+        if self._pid != os.getpid() or not self._slot:
+            return
+        with self._lock:
+            base = self._slot_base
+            for i in range(1, self._slot_len):
+                self._values[base + i] = 0.0
+            self._values[base] = 0.0
+            self._pid = None
+
+    # ---------- 热路径 ----------
+
+    def observe_request(self, endpoint: Optional[str], status: int, duration: float) -> None:
+        """记录一次请求的状态码与延迟"""
+        self._ensure_open()
+        route = self._route_index.get(endpoint, len(self.routes) - 1)
+        status_slot = self._status_index.get(status, len(STATUSES))
+        base = self._slot_base
+        count_i = base + self._counts + route * (len(STATUSES) + 1) + status_slot
+        hist_i = base + self._route_hist + route * _HIST_LEN
+        bucket = bisect_left(BUCKETS, duration)
+        values = self._values
+        with self._write_lock:
+            values[count_i] += 1.0
+            values[hist_i + bucket] += 1.0
+            values[hist_i + _HIST_LEN - 2] += duration
+            values[hist_i + _HIST_LEN - 1] += 1.0
+
+    def observe_stage_index(self, stage: int, duration: float) -> None:
+        self._ensure_open()
+        hist_i = self._slot_base + self._stage_hist + stage * _HIST_LEN
+        bucket = bisect_left(BUCKETS, duration)
+        values = self._values
+        with self._write_lock:
+            values[hist_i + bucket] += 1.0
+            values[hist_i + _HIST_LEN - 2] += duration
+            values[hist_i + _HIST_LEN - 1] += 1.0
+
+    def observe_stage(self, stage: str, duration: float) -> None:
+        """记录一个处理阶段的耗时"""
+        self.observe_stage_index(self._stage_index[stage], duration)
+
+    def stage(self, stage: str) -> StageTimer:
+        """返回阶段计时上下文"""
+        return StageTimer(self, self._stage_index[stage])
+
+    def observe_shed(self, priority: str, reason: str) -> None:
+        """记录一次准入控制拒绝"""
+        self._ensure_open()
+        i = (self._slot_base + self._shed
+             + self._reason_index[reason] * len(PRIORITIES) + self._priority_index[priority])
+        with self._write_lock:
+            self._values[i] += 1.0
+
+    # ---------- 导出 ----------
+
+    def _aggregate(self) -> Tuple[List[float], int]:
+        """汇总所有槽位（含归档），返回合计值和活跃worker数（只计占用进程仍存活的槽位）"""
+        self._ensure_open()
+        values = self._values
+        total = [0.0] * self._slot_len
+        workers = 0
+        for slot in range(self.max_workers + 1):
+            base = slot * self._slot_len
+            if slot and values[base] and _process_alive(int(values[base])):
+                workers += 1
+            for i in range(1, self._slot_len):
+                total[i] += values[base + i]
+        return total, workers
+
+    def render_prometheus(self) -> str:
+        """生成Prometheus文本格式（0.0.4）"""
+        total, workers = self._aggregate()
+        lines = [
+            '# HELP ai_support_workers Worker processes currently reporting metrics.',
+            '# TYPE ai_support_workers gauge',
+            f"ai_support_workers {workers}",
+            '# HELP ai_support_http_requests_total HTTP requests by route and status code.',
+            '# TYPE ai_support_http_requests_total counter',
+        ]
+        status_labels = [str(status) for status in STATUSES] + ['other']
+        for r, (endpoint, rule) in enumerate(self.routes):
+            base = self._counts + r * (len(STATUSES) + 1)
+            for s, status in enumerate(status_labels):
+                value = total[base + s]
+                if value:
+                    lines.append(f'ai_support_http_requests_total{{endpoint="{endpoint}",'
+                                 f'route="{_escape(rule)}",status="{status}"}} {value:.0f}')
+
+        lines += [
+            '# HELP ai_support_http_request_duration_seconds HTTP request latency by route.',
+            '# TYPE ai_support_http_request_duration_seconds histogram',
+        ]
+        for r, (endpoint, rule) in enumerate(self.routes):
+            base = self._route_hist + r * _HIST_LEN
+            if total[base + _HIST_LEN - 1]:
+                labels = f'endpoint="{endpoint}",route="{_escape(rule)}"'
+                lines += _histogram_lines('ai_support_http_request_duration_seconds', labels, total, base)
+
+        lines += [
+            '# HELP ai_support_stage_duration_seconds Time spent in request processing stages.',
+            '# TYPE ai_support_stage_duration_seconds histogram',
+        ]
+        for s, stage in enumerate(STAGES):
+            base = self._stage_hist + s * _HIST_LEN
+            if total[base + _HIST_LEN - 1]:
+                lines += _histogram_lines('ai_support_stage_duration_seconds', f'stage="{stage}"', total, base)
+
+        lines += [
+            '# HELP ai_support_admission_shed_total Requests rejected by admission control.',
+            '# TYPE ai_support_admission_shed_total counter',
+        ]
+        for r, reason in enumerate(SHED_REASONS):
+            for p, priority in enumerate(PRIORITIES):
+                value = total[self._shed + r * len(PRIORITIES) + p]
+                if value:
+                    lines.append(f'ai_support_admission_shed_total{{priority="{priority}",'
+                                 f'reason="{reason}"}} {value:.0f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name: str, labels: str, total: List[float], base: int) -> List[str]:
+    lines = []
+    cumulative = 0.0
+    for i, upper in enumerate(BUCKETS):
+        cumulative += total[base + i]
+        lines.append(f'{name}_bucket{{{labels},le="{upper}"}} {cumulative:.0f}')
+    cumulative += total[base + len(BUCKETS)]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative:.0f}')
+    lines.append(f'{name}_sum{{{labels}}} {total[base + _HIST_LEN - 2]:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {total[base + _HIST_LEN - 1]:.0f}')
+    return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
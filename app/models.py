@@ -0,0 +1,122 @@
+"""
+AI Support System - 数据模型
+用户档案相关的Pydantic模型定义
+"""
+
+from pydantic import BaseModel, Field, EmailStr, create_model, model_validator
+from typing import List, Optional, Dict, Any, Type
+from datetime import datetime, date
+from functools import lru_cache
+
+
+class Address(BaseModel):
+    """地址信息模型"""
+    street: str = Field(..., description="街道地址", min_length=1, max_length=200)
+    city: str = Field(..., description="城市", min_length=1, max_length=50)
+    state: str = Field(..., description="省份/州", min_length=1, max_length=50)
+    postal_code: str = Field(..., description="邮政编码", min_length=5, max_length=10)
+    country: str = Field(default="中国", description="国家")
+    
+
+class ContactInfo(BaseModel):
+    """联系信息模型"""
+    email: EmailStr = Field(..., description="邮箱地址")
+    phone: str = Field(..., description="电话号码", pattern=r'^1[3-9]\d{9}$')
+    wechat: Optional[str] = Field(None, description="微信号", max_length=50)
+    qq: Optional[str] = Field(None, description="QQ号", max_length=20)
+    
+
+class Skill(BaseModel):
+    """技能信息模型"""
+    name: str = Field(..., description="技能名称", min_length=1, max_length=50)
+    level: int = Field(..., description="技能等级", ge=1, le=10)
+    years_experience: float = Field(..., description="经验年数", ge=0, le=50)
+    certifications: List[str] = Field(default_factory=list, description="相关认证")
+    
+
+class Education(BaseModel):
+    """教育背景模型"""
+    school: str = Field(..., description="学校名称", min_length=1, max_length=100)
+    degree: str = Field(..., description="学位", min_length=1, max_length=50)
+    major: str = Field(..., description="专业", min_length=1, max_length=50)
+    graduation_date: date = Field(..., description="毕业日期")
+    gpa: Optional[float] = Field(None, description="GPA", ge=0, le=4.0)
+    
+
+class WorkExperience(BaseModel):
+    """工作经历模型"""
+    company: str = Field(..., description="公司名称", min_length=1, max_length=100)
+    position: str = Field(..., description="职位", min_length=1, max_length=50)
+    start_date: date = Field(..., description="开始日期")
+    end_date: Optional[date] = Field(None, description="结束日期")
+    description: str = Field(..., description="工作描述", min_length=10, max_length=1000)
+    achievements: List[str] = Field(default_factory=list, description="主要成就")
+    
+
+class UserProfile(BaseModel):
+    """用户档案模型"""
+    personal_info: Dict[str, Any] = Field(..., description="个人信息")
+    contact: ContactInfo = Field(..., description="联系信息")
+    address: Address = Field(..., description="地址信息")
+    skills: List[Skill] = Field(..., description="技能列表", min_items=1)
+    education: List[Education] = Field(..., description="教育背景", min_items=1)
+    work_experience: List[WorkExperience] = Field(default_factory=list, description="工作经历")
+    preferences: Dict[str, Any] = Field(default_factory=dict, description="个人偏好")
+    
+
+@lru_cache(maxsize=None)
+def partial_profile_model(include_skills: bool = True, include_education: bool = True,
+                          include_work: bool = True) -> Type[UserProfile]:
+    """返回只校验所选列表段落的UserProfile子类
+
+    未包含的段落（skills / education / work_experience）原样保留为列表，
+    不做嵌套模型校验，也不要求必填；全部包含时返回UserProfile本身。
+    """
+    if include_skills and include_education and include_work:
+        return UserProfile
+    overrides = {}
+    if not include_skills:
+        overrides['skills'] = (List[Any], Field(default_factory=list, description="技能列表（未校验）"))
+    if not include_education:
+        overrides['education'] = (List[Any], Field(default_factory=list, description="教育背景（未校验）"))
+    if not include_work:
+        overrides['work_experience'] = (List[Any], Field(default_factory=list, description="工作经历（未校验）"))
+    return create_model('PartialUserProfile', __base__=UserProfile, **overrides)
+
+
+class UserProfileResponse(BaseModel):
+    """用户档案响应模型"""
+    user_id: str = Field(..., description="用户ID")
+    profile: UserProfile = Field(..., description="用户档案")
+    created_at: datetime = Field(..., description="创建时间")
+    updated_at: datetime = Field(..., description="更新时间")
+    status: str = Field(..., description="状态")
+    score: float = Field(..., description="档案完整度评分", ge=0, le=100)
+
+
+class SkillRequirement(BaseModel):
+    """岗位技能要求模型"""
+    name: str = Field(..., description="技能名称", min_length=1, max_length=50)
+    min_level: int = Field(1, description="最低技能等级", ge=1, le=10)
+    min_years: float = Field(0, description="最低经验年数", ge=0, le=50)
+    weight: float = Field(1.0, description="权重", gt=0, le=100)
+
+
+class JobRequirement(BaseModel):
+    """岗位需求模型（候选人匹配）"""
+    title: Optional[str] = Field(None, description="岗位名称", max_length=100)
+    required_skills: List[SkillRequirement] = Field(..., description="技能要求", min_length=1, max_length=50)
+    location: Optional[str] = Field(None, description="工作地点", max_length=50)
+    salary_min: Optional[float] = Field(None, description="薪资下限", ge=0)
+    salary_max: Optional[float] = Field(None, description="薪资上限", ge=0)
+    require_all_skills: bool = Field(False, description="是否要求满足全部技能的最低等级和年数")
+    skills_weight: float = Field(0.6, description="技能得分权重", ge=0)
+    location_weight: float = Field(0.2, description="地点得分权重", ge=0)
+    salary_weight: float = Field(0.2, description="薪资得分权重", ge=0)
+    top_k: int = Field(10, description="返回的候选人数", ge=1, le=100)
+
+    @model_validator(mode='after')
+    def check_salary_range(self) -> 'JobRequirement':
+        if self.salary_min and self.salary_max and self.salary_min > self.salary_max:
+            raise ValueError('salary_min不能大于salary_max')
+        return self
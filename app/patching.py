@@ -0,0 +1,259 @@
+"""
+AI Support System - 档案局部更新
+PATCH /api/user-profile/<user_id> 的补丁执行与段落级校验：
+- 请求体为JSON对象时按 JSON Merge Patch（RFC 7386）合并，为数组时按 JSON Patch（RFC 6902）逐条执行
+- 只校验被修改的段落：contact / address 校验对应子模型；skills / education / work_experience
+  只改动某一项内部字段时只校验该项，增删或整体替换列表时校验列表中的每一项
+- 修改后的段落序列化为与存储文档一致的JSON文本，由存储层只替换文档中的对应段落
+"""
+
+import copy
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from app.models import Address, ContactInfo, Education, Skill, WorkExperience
+from app.profiles import dumps_document, section_score
+
+MODEL_SECTIONS = {'contact': ContactInfo, 'address': Address}
+LIST_SECTIONS = {'skills': Skill, 'education': Education, 'work_experience': WorkExperience}
+DICT_SECTIONS = ('personal_info', 'preferences')
+# 必填段落（删除时报错）与可选段落删除后的默认值
+REQUIRED_SECTIONS = ('personal_info', 'contact', 'address', 'skills', 'education')
+SECTION_DEFAULTS = {'work_experience': list, 'preferences': dict}
+# 至少需要一项的列表段落
+NON_EMPTY_LISTS = ('skills', 'education')
+# 存储文档中日期序列化为HTTP日期格式，重新校验前转换回ISO格式
+DATE_FIELDS = {'education': ('graduation_date',), 'work_experience': ('start_date', 'end_date')}
+
+SECTIONS = (*DICT_SECTIONS, *MODEL_SECTIONS, *LIST_SECTIONS)
+
+
+class PatchError(ValueError):
+    """补丁格式错误或无法应用"""
+
+
+class PatchResult(NamedTuple):
+    """补丁执行结果：修改的段落名 -> 段落JSON文本，以及增量更新后的完整度评分"""
+    sections: Dict[str, str]
+    score: float
+
+
+def _restore_dates(section: str, item: Any) -> Any:
+    fields = DATE_FIELDS.get(section)
+    if not fields or not isinstance(item, dict):
+        return item
+    item = dict(item)
+    for field in fields:
+        value = item.get(field)
+        if isinstance(value, str) and value.endswith('GMT'):
+            try:
+                item[field] = parsedate_to_datetime(value).date()
+            except (TypeError, ValueError):
+                pass
+    return item
+
+
+# ---------- 补丁执行 ----------
+
+class _Patcher:
+    """在档案字典的副本上执行补丁，记录被修改的段落（列表段落精确到项）"""
+
+    def __init__(self, profile: Dict[str, Any]):
+        self.profile = dict(profile)
+        self._copied: Set[str] = set()
+        # 段落 -> 被修改的列表项下标；None 表示整个段落
+        self.touched: Dict[str, Optional[Set[int]]] = {}
+
+    def section(self, name: str) -> Any:
+        if name not in SECTIONS:
+            raise PatchError(f"Unknown section: {name}")
+        if name not in self._copied:
+            self._copied.add(name)
+            if name in self.profile:
+                self.profile[name] = copy.deepcopy(self.profile[name])
+        return self.profile.get(name)
+
+    def touch(self, tokens: List[str], item_level: bool) -> None:
+        """item_level 为True表示只改动了列表中某一项的内容，不改变列表长度和顺序"""
+        name = tokens[0]
+        if name in LIST_SECTIONS and len(tokens) >= 2 and item_level and self.touched.get(name, set()) is not None:
+            items = self.touched.setdefault(name, set())
+            items.add(int(tokens[1]))
+        else:
+            self.touched[name] = None
+
+    # ---------- JSON Merge Patch ----------
+
+    def merge(self, patch: Dict[str, Any]) -> None:
+        for name, value in patch.items():
+            current = self.section(name)
+            if value is None:
+                self._delete_section(name)
+            elif isinstance(value, dict) and isinstance(current, dict):
+                self.profile[name] = _merge_object(current, value)
+            else:
+                self.profile[name] = value
+            self.touched[name] = None
+
+    def _delete_section(self, name: str) -> None:
+        if name in REQUIRED_SECTIONS:
+            raise PatchError(f"Section {name} is required and cannot be removed")
+        self.profile[name] = SECTION_DEFAULTS[name]()
+
+    # ---------- JSON Patch ----------
+
+    def apply(self, operations: List[Any]) -> None:
+        for operation in operations:
+            if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+                raise PatchError('Each operation must be an object with "op" and "path"')
+            op = operation['op']
+            path = _parse_pointer(operation['path'])
+            if op == 'test':
+                if self._get(path) != operation.get('value'):
+                    raise PatchError(f"Test failed at {operation['path']}")
+                continue
+            if op in ('add', 'replace') and 'value' not in operation:
+                raise PatchError(f"Operation {op} requires a value")
+            if op == 'add':
+                self._add(path, copy.deepcopy(operation['value']))
+            elif op == 'remove':
+                self._remove(path)
+            elif op == 'replace':
+                self._replace(path, copy.deepcopy(operation['value']))
+            elif op in ('move', 'copy'):
+                source = _parse_pointer(operation.get('from', ''))
+                value = copy.deepcopy(self._get(source))
+                if op == 'move':
+                    self._remove(source)
+                self._add(path, value)
+            else:
+                raise PatchError(f"Unsupported operation: {op}")
+
+    def _parent(self, path: List[str]):
+        target = self.section(path[0])
+        if len(path) == 1:
+            return self.profile, path[0]
+        for token in path[1:-1]:
+            target = _child(target, token)
+        return target, path[-1]
+
+    def _get(self, path: List[str]) -> Any:
+        parent, key = self._parent(path)
+        return _child(parent, key)
+
+    def _add(self, path: List[str], value: Any) -> None:
+        parent, key = self._parent(path)
+        if isinstance(parent, list):
+            index = len(parent) if key == '-' else _index(key, len(parent) + 1)
+            parent.insert(index, value)
+            # 插入新项会移动后续项的位置，校验整个列表
+            self.touch(path, item_level=len(path) > 2)
+        elif isinstance(parent, dict):
+            parent[key] = value
+            self.touch(path, item_level=len(path) > 2)
+        else:
+            raise PatchError(f"Cannot add at /{'/'.join(path)}")
+
+    def _remove(self, path: List[str]) -> None:
+        parent, key = self._parent(path)
+        if parent is self.profile:
+            self._delete_section(key)
+        elif isinstance(parent, list):
+            parent.pop(_index(key, len(parent)))
+        elif isinstance(parent, dict) and key in parent:
+            del parent[key]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(path)}")
+        self.touch(path, item_level=len(path) > 2)
+
+    def _replace(self, path: List[str], value: Any) -> None:
+        parent, key = self._parent(path)
+        if isinstance(parent, list):
+            parent[_index(key, len(parent))] = value
+        elif isinstance(parent, dict) and key in parent:
+            parent[key] = value
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(path)}")
+        self.touch(path, item_level=len(path) >= 2)
+
+
+def _merge_object(target: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """RFC 7386：null删除成员，对象递归合并，其他值直接替换"""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            target[key] = _merge_object(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+def _parse_pointer(pointer: Any) -> List[str]:
+    """解析JSON Pointer（RFC 6901），不允许指向整个档案"""
+    if not isinstance(pointer, str) or not pointer.startswith('/') or pointer == '/':
+        raise PatchError(f"Invalid path: {pointer!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _index(token: str, size: int) -> int:
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0') or int(token) >= size:
+        raise PatchError(f"Invalid array index: {token}")
+    return int(token)
+
+
+def _child(container: Any, token: str) -> Any:
+    if isinstance(container, list):
+        return container[_index(token, len(container))]
+    if isinstance(container, dict) and token in container:
+        return container[token]
+    raise PatchError(f"Path not found: {token}")
+
+
+# ---------- 段落校验与增量评分 ----------
+
+def _validate_section(name: str, value: Any, items: Optional[Set[int]]) -> Any:
+    """校验一个段落，返回可直接序列化的段落值；ValidationError 由调用方处理"""
+    if name in DICT_SECTIONS:
+        if not isinstance(value, dict):
+            raise PatchError(f"Section {name} must be an object")
+        return value
+    if name in MODEL_SECTIONS:
+        if not isinstance(value, dict):
+            raise PatchError(f"Section {name} must be an object")
+        return MODEL_SECTIONS[name](**value)
+    if not isinstance(value, list):
+        raise PatchError(f"Section {name} must be an array")
+    if name in NON_EMPTY_LISTS and not value:
+        raise PatchError(f"Section {name} must contain at least 1 item")
+    model = LIST_SECTIONS[name]
+    indexes = range(len(value)) if items is None else sorted(items)
+    validated = list(value)
+    for index in indexes:
+        item = _restore_dates(name, value[index])
+        if not isinstance(item, dict):
+            raise PatchError(f"{name}/{index} must be an object")
+        validated[index] = model(**item)
+    return validated
+
+
+def apply_patch(document: Dict[str, Any], patch: Any) -> PatchResult:
+    """对存储文档执行补丁，返回修改的段落与新评分（PatchError / ValidationError 表示补丁无效）"""
+    profile = document.get('profile')
+    if not isinstance(profile, dict):
+        raise PatchError('Stored document has no profile')
+    patcher = _Patcher(profile)
+    if isinstance(patch, dict):
+        patcher.merge(patch)
+    elif isinstance(patch, list):
+        patcher.apply(patch)
+    else:
+        raise PatchError('Patch must be a JSON object (merge patch) or an array (JSON Patch)')
+
+    sections: Dict[str, str] = {}
+    score = float(document.get('score', 0.0))
+    for name, items in patcher.touched.items():
+        value = _validate_section(name, patcher.profile.get(name), items)
+        score += section_score(name, value) - section_score(name, profile.get(name))
+        sections[name] = dumps_document(value)
+    return PatchResult(sections, round(score, 2))
@@ -0,0 +1,145 @@
+"""
+AI Support System - 用户档案业务逻辑
+评分、验证报告、用户ID生成与存储文档序列化，不依赖Flask应用对象，
+可同时被API服务和批量导入工具使用
+"""
+
+import json
+from functools import lru_cache
+from datetime import datetime, date
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+from werkzeug.http import http_date
+
+from app.ids import IdGenerator
+from app.models import UserProfile, UserProfileResponse
+
+# 进程级的用户ID生成器（worker号租约保存在 DATABASE_URL 指向的数据库中）
+user_ids = IdGenerator.from_env()
+
+
+@lru_cache(maxsize=4096)
+def _format_date(value: date) -> str:
+    """日期格式化结果缓存（毕业/入职等日期在档案间大量重复）"""
+    return http_date(value)
+
+
+# 已识别的Pydantic模型类型；按精确类型查表，避免模型元类上代价较高的isinstance检查
+_model_types = set()
+
+
+def json_default(o: Any) -> Any:
+    """与Flask默认JSON编码一致的类型转换（日期输出为HTTP日期格式）
+
+    Pydantic模型直接交出字段字典，由编码器在同一次遍历中继续序列化，
+    不再像 .dict() 那样预先深拷贝整棵对象树。
+    """
+    cls = type(o)
+    if cls not in _model_types and issubclass(cls, BaseModel):
+        _model_types.add(cls)
+    if cls in _model_types:
+        if o.__pydantic_extra__:
+            return {**o.__dict__, **o.__pydantic_extra__}
+        return o.__dict__
+    if cls is date:
+        return _format_date(o)
+    if isinstance(o, date):
+        return http_date(o)
+    raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+
+
+# C实现的编码器，参数与Flask非调试模式下的jsonify一致
+_document_encoder = json.JSONEncoder(
+    ensure_ascii=True,
+    sort_keys=True,
+    separators=(',', ':'),
+    default=json_default
+)
+
+
+def dumps_document(obj: Any) -> str:
+    """序列化为紧凑JSON文本（可直接包含Pydantic模型），与jsonify的输出格式一致"""
+    return _document_encoder.encode(obj)
+
+
+def generate_user_id() -> str:
+    """生成用户ID（按时间排序，所有worker进程之间不重复，见 app.ids）"""
+    return user_ids.next_id()
+
+
+def build_profile_record(profile: UserProfile, score: float, user_id: Optional[str] = None,
+                         created_at: Optional[datetime] = None):
+    """构建档案响应模型及对应的存储记录；覆盖已有档案（如合并近重复档案）时传入其原创建时间"""
+    now = datetime.now()
+    response_data = UserProfileResponse(
+        user_id=user_id or generate_user_id(),
+        profile=profile,
+        created_at=created_at or now,
+        updated_at=now,
+        status="active",
+        score=score
+    )
+    # 保存与响应中data字段一致的JSON文档
+    record = (
+        response_data.user_id,
+        profile.contact.email,
+        profile.contact.phone,
+        dumps_document(response_data),
+        now.isoformat(),
+        now.isoformat()
+    )
+    return response_data, record
+
+
+# 各段落的完整度得分（合计100分），局部更新时按段落增量重算
+SECTION_SCORES = {
+    'personal_info': lambda value: 20.0 if value else 0.0,                       # 个人信息 (20分)
+    'contact': lambda value: 20.0 if value else 0.0,                             # 联系信息 (20分)
+    'address': lambda value: 15.0 if value else 0.0,                             # 地址信息 (15分)
+    'skills': lambda value: min(20.0, len(value) * 5.0) if value else 0.0,       # 技能信息 (20分)
+    'education': lambda value: min(15.0, len(value) * 7.5) if value else 0.0,    # 教育背景 (15分)
+    'work_experience': lambda value: min(10.0, len(value) * 3.0) if value else 0.0,  # 工作经历 (10分)
+}
+
+
+def section_score(section: str, value: Any) -> float:
+    """计算单个段落的完整度得分（value 可以是模型或存储文档中的JSON值）"""
+    scorer = SECTION_SCORES.get(section)
+    return scorer(value) if scorer else 0.0
+
+
+def calculate_profile_score(profile: UserProfile) -> float:
+    """计算用户档案完整度评分"""
+    score = 0.0
+    for section, scorer in SECTION_SCORES.items():
+        score += scorer(getattr(profile, section))
+    return round(score, 2)
+
+
+def generate_validation_report(profile: UserProfile) -> Dict[str, Any]:
+    """生成验证报告"""
+    report = {
+        "basic_info_complete": bool(profile.personal_info),
+        "contact_info_complete": bool(profile.contact),
+        "address_info_complete": bool(profile.address),
+        "skills_count": len(profile.skills),
+        "education_count": len(profile.education),
+        "work_experience_count": len(profile.work_experience),
+        "recommendations": []
+    }
+    
+    # 生成建议
+    if len(profile.skills) < 3:
+        report["recommendations"].append("建议添加更多技能信息")
+    
+    if len(profile.education) < 1:
+        report["recommendations"].append("请添加教育背景信息")
+    
+    if not profile.work_experience:
+        report["recommendations"].append("建议添加工作经历")
+    
+    if not profile.contact.wechat and not profile.contact.qq:
+        report["recommendations"].append("建议添加微信或QQ联系方式")
+    
+    return report
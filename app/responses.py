@@ -0,0 +1,75 @@
+"""
+AI Support System - JSON响应层
+单次遍历将Pydantic模型与字典直接序列化为JSON字节，输出与jsonify逐字节一致
+（紧凑分隔符、键排序、非ASCII字符转义、日期输出为HTTP日期格式）
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from flask import Response, current_app
+
+from app.profiles import dumps_document as dumps
+
+MIMETYPE = 'application/json'
+
+
+def render_json(payload: Any) -> str:
+    """序列化响应体文本，等价于 jsonify(payload) 的响应体"""
+    if current_app.debug:
+        # 调试模式下jsonify输出带缩进的格式，保持原有行为；先经文档编码器转换其中的Pydantic模型和日期
+        return current_app.json.response(json.loads(dumps(payload))).get_data(as_text=True)
+    return f"{dumps(payload)}\n"
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """构建JSON响应，等价于 jsonify(payload) 但只遍历一次对象树"""
+    return Response(render_json(payload), status=status, mimetype=MIMETYPE)
+
+
+class Envelope:
+    """预先序列化的响应信封
+
+    success/message 为常量，每次只需序列化data并拼接timestamp。
+    按键排序后的输出顺序为 data、message、success、timestamp。
+    """
+
+    def __init__(self, message: str, success: bool = True):
+        self.message = message
+        self.success = success
+        self._head = '{"data":'
+        self._middle = (f',"message":{dumps(message)},"success":{dumps(success)}'
+                        f',"timestamp":"')
+        self._head_bytes = self._head.encode('ascii')
+        self._middle_bytes = self._middle.encode('ascii')
+
+    def render(self, data: Any, timestamp: Optional[str] = None) -> str:
+        """序列化data并套上信封"""
+        timestamp = timestamp or datetime.now().isoformat()
+        if current_app.debug:
+            return render_json({
+                'success': self.success,
+                'message': self.message,
+                'data': data,
+                'timestamp': timestamp
+            })
+        return f"{self._head}{dumps(data)}{self._middle}{timestamp}\"}}\n"
+
+    def render_raw(self, data_json: str, timestamp: Optional[str] = None) -> str:
+        """将已序列化的data文本（如存储中的档案文档）直接套上信封"""
+        if current_app.debug:
+            return self.render(json.loads(data_json), timestamp)
+        timestamp = timestamp or datetime.now().isoformat()
+        return f"{self._head}{data_json}{self._middle}{timestamp}\"}}\n"
+
+    def render_raw_bytes(self, data_json, timestamp: Optional[str] = None) -> bytes:
+        """render_raw 的字节版本，data_json 可以是内存映射上的切片，只在拼接响应体时复制一次"""
+        if current_app.debug:
+            return self.render(json.loads(bytes(data_json)), timestamp).encode()
+        timestamp = timestamp or datetime.now().isoformat()
+        return b''.join((self._head_bytes, data_json, self._middle_bytes, timestamp.encode('ascii'), b'"}\n'))
+
+    def response(self, data: Any, status: int = 200) -> Response:
+        """构建带信封的JSON响应"""
+        return Response(self.render(data), status=status, mimetype=MIMETYPE)
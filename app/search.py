@@ -0,0 +1,258 @@
+"""
+AI Support System - 档案搜索索引
+内存倒排索引，支持按技能（及最低等级）、城市、学位、期望工作地点的组合查询：
+- 每个档案分配一个整数文档号，倒排表为文档号集合，组合查询通过集合求交完成
+- 技能倒排表按等级分桶（1-10），最低等级查询合并对应的等级桶，结果按首个技能等级从高到低排序
+- 创建/更新档案时增量更新；其他进程（其他worker、批量导入）写入的档案通过按updated_at增量同步获得
+"""
+
+import os
+import sys
+import heapq
+import json
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.models import UserProfile
+from app.store import ChangeFeed
+
+MIN_LEVEL = 1
+MAX_LEVEL = 10
+FIELDS = ('city', 'degree', 'work_location')
+
+# 学位别名，查询和索引时统一
+DEGREE_ALIASES = {'学士': '本科'}
+
+
+class ProfileTerms(NamedTuple):
+    """一个档案的索引项"""
+    skills: Tuple[Tuple[str, int], ...]
+    city: Optional[str]
+    degrees: Tuple[str, ...]
+    work_location: Optional[str]
+
+
+def normalize(value: Any) -> Optional[str]:
+    """统一大小写与空白，地名去掉末尾的“市”（“杭州”与“杭州市”视为同一城市）"""
+    if value is None:
+        return None
+    text = str(value).strip().casefold()
+    if len(text) > 1 and text.endswith('市'):
+        text = text[:-1]
+    return sys.intern(text) if text else None
+
+
+def normalize_degree(value: Any) -> Optional[str]:
+    text = normalize(value)
+    return DEGREE_ALIASES.get(text, text) if text else None
+
+
+def _skill_terms(pairs: Iterable[Tuple[Any, Any]]) -> Tuple[Tuple[str, int], ...]:
+    """同名技能取最高等级"""
+    levels: Dict[str, int] = {}
+    for name, level in pairs:
+        key = normalize(name)
+        if key:
+            level = min(MAX_LEVEL, max(MIN_LEVEL, int(level)))
+            levels[key] = max(level, levels.get(key, 0))
+    return tuple(levels.items())
+
+
+def terms_from_model(profile: UserProfile) -> ProfileTerms:
+    """从已校验的UserProfile提取索引项"""
+    return ProfileTerms(
+        skills=_skill_terms((skill.name, skill.level) for skill in profile.skills),
+        city=normalize(profile.address.city),
+        degrees=tuple({normalize_degree(e.degree) for e in profile.education} - {None}),
+        work_location=normalize(profile.preferences.get('work_location'))
+    )
+
+
+def terms_from_document(document: Dict[str, Any]) -> ProfileTerms:
+    """从存储文档（UserProfileResponse序列化结果）提取索引项"""
+    profile = document.get('profile', document)
+    return ProfileTerms(
+        skills=_skill_terms((s.get('name'), s.get('level', MIN_LEVEL)) for s in profile.get('skills', [])),
+        city=normalize((profile.get('address') or {}).get('city')),
+        degrees=tuple({normalize_degree(e.get('degree')) for e in profile.get('education', [])} - {None}),
+        work_location=normalize((profile.get('preferences') or {}).get('work_location'))
+    )
+
+
+class SearchQuery(NamedTuple):
+    """组合查询：skills为 (技能名, 最低等级) 列表，各条件之间为“与”关系"""
+    skills: Tuple[Tuple[str, int], ...] = ()
+    city: Optional[str] = None
+    degree: Optional[str] = None
+    work_location: Optional[str] = None
+
+    @property
+    def empty(self) -> bool:
+        return not (self.skills or self.city or self.degree or self.work_location)
+
+
+class ProfileIndex:
+    """档案倒排索引（进程内）"""
+
+    def __init__(self, refresh_interval: float = 1.0, refresh_overlap: float = 5.0):
+        self._lock = threading.RLock()
+        self._doc_ids: Dict[str, int] = {}
+        self._user_ids: List[Optional[str]] = []
+        self._terms: List[Optional[ProfileTerms]] = []
+        # 技能 -> 等级 -> 文档号集合
+        self._skills: Dict[str, Dict[int, Set[int]]] = {}
+        self._fields: Dict[str, Dict[str, Set[int]]] = {field: {} for field in FIELDS}
+        self._feed = ChangeFeed(refresh_interval, refresh_overlap)
+
+    @classmethod
+    def from_env(cls) -> 'ProfileIndex':
+        """根据环境变量创建（SEARCH_INDEX_REFRESH_INTERVAL / SEARCH_INDEX_REFRESH_OVERLAP）"""
+        return cls(
+            refresh_interval=float(os.environ.get('SEARCH_INDEX_REFRESH_INTERVAL', 1.0)),
+            refresh_overlap=float(os.environ.get('SEARCH_INDEX_REFRESH_OVERLAP', 5.0))
+        )
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    # ---------- 增量更新 ----------
+
+    def add(self, user_id: str, terms: ProfileTerms) -> None:
+        """添加或替换一个档案的索引项"""
+        with self._lock:
+            doc = self._doc_ids.get(user_id)
+            if doc is None:
+                doc = len(self._user_ids)
+                self._doc_ids[user_id] = doc
+                self._user_ids.append(user_id)
+                self._terms.append(None)
+            else:
+                old = self._terms[doc]
+                if old == terms:
+                    return
+                self._unlink(doc, old)
+            self._terms[doc] = terms
+            for name, level in terms.skills:
+                self._skills.setdefault(name, {}).setdefault(level, set()).add(doc)
+            for field, value in self._field_values(terms):
+                self._fields[field].setdefault(value, set()).add(doc)
+
+    def remove(self, user_id: str) -> bool:
+        """移除一个档案，返回是否存在"""
+        with self._lock:
+            doc = self._doc_ids.pop(user_id, None)
+            if doc is None:
+                return False
+            self._unlink(doc, self._terms[doc])
+            self._terms[doc] = None
+            self._user_ids[doc] = None
+            return True
+
+    def _unlink(self, doc: int, terms: Optional[ProfileTerms]) -> None:
+        if terms is None:
+            return
+        for name, level in terms.skills:
+            buckets = self._skills[name]
+            buckets[level].discard(doc)
+            if not buckets[level]:
+                del buckets[level]
+                if not buckets:
+                    del self._skills[name]
+        for field, value in self._field_values(terms):
+            postings = self._fields[field][value]
+            postings.discard(doc)
+            if not postings:
+                del self._fields[field][value]
+
+    @staticmethod
+    def _field_values(terms: ProfileTerms) -> Iterable[Tuple[str, str]]:
+        if terms.city:
+            yield 'city', terms.city
+        for degree in terms.degrees:
+            yield 'degree', degree
+        if terms.work_location:
+            yield 'work_location', terms.work_location
+
+    # ---------- 与存储同步 ----------
+
+    def refresh(self, store, force: bool = False) -> int:
+        """从存储增量同步新增或更新的档案（首次调用时全量加载），返回处理的行数"""
+        if not force and not self._feed.due():
+            return 0
+        with self._lock:
+            if not force and not self._feed.due():
+                return 0
+            rows = 0
+            for user_id, document in self._feed.poll(store):
+                if document is None:
+                    self.remove(user_id)
+                else:
+                    self.add(user_id, terms_from_document(json.loads(document)))
+                rows += 1
+            return rows
+
+    # ---------- 查询 ----------
+
+    def search(self, query: SearchQuery, offset: int = 0, limit: int = 20) -> Tuple[int, List[str]]:
+        """执行组合查询，返回 (命中总数, 当前页user_id列表)
+
+        排序：有技能条件时按首个技能等级从高到低，同等级按创建顺序；否则按创建顺序。
+        """
+        with self._lock:
+            groups: List[List[Set[int]]] = []
+            for name, min_level in query.skills:
+                buckets = self._skills.get(normalize(name), {})
+                sets = [postings for level, postings in buckets.items() if level >= min_level]
+                if not sets:
+                    return 0, []
+                groups.append(sets)
+            for field, value in (('city', normalize(query.city)),
+                                 ('degree', normalize_degree(query.degree)),
+                                 ('work_location', normalize(query.work_location))):
+                if value:
+                    postings = self._fields[field].get(value)
+                    if not postings:
+                        return 0, []
+                    groups.append([postings])
+            if not groups:
+                return len(self._doc_ids), []
+
+            # 从总量最小的条件开始，依次与其余条件的各等级桶求交（集合运算总是遍历较小的一方），
+            # 避免合并大的等级桶
+            groups.sort(key=lambda g: sum(map(len, g)))
+            first = groups[0]
+            matches = first[0] if len(first) == 1 else set().union(*first)
+            for group in groups[1:]:
+                if len(group) == 1:
+                    matches = matches.intersection(group[0])
+                else:
+                    matches = set().union(*(matches.intersection(postings) for postings in group))
+                if not matches:
+                    return 0, []
+            total = len(matches)
+            end = offset + limit
+            if not total or offset >= total:
+                return total, []
+
+            if query.skills:
+                buckets = self._skills[normalize(query.skills[0][0])]
+                page: List[int] = []
+                for level in sorted(buckets, reverse=True):
+                    if len(page) >= end:
+                        break
+                    page.extend(sorted(matches.intersection(buckets[level])))
+            elif end < total // 8:
+                page = heapq.nsmallest(end, matches)
+            else:
+                page = sorted(matches)
+            return total, [self._user_ids[doc] for doc in page[offset:end]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'profiles': len(self._doc_ids),
+            'skills': len(self._skills),
+            'cities': len(self._fields['city']),
+            'degrees': len(self._fields['degree']),
+            'work_locations': len(self._fields['work_location']),
+            'watermark': self._feed.watermark
+        }
@@ -0,0 +1,252 @@
+"""
+AI Support System - 档案只读快照
+读多写少的档案读取路径：定期把存储中的全部档案编译成一个不可变文件，各worker以mmap方式打开，
+GET /api/user-profile/<user_id> 在文件内二分查找并直接切片出档案文档，数据页通过操作系统页缓存
+在所有进程间共享，不再由每个worker各自缓存一份。
+
+文件布局（小端）：
+    文件头 | 档案文档（按user_id排序依次存放的紧凑JSON）| user_id文本 | 定长索引表
+    索引表每项为 (user_id偏移, user_id长度, 文档偏移, 文档长度, 文档摘要)，按user_id排序
+
+快照生成之后的写入放在进程内的增量覆盖层中：本进程的写入直接放入，其他进程的写入按
+updated_at水位线从存储增量读取。检测到新快照文件（原子替换）后切换到新文件并清空覆盖层。
+检查快照文件和同步覆盖层由后台线程调用 refresh 完成（见 app/main.py），不在读取请求中执行。
+
+用法:
+    python -m app.snapshot build --output /var/www/ai-support-system/profiles.snapshot
+    python -m app.snapshot build --output ... --interval 300   # 每5分钟重新生成
+"""
+
+import os
+import sys
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.store import ChangeFeed, ProfileStore, parse_database_url
+
+MAGIC = b'AISSNAP1'
+# magic、档案数、user_id文本偏移、索引表偏移、水位线（快照开始生成的时间，ISO格式）
+_HEADER = struct.Struct('<8sQQQ32s')
+_ENTRY = struct.Struct('<QIQI16s')
+
+
+def document_digest(document: bytes) -> bytes:
+    """文档摘要，十六进制形式即响应的ETag"""
+    return hashlib.blake2b(document, digest_size=16).digest()
+
+
+def build_snapshot(store: ProfileStore, path: str, batch_size: int = 1000) -> int:
+    """按user_id顺序写出全部档案，先写临时文件再原子替换，返回档案数"""
+    watermark = datetime.now().isoformat()
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    keys = bytearray()
+    entries = bytearray()
+    count = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(b'\0' * _HEADER.size)
+            offset = _HEADER.size
+            for user_id, document, _ in store.iter_by_user_id(batch_size=batch_size):
+                blob = document.encode('utf-8')
+                key = user_id.encode('utf-8')
+                f.write(blob)
+                entries += _ENTRY.pack(len(keys), len(key), offset, len(blob), document_digest(blob))
+                keys += key
+                offset += len(blob)
+                count += 1
+            keys_offset = offset
+            f.write(keys)
+            table_offset = keys_offset + len(keys)
+            f.write(entries)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, count, keys_offset, table_offset, watermark.encode('ascii')))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+class Snapshot:
+    """以只读mmap打开的快照文件"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, self.count, self._keys_offset, self._table_offset, watermark = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a profile snapshot: {path}")
+        self.watermark = watermark.rstrip(b'\0').decode('ascii')
+        self.size = len(self._mmap)
+
+    def _key(self, i: int) -> bytes:
+        key_offset, key_len, _, _, _ = _ENTRY.unpack_from(self._mmap, self._table_offset + i * _ENTRY.size)
+        start = self._keys_offset + key_offset
+        return self._mmap[start:start + key_len]
+
+    def find(self, user_id: str) -> Optional[Tuple[memoryview, str]]:
+        """二分查找，返回 (文档在映射内存上的切片, ETag)，不存在时返回None"""
+        key = user_id.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count or self._key(lo) != key:
+            return None
+        _, _, offset, length, digest = _ENTRY.unpack_from(self._mmap, self._table_offset + lo * _ENTRY.size)
+        return self._view[offset:offset + length], digest.hex()
+
+
+class SnapshotStore:
+    """快照 + 增量覆盖层的档案读取路径（未配置或快照文件不存在时不生效）"""
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 5.0,
+                 refresh_interval: float = 1.0, refresh_overlap: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._identity = None
+        self._last_check = 0.0
+        # 覆盖层中值为None表示快照之后已删除
+        self._overlay: Dict[str, Optional[Tuple[bytes, str]]] = {}
+        self._feed = ChangeFeed(refresh_interval, refresh_overlap)
+        self._lock = threading.Lock()
+        self.snapshot_hits = 0
+        self.overlay_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> 'SnapshotStore':
+        """根据环境变量创建（SNAPSHOT_PATH 为空时不启用；SNAPSHOT_CHECK_INTERVAL / SNAPSHOT_REFRESH_*）"""
+        return cls(
+            os.environ.get('SNAPSHOT_PATH') or None,
+            check_interval=float(os.environ.get('SNAPSHOT_CHECK_INTERVAL', 5.0)),
+            refresh_interval=float(os.environ.get('SNAPSHOT_REFRESH_INTERVAL', 1.0)),
+            refresh_overlap=float(os.environ.get('SNAPSHOT_REFRESH_OVERLAP', 5.0))
+        )
+
+    @property
+    def active(self) -> bool:
+        return self._snapshot is not None
+
+    def _check_file(self, force: bool = False) -> None:
+        """检测快照文件是否被替换，是则切换到新文件并清空覆盖层"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval and self._snapshot is not None:
+            return
+        self._last_check = now
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self._identity:
+            return
+        snapshot = Snapshot(self.path)
+        # 旧快照的映射在正在使用它的请求结束后随引用释放
+        self._snapshot = snapshot
+        self._identity = identity
+        self._overlay = {}
+        self._feed.reset(snapshot.watermark)
+
+    def refresh(self, store: ProfileStore, force: bool = False) -> int:
+        """检查快照文件并从存储同步快照之后的写入，返回读取的行数"""
+        if not self.path:
+            return 0
+        with self._lock:
+            self._check_file(force)
+            if self._snapshot is None or not (force or self._feed.due()):
+                return 0
+            rows = 0
+            for user_id, document in self._feed.poll(store):
+                if document is None:
+                    self.discard(user_id)
+                else:
+                    self.put(user_id, document)
+                rows += 1
+            return rows
+
+    def get(self, user_id: str):
+        """返回 (档案文档, ETag)；快照和覆盖层中都没有或已删除时返回None，由调用方回退到存储"""
+        overlay = self._overlay
+        if user_id in overlay:
+            found = overlay[user_id]
+            if found is not None:
+                self.overlay_hits += 1
+                return found
+        else:
+            snapshot = self._snapshot
+            found = snapshot.find(user_id) if snapshot is not None else None
+        if found is None:
+            self.misses += 1
+        else:
+            self.snapshot_hits += 1
+        return found
+
+    def put(self, user_id: str, document: str) -> None:
+        """本进程写入档案后放入覆盖层"""
+        if self._snapshot is not None:
+            blob = document.encode('utf-8')
+            self._overlay[user_id] = (blob, document_digest(blob).hex())
+
+    def discard(self, user_id: str) -> None:
+        """档案已删除：覆盖层中记为删除，不再返回快照中的旧文档"""
+        if self._snapshot is not None:
+            self._overlay[user_id] = None
+
+    def reset_stats(self) -> None:
+        self.snapshot_hits = self.overlay_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, object]:
+        snapshot = self._snapshot
+        return {
+            'enabled': bool(self.path),
+            'profiles': snapshot.count if snapshot else 0,
+            'file_bytes': snapshot.size if snapshot else 0,
+            'watermark': snapshot.watermark if snapshot else None,
+            'overlay_profiles': len(self._overlay),
+            'snapshot_hits': self.snapshot_hits,
+            'overlay_hits': self.overlay_hits,
+            'misses': self.misses
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='生成档案只读快照文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help='从存储全量生成快照')
+    build.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///app.db'))
+    build.add_argument('--output', default=os.environ.get('SNAPSHOT_PATH', 'profiles.snapshot'))
+    build.add_argument('--interval', type=float, default=0, help='大于0时按该间隔（秒）循环生成')
+    args = parser.parse_args()
+
+    store = ProfileStore(parse_database_url(args.database_url))
+    while True:
+        started = time.perf_counter()
+        count = build_snapshot(store, args.output)
+        print(f"snapshot: {count} profiles -> {args.output} "
+              f"({os.path.getsize(args.output) / 1024 / 1024:.1f} MB, {time.perf_counter() - started:.1f}s)")
+        if args.interval <= 0:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
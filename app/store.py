@@ -0,0 +1,430 @@
+"""
+AI Support System - 用户档案存储层
+基于SQLite（WAL模式）的嵌入式存储，每个worker进程维护独立的连接池
+"""
+
+import os
+import time
+import queue
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.logs import describe_error
+
+logger = logging.getLogger(__name__)
+
+# 建表与索引（user_id为主键，自带唯一索引）
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS user_profiles (
+        user_id    TEXT PRIMARY KEY,
+        email      TEXT NOT NULL,
+        phone      TEXT NOT NULL,
+        document   TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_profiles_email ON user_profiles (email)",
+    "CREATE INDEX IF NOT EXISTS idx_user_profiles_phone ON user_profiles (phone)",
+    "CREATE INDEX IF NOT EXISTS idx_user_profiles_updated_at ON user_profiles (updated_at)",
+    # 删除记录（墓碑）：ChangeFeed 据此通知各进程的派生数据移除已删除的档案
+    """
+    CREATE TABLE IF NOT EXISTS deleted_profiles (
+        user_id    TEXT PRIMARY KEY,
+        deleted_at TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_deleted_profiles_deleted_at ON deleted_profiles (deleted_at)",
+)
+
+# 固定的SQL文本，由sqlite3的语句缓存复用预编译结果
+SQL_UPSERT = (
+    "INSERT INTO user_profiles (user_id, email, phone, document, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET "
+    "email = excluded.email, phone = excluded.phone, "
+    "document = excluded.document, updated_at = excluded.updated_at"
+)
+SQL_GET_DOCUMENT = "SELECT document FROM user_profiles WHERE user_id = ?"
+SQL_GET_VERSIONED = "SELECT document, updated_at FROM user_profiles WHERE user_id = ?"
+SQL_FIND_BY_EMAIL = "SELECT user_id FROM user_profiles WHERE email = ?"
+SQL_FIND_BY_PHONE = "SELECT user_id FROM user_profiles WHERE phone = ?"
+SQL_ITER_DOCUMENTS = "SELECT user_id, document, updated_at FROM user_profiles"
+SQL_ITER_UPDATED_SINCE = (
+    "SELECT user_id, document, updated_at FROM user_profiles WHERE updated_at >= ? ORDER BY updated_at"
+)
+SQL_ITER_AFTER_USER_ID = (
+    "SELECT user_id, document, updated_at FROM user_profiles WHERE user_id > ? ORDER BY user_id LIMIT ?"
+)
+SQL_COUNT = "SELECT COUNT(*) FROM user_profiles"
+SQL_DELETE = "DELETE FROM user_profiles WHERE user_id = ?"
+SQL_TOMBSTONE = "INSERT OR REPLACE INTO deleted_profiles (user_id, deleted_at) VALUES (?, ?)"
+# 删除后又重新写入的档案不再视为已删除
+SQL_ITER_DELETED_SINCE = (
+    "SELECT user_id, deleted_at FROM deleted_profiles d WHERE deleted_at >= ? "
+    "AND NOT EXISTS (SELECT 1 FROM user_profiles p WHERE p.user_id = d.user_id) ORDER BY deleted_at"
+)
+
+
+def parse_database_url(url: str) -> str:
+    """将 sqlite:///path 形式的DATABASE_URL解析为文件路径"""
+    prefix = 'sqlite:///'
+    if not url.startswith(prefix):
+        raise ValueError(f"Unsupported DATABASE_URL: {url}")
+    path = url[len(prefix):]
+    if not path or path == ':memory:':
+        raise ValueError("DATABASE_URL must point to a database file")
+    return path
+
+
+class ConnectionPool:
+    """按进程隔离的SQLite连接池：gunicorn fork之后首次访问会在子进程中重新建立连接并执行建表语句"""
+
+    def __init__(self, path: str, schema: Iterable[str], pool_size: int = 4, timeout: float = 5.0):
+        self.path = path
+        self.schema = tuple(schema)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool: Optional[queue.LifoQueue] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接并设置PRAGMA"""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,  # 自动提交，写事务显式开启
+            check_same_thread=False,
+            cached_statements=64,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')
+        return conn
+
+    def _get_pool(self) -> queue.LifoQueue:
+        """获取当前进程的连接池（fork后自动重建）"""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    pool = queue.LifoQueue(maxsize=self.pool_size)
+                    conn = self._connect()
+                    for statement in self.schema:
+                        conn.execute(statement)
+                    pool.put(conn)
+                    self._pool = pool
+                    self._pid = pid
+        return self._pool
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """从连接池借出一个连接，用完归还"""
+        pool = self._get_pool()
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def open_connections(self) -> int:
+        """当前进程池中空闲（已打开）的连接数"""
+        if self._pool is None or self._pid != os.getpid():
+            return 0
+        return self._pool.qsize()
+
+    def close(self) -> None:
+        """关闭当前进程池中的所有连接"""
+        if self._pool is None or self._pid != os.getpid():
+            return
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class ProfileStore:
+    """用户档案存储
+
+    档案以序列化后的JSON文档保存，读取时直接返回文档文本，不再经过Pydantic校验。
+    连接池按进程隔离：gunicorn fork之后首次访问会在子进程中重新建立连接。
+    """
+
+    schema = SCHEMA
+
+    def __init__(self, path: str, pool_size: int = 4, timeout: float = 5.0):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = ConnectionPool(path, self.schema, pool_size, timeout)
+
+    @classmethod
+    def from_env(cls) -> 'ProfileStore':
+        """根据环境变量创建存储实例"""
+        url = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+        pool_size = int(os.environ.get('DATABASE_POOL_SIZE', 4))
+        return cls(parse_database_url(url), pool_size=pool_size)
+
+    def connection(self) -> ContextManager[sqlite3.Connection]:
+        """从连接池借出一个连接，用完归还"""
+        return self._pool.connection()
+
+    def put(self, user_id: str, email: str, phone: str, document: str,
+            created_at: str, updated_at: str) -> None:
+        """写入或更新一份档案文档"""
+        with self.connection() as conn:
+            conn.execute(SQL_UPSERT, (user_id, email, phone, document, created_at, updated_at))
+
+    def put_many(self, records: Iterable[Tuple[str, str, str, str, str, str]]) -> None:
+        """在单个事务中批量写入档案记录"""
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(SQL_UPSERT, records)
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def get_document(self, user_id: str) -> Optional[str]:
+        """按user_id读取档案文档，不存在时返回None"""
+        with self.connection() as conn:
+            row = conn.execute(SQL_GET_DOCUMENT, (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_versioned(self, user_id: str) -> Optional[Tuple[str, str]]:
+        """读取档案文档及其 updated_at（作为局部更新的版本号），不存在时返回None"""
+        with self.connection() as conn:
+            row = conn.execute(SQL_GET_VERSIONED, (user_id,)).fetchone()
+        return tuple(row) if row else None
+
+    def update_sections(self, user_id: str, version: str, sections: Dict[str, str],
+                        fields: Dict[str, Any], updated_at: str,
+                        email: Optional[str] = None, phone: Optional[str] = None) -> Optional[str]:
+        """只替换文档中的指定段落和顶层字段，返回更新后的文档
+
+        sections 为 {段落名: 段落JSON文本}，fields 为 {顶层字段: 值}（如 score、updated_at）。
+        仅当 updated_at 仍等于 version 时写入，版本已变化（并发修改）或档案不存在时返回None。
+        段落名由调用方限定在档案模型的字段内。
+        """
+        paths = []
+        params: List[Any] = []
+        for name, text in sections.items():
+            paths.append(f"'$.profile.{name}', json(?)")
+            params.append(text)
+        for name, value in fields.items():
+            paths.append(f"'$.{name}', ?")
+            params.append(value)
+        sql = (
+            f"UPDATE user_profiles SET document = json_set(document, {', '.join(paths)}), "
+            "email = COALESCE(?, email), phone = COALESCE(?, phone), updated_at = ? "
+            "WHERE user_id = ? AND updated_at = ? RETURNING document"
+        )
+        params.extend((email, phone, updated_at, user_id, version))
+        with self.connection() as conn:
+            row = conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def get_documents(self, user_ids: List[str]) -> Dict[str, str]:
+        """批量读取档案文档，返回 {user_id: document}，不存在的user_id不出现在结果中"""
+        if not user_ids:
+            return {}
+        placeholders = ','.join('?' * len(user_ids))
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT user_id, document FROM user_profiles WHERE user_id IN ({placeholders})", user_ids
+            )
+            return dict(rows.fetchall())
+
+    def iter_documents(self, updated_since: Optional[str] = None,
+                       batch_size: int = 1000) -> Iterator[Tuple[str, str, str]]:
+        """逐批遍历 (user_id, document, updated_at)，可只取 updated_at 不早于 updated_since 的档案"""
+        with self.connection() as conn:
+            if updated_since is None:
+                cursor = conn.execute(SQL_ITER_DOCUMENTS)
+            else:
+                cursor = conn.execute(SQL_ITER_UPDATED_SINCE, (updated_since,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def iter_by_user_id(self, after: str = '', batch_size: int = 1000) -> Iterator[Tuple[str, str, str]]:
+        """按user_id顺序遍历 (user_id, document, updated_at)，只取大于 after 的档案
+
+        按主键分页，每批是一次独立的短查询，长时间遍历（如全量导出）不会一直占用连接和读事务。
+        """
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(SQL_ITER_AFTER_USER_ID, (after, batch_size)).fetchall()
+            if not rows:
+                break
+            yield from rows
+            after = rows[-1][0]
+
+    def find_by_email(self, email: str) -> list:
+        """按邮箱查找user_id"""
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute(SQL_FIND_BY_EMAIL, (email,))]
+
+    def find_by_phone(self, phone: str) -> list:
+        """按电话查找user_id"""
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute(SQL_FIND_BY_PHONE, (phone,))]
+
+    def delete(self, user_id: str) -> bool:
+        """删除一份档案并写入删除记录，返回是否存在"""
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                deleted = conn.execute(SQL_DELETE, (user_id,)).rowcount > 0
+                if deleted:
+                    conn.execute(SQL_TOMBSTONE, (user_id, datetime.now().isoformat()))
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        return deleted
+
+    def iter_deleted(self, deleted_since: str) -> List[Tuple[str, str]]:
+        """删除时间不早于 deleted_since 且之后未重新写入的 (user_id, deleted_at)"""
+        with self.connection() as conn:
+            return conn.execute(SQL_ITER_DELETED_SINCE, (deleted_since,)).fetchall()
+
+    def count(self) -> int:
+        """档案总数"""
+        with self.connection() as conn:
+            return conn.execute(SQL_COUNT).fetchone()[0]
+
+    def open_connections(self) -> int:
+        return self._pool.open_connections()
+
+    def close(self) -> None:
+        """关闭当前进程池中的所有连接"""
+        self._pool.close()
+
+
+class ChangeFeed:
+    """按updated_at水位线增量读取存储中新增、更新或删除的档案
+
+    供进程内的派生数据（搜索索引、匹配矩阵）与存储保持同步：首次读取全部档案，
+    之后只读取水位线之后的档案和删除记录。水位线向前回退 overlap 秒，覆盖其他进程中
+    提交较晚但时间戳较早的写入，因此同一档案可能被重复读取，调用方需幂等处理。
+    """
+
+    def __init__(self, interval: float = 1.0, overlap: float = 5.0):
+        self.interval = interval
+        self.overlap = overlap
+        self.watermark: Optional[str] = None
+        self._last_poll = 0.0
+
+    def reset(self, watermark: Optional[str] = None) -> None:
+        """从指定水位线重新开始，下次 due() 立即返回True"""
+        self.watermark = watermark
+        self._last_poll = 0.0
+
+    def due(self) -> bool:
+        """是否需要再次读取（首次读取或距上次读取超过interval）"""
+        return self.watermark is None or time.monotonic() - self._last_poll >= self.interval
+
+    def _since(self) -> Optional[str]:
+        if self.watermark is None:
+            return None
+        return (datetime.fromisoformat(self.watermark) - timedelta(seconds=self.overlap)).isoformat()
+
+    def poll(self, store: ProfileStore) -> Iterator[Tuple[str, Optional[str]]]:
+        """逐条产出 (user_id, document)，已删除的档案产出 (user_id, None)，遍历结束后推进水位线
+
+        首次读取（全量加载）时不产出删除记录。
+        """
+        since = self._since()
+        watermark = self.watermark
+        for user_id, document, updated_at in store.iter_documents(updated_since=since):
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+            yield user_id, document
+        if since is not None:
+            for user_id, deleted_at in store.iter_deleted(since):
+                if deleted_at > watermark:
+                    watermark = deleted_at
+                yield user_id, None
+        self.watermark = watermark or datetime.now().isoformat()
+        self._last_poll = time.monotonic()
+
+    def poll_deleted(self, store: ProfileStore) -> List[str]:
+        """只读取水位线之后删除的user_id（首次调用只设置水位线）"""
+        since = self._since()
+        deleted = store.iter_deleted(since) if since is not None else []
+        watermark = max([self.watermark or ''] + [deleted_at for _, deleted_at in deleted])
+        self.watermark = watermark or datetime.now().isoformat()
+        self._last_poll = time.monotonic()
+        return [user_id for user_id, _ in deleted]
+
+
+class BackgroundRefresher:
+    """在后台线程中按间隔执行同步任务（如快照覆盖层同步），不占用请求路径
+
+    与任务队列相同按进程启动：gunicorn在worker初始化后调用start（master预热时不启动），
+    fork出的子进程中需要重新启动；任务抛出的异常记录日志后在下个间隔重试。
+    """
+
+    def __init__(self, interval: float = 1.0, name: str = 'background-refresh'):
+        self.interval = interval
+        self.name = name
+        self._tasks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+
+    def add(self, task: Callable[[], Any]) -> None:
+        self._tasks.append(task)
+
+    def run_once(self) -> None:
+        for task in self._tasks:
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Background refresh task failed: {describe_error(e)}")
+
+    def start(self) -> None:
+        """在当前进程启动后台线程（同一进程只启动一次）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            self._pid = pid
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._pid != os.getpid():
+            return
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self.run_once()
+            self._stopping.wait(self.interval)
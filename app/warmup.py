@@ -0,0 +1,92 @@
+"""
+AI Support System - 预热
+在worker接收流量之前，用示例档案把每个路由执行一遍：
+Pydantic校验器、Flask路由匹配器、JSON编码器、日期格式缓存和SQLite连接在此时完成初始化。
+预热只访问只读和验证类接口，创建与局部更新路径中不写存储的部分（评分、查重、构建存储记录、
+合并补丁、拼接响应）直接调用，不会向存储写入任何档案，其他worker的索引同步不会读到预热数据。
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_sample_profiles() -> List[Dict[str, Any]]:
+    """示例档案：sample_user_profile.json 与 create_sample_profile()"""
+    from app.main import create_sample_profile
+
+    samples = [create_sample_profile().model_dump(mode='json')]
+    path = os.path.join(ROOT, 'sample_user_profile.json')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            samples.append(json.load(f))
+    return samples
+
+
+def warm_up(flask_app) -> Dict[str, Any]:
+    """通过测试客户端访问所有路由（不写入存储），返回请求数、5xx响应数和耗时"""
+    from app.main import (admission, fetched_envelope, find_duplicates, metrics, profile_cache,
+                          snapshot_store, validation_memo)
+    from app.models import UserProfile
+    from app.patching import apply_patch
+    from app.profiles import build_profile_record, calculate_profile_score
+
+    started = time.perf_counter()
+    client = flask_app.test_client()
+    requests = server_errors = 0
+
+    def call(method: str, url: str, **kwargs):
+        nonlocal requests, server_errors
+        requests += 1
+        response = client.open(url, method=method, **kwargs)
+        if response.status_code >= 500:
+            server_errors += 1
+            logger.warning(f"Warm-up request {method} {url} failed with {response.status_code}")
+        return response
+
+    call('GET', '/')
+    call('GET', '/api/status')
+    call('GET', '/api/test')
+    for profile in load_sample_profiles():
+        call('POST', '/api/echo', json=profile)
+        for format_type in ('detailed', 'simple'):
+            call('POST', f"/api/user-profile/warmup/validate?format={format_type}", json=profile)
+        call('POST', '/api/user-profiles/batch?mode=validate', data=json.dumps(profile))
+
+        # 创建/局部更新路径：直接调用不写存储的部分（查重按flag模式只查询，同时完成去重索引的首次加载）
+        with flask_app.app_context():
+            user_profile = UserProfile(**profile)
+            find_duplicates(user_profile, mode='flag')
+            _, record = build_profile_record(user_profile, calculate_profile_score(user_profile),
+                                             user_id='warmup')
+            apply_patch(json.loads(record[3]), {'preferences': profile.get('preferences') or {}})
+            fetched_envelope.render_raw_bytes(record[3].encode('utf-8'))
+    # 不存在的档案/任务与无效请求体：走完路由、存储查询和错误响应，不产生写入
+    call('POST', '/api/user-profile', json={})
+    call('GET', '/api/user-profile/warmup-missing')
+    call('GET', '/api/user-profile/warmup-missing', headers={'If-None-Match': '"warmup"'})
+    call('PATCH', '/api/user-profile/warmup-missing', json={'preferences': {}})
+    call('GET', '/api/jobs/warmup-missing')
+    # 首次搜索/匹配/全文检索时从存储加载倒排索引、匹配矩阵和全文索引（gunicorn主进程中预热时，fork出的worker共享已加载的数据）
+    call('GET', '/api/user-profiles/search?skill=Python&page_size=1')
+    call('POST', '/api/user-profiles/match', json={'required_skills': [{'name': 'Python', 'min_level': 5}],
+                                                    'location': '北京', 'salary_max': 30000, 'top_k': 1})
+    call('GET', '/api/user-profiles/fulltext?q=微服务&top_k=1')
+
+    # 清理预热产生的缓存与统计
+    validation_memo.clear()
+    profile_cache.reset_stats()
+    snapshot_store.reset_stats()
+    validation_memo.reset_stats()
+    admission.reset_stats()
+    metrics.discard_local()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Warm-up finished: {requests} requests in {elapsed * 1000:.1f}ms")
+    return {'requests': requests, 'server_errors': server_errors, 'elapsed_seconds': elapsed}
@@ -0,0 +1,31 @@
+"""
+AI Support System - gunicorn worker
+gthread worker 的处理线程全部繁忙时，新请求在worker内部的线程池队列中等待，应用无法感知。
+ThreadWorker 记录连接进入线程池队列的时间，请求没有 X-Request-Start（反向代理未设置）时
+以该时间补上，准入控制据此按排队时长降级（见 app/admission.py）。
+
+用法（gunicorn.conf.py 默认使用）:
+    gunicorn -k app.workers.ThreadWorker app.main:app
+"""
+
+import time
+
+from gunicorn.workers import gthread
+
+from app.admission import REQUEST_START_HEADER
+
+_HEADER_NAME = REQUEST_START_HEADER.upper()
+
+
+class ThreadWorker(gthread.ThreadWorker):
+    """记录请求排队时间的gthread worker"""
+
+    def enqueue_req(self, conn) -> None:
+        conn.queued_at = time.time()
+        super().enqueue_req(conn)
+
+    def handle_request(self, req, conn):
+        # 反向代理设置的到达时间更早（包含代理和连接队列中的等待），优先使用
+        if not any(name == _HEADER_NAME for name, _ in req.headers):
+            req.headers.append((_HEADER_NAME, f"t={conn.queued_at:.6f}"))
+        return super().handle_request(req, conn)
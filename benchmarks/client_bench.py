@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+客户端SDK基准：逐个调用 vs 并发调用 vs 批量接口，以及连接复用情况
+
+用法:
+    python benchmarks/client_bench.py [--mode gunicorn] [--profiles 2000] [--concurrency 16]
+
+- 在本地启动服务，用 app.client.ProfileClient 分别逐个创建、并发逐个创建（create_many use_batch=False）、
+  并发分块提交批量接口（create_many）同样数量的档案，再逐个/并发读取
+- 输出每种方式的吞吐与连接池新建/复用的连接数（gunicorn gthread worker支持keep-alive）
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payloads import ProfileFactory
+from httpclient import local_server
+from app.client import AsyncProfileClient, ProfileClient
+
+
+def report(name: str, count: int, elapsed: float, client: ProfileClient, results) -> None:
+    failed = sum(1 for item in results if isinstance(item, Exception) or
+                 (isinstance(item, dict) and item.get('success') is False))
+    stats = client.pool.stats()
+    print(f"  {name:<28} {count / elapsed:8.0f} req/s  {elapsed:6.2f}s  failed={failed}  "
+          f"connections created={stats['created']} reused={stats['reused']}")
+
+
+def run(label: str, func, count: int, **client_args):
+    client = ProfileClient(**client_args)
+    started = time.perf_counter()
+    results = func(client)
+    report(label, count, time.perf_counter() - started, client, results)
+    client.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['sync', 'gunicorn'], default='gunicorn')
+    parser.add_argument('--profiles', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    factory = ProfileFactory(args.seed)
+    profiles = [factory.profile() for _ in range(args.profiles * 3)]
+    for i, profile in enumerate(profiles):
+        profile['contact']['email'] = f"client{i}@example.com"
+    chunks = [profiles[i * args.profiles:(i + 1) * args.profiles] for i in range(3)]
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            local_server(args.mode, os.path.join(tmp, 'client_bench.db'),
+                         {'ADMISSION_ENABLED': 'false', 'DEDUP_MODE': 'off'}) as port:
+        base_url = f"http://127.0.0.1:{port}"
+        options = {'base_url': base_url, 'pool_size': args.concurrency, 'timeout': 60}
+        count = args.profiles
+
+        print(f"== create {count} profiles ({args.mode})")
+        run('sequential', lambda c: [c.create_profile(p) for p in chunks[0]], count, **options)
+        run(f"fan-out x{args.concurrency}",
+            lambda c: c.create_many(chunks[1], args.concurrency, use_batch=False), count, **options)
+        created = run(f"batch {args.batch_size}/req x{args.concurrency}",
+                      lambda c: c.create_many(chunks[2], args.concurrency, batch_size=args.batch_size),
+                      count, **options)
+
+        user_ids = [item['user_id'] for item in created if isinstance(item, dict) and item.get('success')]
+        print(f"\n== get {len(user_ids)} profiles")
+        run('sequential', lambda c: [c.get_profile(user_id) for user_id in user_ids], len(user_ids), **options)
+        run(f"fan-out x{args.concurrency}", lambda c: c.get_many(user_ids, args.concurrency),
+            len(user_ids), **options)
+
+        async def fetch_async(client):
+            async with AsyncProfileClient(client) as async_client:
+                return await async_client.get_many(user_ids, args.concurrency)
+
+        run(f"asyncio fan-out x{args.concurrency}", lambda c: asyncio.run(fetch_async(c)),
+            len(user_ids), **options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+档案常驻内存基准：Pydantic模型对象 vs 紧凑表示（app.compact），以及两者之间的转换耗时
+
+用法:
+    python benchmarks/compact_bench.py [--profiles 1000000] [--sample 20000]
+
+- 每份档案都从JSON文本解析得到（与请求体相同，字符串对象各自独立），并改写邮箱和电话使其互不相同
+- 模型对象：用tracemalloc测量 --sample 份档案的平均占用，按 --profiles 份估算（百万级模型对象放不进内存）
+- 紧凑表示：逐份转换后丢弃模型对象，测量 --profiles 份全部常驻时的进程RSS增量，另用tracemalloc测量样本平均占用
+- 转换：from_model / to_model 的平均耗时
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payloads import ProfileFactory
+from app.compact import CompactProfile, strings
+from app.models import UserProfile
+from app.profiles import dumps_document
+
+
+def rss_bytes() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def profile_texts(count: int, seed: int):
+    factory = ProfileFactory(seed)
+    return [json.dumps(factory.profile(), ensure_ascii=False) for _ in range(count)]
+
+
+def load(texts, i: int) -> UserProfile:
+    data = json.loads(texts[i % len(texts)])
+    data['contact']['email'] = f"user{i}@example.com"
+    data['contact']['phone'] = f"13{i:09d}"
+    return UserProfile(**data)
+
+
+def traced_per_profile(build, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    resident = build(count)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del resident
+    return used / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=1_000_000)
+    parser.add_argument('--sample', type=int, default=20_000)
+    parser.add_argument('--distinct', type=int, default=5_000, help='生成的不同档案模板数')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    texts = profile_texts(args.distinct, args.seed)
+
+    # 样本：两种表示的平均占用
+    models_bytes = traced_per_profile(lambda n: [load(texts, i) for i in range(n)], args.sample)
+    compact_bytes = traced_per_profile(
+        lambda n: [CompactProfile.from_model(load(texts, i)) for i in range(n)], args.sample)
+
+    # 转换耗时与一致性
+    models = [load(texts, i) for i in range(min(args.sample, 5000))]
+    started = time.perf_counter()
+    compacts = [CompactProfile.from_model(model) for model in models]
+    from_us = (time.perf_counter() - started) / len(models) * 1e6
+    started = time.perf_counter()
+    restored = [compact.to_model() for compact in compacts]
+    to_us = (time.perf_counter() - started) / len(models) * 1e6
+    assert all(dumps_document(a) == dumps_document(b) for a, b in zip(models, restored))
+    del models, compacts, restored
+
+    # 全量：紧凑表示全部常驻时的RSS增量
+    gc.collect()
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    resident = [CompactProfile.from_model(load(texts, i)) for i in range(args.profiles)]
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    rss_compact = rss_bytes() - rss_before
+
+    print(f"== {args.profiles} resident profiles (sample {args.sample})")
+    print(f"  pydantic models  {models_bytes:8.0f} B/profile  "
+          f"~{models_bytes * args.profiles / 2 ** 30:6.2f} GiB (estimated)")
+    print(f"  compact          {compact_bytes:8.0f} B/profile  "
+          f"{rss_compact / 2 ** 30:6.2f} GiB RSS measured ({rss_compact / len(resident):.0f} B/profile)")
+    print(f"  ratio            {models_bytes / compact_bytes:8.1f}x")
+    print(f"  string pool      {strings.stats()}")
+    print(f"\n== conversion")
+    print(f"  from_model {from_us:6.1f}us  to_model {to_us:6.1f}us  (load {args.profiles} in {elapsed:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+并发基准测试：同步模式（python app/main.py）与asyncio模式（python -m app.asgi）对比
+
+用法:
+    python benchmarks/concurrency_bench.py [--connections 200] [--slow-clients 500] [--duration 10]
+
+两种模式分别以子进程启动在本地端口上，使用asyncio客户端：
+- connections 个活跃连接循环发送 GET 档案 / POST 验证请求（尽量复用keep-alive连接）
+- slow-clients 个慢客户端只发送部分请求头后保持连接，模拟慢客户端和慢上传
+输出各模式的RPS、延迟分位数、错误数以及慢客户端建立成功的连接数。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from httpclient import ROOT, AsyncConnection, local_server
+
+MODES = {
+    'sync (Flask dev server)': 'sync',
+    'asyncio (uvicorn + ASGI)': 'asyncio',
+}
+
+
+async def slow_client(host: str, port: int, stop: asyncio.Event, opened: List[int]) -> None:
+    """只发送部分请求头并保持连接，直到基准结束"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"POST /api/echo HTTP/1.1\r\nHost: {host}\r\n".encode())
+        await writer.drain()
+        opened.append(1)
+        while not stop.is_set():
+            await asyncio.sleep(1)
+            writer.write(b'X-Slow: 1\r\n')
+            await writer.drain()
+        writer.close()
+    except (OSError, asyncio.IncompleteReadError):
+        pass
+
+
+async def active_client(host: str, port: int, user_id: str, profile: bytes, deadline: float,
+                        latencies: List[float], errors: List[int]) -> None:
+    conn = AsyncConnection(host, port)
+    requests_cycle = [
+        ('GET', f"/api/user-profile/{user_id}", b''),
+        ('POST', '/api/user-profile/bench/validate?format=simple', profile),
+    ]
+    index = 0
+    while time.perf_counter() < deadline:
+        method, path, body = requests_cycle[index % len(requests_cycle)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            status, _ = await asyncio.wait_for(conn.request(method, path, body), timeout=30)
+            if status >= 400:
+                errors.append(status)
+            else:
+                latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            errors.append(0)
+            conn.close()
+            await asyncio.sleep(0.01)
+    conn.close()
+
+
+async def run_load(host: str, port: int, user_id: str, profile: bytes, connections: int,
+                   slow_clients: int, duration: float) -> Dict[str, float]:
+    stop = asyncio.Event()
+    opened: List[int] = []
+    slow_tasks = [asyncio.create_task(slow_client(host, port, stop, opened)) for _ in range(slow_clients)]
+    await asyncio.sleep(1)
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(active_client(host, port, user_id, profile, deadline, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for task in slow_tasks:
+        task.cancel()
+    await asyncio.gather(*slow_tasks, return_exceptions=True)
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else 0.0
+
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+        'errors': len(errors),
+        'slow_opened': len(opened),
+    }
+
+
+async def seed_profile(port: int, profile: bytes) -> str:
+    conn = AsyncConnection('127.0.0.1', port)
+    status, payload = await conn.request('POST', '/api/user-profile', profile)
+    conn.close()
+    if status != 201:
+        raise RuntimeError(f"seed failed: {status} {payload[:200]!r}")
+    return json.loads(payload)['data']['user_id']
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='同步/asyncio服务模式并发对比')
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--slow-clients', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'sample_user_profile.json'), 'rb') as f:
+        profile = json.dumps(json.load(f)).encode()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, mode in MODES.items():
+            with local_server(mode, os.path.join(tmp, f"{mode}.db")) as port:
+                user_id = asyncio.run(seed_profile(port, profile))
+                results[name] = asyncio.run(run_load('127.0.0.1', port, user_id, profile,
+                                                     args.connections, args.slow_clients, args.duration))
+
+    print(f"\nconnections={args.connections} slow_clients={args.slow_clients} duration={args.duration}s")
+    print(f"{'mode':<26}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'errors':>8}{'slow open':>11}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['requests']:>10}{r['rps']:>10.0f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['errors']:>8}{r['slow_opened']:>11}")
+
+
+if __name__ == '__main__':
+    main()
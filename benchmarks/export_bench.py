@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+全量导出基准：NDJSON / CSV（两种展开方式）/ gzip 的吞吐（MB/s）与内存占用
+
+用法:
+    python benchmarks/export_bench.py [--profiles 100000] [--database /tmp/export_bench.db]
+
+先向临时SQLite库写入档案（库已存在且档案数足够时直接复用），然后：
+- 吞吐：遍历导出管道的全部输出块，按输入文档字节数和输出字节数分别计算MB/s
+- 内存：用tracemalloc分别测量导出前1/10档案和全部档案时的峰值分配，两者应基本相同
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payloads import ProfileFactory
+from app.export import export_chunks
+from app.models import UserProfile
+from app.profiles import build_profile_record, calculate_profile_score
+from app.store import ProfileStore
+
+CASES = {
+    'ndjson': dict(fmt='ndjson'),
+    'ndjson + gzip': dict(fmt='ndjson', compress=True),
+    'csv columns': dict(fmt='csv', explode='columns'),
+    'csv rows': dict(fmt='csv', explode='rows'),
+    'csv columns + gzip': dict(fmt='csv', explode='columns', compress=True),
+}
+
+
+def populate(store: ProfileStore, profiles: int, seed: int) -> None:
+    existing = store.count()
+    if existing >= profiles:
+        return
+    factory = ProfileFactory(seed)
+    started = time.perf_counter()
+    batch = []
+    for i in range(existing, profiles):
+        profile = UserProfile(**factory.profile())
+        _, record = build_profile_record(profile, calculate_profile_score(profile), user_id=f"user_{i:08d}")
+        batch.append(record)
+        if len(batch) == 1000:
+            store.put_many(batch)
+            batch.clear()
+    store.put_many(batch)
+    print(f"populated {profiles - existing} profiles in {time.perf_counter() - started:.1f}s")
+
+
+def run(store: ProfileStore, limit: int, options: dict):
+    rows = itertools.islice(store.iter_by_user_id(), limit)
+    input_bytes = 0
+
+    def counted():
+        nonlocal input_bytes
+        for row in rows:
+            input_bytes += len(row[1])
+            yield row
+
+    output_bytes = chunks = 0
+    for chunk in export_chunks(counted(), **options):
+        output_bytes += len(chunk)
+        chunks += 1
+    return input_bytes, output_bytes, chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=100_000)
+    parser.add_argument('--database', default='/tmp/export_bench.db')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    store = ProfileStore(args.database)
+    populate(store, args.profiles, args.seed)
+
+    print(f"\n== throughput ({args.profiles} profiles)")
+    for name, options in CASES.items():
+        started = time.perf_counter()
+        input_bytes, output_bytes, chunks = run(store, args.profiles, options)
+        elapsed = time.perf_counter() - started
+        print(f"  {name:<20} {elapsed:6.2f}s  {args.profiles / elapsed:9.0f} profiles/s  "
+              f"in {input_bytes / elapsed / 1e6:6.1f} MB/s  out {output_bytes / elapsed / 1e6:6.1f} MB/s  "
+              f"({output_bytes / 1e6:.1f} MB, {chunks} chunks)")
+
+    print("\n== peak traced memory (first 10% vs all profiles)")
+    for name, options in CASES.items():
+        peaks = []
+        for limit in (args.profiles // 10, args.profiles):
+            tracemalloc.start()
+            run(store, limit, options)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        print(f"  {name:<20} {peaks[0] / 1024:8.0f} KiB  {peaks[1] / 1024:8.0f} KiB")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
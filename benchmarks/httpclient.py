@@ -0,0 +1,121 @@
+"""
+基准测试共用的HTTP工具：最小的asyncio HTTP/1.1客户端连接与本地服务进程管理
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 本地启动服务的方式
+SERVER_COMMANDS = {
+    'sync': [sys.executable, os.path.join(ROOT, 'app', 'main.py')],
+    'asyncio': [sys.executable, '-m', 'app.asgi'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', 'app.main:app'],
+}
+
+
+class AsyncConnection:
+    """最小的HTTP/1.1客户端连接，支持Content-Length与chunked响应，服务端要求关闭时自动重连"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b'',
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        extra = ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n{extra}\r\n")
+        self.writer.write(head.encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            payload = await self._read_chunked()
+        elif 'content-length' in response_headers:
+            payload = await self.reader.readexactly(int(response_headers['content-length']))
+        elif int(status) in (204, 304) or method == 'HEAD':
+            payload = b''
+        else:
+            payload = await self.reader.read()
+            self.close()
+        if version == 'HTTP/1.0' or response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return int(status), payload
+
+    async def _read_chunked(self) -> bytes:
+        parts: List[bytes] = []
+        while True:
+            size = int((await self.reader.readline()).split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                while (await self.reader.readline()) not in (b'\r\n', b''):
+                    pass
+                return b''.join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 15.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+@contextmanager
+def local_server(mode: str, database_path: str, extra_env: Optional[Dict[str, str]] = None) -> Iterator[int]:
+    """在本地空闲端口启动服务子进程，产出端口号，结束时停止服务"""
+    port = free_port()
+    env = dict(os.environ, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port), FLASK_DEBUG='false',
+               DATABASE_URL=f"sqlite:///{database_path}",
+               METRICS_MMAP_PATH=f"{database_path}.metrics")
+    env.update(extra_env or {})
+    process = subprocess.Popen(SERVER_COMMANDS[mode], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        yield port
+    finally:
+        process.send_signal(signal.SIGINT if mode != 'gunicorn' else signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
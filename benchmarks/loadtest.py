@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+并发压测与延迟回归检查
+
+按 postman/AI_Support_System.postman_collection.json 中的全部接口施加并发负载，
+请求体由 sample_user_profile.json / create_sample_profile_data() 生成的随机档案替换，
+输出各接口及整体的RPS、p50/p95/p99/max延迟，并与保存的基线对比，出现回归时以退出码1结束。
+
+用法:
+    # 在本地空闲端口启动服务（临时数据库）并压测
+    python benchmarks/loadtest.py --start-server sync --mode threads --concurrency 16 --duration 20
+
+    # 压测已运行的实例，限速500 RPS
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:5000 --mode asyncio --concurrency 64 --rate 500
+
+    # 生成/更新基线，之后的运行与基线对比
+    python benchmarks/loadtest.py --start-server gunicorn --update-baseline benchmarks/baseline.json
+    python benchmarks/loadtest.py --start-server gunicorn --baseline benchmarks/baseline.json --tolerance 0.2
+
+基线与机器相关，请在同一台机器、相同参数下生成和对比。
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import http.client
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from httpclient import ROOT, AsyncConnection, local_server
+from payloads import ProfileFactory
+
+COLLECTION_PATH = os.path.join(ROOT, 'postman', 'AI_Support_System.postman_collection.json')
+_STATUS_PATTERN = re.compile(r'to\.have\.status\((\d+)\)')
+
+
+@dataclass
+class Endpoint:
+    """Postman集合中的一个请求"""
+    name: str
+    method: str
+    path: str
+    content_type: Optional[str]
+    body: bytes
+    expected_status: int
+    weight: float = 1.0
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+
+def load_collection(path: str) -> List[Endpoint]:
+    """读取Postman集合，展开文件夹，按测试脚本中的断言确定期望状态码"""
+    with open(path, 'r', encoding='utf-8') as f:
+        collection = json.load(f)
+
+    endpoints = []
+
+    def walk(items):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'])
+                continue
+            request = item['request']
+            url = request['url']
+            raw = url['raw'] if isinstance(url, dict) else url
+            headers = {h['key'].lower(): h['value'] for h in request.get('header', [])}
+            script = '\n'.join(line for event in item.get('event', []) if event.get('listen') == 'test'
+                               for line in event['script'].get('exec', []))
+            match = _STATUS_PATTERN.search(script)
+            endpoints.append(Endpoint(
+                name=item['name'],
+                method=request['method'],
+                path=raw.replace('{{base_url}}', '') or '/',
+                content_type=headers.get('content-type'),
+                body=request.get('body', {}).get('raw', '').encode('utf-8'),
+                expected_status=int(match.group(1)) if match else 200
+            ))
+
+    walk(collection['item'])
+    return endpoints
+
+
+class PayloadPool:
+    """预先生成的随机档案请求体，压测过程中循环取用，避免生成开销计入客户端"""
+
+    def __init__(self, factory: ProfileFactory, size: int, batch_size: int):
+        self.profiles = [json.dumps(factory.profile(), ensure_ascii=False).encode('utf-8')
+                         for _ in range(size)]
+        self.batches = [b'\n'.join(self.profiles[(i + j) % size] for j in range(batch_size)) + b'\n'
+                        for i in range(0, size, batch_size)]
+
+    def body_for(self, endpoint: Endpoint, rnd: random.Random) -> bytes:
+        if endpoint.content_type == 'application/x-ndjson':
+            return rnd.choice(self.batches)
+        if endpoint.method == 'POST' and endpoint.path.split('?', 1)[0].startswith('/api/user-profile'):
+            return rnd.choice(self.profiles)
+        return endpoint.body
+
+
+class Pacer:
+    """全局限速：按固定间隔分配发送时刻，rate<=0 表示不限速"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """返回距本次发送还需等待的秒数"""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.perf_counter()
+            slot = max(self.next_at, now)
+            self.next_at = slot + self.interval
+            return slot - now
+
+
+class LoadTest:
+    """负载调度：按权重随机选择接口，记录每个接口的延迟与状态码"""
+
+    def __init__(self, endpoints: List[Endpoint], payloads: PayloadPool, user_ids: List[str],
+                 host: str, port: int, rate: float, seed: int):
+        self.endpoints = endpoints
+        self.weights = [e.weight for e in endpoints]
+        self.payloads = payloads
+        self.user_ids = user_ids
+        self.host = host
+        self.port = port
+        self.pacer = Pacer(rate)
+        self.seed = seed
+        self.stats: Dict[str, EndpointStats] = {e.name: EndpointStats() for e in endpoints}
+        self._lock = threading.Lock()
+
+    def next_request(self, rnd: random.Random) -> Tuple[Endpoint, str, bytes]:
+        endpoint = rnd.choices(self.endpoints, self.weights)[0]
+        path = endpoint.path
+        if '{{user_id}}' in path:
+            path = path.replace('{{user_id}}', rnd.choice(self.user_ids))
+        return endpoint, path, self.payloads.body_for(endpoint, rnd)
+
+    def record(self, endpoint: Endpoint, status: int, latency: float) -> None:
+        with self._lock:
+            stats = self.stats[endpoint.name]
+            stats.statuses[status] += 1
+            if status == endpoint.expected_status:
+                stats.latencies.append(latency)
+            else:
+                stats.errors += 1
+
+    # ---------- 线程模式 ----------
+
+    def run_threads(self, concurrency: int, duration: float) -> float:
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=self._thread_worker, args=(i, deadline), daemon=True)
+                   for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def _thread_worker(self, index: int, deadline: float) -> None:
+        rnd = random.Random(self.seed + index)
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        while time.perf_counter() < deadline:
+            endpoint, path, body = self.next_request(rnd)
+            delay = self.pacer.reserve()
+            if delay:
+                time.sleep(delay)
+            headers = {'Content-Type': endpoint.content_type or 'application/json'}
+            started = time.perf_counter()
+            try:
+                conn.request(endpoint.method, path, body=body or None, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                self.record(endpoint, response.status, time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                self.record(endpoint, 0, time.perf_counter() - started)
+                conn.close()
+        conn.close()
+
+    # ---------- asyncio模式 ----------
+
+    def run_asyncio(self, concurrency: int, duration: float) -> float:
+        async def run() -> float:
+            deadline = time.perf_counter() + duration
+            started = time.perf_counter()
+            await asyncio.gather(*(self._async_worker(i, deadline) for i in range(concurrency)))
+            return time.perf_counter() - started
+
+        return asyncio.run(run())
+
+    async def _async_worker(self, index: int, deadline: float) -> None:
+        rnd = random.Random(self.seed + index)
+        conn = AsyncConnection(self.host, self.port)
+        while time.perf_counter() < deadline:
+            endpoint, path, body = self.next_request(rnd)
+            delay = self.pacer.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            headers = {'Content-Type': endpoint.content_type} if endpoint.content_type else None
+            started = time.perf_counter()
+            try:
+                status, _ = await asyncio.wait_for(
+                    conn.request(endpoint.method, path, body, headers=headers), timeout=30)
+                self.record(endpoint, status, time.perf_counter() - started)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+                self.record(endpoint, 0, time.perf_counter() - started)
+                conn.close()
+        conn.close()
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000 if ordered else 0.0
+
+    total = len(ordered) + errors
+    return {
+        'requests': total,
+        'rps': round(len(ordered) / elapsed, 2),
+        'p50_ms': round(pct(50), 3),
+        'p95_ms': round(pct(95), 3),
+        'p99_ms': round(pct(99), 3),
+        'max_ms': round(ordered[-1] * 1000 if ordered else 0.0, 3),
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+    }
+
+
+def build_report(test: LoadTest, elapsed: float, config: Dict) -> Dict:
+    endpoints = {}
+    all_latencies: List[float] = []
+    all_errors = 0
+    for name, stats in test.stats.items():
+        endpoints[name] = summarize(stats.latencies, stats.errors, elapsed)
+        endpoints[name]['statuses'] = {str(k): v for k, v in sorted(stats.statuses.items())}
+        all_latencies += stats.latencies
+        all_errors += stats.errors
+    return {
+        'config': config,
+        'elapsed_s': round(elapsed, 3),
+        'overall': summarize(all_latencies, all_errors, elapsed),
+        'endpoints': endpoints,
+    }
+
+
+def print_report(report: Dict) -> None:
+    config = report['config']
+    print(f"\nmode={config['mode']} concurrency={config['concurrency']} rate={config['rate'] or 'unlimited'} "
+          f"duration={config['duration']}s elapsed={report['elapsed_s']}s")
+    print(f"{'endpoint':<32}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'errors':>8}")
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['overall'])]
+    for name, r in rows:
+        print(f"{name:<32}{r['requests']:>9}{r['rps']:>9.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['p99_ms']:>9.2f}{r['max_ms']:>9.2f}{r['errors']:>8}")
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float, min_slack_ms: float) -> List[str]:
+    """对比基线：p95/p99变慢、RPS下降超过容差或错误率升高均视为回归"""
+    regressions = []
+    current = dict(report['endpoints'], TOTAL=report['overall'])
+    expected = dict(baseline.get('endpoints', {}), TOTAL=baseline.get('overall', {}))
+    for name, base in expected.items():
+        now = current.get(name)
+        if not base or now is None:
+            continue
+        for key in ('p95_ms', 'p99_ms'):
+            limit = max(base[key] * (1 + tolerance), base[key] + min_slack_ms)
+            if now[key] > limit:
+                regressions.append(f"{name}: {key} {now[key]:.2f} > {limit:.2f} (baseline {base[key]:.2f})")
+        if base['rps'] and now['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: rps {now['rps']:.1f} < {base['rps'] * (1 - tolerance):.1f} "
+                               f"(baseline {base['rps']:.1f})")
+        if now['error_rate'] > base['error_rate'] + 0.01:
+            regressions.append(f"{name}: error_rate {now['error_rate']:.2%} (baseline {base['error_rate']:.2%})")
+    return regressions
+
+
+def seed_user_ids(host: str, port: int, payloads: PayloadPool, count: int) -> List[str]:
+    """创建若干档案，供 {{user_id}} 接口使用"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    user_ids = []
+    try:
+        for body in payloads.profiles[:count]:
+            conn.request('POST', '/api/user-profile', body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            payload = response.read()
+            if response.status != 201:
+                raise RuntimeError(f"seed failed: {response.status} {payload[:200]!r}")
+            user_ids.append(json.loads(payload)['data']['user_id'])
+    finally:
+        conn.close()
+    return user_ids
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    weights = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, value = part.rpartition('=')
+        weights[name.strip()] = float(value)
+    return weights
+
+
+def run(args: argparse.Namespace, host: str, port: int) -> Dict:
+    endpoints = load_collection(args.collection)
+    weights = parse_weights(args.weights)
+    unknown = set(weights) - {e.name for e in endpoints}
+    if unknown:
+        raise SystemExit(f"unknown endpoints in --weights: {', '.join(sorted(unknown))}")
+    for endpoint in endpoints:
+        endpoint.weight = weights.get(endpoint.name, 1.0)
+    endpoints = [e for e in endpoints if e.weight > 0]
+
+    payloads = PayloadPool(ProfileFactory(args.seed), args.payloads, args.batch_size)
+    user_ids = seed_user_ids(host, port, payloads, args.seed_profiles)
+    test = LoadTest(endpoints, payloads, user_ids, host, port, args.rate, args.seed)
+    if args.mode == 'threads':
+        elapsed = test.run_threads(args.concurrency, args.duration)
+    else:
+        elapsed = test.run_asyncio(args.concurrency, args.duration)
+
+    config = {
+        'mode': args.mode, 'concurrency': args.concurrency, 'rate': args.rate,
+        'duration': args.duration, 'server': args.start_server or args.base_url,
+        'batch_size': args.batch_size, 'weights': weights,
+    }
+    return build_report(test, elapsed, config)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='并发压测与延迟回归检查')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--base-url', default='http://127.0.0.1:5000', help='压测已运行的实例')
+    target.add_argument('--start-server', choices=['sync', 'asyncio', 'gunicorn'],
+                        help='在本地空闲端口启动服务（临时数据库）')
+    parser.add_argument('--collection', default=COLLECTION_PATH)
+    parser.add_argument('--mode', choices=['threads', 'asyncio'], default='threads')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=0, help='总请求速率（次/秒），0表示不限速')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--weights', default='', help='接口权重，如 "Get User Profile=5,Metrics=0"')
+    parser.add_argument('--batch-size', type=int, default=10, help='批量接口每次提交的档案数')
+    parser.add_argument('--payloads', type=int, default=200, help='预生成的档案数量')
+    parser.add_argument('--seed-profiles', type=int, default=20, help='预先创建供查询的档案数量')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='将结果写入JSON文件')
+    parser.add_argument('--baseline', help='与基线JSON对比，出现回归时退出码为1')
+    parser.add_argument('--update-baseline', metavar='PATH', help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对波动（默认20%%）')
+    parser.add_argument('--min-slack-ms', type=float, default=1.0, help='延迟比较的最小绝对余量')
+    args = parser.parse_args()
+
+    if args.start_server:
+        with tempfile.TemporaryDirectory() as tmp:
+            with local_server(args.start_server, os.path.join(tmp, 'loadtest.db')) as port:
+                report = run(args, '127.0.0.1', port)
+    else:
+        url = urlsplit(args.base_url)
+        report = run(args, url.hostname or '127.0.0.1', url.port or 80)
+
+    print_report(report)
+    for path in filter(None, (args.output, args.update_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance, args.min_slack_ms)
+        if regressions:
+            print('\n性能回归:')
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n与基线 {args.baseline} 对比无回归（容差 {args.tolerance:.0%}）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+日志开销基准测试：原写法（两次print + basicConfig同步写出）与异步JSON日志（含采样）对比
+
+用法:
+    python benchmarks/logging_bench.py [--iterations 20000] [--output /tmp/logging_bench.log]
+
+每次迭代模拟一次验证请求在请求线程上的日志开销，日志与stdout都写入同一个文件（模拟重定向到文件的
+进程输出），输出请求线程上的 p50/p99 延迟。异步模式另外统计后台线程写完全部日志所需的时间。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import contextlib
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.logs import (AsyncQueueHandler, JsonFormatter, RequestContextFilter, begin_request, end_request,
+                      redact)
+from app.models import UserProfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[int], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index] / 1000.0
+
+
+def measure(func: Callable[[int], None], iterations: int) -> Dict[str, float]:
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter_ns()
+        func(i)
+        samples.append(time.perf_counter_ns() - started)
+    return {'p50_us': percentile(samples, 50), 'p99_us': percentile(samples, 99),
+            'mean_us': sum(samples) / len(samples) / 1000.0}
+
+
+def install(handler: logging.Handler) -> logging.Logger:
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    return logging.getLogger('bench')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--output', default='/tmp/logging_bench.log')
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'sample_user_profile.json'), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    profile = UserProfile(**data)
+    query = {'format': 'detailed', 'include_skills': 'true'}
+
+    with open(args.output, 'w', encoding='utf-8') as output, contextlib.redirect_stdout(output):
+        stream = logging.StreamHandler(output)
+
+        # 原写法：请求线程上print请求参数和整个档案repr，再同步写一行文本日志
+        stream.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger = install(stream)
+
+        def legacy(i: int) -> None:
+            print('现在有请求参数：', query)
+            print('现在有用户档案：', profile)
+            logger.info(f"Validated user profile {i}")
+
+        results = {'print + sync text': measure(legacy, args.iterations)}
+
+        # 异步JSON：请求线程只入队，访问日志按比例采样，错误请求附带脱敏后的请求体
+        stream.setFormatter(JsonFormatter())
+        for rate in (1.0, 0.1, 0.01):
+            handler = AsyncQueueHandler(stream, maxsize=args.iterations * 2)
+            handler.addFilter(RequestContextFilter())
+            logger = install(handler)
+
+            def structured(i: int) -> None:
+                begin_request(None, rate)
+                logger.info(f"Validated user profile {i}")
+                if i % 100 == 0:
+                    logger.info('request', extra={'status': 400, 'payload': redact(data), 'force': True})
+                else:
+                    logger.info('request', extra={'method': 'POST', 'path': '/api/user-profile/x/validate',
+                                                  'status': 200, 'duration_ms': 1.0})
+                end_request()
+
+            result = measure(structured, args.iterations)
+            drain_started = time.perf_counter()
+            handler.close()
+            result['drain_ms'] = (time.perf_counter() - drain_started) * 1000
+            result['dropped'] = handler.dropped
+            results[f"async json sample={rate}"] = result
+
+    for name, result in results.items():
+        extra = f" drain={result['drain_ms']:.0f}ms dropped={result['dropped']}" if 'drain_ms' in result else ''
+        print(f"{name:<26} p50={result['p50_us']:7.1f}us p99={result['p99_us']:7.1f}us "
+              f"mean={result['mean_us']:7.1f}us{extra}")
+    print(f"log output: {os.path.getsize(args.output) / 1024 / 1024:.1f} MB -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+进程内微基准：模型校验、评分、报告生成与响应序列化
+
+用法:
+    python benchmarks/microbench.py [--sizes 1,10,50,100,500] [--min-time 0.5] [--output results.json]
+    python benchmarks/microbench.py --compare before.json      # 与之前的结果对比
+
+按档案规模（skills与work_experience各N条）测量以下阶段：
+- construct:   UserProfile(**data) 完整构造（含嵌套校验）
+- skills / education / work: 嵌套列表单独校验（TypeAdapter）
+- score:       calculate_profile_score
+- report:      generate_validation_report
+- serialize:   创建接口响应序列化（Envelope.render）
+
+每项记录单次调用的墙钟时间（p50/p99）、CPU时间、tracemalloc峰值内存与分配块数，
+以及每千次调用触发的0代GC次数，结果写入JSON以便修改模型前后对比。
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 导入应用前指向临时数据库与指标文件，避免写入工作目录
+_TMP = tempfile.mkdtemp(prefix='microbench_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_TMP, 'bench.db')}")
+os.environ.setdefault('METRICS_MMAP_PATH', os.path.join(_TMP, 'metrics.bin'))
+
+import pydantic
+from pydantic import TypeAdapter
+
+from payloads import ProfileFactory
+from app.main import app, created_envelope
+from app.models import Education, Skill, UserProfile, WorkExperience
+from app.profiles import build_profile_record, calculate_profile_score, generate_validation_report
+
+SKILLS_ADAPTER = TypeAdapter(List[Skill])
+EDUCATION_ADAPTER = TypeAdapter(List[Education])
+WORK_ADAPTER = TypeAdapter(List[WorkExperience])
+
+
+def build_cases(data: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    profile = UserProfile(**data)
+    score = calculate_profile_score(profile)
+    response_data, _ = build_profile_record(profile, score, user_id='user_bench')
+    timestamp = datetime.now().isoformat()
+    return {
+        'construct': lambda: UserProfile(**data),
+        'skills': lambda: SKILLS_ADAPTER.validate_python(data['skills']),
+        'education': lambda: EDUCATION_ADAPTER.validate_python(data['education']),
+        'work': lambda: WORK_ADAPTER.validate_python(data['work_experience']),
+        'score': lambda: calculate_profile_score(profile),
+        'report': lambda: generate_validation_report(profile),
+        'serialize': lambda: created_envelope.render(response_data, timestamp),
+    }
+
+
+def measure(func: Callable[[], Any], min_time: float, min_rounds: int) -> Dict[str, float]:
+    """测量单次调用的墙钟/CPU时间、峰值内存与分配块数"""
+    for _ in range(10):
+        func()
+
+    samples: List[int] = []
+    gc_before = gc.get_stats()[0]['collections']
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    while len(samples) < min_rounds or time.perf_counter() - wall_started < min_time:
+        started = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - started)
+    cpu = time.process_time() - cpu_started
+    gc_runs = gc.get_stats()[0]['collections'] - gc_before
+
+    # 内存：单次调用峰值与调用结果仍持有的分配块
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base_bytes = tracemalloc.get_traced_memory()[0]
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1] - base_bytes
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    retained_blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+    retained_bytes = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+    del result
+
+    samples.sort()
+    rounds = len(samples)
+    return {
+        'rounds': rounds,
+        'p50_us': round(samples[rounds // 2] / 1000, 3),
+        'p99_us': round(samples[min(rounds - 1, int(rounds * 0.99))] / 1000, 3),
+        'cpu_us': round(cpu / rounds * 1e6, 3),
+        'peak_bytes': peak,
+        'alloc_blocks': retained_blocks,
+        'alloc_bytes': retained_bytes,
+        'gc_gen0_per_1k': round(gc_runs * 1000 / rounds, 3),
+    }
+
+
+def environment() -> Dict[str, str]:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = ''
+    return {
+        'python': platform.python_version(),
+        'pydantic': pydantic.VERSION,
+        'platform': platform.platform(),
+        'git_revision': revision,
+        'timestamp': datetime.now().isoformat(),
+    }
+
+
+def print_results(results: Dict[str, Dict[str, Dict[str, float]]], previous: Dict = None) -> None:
+    header = f"{'size':>6} {'case':<11}{'p50 us':>11}{'p99 us':>11}{'cpu us':>11}{'peak B':>11}" \
+             f"{'blocks':>9}{'gc/1k':>8}"
+    print(header + ('   vs prev' if previous else ''))
+    for size, cases in results.items():
+        for case, r in cases.items():
+            line = (f"{size:>6} {case:<11}{r['p50_us']:>11.1f}{r['p99_us']:>11.1f}{r['cpu_us']:>11.1f}"
+                    f"{r['peak_bytes']:>11}{r['alloc_blocks']:>9}{r['gc_gen0_per_1k']:>8.2f}")
+            old = (previous or {}).get(size, {}).get(case)
+            if old and old['p50_us']:
+                line += f"{r['p50_us'] / old['p50_us']:>9.2f}x"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='模型校验/评分/报告/序列化微基准')
+    parser.add_argument('--sizes', default='1,10,50,100,500', help='skills与work_experience条目数')
+    parser.add_argument('--cases', default='', help='只运行指定阶段，逗号分隔')
+    parser.add_argument('--min-time', type=float, default=0.5, help='每项最少测量秒数')
+    parser.add_argument('--min-rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='', help='结果JSON路径（默认 benchmarks/results/microbench-<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果JSON对比p50')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    selected = {c.strip() for c in args.cases.split(',') if c.strip()}
+    factory = ProfileFactory(args.seed)
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with app.test_request_context():
+        for size in sizes:
+            data = factory.profile(n_skills=size, n_work=size)
+            cases = build_cases(data)
+            results[str(size)] = {name: measure(func, args.min_time, args.min_rounds)
+                                  for name, func in cases.items() if not selected or name in selected}
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)['results']
+    print_results(results, previous)
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"microbench-{datetime.now():%Y%m%d%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'sizes': sizes, 'results': results}, f, indent=2)
+    print(f"\n结果已写入 {output}")
+
+
+if __name__ == '__main__':
+    main()
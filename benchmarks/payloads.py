@@ -0,0 +1,102 @@
+"""
+基准测试共用的档案数据生成器
+以 sample_user_profile.json 与 create_sample_profile_data() 为模板，生成字段随机变化但符合UserProfile模型的档案
+"""
+
+import os
+import sys
+import copy
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+CITIES = [('北京市', '北京市', '北京'), ('上海市', '上海市', '上海'), ('杭州', '浙江省', '杭州'),
+          ('深圳市', '广东省', '深圳'), ('成都市', '四川省', '成都'), ('武汉市', '湖北省', '武汉')]
+SKILLS = ['Python', 'Java', 'Go', 'RAG', 'React', 'Docker', 'Kubernetes', '机器学习', '深度学习',
+          '数据库设计', '微服务架构', 'JavaScript', 'Rust', 'NLP', '知识图谱', 'Spark']
+DEGREES = ['本科', '学士', '硕士', '博士']
+SCHOOLS = ['清华大学', '复旦大学', '河南大学', '浙江大学', '上海交通大学', '武汉大学']
+COMPANIES = ['阿里巴巴', '腾讯科技', '字节跳动', '美团', '杭州鼎智', '华为']
+SURNAMES = '张王李赵刘陈杨黄周吴'
+GIVEN = ['伟', '芳', '娜', '敏', '静', '强', '磊', '洋', '艳', '勇', '军', '杰']
+
+
+def load_templates() -> List[Dict[str, Any]]:
+    """读取模板档案：sample_user_profile.json，以及（依赖可用时）前端测试脚本中的示例数据"""
+    with open(os.path.join(ROOT, 'sample_user_profile.json'), 'r', encoding='utf-8') as f:
+        templates = [json.load(f)]
+    try:
+        from app.fronted_api_test import create_sample_profile_data
+        templates.append(create_sample_profile_data())
+    except ImportError:  # 前端测试脚本依赖requests
+        pass
+    return templates
+
+
+class ProfileFactory:
+    """可复现的随机档案生成器"""
+
+    def __init__(self, seed: int = 42):
+        self.random = random.Random(seed)
+        self.templates = load_templates()
+        self.counter = 0
+
+    def profile(self, n_skills: Optional[int] = None, n_education: Optional[int] = None,
+                n_work: Optional[int] = None) -> Dict[str, Any]:
+        """生成一份档案；未指定数量时沿用模板中的条目数"""
+        rnd = self.random
+        self.counter += 1
+        data = copy.deepcopy(rnd.choice(self.templates))
+
+        data['personal_info']['name'] = rnd.choice(SURNAMES) + ''.join(rnd.sample(GIVEN, 2))
+        data['personal_info']['age'] = rnd.randint(20, 55)
+        data['contact']['email'] = f"user{self.counter}_{rnd.randint(0, 10**6)}@example.com"
+        data['contact']['phone'] = f"1{rnd.randint(3, 9)}{rnd.randint(0, 10**9 - 1):09d}"
+        city, state, location = rnd.choice(CITIES)
+        data['address'].update(city=city, state=state, postal_code=f"{rnd.randint(100000, 999999)}")
+        data['preferences']['work_location'] = location
+        data['preferences']['salary_expectation'] = rnd.randrange(8000, 80000, 1000)
+
+        data['skills'] = [self._skill(i) for i in range(n_skills or len(data['skills']))]
+        data['education'] = [self._education() for _ in range(n_education or len(data['education']))]
+        work_template = data['work_experience'][0] if data['work_experience'] else None
+        count = len(data['work_experience']) if n_work is None else n_work
+        data['work_experience'] = [self._work(work_template, i) for i in range(count)]
+        return data
+
+    def _skill(self, index: int) -> Dict[str, Any]:
+        rnd = self.random
+        name = SKILLS[index % len(SKILLS)] if index < len(SKILLS) else f"{rnd.choice(SKILLS)}-{index}"
+        return {
+            'name': name,
+            'level': rnd.randint(1, 10),
+            'years_experience': round(rnd.uniform(0, 15), 1),
+            'certifications': rnd.sample(['系统分析师', 'AWS认证', 'Python认证', 'PMP'], rnd.randint(0, 2))
+        }
+
+    def _education(self) -> Dict[str, Any]:
+        rnd = self.random
+        return {
+            'school': rnd.choice(SCHOOLS),
+            'degree': rnd.choice(DEGREES),
+            'major': rnd.choice(['计算机科学与技术', '软件工程', '人工智能', '数学']),
+            'graduation_date': f"{rnd.randint(2000, 2024)}-06-{rnd.randint(1, 28):02d}",
+            'gpa': round(rnd.uniform(2.5, 4.0), 2)
+        }
+
+    def _work(self, template: Optional[Dict[str, Any]], index: int) -> Dict[str, Any]:
+        rnd = self.random
+        year = rnd.randint(2005, 2022)
+        description = (template or {}).get('description') or '负责后端服务开发和系统性能优化工作'
+        return {
+            'company': rnd.choice(COMPANIES),
+            'position': rnd.choice(['软件工程师', 'AI算法工程师', '技术专家', '架构师']),
+            'start_date': f"{year}-{rnd.randint(1, 12):02d}-01",
+            'end_date': None if index == 0 else f"{year + rnd.randint(1, 3)}-{rnd.randint(1, 12):02d}-28",
+            'description': description,
+            'achievements': list((template or {}).get('achievements', []))[:rnd.randint(0, 3)]
+        }
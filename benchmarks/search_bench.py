@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+搜索索引基准：直接向 ProfileIndex 写入合成索引项，测量构建耗时、内存与查询延迟
+
+用法:
+    python benchmarks/search_bench.py [--profiles 1000000] [--queries 200]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import resource
+import gc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payloads import CITIES, DEGREES, SKILLS
+from app.search import ProfileIndex, ProfileTerms, SearchQuery, normalize, normalize_degree
+
+
+def synthetic_terms(rnd: random.Random) -> ProfileTerms:
+    skills = {normalize(name): rnd.randint(1, 10) for name in rnd.sample(SKILLS, rnd.randint(2, 8))}
+    city, _, location = rnd.choice(CITIES)
+    return ProfileTerms(
+        skills=tuple(skills.items()),
+        city=normalize(city),
+        degrees=tuple({normalize_degree(rnd.choice(DEGREES)) for _ in range(rnd.randint(1, 2))}),
+        work_location=normalize(location)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='档案搜索索引基准')
+    parser.add_argument('--profiles', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    index = ProfileIndex()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    started = time.perf_counter()
+    for i in range(args.profiles):
+        index.add(f"user_{i:09d}", synthetic_terms(rnd))
+    build = time.perf_counter() - started
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - rss_before
+    gc.collect()
+    gc.freeze()
+    print(f"built {len(index)} profiles in {build:.1f}s, ~{memory / 1024 / 1024:.0f} MiB RSS "
+          f"({memory / max(1, len(index)):.0f} B/profile)")
+
+    cases = {
+        'skill>=7 + city + degree': lambda: SearchQuery(
+            skills=((rnd.choice(SKILLS), 7),), city=rnd.choice(CITIES)[0], degree='本科'),
+        'two skills >=5': lambda: SearchQuery(skills=tuple((s, 5) for s in rnd.sample(SKILLS, 2))),
+        'city only': lambda: SearchQuery(city=rnd.choice(CITIES)[0]),
+        'skill>=9 + work_location': lambda: SearchQuery(
+            skills=((rnd.choice(SKILLS), 9),), work_location=rnd.choice(CITIES)[2]),
+    }
+    print(f"{'query':<28}{'avg hits':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, make in cases.items():
+        samples, hits = [], 0
+        for _ in range(args.queries):
+            query = make()
+            started = time.perf_counter()
+            total, _ = index.search(query, offset=rnd.choice([0, 20, 100]), limit=20)
+            samples.append(time.perf_counter() - started)
+            hits += total
+        samples.sort()
+        print(f"{name:<28}{hits // args.queries:>10}{samples[len(samples) // 2] * 1000:>9.2f}"
+              f"{samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
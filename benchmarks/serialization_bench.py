@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+序列化基准测试：旧路径（.dict() + jsonify）与单次遍历路径（Envelope / json_response）对比
+
+用法:
+    python benchmarks/serialization_bench.py [--iterations 5000]
+
+先校验两条路径输出逐字节一致，再输出每种示例档案的 p50/p99 延迟与单次调用的峰值内存分配。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+
+from app.main import app, create_sample_profile, created_envelope
+from app.models import UserProfile
+from app.profiles import build_profile_record, calculate_profile_score, generate_validation_report
+from app.responses import json_response
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_samples() -> Dict[str, UserProfile]:
+    """示例档案：sample_user_profile.json、create_sample_profile() 及放大后的大档案"""
+    with open(os.path.join(ROOT, 'sample_user_profile.json'), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    large = dict(data)
+    large['skills'] = data['skills'] * 25
+    large['work_experience'] = data['work_experience'] * 25
+    return {
+        'sample_user_profile.json': UserProfile(**data),
+        'create_sample_profile()': create_sample_profile(),
+        'large (100 skills / 50 jobs)': UserProfile(**large),
+    }
+
+
+def percentile(values: List[int], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index] / 1000.0
+
+
+def measure(func: Callable[[], bytes], iterations: int) -> Dict[str, float]:
+    """测量延迟分位数（微秒）与单次调用峰值分配（字节）"""
+    for _ in range(min(200, iterations)):
+        func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - started)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return {'p50_us': percentile(samples, 50), 'p99_us': percentile(samples, 99), 'peak_bytes': peak}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    with app.test_request_context():
+        for name, profile in load_samples().items():
+            response_data, _ = build_profile_record(profile, calculate_profile_score(profile))
+            report = generate_validation_report(profile)
+            timestamp = datetime.now().isoformat()
+            validate_payload = {
+                'success': True, 'message': '数据验证成功', 'user_id': response_data.user_id,
+                'validation_report': report, 'score': response_data.score, 'timestamp': timestamp
+            }
+
+            cases = {
+                'create/get envelope': (
+                    lambda: jsonify({'success': True, 'message': '用户档案创建成功',
+                                     'data': response_data.dict(), 'timestamp': timestamp}).get_data(),
+                    lambda: created_envelope.render(response_data, timestamp).encode()
+                ),
+                'validate payload': (
+                    lambda: jsonify(validate_payload).get_data(),
+                    lambda: json_response(validate_payload).get_data()
+                ),
+            }
+
+            print(f"\n== {name}")
+            for case, (legacy, fast) in cases.items():
+                assert legacy() == fast(), f"{case}: output differs from jsonify"
+                old = measure(legacy, args.iterations)
+                new = measure(fast, args.iterations)
+                print(f"  {case:<20} legacy p50={old['p50_us']:8.1f}us p99={old['p99_us']:8.1f}us "
+                      f"peak={old['peak_bytes']:>8}B | single-pass p50={new['p50_us']:8.1f}us "
+                      f"p99={new['p99_us']:8.1f}us peak={new['peak_bytes']:>8}B "
+                      f"({old['p50_us'] / new['p50_us']:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
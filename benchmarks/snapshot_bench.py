@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+档案快照基准：单次读取延迟（存储查询 vs 快照二分查找）与多worker读取时的内存占用
+
+用法:
+    python benchmarks/snapshot_bench.py [--profiles 100000] [--workers 4] [--database /tmp/export_bench.db]
+
+- 延迟：随机读取档案并拼接响应体，输出 p50/p99
+- 内存：fork出多个worker各自读取全部档案，统计各worker的私有内存增量（USS）与共享内存（快照页缓存）；
+  对比每个worker把全部响应体放入进程内缓存的做法
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_bench import populate
+from app.main import app, fetched_envelope
+from app.snapshot import Snapshot, build_snapshot
+from app.store import ProfileStore
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] / 1000.0
+
+
+def measure(func, user_ids):
+    samples = []
+    for user_id in user_ids:
+        started = time.perf_counter_ns()
+        func(user_id)
+        samples.append(time.perf_counter_ns() - started)
+    return f"p50={percentile(samples, 50):6.1f}us p99={percentile(samples, 99):6.1f}us"
+
+
+def memory_kib():
+    """当前进程的 (私有内存, 共享内存)，单位KiB（读取 /proc/self/smaps_rollup）"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    shared = values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+    return private, shared
+
+
+def worker(read, user_ids, pipe_w):
+    before = memory_kib()
+    read(user_ids)
+    after = memory_kib()
+    os.write(pipe_w, f"{after[0] - before[0]} {after[1]}\n".encode())
+    os._exit(0)
+
+
+def fork_workers(read, user_ids, workers):
+    results = []
+    for _ in range(workers):
+        pipe_r, pipe_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            worker(read, user_ids, pipe_w)
+        os.close(pipe_w)
+        with os.fdopen(pipe_r) as f:
+            results.append(tuple(map(int, f.read().split())))
+        os.waitpid(pid, 0)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--lookups', type=int, default=20_000)
+    parser.add_argument('--database', default='/tmp/export_bench.db')
+    parser.add_argument('--snapshot', default='/tmp/snapshot_bench.snapshot')
+    args = parser.parse_args()
+
+    store = ProfileStore(args.database)
+    populate(store, args.profiles, 42)
+    started = time.perf_counter()
+    count = build_snapshot(store, args.snapshot)
+    print(f"snapshot: {count} profiles, {os.path.getsize(args.snapshot) / 1024 / 1024:.1f} MB "
+          f"in {time.perf_counter() - started:.1f}s")
+    snapshot = Snapshot(args.snapshot)
+    user_ids = [user_id for user_id, _, _ in store.iter_by_user_id()]
+    sample = random.Random(1).choices(user_ids, k=args.lookups)
+
+    with app.app_context():
+        print("\n== lookup + render")
+        print(f"  store      {measure(lambda u: fetched_envelope.render_raw(store.get_document(u)).encode(), sample)}")
+        print(f"  snapshot   {measure(lambda u: fetched_envelope.render_raw_bytes(snapshot.find(u)[0]), sample)}")
+
+        def cache_all(ids):
+            return {u: fetched_envelope.render_raw(store.get_document(u)).encode() for u in ids}
+
+        def read_snapshot(ids):
+            for u in ids:
+                fetched_envelope.render_raw_bytes(snapshot.find(u)[0])
+
+        print(f"\n== memory per worker after reading all profiles ({args.workers} workers)")
+        for name, read in (('per-worker cache', cache_all), ('snapshot', read_snapshot)):
+            results = fork_workers(read, user_ids, args.workers)
+            private = sum(r[0] for r in results) / len(results)
+            shared = sum(r[1] for r in results) / len(results)
+            print(f"  {name:<17} private +{private / 1024:8.1f} MiB  shared {shared / 1024:8.1f} MiB")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
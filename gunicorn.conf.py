@@ -0,0 +1,94 @@
+"""
+AI Support System - gunicorn生产配置
+gunicorn 会自动加载当前目录下的 gunicorn.conf.py：
+
+    gunicorn app.main:app
+
+- worker/线程数按CPU数自动计算，可通过环境变量覆盖
+- preload_app：master进程加载应用并完成预热后再fork，Pydantic模型schema只构建一次，
+  子进程通过写时复制共享这些内存页
+- 每个worker在接收流量前再执行一次预热（建立自己的SQLite连接等）
+"""
+
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _cpu_count() -> int:
+    """当前进程可用的CPU数（考虑容器/taskset的CPU亲和性限制）"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+_cpus = _cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND') or \
+    f"{os.environ.get('FLASK_HOST', '0.0.0.0')}:{os.environ.get('FLASK_PORT', 5000)}"
+
+# 线程数 > 1 时使用gthread，I/O等待期间同一进程可继续处理其他请求；
+# app.workers.ThreadWorker 记录请求在线程池队列中的等待时间，供准入控制按排队时长降级
+threads = _env_int('GUNICORN_THREADS', 2)
+workers = _env_int('GUNICORN_WORKERS', (_cpus * 2 + 1) if threads == 1 else (_cpus + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'app.workers.ThreadWorker' if threads > 1 else 'sync')
+
+preload_app = True
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+backlog = _env_int('GUNICORN_BACKLOG', 2048)
+
+# 定期重启worker，防止内存缓慢增长；jitter避免所有worker同时重启
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 10000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 1000)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+_warmup_enabled = os.environ.get('GUNICORN_WARMUP', 'true').lower() == 'true'
+
+
+def _wsgi_app():
+    from app.main import app
+    return app
+
+
+def when_ready(server):
+    """master进程：应用已预加载，fork之前完成预热并冻结GC"""
+    if _warmup_enabled:
+        from app.warmup import warm_up
+        result = warm_up(_wsgi_app())
+        server.log.info(f"Pre-fork warm-up: {result['requests']} requests "
+                        f"in {result['elapsed_seconds'] * 1000:.1f}ms")
+        # master不处理请求，关闭预热时打开的全部SQLite连接（档案、任务表、ID租约表），子进程会自行重建
+        from app.main import close_connections
+        close_connections()
+    # 将已有对象移出GC跟踪，避免子进程中的GC扫描触发写时复制
+    gc.freeze()
+    server.log.info(f"Workers: {workers} x {threads} threads ({worker_class}), CPUs: {_cpus}")
+
+
+def post_fork(server, worker):
+    """子进程：重置本worker的运行统计"""
+    from app.main import worker_stats
+    worker_stats.reset()
+
+
+def post_worker_init(worker):
+    """子进程：接收流量前执行预热，随后重置统计并启动后台任务和读取同步线程"""
+    if _warmup_enabled:
+        from app.warmup import warm_up
+        warm_up(_wsgi_app())
+    from app.main import start_background_tasks, worker_stats
+    worker_stats.reset()
+    start_background_tasks()
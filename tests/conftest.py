@@ -0,0 +1,33 @@
+"""
+测试公共配置：导入应用前将存储和指标文件指向临时目录
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix='ai_support_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ['METRICS_MMAP_PATH'] = os.path.join(_TMP, 'metrics.bin')
+
+import json
+
+import pytest
+
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def sample_profile():
+    with open(os.path.join(ROOT, 'sample_user_profile.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
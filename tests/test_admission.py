@@ -0,0 +1,160 @@
+"""
+准入控制：令牌桶限流、按优先级排队的并发限制、按排队时长降级（gunicorn与asyncio模式）、拒绝响应与指标导出
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+
+import app.main as main
+from app.admission import AdmissionController, ConcurrencyLimiter, TokenBucket, request_queue_delay
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_token_bucket_reserve():
+    bucket = TokenBucket(rate=10, burst=4, now=0.0)
+    assert bucket.take(0.0, reserve=1) == 0
+    assert bucket.take(0.0, reserve=1) == 0
+    assert bucket.take(0.0, reserve=1) == 0
+    # 剩余的一个令牌保留给更高优先级
+    assert bucket.take(0.0, reserve=1) > 0
+    assert bucket.take(0.0) == 0
+    assert bucket.take(0.05) > 0
+    assert bucket.take(0.1) == 0
+
+
+def test_limiter_sheds_low_priority_first():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=4, queue_timeout=1.0)
+    assert limiter.acquire(1, 1.0) is None
+
+    order = []
+
+    def wait(priority):
+        if limiter.acquire(priority, 1.0) is None:
+            order.append(priority)
+            limiter.release()
+
+    threads = [threading.Thread(target=wait, args=(3,)), threading.Thread(target=wait, args=(1,))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    # 队列已有2个请求，bulk（可用比例0.25）不再排队，read仍可排队
+    assert limiter.acquire(3, 0.25) == 'queue_full'
+    limiter.release()
+    for thread in threads:
+        thread.join()
+    assert order == [1, 3]
+
+
+def test_rejection_response(client, monkeypatch):
+    monkeypatch.setattr(main, 'admission', AdmissionController(client_rate=1, client_burst=1))
+    assert client.get('/api/test').status_code == 200
+
+    response = client.get('/api/test')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['success'] is False
+    # 健康检查不受限流影响
+    assert client.get('/').status_code == 200
+    assert 'ai_support_admission_shed_total{priority="read",reason="client_rate"}' in \
+        client.get('/metrics').get_data(as_text=True)
+    assert main.admission.stats()['active'] == 0
+
+
+def test_queue_delay_sheds_by_priority(monkeypatch):
+    now = 1_700_000_001.0
+    assert request_queue_delay('t=1700000000.5', now) == 0.5
+    assert request_queue_delay('1700000000500', now) == 0.5
+    assert request_queue_delay('1700000000500000, t=1700000000.9', now) == 0.5
+    assert request_queue_delay('garbage', now) is None and request_queue_delay(None, now) is None
+
+    controller = AdmissionController(max_queue_delay=0.4)
+    assert controller.admit('bulk', 'c', 0.15).reason == 'queue_delay'
+    assert controller.admit('write', 'c', 0.15) is None
+    assert controller.admit('write', 'c', 0.3).reason == 'queue_delay'
+    assert controller.admit('read', 'c', 0.3) is None
+    assert controller.admit('critical', 'c', 10.0) is None
+
+    # 未配置并发上限时不限制并发（开发服务器每个请求一个线程）
+    monkeypatch.delenv('ADMISSION_MAX_CONCURRENT', raising=False)
+    controller = AdmissionController.from_env()
+    for _ in range(16):
+        assert controller.admit('read', 'c') is None
+    assert controller.stats()['active'] == 16
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def send_request(port, method, path, body=b'', content_length=None):
+    """发送请求后返回已连接的套接字；content_length 大于 body 长度时请求体未发送完"""
+    sock = socket.create_connection(('127.0.0.1', port), timeout=10)
+    length = len(body) if content_length is None else content_length
+    sock.sendall(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {length}\r\n\r\n".encode() + body)
+    return sock
+
+
+def read_status(sock):
+    with sock, sock.makefile('rb') as response:
+        return int(response.readline().split()[1])
+
+
+def test_gunicorn_sheds_requests_queued_behind_busy_threads(tmp_path):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_WORKERS='1', GUNICORN_THREADS='2',
+               GUNICORN_WARMUP='false', ADMISSION_MAX_QUEUE_DELAY='0.2', LOG_ACCESS='false',
+               DATABASE_URL=f"sqlite:///{tmp_path / 'gunicorn.db'}",
+               METRICS_MMAP_PATH=str(tmp_path / 'metrics.bin'))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app.main:app'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if read_status(send_request(port, 'GET', '/')) == 200:
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+        # 两个请求体未发送完的请求占满worker的2个处理线程
+        stalled = [send_request(port, 'POST', '/api/echo', b'{"a"', content_length=8) for _ in range(2)]
+        time.sleep(0.3)
+        queued_read = send_request(port, 'GET', '/api/test')
+        queued_health = send_request(port, 'GET', '/')
+        time.sleep(0.5)
+        for sock in stalled:
+            sock.sendall(b': 1}')
+        assert [read_status(sock) for sock in stalled] == [200, 200]
+        # 排队超过上限的读取请求被拒绝，健康检查不受影响
+        assert read_status(queued_read) == 503
+        assert read_status(queued_health) == 200
+        assert read_status(send_request(port, 'GET', '/api/test')) == 200
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def test_admitted_counter_is_exact_under_contention():
+    controller = AdmissionController(max_concurrent=64)
+
+    def admit():
+        for _ in range(2000):
+            assert controller.admit('read', 'client') is None
+            controller.release()
+
+    threads = [threading.Thread(target=admit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert controller.stats()['admitted']['read'] == 16000
@@ -0,0 +1,148 @@
+"""
+asyncio适配器：请求体流式交给 wsgi.input、背压、大小上限返回413、未知长度请求体、客户端断开、
+处理线程繁忙时按排队时长降级
+"""
+
+import asyncio
+import json
+
+import app.main as main
+from app.admission import AdmissionController
+from app.asgi import RequestBody, WSGIToASGI
+from app.main import app
+
+
+def scope(method='POST', path='/api/echo', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+            'headers': [(b'content-type', b'application/json'), *headers]}
+
+
+async def call(adapter, request_scope, messages):
+    """依次交付 messages（可为协程函数，在交付前等待），返回 (状态码, 响应体)"""
+    pending = list(messages)
+    sent = []
+
+    async def receive():
+        if not pending:
+            await asyncio.Event().wait()
+        message = pending.pop(0)
+        return await message() if callable(message) else message
+
+    async def send(message):
+        sent.append(message)
+
+    await adapter(request_scope, receive, send)
+    status = next(m['status'] for m in sent if m['type'] == 'http.response.start')
+    return status, b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+
+
+def chunk(data, more=True):
+    return {'type': 'http.request', 'body': data, 'more_body': more}
+
+
+def test_body_is_streamed_to_the_view():
+    async def run():
+        loop = asyncio.get_running_loop()
+        first_read = asyncio.Event()
+        received = []
+
+        def wsgi_app(environ, start_response):
+            stream = environ['wsgi.input']
+            received.append(stream.read(5))
+            loop.call_soon_threadsafe(first_read.set)
+            received.append(stream.read())
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'|'.join(received)]
+
+        async def last_chunk():
+            # 视图读到第一块之前不交付最后一块：整体缓存请求体时这里会一直等待
+            await asyncio.wait_for(first_read.wait(), timeout=5)
+            return chunk(b'world', more=False)
+
+        return await call(WSGIToASGI(wsgi_app, max_workers=2), scope(), [chunk(b'hello'), last_chunk])
+
+    assert asyncio.run(run()) == (200, b'hello|world')
+
+
+def test_flask_app_reads_chunked_body():
+    adapter = WSGIToASGI(app, max_workers=2)
+    payload = json.dumps({'name': '流式', 'items': list(range(200))}).encode('utf-8')
+    parts = [chunk(payload[i:i + 100]) for i in range(0, len(payload), 100)] + [chunk(b'', more=False)]
+    status, body = asyncio.run(call(adapter, scope(), parts))
+    assert status == 200
+    assert json.loads(body)['received_data']['items'] == list(range(200))
+
+
+def test_body_size_limit():
+    calls = []
+
+    def wsgi_app(environ, start_response):
+        calls.append(environ['wsgi.input'].read())
+        start_response('200 OK', [])
+        return [b'ok']
+
+    adapter = WSGIToASGI(wsgi_app, max_workers=2, max_body_size=10)
+    # 声明的长度超过上限：不调用视图直接返回413
+    status, body = asyncio.run(call(adapter, scope(headers=[(b'content-length', b'11')]),
+                                    [chunk(b'x' * 11, more=False)]))
+    assert status == 413 and json.loads(body)['success'] is False and calls == []
+
+    # 未声明长度，接收过程中超过上限
+    status, _ = asyncio.run(call(adapter, scope(), [chunk(b'x' * 6), chunk(b'x' * 6, more=False)]))
+    assert status == 413
+
+    status, body = asyncio.run(call(adapter, scope(headers=[(b'content-length', b'10')]),
+                                    [chunk(b'x' * 10, more=False)]))
+    assert (status, body) == (200, b'ok') and calls[-1] == b'x' * 10
+
+
+def test_backpressure_and_disconnect():
+    async def run():
+        body = RequestBody(asyncio.get_running_loop(), max_buffer=5)
+        await body.put(b'ab')
+        put = asyncio.ensure_future(body.put(b'cdef'))
+        await asyncio.sleep(0.01)
+        # 缓冲达到上限，接收暂停直到处理线程读走数据
+        assert not put.done()
+        data = await asyncio.get_running_loop().run_in_executor(None, body.read, 3)
+        await asyncio.wait_for(put, timeout=5)
+        body.finish(ConnectionResetError('client gone'))
+        rest = body.read(10)
+        try:
+            body.read(10)
+        except ConnectionResetError:
+            return data, rest, True
+        return data, rest, False
+
+    # 每次最多读取一个已接收的分块
+    assert asyncio.run(run()) == (b'ab', b'cdef', True)
+
+    async def disconnected():
+        return await call(WSGIToASGI(app, max_workers=2), scope(),
+                          [chunk(b'{"a"'), {'type': 'http.disconnect'}])
+
+    status, _ = asyncio.run(disconnected())
+    assert status == 400
+
+
+def test_asgi_sheds_requests_queued_behind_busy_threads(monkeypatch):
+    monkeypatch.setattr(main, 'admission', AdmissionController(max_queue_delay=0.2))
+
+    async def run():
+        adapter = WSGIToASGI(app, max_workers=1)
+        release = asyncio.Event()
+
+        async def last_chunk():
+            await release.wait()
+            return chunk(b': 1}', more=False)
+
+        # 第一个请求等待请求体，占住唯一的处理线程
+        busy = asyncio.ensure_future(call(adapter, scope(), [chunk(b'{"a"'), last_chunk]))
+        await asyncio.sleep(0.1)
+        queued = asyncio.ensure_future(call(adapter, scope('GET', '/api/test'), [chunk(b'', more=False)]))
+        await asyncio.sleep(0.4)
+        release.set()
+        return (await busy)[0], (await queued)[0]
+
+    assert asyncio.run(run()) == (200, 503)
+    assert main.admission.stats()['shed']['queue_delay']['read'] == 1
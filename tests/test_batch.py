@@ -0,0 +1,77 @@
+"""
+NDJSON批量接口：逐行结果、分块输出、验证模式不写入、超长行
+"""
+
+import io
+import copy
+import json
+import zlib
+
+import pytest
+
+import app.main as main
+from app.main import iter_ndjson_lines
+
+
+def profile_line(sample, email):
+    data = copy.deepcopy(sample)
+    # 姓名和联系方式都不同，不会被去重索引当作其他用例档案的重复
+    data['personal_info']['name'] = f"批量{email.split('@')[0]}"
+    data['contact']['email'] = email
+    data['contact']['phone'] = f"136{zlib.crc32(email.encode()) % 10 ** 8:08d}"
+    return json.dumps(data, ensure_ascii=False)
+
+
+def post_batch(client, lines, mode=None):
+    url = '/api/user-profiles/batch' + (f"?mode={mode}" if mode else '')
+    response = client.post(url, data='\n'.join(lines).encode('utf-8'))
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_create_reports_each_line(client, sample_profile, monkeypatch):
+    monkeypatch.setitem(main.app.config, 'BATCH_CHUNK_SIZE', 2)
+    invalid = copy.deepcopy(sample_profile)
+    del invalid['contact']
+    lines = [profile_line(sample_profile, 'batch1@example.com'), '{not json', '', '[1, 2]',
+             json.dumps(invalid, ensure_ascii=False), profile_line(sample_profile, 'batch2@example.com')]
+
+    results = post_batch(client, lines)
+    # 空行不产生结果，行号对应输入中的位置
+    assert [item['line'] for item in results] == [1, 2, 4, 5, 6]
+    assert [item['success'] for item in results] == [True, False, False, False, True]
+    assert results[1]['error']['type'] == 'invalid_json'
+    assert results[3]['error']['type'] == 'validation_error'
+    assert 'input' not in results[3]['error']['details'][0]
+
+    for item in (results[0], results[4]):
+        document = json.loads(main.profile_store.get_document(item['user_id']))
+        assert document['score'] == item['score']
+
+
+def test_batch_validate_does_not_store(client, sample_profile):
+    before = main.profile_store.count()
+    results = post_batch(client, [profile_line(sample_profile, f"validate{i}@example.com") for i in range(3)],
+                         mode='validate')
+    assert all(item['success'] and item['score'] > 0 for item in results)
+    assert main.profile_store.count() == before
+
+    response = client.post('/api/user-profiles/batch?mode=upsert', data=b'{}')
+    assert response.status_code == 400 and response.get_json()['success'] is False
+
+
+def test_batch_rejects_long_lines(client, sample_profile, monkeypatch):
+    line = profile_line(sample_profile, 'long@example.com')
+    monkeypatch.setitem(main.app.config, 'BATCH_MAX_LINE_BYTES', len(line.encode('utf-8')) - 1)
+    results = post_batch(client, [line, '{}'], mode='validate')
+    assert results[0]['error']['type'] == 'line_too_long'
+    assert results[1]['line'] == 2 and results[1]['error']['type'] == 'validation_error'
+
+
+@pytest.mark.parametrize('body, expected', [
+    (b'a\nbb\n', [b'a\n', b'bb\n']),
+    (b'a\n' + b'x' * 10 + b'\nb', [b'a\n', None, b'b']),
+    (b'', []),
+])
+def test_iter_ndjson_lines(body, expected):
+    assert list(iter_ndjson_lines(io.BytesIO(body), 4)) == expected
@@ -0,0 +1,87 @@
+"""
+批量导入：被拒行写入错误文件、中断后继续导入不产生重复档案、与在线创建相同查找近重复档案
+"""
+
+import copy
+import json
+
+from app.bulk_import import load_checkpoint, run_import, save_checkpoint
+from app.store import ProfileStore
+
+
+def write_input(path, sample, count, bad_lines=()):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            data = copy.deepcopy(sample)
+            data.pop('user_id', None)
+            data['contact']['email'] = f"import{i}@example.com"
+            if i in bad_lines:
+                data['user_id'] = 123
+            f.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+
+def run(tmp_path, database_path, input_path, resume=True, dedup_mode='off'):
+    return run_import(str(input_path), database_path, workers=2, chunk_size=4,
+                      errors_path=str(tmp_path / 'errors.jsonl'),
+                      checkpoint_path=str(tmp_path / 'checkpoint'), resume=resume, progress_every=0,
+                      dedup_mode=dedup_mode)
+
+
+def test_invalid_user_id_is_rejected_not_fatal(tmp_path, sample_profile):
+    database_path = str(tmp_path / 'import.db')
+    input_path = tmp_path / 'profiles.jsonl'
+    write_input(input_path, sample_profile, 10, bad_lines={3})
+
+    summary = run(tmp_path, database_path, input_path)
+    assert summary['imported'] == 9 and summary['rejected'] == 1
+    with open(tmp_path / 'errors.jsonl', encoding='utf-8') as f:
+        errors = [json.loads(line) for line in f]
+    assert [item['line'] for item in errors] == [4]
+    assert errors[0]['error']['type'] == 'validation_error'
+    assert ProfileStore(database_path).count() == 9
+
+
+def test_resume_overwrites_instead_of_duplicating(tmp_path, sample_profile):
+    database_path = str(tmp_path / 'import.db')
+    input_path = tmp_path / 'profiles.jsonl'
+    write_input(input_path, sample_profile, 10)
+    run(tmp_path, database_path, input_path)
+    store = ProfileStore(database_path)
+    user_ids = sorted(user_id for user_id, _, _ in store.iter_by_user_id())
+
+    # 模拟块已写入但检查点未推进时中断：回退检查点后继续导入
+    checkpoint = load_checkpoint(str(tmp_path / 'checkpoint'))
+    save_checkpoint(str(tmp_path / 'checkpoint'), dict(checkpoint, offset=0, line=0))
+    assert run(tmp_path, database_path, input_path)['imported'] == 10
+    assert sorted(user_id for user_id, _, _ in store.iter_by_user_id()) == user_ids
+
+
+def test_merge_mode_merges_exact_duplicates(tmp_path, sample_profile):
+    database_path = str(tmp_path / 'import.db')
+    existing = tmp_path / 'existing.jsonl'
+    write_input(existing, sample_profile, 1)
+    run(tmp_path, database_path, existing)
+    store = ProfileStore(database_path)
+    [(user_id, document, _)] = list(store.iter_by_user_id())
+    created_at = json.loads(document)['created_at']
+
+    # 与已有档案相同的行合并进已有档案，同一块中重复的行也只保留一份
+    input_path = tmp_path / 'profiles.jsonl'
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for name, email, phone in (('', 'import0@example.com', ''), ('王五', 'other@example.com', '13900000001'),
+                                   ('王五', 'other@example.com', '13900000001')):
+            data = copy.deepcopy(sample_profile)
+            data.pop('user_id', None)
+            data['contact']['email'] = email
+            if name:
+                data['personal_info']['name'], data['contact']['phone'] = name, phone
+            f.write(json.dumps(data, ensure_ascii=False) + '\n')
+    summary = run(tmp_path, database_path, input_path, resume=False, dedup_mode='merge')
+    assert summary['imported'] == 3 and summary['duplicates'] == 2 and summary['merged'] == 2
+    documents = {uid: json.loads(doc) for uid, doc, _ in store.iter_by_user_id()}
+    assert len(documents) == 2 and documents[user_id]['created_at'] == created_at
+
+    # flag 模式只计数，照常写入
+    summary = run(tmp_path, database_path, input_path, resume=False, dedup_mode='flag')
+    assert summary['duplicates'] == 3 and summary['merged'] == 0
+    assert store.count() == 5
@@ -0,0 +1,136 @@
+"""
+客户端SDK：连接复用、被拒绝后重试、批量接口与并发调用、asyncio版本
+"""
+
+import copy
+import time
+import asyncio
+import threading
+import http.client
+
+import pytest
+from werkzeug.serving import make_server
+
+from app import main
+from app.admission import Rejection
+from app.client import APIError, AsyncProfileClient, ProfileClient
+
+
+@pytest.fixture
+def server():
+    main.app.config['TESTING'] = True
+    httpd = make_server('127.0.0.1', 0, main.app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    thread.join()
+
+
+def make_profiles(sample_profile, count):
+    profiles = []
+    for i in range(count):
+        data = copy.deepcopy(sample_profile)
+        data.pop('user_id', None)
+        # 姓名和联系方式都不同，不会被去重索引当作其他用例档案的重复
+        data['personal_info']['name'] = f"客户{i}"
+        data['contact']['email'] = f"client{i}@example.com"
+        data['contact']['phone'] = f"139{i:08d}"
+        profiles.append(data)
+    return profiles
+
+
+def test_create_get_validate(server, sample_profile):
+    profile = make_profiles(sample_profile, 1)[0]
+    with ProfileClient(server, backoff=0) as client:
+        created = client.create_profile(profile)
+        assert client.get_profile(created['user_id'])['user_id'] == created['user_id']
+        assert client.validate_profile(created['user_id'], profile)['success'] is True
+        with pytest.raises(APIError) as excinfo:
+            client.get_profile('user_missing')
+        assert excinfo.value.status == 404
+
+
+def test_retries_rejected_write(server, sample_profile, monkeypatch):
+    admit = main.admission.admit
+    calls = []
+
+    def reject_once(priority, client, queue_delay=None):
+        calls.append(priority)
+        if len(calls) == 1:
+            return Rejection(503, 'queue_full', 0)
+        return admit(priority, client, queue_delay)
+
+    monkeypatch.setattr(main.admission, 'admit', reject_once)
+    with ProfileClient(server, backoff=0) as client:
+        assert client.create_profile(make_profiles(sample_profile, 1)[0])['user_id']
+    assert len(calls) == 2
+
+
+class StaleConnection:
+    """已被服务端关闭的空闲连接：请求写出后读不到响应"""
+    sock = None
+    timeout = None
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, path, body=None, headers=None):
+        self.requests.append(method)
+
+    def getresponse(self):
+        raise http.client.RemoteDisconnected('Remote end closed connection without response')
+
+    def close(self):
+        pass
+
+
+def test_stale_connection_resends_only_idempotent(server, sample_profile):
+    with ProfileClient(server, backoff=0) as client:
+        stale = StaleConnection()
+        client.pool._idle.put((stale, time.monotonic()))
+        assert client.health()
+        assert stale.requests == ['GET']
+
+        # 创建请求可能已被处理，不自动重发
+        before = main.profile_store.count()
+        stale = StaleConnection()
+        client.pool._idle.put((stale, time.monotonic()))
+        with pytest.raises(http.client.RemoteDisconnected):
+            client.create_profile(make_profiles(sample_profile, 1)[0])
+        assert stale.requests == ['POST'] and main.profile_store.count() == before
+
+
+def test_fan_out(server, sample_profile):
+    profiles = make_profiles(sample_profile, 25)
+    invalid = copy.deepcopy(profiles[0])
+    del invalid['contact']
+    with ProfileClient(server, backoff=0, pool_size=4) as client:
+        results = client.create_many(profiles[:20] + [invalid], concurrency=4, batch_size=6)
+        assert [result['success'] for result in results] == [True] * 20 + [False]
+        user_ids = [result['user_id'] for result in results[:20]]
+
+        fetched = client.get_many(user_ids + ['user_missing'], concurrency=4)
+        assert [item['user_id'] for item in fetched[:20]] == user_ids
+        assert isinstance(fetched[-1], APIError) and fetched[-1].status == 404
+
+        created = client.create_many(profiles[20:], concurrency=4, use_batch=False)
+        validated = client.validate_many([(item['user_id'], profile) for item, profile
+                                          in zip(created, profiles[20:])], concurrency=4)
+        assert all(body['success'] for body in validated)
+
+
+def test_async_client(server, sample_profile):
+    profiles = make_profiles(sample_profile, 12)
+
+    async def run():
+        async with AsyncProfileClient(base_url=server, backoff=0, pool_size=4) as client:
+            created = await client.create_many(profiles[:10], concurrency=3, batch_size=4)
+            single = await client.create_profile(profiles[10])
+            user_ids = [item['user_id'] for item in created] + [single['user_id']]
+            fetched = await client.get_many(user_ids, concurrency=3)
+            return user_ids, fetched
+
+    user_ids, fetched = asyncio.run(run())
+    assert len(user_ids) == 11
+    assert [item['user_id'] for item in fetched] == user_ids
@@ -0,0 +1,49 @@
+"""
+档案紧凑内存表示：与API模型互相转换、字符串池共享
+"""
+
+import copy
+
+from app.compact import CompactProfile, strings
+from app.models import UserProfile
+from app.profiles import calculate_profile_score, dumps_document
+
+
+def test_round_trip(sample_profile):
+    data = copy.deepcopy(sample_profile)
+    data['work_experience'].append({'company': '华为', 'position': '架构师', 'start_date': '2015-03-01',
+                                    'description': '负责分布式存储系统设计', 'achievements': []})
+    data['education'][0]['gpa'] = None
+    profile = UserProfile(**data)
+
+    restored = CompactProfile.from_model(profile).to_model()
+    assert dumps_document(restored) == dumps_document(profile)
+    assert restored.model_dump() == profile.model_dump()
+    assert calculate_profile_score(restored) == calculate_profile_score(profile)
+
+    # 还原出的可变取值与常驻数据互不影响
+    restored.preferences['industry'] = 'changed'
+    assert CompactProfile.from_model(profile).to_model().preferences == profile.preferences
+
+
+def test_shared_values(sample_profile):
+    first = CompactProfile.from_model(UserProfile(**copy.deepcopy(sample_profile)))
+    second = CompactProfile.from_model(UserProfile(**copy.deepcopy(sample_profile)))
+    assert first.city is second.city
+    assert first.education[0].school is second.education[0].school
+    assert first.personal_keys is second.personal_keys
+    assert list(first.skill_names) == list(second.skill_names)
+    assert strings.string(first.skill_names[0]) == sample_profile['skills'][0]['name']
+    assert first.education[0].graduation == UserProfile(**sample_profile).education[0].graduation_date.toordinal()
+    assert not hasattr(first, '__dict__')
+
+
+def test_free_values_interned_only_for_listed_keys(sample_profile):
+    CompactProfile.from_model(UserProfile(**copy.deepcopy(sample_profile)))
+    interned = strings.stats()['interned']
+    data = copy.deepcopy(sample_profile)
+    # 姓名各不相同，不进入只增不减的字符串池
+    data['personal_info']['name'] = '赵六七'
+    compact = CompactProfile.from_model(UserProfile(**data))
+    assert strings.stats()['interned'] == interned
+    assert compact.to_model().personal_info['name'] == '赵六七'
@@ -0,0 +1,169 @@
+"""
+近重复档案检测：MinHash LSH索引、创建/批量导入时的标记与合并、离线去重
+"""
+
+import copy
+import json
+
+from app import dedup
+from app.dedup import DedupIndex, find_duplicate_groups
+from app.fulltext import FullTextIndex
+from app.main import app
+from app.matching import MatchingEngine
+from app.models import JobRequirement, UserProfile
+from app.profiles import build_profile_record
+from app.search import ProfileIndex, SearchQuery
+from app.snapshot import SnapshotStore, build_snapshot
+from app.store import ChangeFeed, ProfileStore
+
+
+def near_duplicate(sample, email='dup@example.com', phone='13900001111'):
+    data = copy.deepcopy(sample)
+    data['contact']['email'] = email
+    data['contact']['phone'] = phone
+    data['work_experience'][0]['achievements'][0] = '参与双11大促系统优化，QPS提升了35%'
+    return data
+
+
+def other_person(sample):
+    data = copy.deepcopy(sample)
+    data['personal_info']['name'] = '王五'
+    data['contact']['email'] = 'wangwu@example.com'
+    data['education'] = [{'school': '浙江大学', 'degree': '本科', 'major': '自动化',
+                          'graduation_date': '2016-06-01'}]
+    for work in data['work_experience']:
+        work['company'] = '网易'
+    return data
+
+
+def test_index_finds_near_duplicates_only(sample_profile):
+    index = DedupIndex()
+    fingerprint = index.fingerprint_from_document(sample_profile)
+    index.add('original', fingerprint)
+
+    found = index.find(index.fingerprint_from_document(near_duplicate(sample_profile)))
+    assert [item['user_id'] for item in found] == ['original']
+    assert found[0]['similarity'] >= 0.8
+    assert index.find(index.fingerprint_from_document(other_person(sample_profile))) == []
+    assert index.find(fingerprint, exclude='original') == []
+
+    # 描述、学历、工作经历完全相同但姓名和联系方式都不同，不视为同一人
+    stranger = near_duplicate(sample_profile)
+    stranger['personal_info']['name'] = '赵六'
+    assert index.find(index.fingerprint_from_document(stranger)) == []
+
+    assert index.remove('original')
+    assert index.find(fingerprint) == []
+
+
+def test_create_flag_and_merge(client, sample_profile):
+    first = client.post('/api/user-profile', json=near_duplicate(sample_profile, 'merge1@example.com'))
+    user_id = first.get_json()['data']['user_id']
+
+    flagged = client.post('/api/user-profile', json=near_duplicate(sample_profile, 'merge2@example.com'))
+    assert flagged.status_code == 201
+    assert user_id in [item['user_id'] for item in flagged.get_json()['data']['duplicates']]
+
+    app.config['DEDUP_MODE'] = 'merge'
+    try:
+        merged = client.post('/api/user-profile', json=near_duplicate(sample_profile, 'merge3@example.com'))
+    finally:
+        app.config['DEDUP_MODE'] = 'flag'
+    assert merged.status_code == 200
+    body = merged.get_json()
+    assert body['data']['user_id'] in {user_id, flagged.get_json()['data']['user_id']}
+    assert body['data']['profile']['contact']['email'] == 'merge3@example.com'
+
+
+def test_batch_flags_duplicates_within_chunk(client, sample_profile):
+    lines = [json.dumps(near_duplicate(sample_profile, f"batchdup{i}@example.com")) for i in range(2)]
+    response = client.post('/api/user-profiles/batch', data='\n'.join(lines))
+    first, second = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert first['user_id'] in [item['user_id'] for item in second['duplicates']]
+
+
+def test_offline_groups(tmp_path, sample_profile):
+    store = ProfileStore(str(tmp_path / 'dedup.db'))
+    for user_id, data, updated_at in [('a', sample_profile, '2024-01-01T00:00:00'),
+                                      ('b', other_person(sample_profile), '2024-01-02T00:00:00'),
+                                      ('c', near_duplicate(sample_profile), '2024-01-03T00:00:00')]:
+        store.put(user_id, data['contact']['email'], data['contact']['phone'],
+                  json.dumps({'profile': data}), updated_at, updated_at)
+    groups = find_duplicate_groups(store, DedupIndex())
+    assert [[user_id for user_id, _ in group] for group in groups] == [['a', 'c']]
+    store.close()
+
+
+def person(sample, name, email):
+    data = near_duplicate(sample, email, phone=f"137{sum(map(ord, name)):08d}")
+    data['personal_info']['name'] = name
+    return data
+
+
+def test_merge_keeps_created_at_and_skips_deleted_targets(client, sample_profile):
+    import time
+    import app.main as main
+
+    original = client.post('/api/user-profile', json=person(sample_profile, '钱七', 'qian1@example.com'))
+    original = original.get_json()['data']
+    deleted = client.post('/api/user-profile', json=person(sample_profile, '孙八', 'sun1@example.com'))
+    deleted_id = deleted.get_json()['data']['user_id']
+    # 离线去重 --apply 直接删除存储中的档案，运行中的worker的去重索引仍保留该档案
+    assert main.profile_store.delete(deleted_id)
+    time.sleep(1.01)
+
+    app.config['DEDUP_MODE'] = 'merge'
+    try:
+        merged = client.post('/api/user-profile', json=person(sample_profile, '钱七', 'qian2@example.com'))
+        recreated = client.post('/api/user-profile', json=person(sample_profile, '孙八', 'sun2@example.com'))
+        lines = [json.dumps(person(sample_profile, '周九', f"zhou{i}@example.com")) for i in range(2)]
+        batch = client.post('/api/user-profiles/batch', data='\n'.join(lines))
+    finally:
+        app.config['DEDUP_MODE'] = 'flag'
+
+    assert merged.status_code == 200
+    data = merged.get_json()['data']
+    assert data['user_id'] == original['user_id']
+    assert data['created_at'] == original['created_at'] and data['updated_at'] != original['updated_at']
+    stored = json.loads(main.profile_store.get_document(original['user_id']))
+    assert stored['created_at'] == original['created_at']
+
+    assert recreated.status_code == 201
+    assert recreated.get_json()['data']['user_id'] != deleted_id
+    assert main.profile_store.get_document(deleted_id) is None
+
+    first, second = [json.loads(line) for line in batch.get_data(as_text=True).splitlines()]
+    assert second['merged_into'] == first['user_id'] == second['user_id']
+
+
+def test_apply_removes_deleted_profiles_from_running_indexes(tmp_path, sample_profile):
+    path = tmp_path / 'apply.db'
+    store = ProfileStore(str(path))
+    user_ids = []
+    for data in (sample_profile, other_person(sample_profile), near_duplicate(sample_profile)):
+        _, record = build_profile_record(UserProfile(**data), 80.0)
+        store.put(*record)
+        user_ids.append(record[0])
+    original, other, duplicate = user_ids
+
+    # 运行中的worker：各索引、快照覆盖层和缓存的删除同步都已加载
+    search, match, fulltext = ProfileIndex(), MatchingEngine(), FullTextIndex()
+    snapshot = SnapshotStore(str(tmp_path / 'profiles.snapshot'), check_interval=0, refresh_interval=0)
+    build_snapshot(store, snapshot.path)
+    deletions = ChangeFeed()
+    for index in (search, match, fulltext, snapshot):
+        index.refresh(store, force=True)
+    assert deletions.poll_deleted(store) == []
+
+    assert dedup.main(['--database-url', f"sqlite:///{path}", '--apply']) == 0
+    assert store.get_document(original) is None
+
+    for index in (search, match, fulltext, snapshot):
+        index.refresh(store, force=True)
+    assert search.search(SearchQuery(skills=(('Java', 1),)))[1] == [other, duplicate]
+    job = JobRequirement(required_skills=[{'name': 'Java', 'min_level': 1}], top_k=10)
+    assert sorted(item['user_id'] for item in match.match(job)[1]) == sorted([other, duplicate])
+    assert sorted(user_id for user_id, _ in fulltext.search('微服务')[1]) == sorted([other, duplicate])
+    assert snapshot.get(original) is None and snapshot.get(duplicate) is not None
+    assert deletions.poll_deleted(store) == [original]
+    store.close()
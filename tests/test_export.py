@@ -0,0 +1,62 @@
+"""
+全量导出：NDJSON/CSV流式输出、gzip压缩、按user_id续传
+"""
+
+import csv
+import copy
+import gzip
+import io
+import json
+
+from app.export import csv_header, export_chunks
+
+
+def create(client, sample, email):
+    data = copy.deepcopy(sample)
+    data['contact']['email'] = email
+    return client.post('/api/user-profile', json=data).get_json()['data']['user_id']
+
+
+def test_export_ndjson_and_resume(client, sample_profile):
+    user_ids = [create(client, sample_profile, f'export{i}@example.com') for i in range(3)]
+
+    response = client.get('/api/user-profiles/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    documents = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    exported = [document['user_id'] for document in documents]
+    assert exported == sorted(exported) and set(user_ids) <= set(exported)
+    assert documents[exported.index(user_ids[0])]['profile']['contact']['email'] == 'export0@example.com'
+
+    resumed = client.get(f'/api/user-profiles/export?after={exported[0]}').get_data(as_text=True)
+    assert [json.loads(line)['user_id'] for line in resumed.splitlines()] == exported[1:]
+
+
+def test_export_csv_gzip(client, sample_profile):
+    user_id = create(client, sample_profile, 'export-csv@example.com')
+
+    response = client.get('/api/user-profiles/export?format=csv&max_items=2&gzip=true')
+    assert response.headers['Content-Type'] == 'application/gzip'
+    assert response.headers['Content-Disposition'].endswith('.csv.gz"')
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.get_data()).decode('utf-8'))))
+    row = next(row for row in rows if row['user_id'] == user_id)
+    assert row['email'] == 'export-csv@example.com'
+    assert row['skills_count'] == str(len(sample_profile['skills']))
+    assert row['skills_1_name'] == sample_profile['skills'][0]['name']
+    assert row['education_1_graduation_date'] == sample_profile['education'][0]['graduation_date']
+    assert 'skills_3_name' not in row
+
+    response = client.get('/api/user-profiles/export?format=csv&explode=rows')
+    assert response.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    rows = [row for row in csv.DictReader(io.StringIO(response.get_data(as_text=True))) if row['user_id'] == user_id]
+    assert len(rows) == sum(len(sample_profile[s]) for s in ('skills', 'education', 'work_experience'))
+
+    assert client.get('/api/user-profiles/export?format=xml').status_code == 400
+
+
+def test_export_chunks_are_bounded():
+    document = json.dumps({'user_id': 'u', 'profile': {'skills': [{'name': 'Python'}]}})
+    rows = ((f'u{i}', document, '') for i in range(10000))
+    sizes = [len(chunk) for chunk in export_chunks(rows, 'csv', chunk_size=4096)]
+    assert len(sizes) > 10 and max(sizes) < 4096 + 1024
+    assert csv_header('rows', 3)[:3] == ['user_id', 'section', 'item_index']
@@ -0,0 +1,127 @@
+"""
+工作经历全文检索：分词、BM25索引与接口
+"""
+
+import copy
+
+import numpy as np
+
+import app.fulltext as fulltext
+import app.main as main
+from app.fulltext import FullTextIndex, tokenize
+
+
+def make_profile(sample, email, description, achievements):
+    data = copy.deepcopy(sample)
+    data['contact']['email'] = email
+    data['work_experience'] = data['work_experience'][:1]
+    data['work_experience'][0]['description'] = description
+    data['work_experience'][0]['achievements'] = achievements
+    return data
+
+
+def test_tokenize_bigrams_and_words():
+    assert tokenize('负责Kafka消息队列, C++ 与 Node.js') == [
+        '负责', 'kafka', '消息', '息队', '队列', 'c++', '与', 'node', 'js']
+
+
+def test_index_ranking_updates_and_persistence(tmp_path):
+    index = FullTextIndex()
+    index.add('a', ['负责推荐系统的召回与排序', '推荐系统点击率提升10%'])
+    index.add('b', ['负责支付系统开发'])
+    index.add('c', ['搭建日志平台'])
+
+    total, hits, _ = index.search('推荐系统')
+    assert total == 2 and hits[0][0] == 'a'
+    assert index.search('召回', top_k=5)[1][0][0] == 'a'
+
+    # 更新后旧内容不再命中，合并与持久化后结果一致
+    index.add('a', ['负责搜索引擎开发'])
+    assert index.search('召回')[0] == 0
+    path = str(tmp_path / 'fulltext.npz')
+    index.save(path)
+    loaded = FullTextIndex()
+    loaded.load(path)
+    assert loaded.search('系统') == index.search('系统')
+    assert loaded.stats()['delta_postings'] == 0
+    loaded.add('d', ['负责推荐系统'])
+    assert [user_id for user_id, _ in loaded.search('推荐')[1]] == ['d']
+
+
+def test_fulltext_endpoint(client, sample_profile):
+    response = client.post('/api/user-profile', json=make_profile(
+        sample_profile, 'fulltext@example.com', '负责风控模型训练平台建设', ['反欺诈模型召回率提升至95%']))
+    user_id = response.get_json()['data']['user_id']
+
+    body = client.get('/api/user-profiles/fulltext?q=反欺诈召回&top_k=3').get_json()
+    assert body['success'] is True
+    top = body['data']['results'][0]
+    assert top['user_id'] == user_id
+    assert top['field'] == 'achievements'
+    assert '反欺诈' in top['snippet']
+
+    assert client.get('/api/user-profiles/fulltext?q=').status_code == 400
+    assert client.get('/api/user-profiles/fulltext?q=x&top_k=0').status_code == 400
+
+
+def test_unchanged_add_and_compact_reclaim_slots():
+    index = FullTextIndex()
+    for _ in range(1000):
+        index.add('a', ['负责推荐系统的召回与排序'])
+    index.add('b', ['负责支付系统开发'])
+    stats = index.stats()
+    assert stats['documents'] == 2 and stats['deleted_slots'] == 0
+    delta_postings = stats['delta_postings']
+
+    index.add('a', ['负责搜索引擎开发'])
+    index.remove('b')
+    assert index.stats()['deleted_slots'] == 2
+    index.compact()
+    assert index.stats()['deleted_slots'] == 0 and index.stats()['base_postings'] < delta_postings
+    assert [user_id for user_id, _ in index.search('搜索开发')[1]] == ['a']
+    assert index.search('支付')[0] == 0
+
+    index.add('c', ['负责支付网关'])
+    assert sorted(user_id for user_id, _ in index.search('负责')[1]) == ['a', 'c']
+
+
+def test_compact_keeps_writes_made_during_merge(monkeypatch):
+    index = FullTextIndex()
+    index.add('a', ['负责推荐系统'])
+    index.add('b', ['负责支付系统'])
+    index.remove('b')
+
+    # 合并在锁外进行：模拟合并期间的写入与删除
+    merge = np.concatenate
+
+    def concatenate(parts, *args, **kwargs):
+        if not concurrent:
+            concurrent.append(True)
+            index.add('c', ['负责搜索系统'])
+            index.remove('a')
+        return merge(parts, *args, **kwargs)
+
+    concurrent = []
+    monkeypatch.setattr(np, 'concatenate', concatenate)
+    index.compact()
+    monkeypatch.undo()
+
+    assert concurrent
+    stats = index.stats()
+    assert stats['documents'] == 1 and stats['deleted_slots'] == 1 and stats['delta_postings'] > 0
+    assert [user_id for user_id, _ in index.search('系统')[1]] == ['c']
+    assert index.search('推荐')[0] == 0
+    index.compact()
+    assert index.stats()['deleted_slots'] == 0
+    assert [user_id for user_id, _ in index.search('搜索')[1]] == ['c']
+
+
+def test_refresh_does_not_compact(monkeypatch):
+    monkeypatch.setattr(fulltext, 'COMPACT_MIN_POSTINGS', 0)
+    index = FullTextIndex(refresh_interval=0)
+    index.add('a', ['负责推荐系统'])
+    assert index.needs_compaction()
+    index.refresh(main.profile_store, force=True)
+    assert index.stats()['base_postings'] == 0
+    assert index.compact_if_needed()
+    assert index.stats()['delta_postings'] == 0 and index.stats()['base_postings'] > 0
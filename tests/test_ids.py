@@ -0,0 +1,88 @@
+"""
+用户ID生成：按时间排序、多线程/多进程并发生成不重复、worker号租约
+"""
+
+import gc
+import time
+import weakref
+import threading
+import multiprocessing
+
+from app.ids import MAX_SEQUENCE, IdGenerator, WorkerLeaseStore, decode_timestamp
+from app.store import ProfileStore
+
+
+def generate_in_threads(generator, threads=4, count=5000):
+    results = [[] for _ in range(threads)]
+
+    def run(out):
+        for _ in range(count):
+            out.append(generator.next_id())
+
+    workers = [threading.Thread(target=run, args=(out,)) for out in results]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for out in results:
+        assert out == sorted(out)
+    return [user_id for out in results for user_id in out]
+
+
+def child(generator, queue):
+    ids = generate_in_threads(generator)
+    queue.put((generator.worker_id, ids))
+
+
+def test_sortable_ids(tmp_path):
+    generator = IdGenerator(WorkerLeaseStore(str(tmp_path / 'ids.db')))
+    ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 10)]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert all(user_id.startswith('user_') and len(user_id) == 21 for user_id in ids[:10])
+    assert abs(decode_timestamp(ids[0]) - time.time() * 1000) < 60_000
+
+
+def test_no_collisions_across_processes_and_threads(tmp_path):
+    generator = IdGenerator(WorkerLeaseStore(str(tmp_path / 'ids.db')))
+    parent_ids = generate_in_threads(generator)
+
+    # fork出的子进程各自分配新的worker号
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [context.Process(target=child, args=(generator, queue)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    results = [queue.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+
+    # 子进程不沿用父进程的worker号
+    assert all(worker_id is not None and worker_id != generator.worker_id for worker_id, _ in results)
+    all_ids = parent_ids + [user_id for _, ids in results for user_id in ids]
+    assert len(set(all_ids)) == len(all_ids) == 5 * 4 * 5000
+
+
+def test_released_worker_id_continues_after_last_timestamp(tmp_path):
+    store = WorkerLeaseStore(str(tmp_path / 'ids.db'))
+    first = IdGenerator(store)
+    first.next_id()
+    first._last_ms += 60_000  # 模拟上一个使用者的时间戳领先于当前时钟
+    last = first.next_id()
+    worker_id = first.worker_id
+    first.release()
+
+    second = IdGenerator(store)
+    assert second.next_id() > last and second.worker_id == worker_id
+
+
+def test_lease_store_shares_database_file_with_profiles(tmp_path):
+    path = str(tmp_path / 'app.db')
+    profiles = ProfileStore(path)
+    generator = IdGenerator(WorkerLeaseStore(path))
+    assert generator.next_id() and profiles.count() == 0
+    # 生成器不被进程级的fork/退出钩子持有，释放后可被回收
+    ref = weakref.ref(generator)
+    generator.release()
+    del generator
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,94 @@
+"""
+后台任务队列：?async=true 提交、轮询结果、队列满时拒绝、结果过期、租约到期重新执行不产生重复档案
+"""
+
+import copy
+import json
+import time
+
+import app.main as main
+from app.jobs import SQL_CLAIM, JobQueue, JobStore
+
+
+def wait_for(client, status_url, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(status_url).get_json()['data']
+        if job['status'] in ('succeeded', 'failed') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
+
+
+def test_async_create(client, sample_profile):
+    data = copy.deepcopy(sample_profile)
+    data['contact']['email'] = 'async-create@example.com'
+    response = client.post('/api/user-profile?async=true', json=data)
+    assert response.status_code == 202
+    submitted = response.get_json()['data']
+    assert submitted['status'] == 'queued' and response.headers['Location'] == submitted['status_url']
+
+    job = wait_for(client, submitted['status_url'])
+    assert job['status'] == 'succeeded' and job['status_code'] == 201 and job['attempts'] == 1
+    user_id = job['result']['data']['user_id']
+    profile = client.get(f'/api/user-profile/{user_id}').get_json()['data']
+    assert profile['profile']['contact']['email'] == 'async-create@example.com'
+    assert profile['score'] == job['result']['data']['score']
+
+
+def test_async_validate(client, sample_profile):
+    expected = client.post('/api/user-profile/u1/validate?format=simple', json=sample_profile).get_json()
+    response = client.post('/api/user-profile/u1/validate?format=simple&async=true', json=sample_profile)
+    job = wait_for(client, response.get_json()['data']['status_url'])
+    assert job['status'] == 'succeeded' and job['result']['score'] == expected['score']
+
+    invalid = copy.deepcopy(sample_profile)
+    del invalid['contact']
+    response = client.post('/api/user-profile/u1/validate?async=true', json=invalid)
+    job = wait_for(client, response.get_json()['data']['status_url'])
+    assert job['status'] == 'failed' and job['status_code'] == 400
+    assert job['result']['message'] == '数据验证失败'
+
+
+def test_queue_full_and_expired(client, sample_profile, monkeypatch):
+    monkeypatch.setattr(main.job_queue, 'max_queue', 0)
+    response = client.post('/api/user-profile/u1/validate?async=true', json=sample_profile)
+    assert response.status_code == 503 and response.headers['Retry-After']
+    monkeypatch.undo()
+
+    response = client.post('/api/user-profile/u1/validate?async=true', json=sample_profile)
+    status_url = response.get_json()['data']['status_url']
+    assert wait_for(client, status_url)['status'] == 'succeeded'
+    monkeypatch.setattr(main.job_queue, 'result_ttl', -1)
+    assert client.get(status_url).status_code == 404
+    assert client.get('/api/jobs/missing').status_code == 404
+
+
+def test_retried_create_reuses_user_id(client, sample_profile, tmp_path, monkeypatch):
+    job_queue = JobQueue(JobStore(str(tmp_path / 'jobs.db')))
+    job_queue.register('create', main.run_create_job)
+    monkeypatch.setattr(job_queue, 'start', lambda: None)
+    monkeypatch.setattr(main, 'job_queue', job_queue)
+
+    data = copy.deepcopy(sample_profile)
+    data['personal_info']['name'] = '重试任务'
+    data['contact']['email'] = 'async-retry@example.com'
+    data['contact']['phone'] = '13712345670'
+    job_id = client.post('/api/user-profile?async=true', json=data).get_json()['data']['job_id']
+    before = main.profile_store.count()
+
+    # 第一个worker写入档案后、记录结果前退出，租约到期
+    now = time.time()
+    with job_queue.store.connection() as conn:
+        _, _, payload, _ = conn.execute(SQL_CLAIM, (now, now - 1, now)).fetchone()
+    status, body = main.run_create_job(json.loads(payload))
+    first = json.loads(body)['data']
+    assert status == 201 and main.profile_store.count() == before + 1
+
+    # 其他worker重新执行：写入同一个user_id，不产生重复档案，也不把自己列为近重复
+    assert job_queue.run_once()
+    job = job_queue.get(job_id)
+    assert job['status'] == 'succeeded' and job['attempts'] == 2
+    assert job['result']['data']['user_id'] == first['user_id']
+    assert job['result']['data']['created_at'] == first['created_at']
+    assert 'duplicates' not in job['result']['data']
+    assert main.profile_store.count() == before + 1
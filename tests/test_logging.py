@@ -0,0 +1,68 @@
+"""
+结构化日志：脱敏截断、request_id、按请求采样、校验错误不记录字段值、调用位置
+"""
+
+import copy
+import json
+import logging
+
+from app.logs import JsonFormatter, RequestContextFilter, TextFormatter, describe_error, redact
+from app.main import app
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_redact():
+    data = {'contact': {'email': 'a@b.com', 'Phone': '13800000000'}, 'bio': 'x' * 300, 'tags': list(range(30))}
+    result = redact(data, max_chars=10)
+    assert result['contact'] == {'email': '***', 'Phone': '***'}
+    assert result['bio'] == 'x' * 10 + '...(+290 chars)'
+    assert result['tags'][-1] == '...(+10 items)' and len(result['tags']) == 21
+
+
+def test_request_id_and_sampling(client, sample_profile):
+    handler = ListHandler()
+    handler.addFilter(RequestContextFilter())
+    logging.getLogger().addHandler(handler)
+    app.config['LOG_SAMPLE_RATE'] = 0.0
+    try:
+        response = client.get('/api/test', headers={'X-Request-ID': 'req-1'})
+        assert response.headers['X-Request-ID'] == 'req-1'
+        generated = client.get('/api/user-profile/missing').headers['X-Request-ID']
+        assert len(generated) == 16
+    finally:
+        app.config['LOG_SAMPLE_RATE'] = 1.0
+        logging.getLogger().removeHandler(handler)
+
+    access = [r for r in handler.records if r.name == 'app.access']
+    # 未采样的成功请求不输出访问日志，错误请求始终输出
+    assert [(r.status, r.request_id) for r in access] == [(404, generated)]
+    line = JsonFormatter().format(access[0])
+    assert f'"request_id": "{generated}"' in line and '"status": 404' in line
+
+
+def test_validation_errors_are_logged_without_input(client, sample_profile, caplog):
+    invalid = copy.deepcopy(sample_profile)
+    invalid['contact']['email'] = 'secret-address-at-example'
+    with caplog.at_level(logging.ERROR, logger='app.main'):
+        assert client.post('/api/user-profile', json=invalid).status_code == 400
+    messages = [r.getMessage() for r in caplog.records if r.name == 'app.main']
+    assert messages and all('secret-address' not in m and 'input_value' not in m for m in messages)
+    assert "'email'" in messages[-1] or '"email"' in messages[-1]
+
+    assert describe_error(ValueError('plain')) == 'plain'
+
+
+def test_caller_info_is_optional():
+    record = logging.makeLogRecord({'name': 'app.x', 'msg': 'hi', 'levelno': logging.INFO, 'levelname': 'INFO',
+                                    'module': 'main', 'funcName': 'view', 'lineno': 42})
+    assert 'caller' not in json.loads(JsonFormatter().format(record))
+    assert json.loads(JsonFormatter(include_caller=True).format(record))['caller'] == 'main:view:42'
+    assert 'main:view:42' in TextFormatter(include_caller=True).format(record)
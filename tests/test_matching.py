@@ -0,0 +1,135 @@
+"""
+候选人匹配引擎：向量化打分与逐个计算结果一致
+"""
+
+import random
+
+from app.matching import MatchFeatures, MatchingEngine
+from app.models import JobRequirement
+
+SKILLS = ['Python', 'Java', 'Go', 'RAG', 'Docker']
+CITIES = ['杭州', '北京', '上海']
+
+
+def brute_force(features, job):
+    weights = job.skills_weight + job.location_weight + job.salary_weight
+    weight_sum = sum(r.weight for r in job.required_skills)
+    skills = {name.casefold(): (level, round(years * 10)) for name, level, years in features.skills}
+    skill_score = 0.0
+    for r in job.required_skills:
+        level, years = skills.get(r.name.casefold(), (0, 0))
+        min_years = round(r.min_years * 10)
+        if job.require_all_skills and (level < r.min_level or years < min_years):
+            return None
+        score = 0.0
+        if level:
+            score = 0.6 * min(level / r.min_level, 1.0)
+            score += 0.4 * (min(years, min_years) / min_years if min_years else 1.0)
+        skill_score += score * r.weight / weight_sum
+    location = 1.0 if job.location in (features.city, features.work_location) else 0.0
+    over = max(features.salary - job.salary_max, 0.0) / job.salary_max if job.salary_max else 0.0
+    under = max(job.salary_min - features.salary, 0.0) / job.salary_min if job.salary_min else 0.0
+    salary = max(0.0, 1.0 - over - under)
+    return 100 * (job.skills_weight * skill_score + job.location_weight * location
+                  + job.salary_weight * salary) / weights
+
+
+def build_engine(rnd, count):
+    engine = MatchingEngine(initial_rows=4)
+    profiles = {}
+    for i in range(count):
+        features = MatchFeatures(
+            skills=tuple((name, rnd.randint(1, 10), round(rnd.uniform(0, 10), 1))
+                         for name in rnd.sample(SKILLS, rnd.randint(1, 4))),
+            city=rnd.choice(CITIES),
+            work_location=rnd.choice(CITIES),
+            salary=float(rnd.randrange(10000, 50000, 1000))
+        )
+        engine.add(f"u{i}", features)
+        profiles[f"u{i}"] = features
+    return engine, profiles
+
+
+def test_scores_match_brute_force():
+    rnd = random.Random(7)
+    engine, profiles = build_engine(rnd, 300)
+    for require_all, salary_min in ((False, None), (True, None), (False, 20000), (True, 20000)):
+        job = JobRequirement(
+            required_skills=[{'name': 'python', 'min_level': 6, 'min_years': 2.5},
+                             {'name': 'Go', 'min_level': 4, 'weight': 0.5}],
+            location='杭州', salary_min=salary_min, salary_max=30000, require_all_skills=require_all, top_k=20
+        )
+        expected = {uid: brute_force(f, job) for uid, f in profiles.items()}
+        expected = {uid: score for uid, score in expected.items() if score is not None}
+        candidates, results = engine.match(job)
+        assert candidates == len(expected)
+        ranked = sorted(expected.values(), reverse=True)[:len(results)]
+        for result, score in zip(results, ranked):
+            assert abs(result['score'] - round(expected[result['user_id']], 2)) < 0.02
+            assert abs(result['score'] - round(score, 2)) < 0.02
+
+
+def test_salary_range():
+    engine = MatchingEngine(initial_rows=4)
+    for user_id, salary in (('low', 10000.0), ('inside', 25000.0), ('high', 45000.0), ('unknown', None)):
+        engine.add(user_id, MatchFeatures((('Rust', 5, 1.0),), None, None, salary))
+    job = JobRequirement(required_skills=[{'name': 'Rust'}], salary_min=20000, salary_max=30000)
+    salaries = {r['user_id']: r['breakdown']['salary'] for r in engine.match(job)[1]}
+    assert salaries == {'inside': 100.0, 'low': 50.0, 'high': 50.0, 'unknown': 50.0}
+
+    # 只给下限时高出不扣分
+    job = JobRequirement(required_skills=[{'name': 'Rust'}], salary_min=20000)
+    salaries = {r['user_id']: r['breakdown']['salary'] for r in engine.match(job)[1]}
+    assert salaries['high'] == 100.0 and salaries['low'] == 50.0
+
+
+def test_incremental_update_and_remove():
+    engine = MatchingEngine(initial_rows=1)
+    job = JobRequirement(required_skills=[{'name': 'Rust', 'min_level': 5}], top_k=5)
+    engine.add('a', MatchFeatures((('Rust', 9, 3.0),), '杭州', None, 20000.0))
+    engine.add('b', MatchFeatures((('Rust', 3, 1.0),), '北京', None, None))
+    assert [r['user_id'] for r in engine.match(job)[1]] == ['a', 'b']
+
+    engine.add('b', MatchFeatures((('Rust', 10, 8.0),), '北京', None, None))
+    engine.remove('a')
+    candidates, results = engine.match(job)
+    assert candidates == 1 and results[0]['user_id'] == 'b'
+    assert results[0]['breakdown']['skill_details'][0] == {
+        'name': 'Rust', 'level': 10, 'years_experience': 8.0, 'score': 100.0}
+
+
+def test_match_endpoint(client, sample_profile):
+    client.post('/api/user-profile', json=sample_profile)
+    skill = sample_profile['skills'][0]
+    response = client.post('/api/user-profiles/match', json={
+        'required_skills': [{'name': skill['name'], 'min_level': 1}], 'top_k': 3})
+    body = response.get_json()
+    assert response.status_code == 200 and body['success'] is True
+    assert body['data']['candidates'] >= 1
+    assert body['data']['results'][0]['breakdown']['skill_details'][0]['level'] >= 1
+
+    assert client.post('/api/user-profiles/match', json={'required_skills': []}).status_code == 400
+    inverted = client.post('/api/user-profiles/match', json={
+        'required_skills': [{'name': skill['name']}], 'salary_min': 30000, 'salary_max': 20000})
+    assert inverted.status_code == 400 and inverted.get_json()['success'] is False
+
+
+def test_sparse_skill_columns_update_in_place():
+    engine = MatchingEngine(initial_rows=1)
+    # 技能为自由文本：每个档案一个不同的技能，存储与技能条目数成正比
+    for i in range(200):
+        engine.add(f"u{i}", MatchFeatures(((f"skill-{i}", 5, 1.0), ('Rust', 3, 0.5)), None, None, None))
+    stats = engine.stats()
+    assert stats['skills'] == 201 and stats['skill_entries'] == 400
+
+    job = JobRequirement(required_skills=[{'name': 'Rust'}, {'name': 'skill-7'}], require_all_skills=True)
+    assert [r['user_id'] for r in engine.match(job)[1]] == ['u7']
+
+    # 更新时原位覆盖：不再掌握的技能不参与匹配，再次写入时复用原条目
+    engine.add('u7', MatchFeatures((('Rust', 9, 2.0),), None, None, None))
+    assert engine.match(job)[0] == 0
+    engine.add('u7', MatchFeatures((('Rust', 9, 2.0), ('skill-7', 8, 1.0)), None, None, None))
+    assert engine.stats()['skill_entries'] == 400
+    result = engine.match(job)[1][0]
+    assert result['user_id'] == 'u7'
+    assert [d['level'] for d in result['breakdown']['skill_details']] == [9, 8]
@@ -0,0 +1,103 @@
+"""
+跨进程指标：多个worker写入同一映射文件后汇总、已退出worker的槽位并入归档后复用、
+槽位用尽时共用归档槽位不丢计数、只统计存活worker、/metrics 输出
+"""
+
+import multiprocessing
+import re
+
+from app.main import app
+from app.metrics import Metrics
+
+REQUESTS_PER_CHILD = 2000
+
+
+def new_metrics(tmp_path, max_workers):
+    metrics = Metrics(str(tmp_path / 'metrics.bin'), max_workers=max_workers)
+    metrics.init_app(app)
+    return metrics
+
+
+def record_requests(metrics, count):
+    for _ in range(count):
+        metrics.observe_request('get_status', 200, 0.001)
+
+
+def record_mixed(metrics):
+    metrics.observe_request('get_status', 404, 0.003)
+    metrics.observe_stage('validate', 0.0002)
+    metrics.observe_shed('write', 'queue_full')
+
+
+def run_children(metrics, children, count=REQUESTS_PER_CHILD):
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=record_requests, args=(metrics, count)) for _ in range(children)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+
+def sample(text, name):
+    match = re.search(rf'^{re.escape(name)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def status_count(text):
+    return sample(text, 'ai_support_http_requests_total{endpoint="get_status",route="/api/status",status="200"}')
+
+
+def test_shared_archive_slot_does_not_lose_counts(tmp_path):
+    # 只有一个槽位：父进程占用后，子进程全部共用归档槽位
+    metrics = new_metrics(tmp_path, max_workers=1)
+    record_requests(metrics, 1)
+    run_children(metrics, 4)
+
+    text = metrics.render_prometheus()
+    assert status_count(text) == 1 + 4 * REQUESTS_PER_CHILD
+    assert sample(text, 'ai_support_workers') == 1
+
+
+def test_workers_gauge_counts_only_live_processes(tmp_path):
+    metrics = new_metrics(tmp_path, max_workers=8)
+    record_requests(metrics, 1)
+    run_children(metrics, 3, count=10)
+
+    # 已退出worker的槽位尚未回收，其计数仍计入合计，但不算作存活worker
+    text = metrics.render_prometheus()
+    assert sample(text, 'ai_support_workers') == 1
+    assert status_count(text) == 31
+
+
+def test_aggregates_across_workers_and_archives_reused_slots(tmp_path):
+    metrics = new_metrics(tmp_path, max_workers=2)
+    record_requests(metrics, 1)
+    run_children(metrics, 1, count=5)
+    # 第二轮子进程复用第一轮已退出进程的槽位，旧计数先并入归档槽位
+    run_children(metrics, 1, count=7)
+    context = multiprocessing.get_context('fork')
+    process = context.Process(target=record_mixed, args=(metrics,))
+    process.start()
+    process.join(timeout=60)
+    assert process.exitcode == 0
+
+    text = metrics.render_prometheus()
+    assert status_count(text) == 13
+    assert sample(text, 'ai_support_http_requests_total{endpoint="get_status",route="/api/status",status="404"}') == 1
+    labels = 'endpoint="get_status",route="/api/status"'
+    assert sample(text, f'ai_support_http_request_duration_seconds_count{{{labels}}}') == 14
+    assert sample(text, f'ai_support_http_request_duration_seconds_bucket{{{labels},le="0.001"}}') == 13
+    assert sample(text, f'ai_support_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}') == 14
+    assert sample(text, 'ai_support_stage_duration_seconds_count{stage="validate"}') == 1
+    assert sample(text, 'ai_support_admission_shed_total{priority="write",reason="queue_full"}') == 1
+
+
+def test_metrics_endpoint(client):
+    client.get('/api/status')
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert sample(text, 'ai_support_workers') == 1
+    assert status_count(text) >= 1
+    assert '# TYPE ai_support_http_request_duration_seconds histogram' in text
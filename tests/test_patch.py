@@ -0,0 +1,83 @@
+"""
+档案局部更新：JSON Merge Patch / JSON Patch、段落级校验、增量评分与段落写入
+"""
+
+import copy
+
+from app.models import UserProfile
+from app.patching import PatchError, apply_patch
+from app.profiles import calculate_profile_score
+
+
+def create(client, sample, email):
+    data = copy.deepcopy(sample)
+    data['contact']['email'] = email
+    response = client.post('/api/user-profile', json=data)
+    assert response.status_code in (200, 201)
+    return response.get_json()['data']['user_id']
+
+
+def test_apply_patch_scores_incrementally(sample_profile):
+    document = {'profile': sample_profile, 'score': calculate_profile_score(UserProfile(**sample_profile))}
+    result = apply_patch(document, [
+        {'op': 'add', 'path': '/skills/-', 'value': {'name': 'Go', 'level': 3, 'years_experience': 1}},
+        {'op': 'remove', 'path': '/work_experience/1'},
+    ])
+    assert set(result.sections) == {'skills', 'work_experience'}
+
+    patched = copy.deepcopy(sample_profile)
+    patched['skills'].append({'name': 'Go', 'level': 3, 'years_experience': 1})
+    del patched['work_experience'][1]
+    assert result.score == calculate_profile_score(UserProfile(**patched))
+
+    # 只改动某一项内部字段时只校验该项
+    result = apply_patch(document, [{'op': 'replace', 'path': '/skills/0/level', 'value': 4}])
+    assert list(result.sections) == ['skills']
+    assert result.score == document['score']
+
+
+def test_apply_patch_rejects_invalid(sample_profile):
+    document = {'profile': sample_profile, 'score': 100.0}
+    for patch in ({'unknown': {}}, {'skills': []}, {'contact': None},
+                  [{'op': 'replace', 'path': '/skills/9/level', 'value': 1}],
+                  [{'op': 'test', 'path': '/contact/email', 'value': 'other@example.com'}]):
+        try:
+            apply_patch(document, patch)
+        except PatchError:
+            continue
+        raise AssertionError(f"patch should be rejected: {patch}")
+
+
+def test_patch_endpoint_updates_sections(client, sample_profile):
+    user_id = create(client, sample_profile, 'patch1@example.com')
+
+    response = client.patch(f'/api/user-profile/{user_id}',
+                            json={'contact': {'phone': '13700001111'}, 'address': {'city': '杭州'}})
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert sorted(data['updated_sections']) == ['address', 'contact']
+
+    profile = client.get(f'/api/user-profile/{user_id}').get_json()['data']['profile']
+    assert profile['contact']['phone'] == '13700001111'
+    assert profile['contact']['email'] == 'patch1@example.com'
+    assert profile['address']['city'] == '杭州'
+
+    # 修改教育经历中的一项，存储中的HTTP日期格式可被重新校验
+    response = client.patch(f'/api/user-profile/{user_id}',
+                            json=[{'op': 'replace', 'path': '/education/0/gpa', 'value': 3.9}],
+                            headers={'Prefer': 'return=representation'})
+    assert response.status_code == 200
+    assert response.get_json()['data']['profile']['education'][0]['gpa'] == 3.9
+
+    # 修改后的城市可被结构化检索命中
+    found = client.get('/api/user-profiles/search?city=杭州').get_json()['data']
+    assert user_id in [item['user_id'] for item in found['results']]
+
+
+def test_patch_endpoint_errors(client, sample_profile):
+    assert client.patch('/api/user-profile/missing', json={'address': {'city': 'x'}}).status_code == 404
+
+    user_id = create(client, sample_profile, 'patch2@example.com')
+    response = client.patch(f'/api/user-profile/{user_id}', json={'contact': {'email': 'not-an-email'}})
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
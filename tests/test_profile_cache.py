@@ -0,0 +1,62 @@
+"""
+档案读取缓存：ETag由存储文档决定、304、命中时重新生成timestamp、写入后失效
+"""
+
+import copy
+import time
+
+import app.main as main
+from app.cache import DocumentCache, compute_etag
+
+
+def create(client, sample, email):
+    data = copy.deepcopy(sample)
+    data['contact']['email'] = email
+    return client.post('/api/user-profile', json=data).get_json()['data']['user_id']
+
+
+def test_etag_is_stable_and_timestamp_fresh(client, sample_profile):
+    user_id = create(client, sample_profile, 'cache1@example.com')
+    first = client.get(f"/api/user-profile/{user_id}")
+    etag = first.headers['ETag'].strip('"')
+    assert etag == compute_etag(main.profile_store.get_document(user_id).encode('utf-8'))
+
+    time.sleep(0.002)
+    cached = client.get(f"/api/user-profile/{user_id}")
+    assert cached.headers['ETag'] == first.headers['ETag']
+    assert cached.get_json()['data'] == first.get_json()['data']
+    assert cached.get_json()['timestamp'] != first.get_json()['timestamp']
+
+    # 缓存被清空（或其他worker、TTL过期后重新读取）时ETag不变，客户端仍可得到304
+    main.profile_cache.clear()
+    revalidated = client.get(f"/api/user-profile/{user_id}", headers={'If-None-Match': f'"{etag}"'})
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    assert revalidated.headers['ETag'] == first.headers['ETag']
+
+
+def test_write_invalidates_cached_document(client, sample_profile):
+    user_id = create(client, sample_profile, 'cache2@example.com')
+    etag = client.get(f"/api/user-profile/{user_id}").headers['ETag']
+
+    assert client.patch(f"/api/user-profile/{user_id}", json={'preferences': {'remote': True}}).status_code == 200
+    updated = client.get(f"/api/user-profile/{user_id}", headers={'If-None-Match': etag})
+    assert updated.status_code == 200 and updated.headers['ETag'] != etag
+    assert updated.get_json()['data']['profile']['preferences']['remote'] is True
+
+    assert client.get('/api/user-profile/user_missing').status_code == 404
+
+
+def test_document_cache_limits():
+    cache = DocumentCache(max_entries=2, max_bytes=10, ttl=60)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    cache.put('c', b'1234')
+    assert cache.get('a') is None and cache.get('c').document == b'1234'
+    assert cache.stats()['evictions'] == 1
+
+    cache.put('d', b'x' * 11)
+    assert cache.get('d') is None
+    expired = DocumentCache(ttl=0.001)
+    expired.put('a', b'1')
+    time.sleep(0.005)
+    assert expired.get('a') is None and expired.stats()['expirations'] == 1
@@ -0,0 +1,55 @@
+"""
+单次遍历序列化：输出与 model_dump() + jsonify 逐字节一致（含调试模式）
+"""
+
+import copy
+from datetime import datetime
+
+import pytest
+from flask import jsonify
+
+from app.main import app, create_sample_profile, created_envelope, fetched_envelope
+from app.models import UserProfile
+from app.profiles import build_profile_record, calculate_profile_score, dumps_document, generate_validation_report
+from app.responses import json_response
+
+
+def profiles(sample):
+    large = copy.deepcopy(sample)
+    large['skills'] = sample['skills'] * 5
+    large['personal_info']['name'] = 'Zoë 张三  '
+    return [UserProfile(**sample), create_sample_profile(), UserProfile(**large)]
+
+
+@pytest.mark.parametrize('debug', [False, True])
+def test_matches_jsonify(sample_profile, debug):
+    app.debug = debug
+    try:
+        with app.test_request_context():
+            for profile in profiles(sample_profile):
+                response_data, record = build_profile_record(profile, calculate_profile_score(profile))
+                timestamp = datetime.now().isoformat()
+                legacy = jsonify({'success': True, 'message': '用户档案创建成功',
+                                  'data': response_data.model_dump(), 'timestamp': timestamp}).get_data()
+                assert created_envelope.render(response_data, timestamp).encode() == legacy
+
+                fetched = jsonify({'success': True, 'message': '获取用户档案成功',
+                                   'data': response_data.model_dump(), 'timestamp': timestamp}).get_data()
+                assert fetched_envelope.render_raw(record[3], timestamp).encode() == fetched
+                assert fetched_envelope.render_raw_bytes(record[3].encode(), timestamp) == fetched
+
+                payload = {'success': True, 'user_id': response_data.user_id, 'score': response_data.score,
+                           'validation_report': generate_validation_report(profile), 'timestamp': timestamp}
+                response = json_response(payload, 201)
+                assert response.status_code == 201 and response.mimetype == 'application/json'
+                assert response.get_data() == jsonify(payload).get_data()
+    finally:
+        app.debug = False
+
+
+def test_stored_document_matches_response_data(sample_profile):
+    profile = UserProfile(**sample_profile)
+    response_data, record = build_profile_record(profile, calculate_profile_score(profile))
+    with app.test_request_context():
+        assert record[3] == dumps_document(response_data)
+        assert f"{record[3]}\n".encode() == jsonify(response_data.model_dump()).get_data()
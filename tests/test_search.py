@@ -0,0 +1,58 @@
+"""
+档案搜索接口与倒排索引
+"""
+
+import copy
+
+from app.search import ProfileIndex, SearchQuery, terms_from_document
+
+
+def make_profile(sample, email, city, python_level, degree='本科'):
+    data = copy.deepcopy(sample)
+    data['contact']['email'] = email
+    data['address']['city'] = city
+    data['skills'][0]['name'] = 'Python'
+    data['skills'][0]['level'] = python_level
+    data['education'][0]['degree'] = degree
+    return data
+
+
+def test_index_intersection_and_updates(sample_profile):
+    index = ProfileIndex()
+    index.add('a', terms_from_document(make_profile(sample_profile, 'a@example.com', '杭州市', 8)))
+    index.add('b', terms_from_document(make_profile(sample_profile, 'b@example.com', '杭州', 9, '学士')))
+    index.add('c', terms_from_document(make_profile(sample_profile, 'c@example.com', '北京市', 9)))
+
+    query = SearchQuery(skills=(('python', 7),), city='杭州', degree='本科')
+    assert index.search(query) == (2, ['b', 'a'])
+    assert index.search(query, offset=1, limit=1) == (2, ['a'])
+
+    # 更新后旧索引项失效
+    index.add('b', terms_from_document(make_profile(sample_profile, 'b@example.com', '上海市', 9)))
+    assert index.search(query) == (1, ['a'])
+    assert index.remove('a')
+    assert index.search(query) == (0, [])
+    assert index.search(SearchQuery(skills=(('Python', 9),))) == (2, ['b', 'c'])
+
+
+def test_search_endpoint(client, sample_profile):
+    created = []
+    for i, (city, level) in enumerate([('成都市', 9), ('成都市', 6), ('武汉市', 9)]):
+        response = client.post('/api/user-profile',
+                               json=make_profile(sample_profile, f"search{i}@example.com", city, level))
+        created.append(response.get_json()['data']['user_id'])
+
+    body = client.get('/api/user-profiles/search?skill=Python:7&city=成都&degree=本科').get_json()
+    assert body['success'] is True
+    assert body['data']['total'] == 1
+    assert [r['user_id'] for r in body['data']['results']] == [created[0]]
+
+    body = client.get('/api/user-profiles/search?skill=Python&min_level=9&page_size=1&page=1').get_json()
+    assert body['data']['page_size'] == 1 and len(body['data']['results']) == 1
+    assert body['data']['total'] >= 2
+
+
+def test_search_endpoint_rejects_bad_parameters(client):
+    assert client.get('/api/user-profiles/search').status_code == 400
+    assert client.get('/api/user-profiles/search?skill=Python:high').status_code == 400
+    assert client.get('/api/user-profiles/search?city=杭州&page_size=1000').status_code == 400
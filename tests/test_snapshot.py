@@ -0,0 +1,94 @@
+"""
+档案只读快照：二分查找、覆盖层、快照文件替换与ETag
+"""
+
+import copy
+import json
+
+import pytest
+
+import app.main as main
+from app.profiles import build_profile_record
+from app.models import UserProfile
+from app.snapshot import Snapshot, SnapshotStore, build_snapshot
+
+
+def create(client, sample, email):
+    data = copy.deepcopy(sample)
+    data['contact']['email'] = email
+    return client.post('/api/user-profile', json=data).get_json()['data']['user_id']
+
+
+@pytest.fixture
+def snapshot_store(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path / 'profiles.snapshot'), check_interval=0, refresh_interval=0,
+                          refresh_overlap=0)
+    monkeypatch.setattr(main, 'snapshot_store', store)
+    return store
+
+
+def test_snapshot_find(tmp_path):
+    path = str(tmp_path / 'profiles.snapshot')
+    count = build_snapshot(main.profile_store, path, batch_size=2)
+    snapshot = Snapshot(path)
+    assert snapshot.count == count == main.profile_store.count()
+    for user_id, document, _ in main.profile_store.iter_by_user_id():
+        found, etag = snapshot.find(user_id)
+        assert bytes(found) == document.encode() and len(etag) == 32
+    assert snapshot.find('') is None and snapshot.find('~missing') is None
+
+
+def test_get_served_from_snapshot(client, sample_profile, snapshot_store):
+    user_id = create(client, sample_profile, 'snapshot1@example.com')
+    expected = client.get(f'/api/user-profile/{user_id}').get_json()['data']
+    build_snapshot(main.profile_store, snapshot_store.path)
+    snapshot_store.refresh(main.profile_store)
+
+    response = client.get(f'/api/user-profile/{user_id}')
+    assert response.status_code == 200 and response.get_json()['data'] == expected
+    assert snapshot_store.stats()['snapshot_hits'] == 1
+    assert client.get(f'/api/user-profile/{user_id}',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    # 快照之后本进程的写入进入覆盖层
+    client.patch(f'/api/user-profile/{user_id}', json={'preferences': {'remote': True}})
+    patched = client.get(f'/api/user-profile/{user_id}')
+    assert patched.get_json()['data']['profile']['preferences']['remote'] is True
+    assert patched.headers['ETag'] != response.headers['ETag']
+    created = create(client, sample_profile, 'snapshot2@example.com')
+    assert client.get(f'/api/user-profile/{created}').get_json()['data']['user_id'] == created
+    assert snapshot_store.stats()['overlay_hits'] == 2
+
+    # 不存在的档案回退到存储
+    assert client.get('/api/user-profile/snapshot-missing').status_code == 404
+
+
+def test_other_writers_and_snapshot_swap(client, sample_profile, snapshot_store):
+    build_snapshot(main.profile_store, snapshot_store.path)
+    snapshot_store.refresh(main.profile_store)
+    profiles = snapshot_store.stats()['profiles']
+
+    # 其他进程写入存储的档案按水位线同步到覆盖层
+    data = copy.deepcopy(sample_profile)
+    data['contact']['email'] = 'snapshot3@example.com'
+    _, record = build_profile_record(UserProfile(**data), 80.0)
+    main.profile_store.put(*record)
+    # GET请求不访问水位线和存储的增量，覆盖层由后台线程同步
+    client.get(f'/api/user-profile/{record[0]}')
+    assert snapshot_store.stats()['overlay_profiles'] == 0
+    main.read_refresher.run_once()
+    response = client.get(f'/api/user-profile/{record[0]}')
+    assert response.get_json()['data'] == json.loads(record[3])
+    assert snapshot_store.stats()['overlay_profiles'] >= 1
+
+    # 重新生成快照后切换到新文件并清空覆盖层
+    build_snapshot(main.profile_store, snapshot_store.path)
+    main.read_refresher.run_once()
+    stats = snapshot_store.stats()
+    assert stats['profiles'] == profiles + 1 and stats['overlay_profiles'] == 0
+
+
+def test_refresh_settings_are_separate_from_search_index(monkeypatch):
+    monkeypatch.setenv('SEARCH_INDEX_REFRESH_INTERVAL', '30')
+    monkeypatch.setenv('SNAPSHOT_REFRESH_INTERVAL', '2')
+    assert SnapshotStore.from_env().refresh_interval == 2.0
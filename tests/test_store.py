@@ -0,0 +1,101 @@
+"""
+档案存储：读写与索引查询、按版本局部更新、增量同步水位线、fork后重建连接池
+"""
+
+import copy
+import json
+import multiprocessing
+
+import pytest
+
+import app.main as main
+from app.store import ChangeFeed, ProfileStore, parse_database_url
+
+
+def record(user_id, email, phone='13800000000', updated_at='2024-01-01T00:00:00'):
+    document = json.dumps({'user_id': user_id, 'profile': {'contact': {'email': email}}, 'score': 50.0})
+    return user_id, email, phone, document, updated_at, updated_at
+
+
+def test_put_get_find_delete(tmp_path):
+    store = ProfileStore(str(tmp_path / 'store.db'))
+    store.put_many([record('a', 'a@example.com'), record('b', 'b@example.com', phone='13900000000')])
+    store.put(*record('c', 'a@example.com'))
+
+    assert json.loads(store.get_document('a'))['user_id'] == 'a'
+    assert store.get_document('missing') is None
+    assert sorted(store.find_by_email('a@example.com')) == ['a', 'c']
+    assert store.find_by_phone('13900000000') == ['b']
+    assert set(store.get_documents(['a', 'b', 'missing'])) == {'a', 'b'}
+    assert store.count() == 3
+
+    # 同一user_id再次写入为更新
+    store.put(*record('a', 'new@example.com', updated_at='2024-01-02T00:00:00'))
+    assert store.find_by_email('new@example.com') == ['a'] and store.count() == 3
+    assert store.delete('a') and not store.delete('a')
+    assert [user_id for user_id, _, _ in store.iter_by_user_id(batch_size=1)] == ['b', 'c']
+    store.close()
+
+
+def test_update_sections_checks_version(tmp_path):
+    store = ProfileStore(str(tmp_path / 'store.db'))
+    store.put(*record('a', 'a@example.com'))
+    _, version = store.get_versioned('a')
+
+    updated = store.update_sections('a', version, {'skills': json.dumps([{'name': 'Go'}])},
+                                    {'score': 60.0}, '2024-01-02T00:00:00', email='b@example.com')
+    document = json.loads(updated)
+    assert document['profile']['skills'] == [{'name': 'Go'}] and document['score'] == 60.0
+    assert document['profile']['contact'] == {'email': 'a@example.com'}
+    assert store.find_by_email('b@example.com') == ['a']
+    # 版本已变化（并发修改）时不写入
+    assert store.update_sections('a', version, {}, {'score': 70.0}, '2024-01-03T00:00:00') is None
+    assert store.get_versioned('a')[1] == '2024-01-02T00:00:00'
+
+
+def test_change_feed_follows_watermark(tmp_path):
+    store = ProfileStore(str(tmp_path / 'store.db'))
+    store.put(*record('a', 'a@example.com', updated_at='2024-01-01T00:00:00'))
+    feed = ChangeFeed(interval=0, overlap=0)
+    assert [user_id for user_id, _ in feed.poll(store)] == ['a']
+    assert feed.watermark == '2024-01-01T00:00:00'
+
+    # 水位线之前的档案不再读取；等于水位线的档案会被重复读取，由调用方幂等处理
+    store.put(*record('old', 'old@example.com', updated_at='2023-12-31T00:00:00'))
+    store.put(*record('b', 'b@example.com', updated_at='2024-01-02T00:00:00'))
+    assert [user_id for user_id, _ in feed.poll(store)] == ['a', 'b']
+    assert feed.watermark == '2024-01-02T00:00:00' and feed.due()
+
+
+def put_in_child(store):
+    store.put(*record('child', 'child@example.com'))
+
+
+def test_pool_is_rebuilt_after_fork(tmp_path):
+    store = ProfileStore(str(tmp_path / 'store.db'))
+    store.put(*record('parent', 'parent@example.com'))
+    process = multiprocessing.get_context('fork').Process(target=put_in_child, args=(store,))
+    process.start()
+    process.join(timeout=30)
+    assert process.exitcode == 0
+    assert store.get_document('child') is not None and store.count() == 2
+
+
+def test_created_profile_is_persisted(client, sample_profile):
+    data = copy.deepcopy(sample_profile)
+    data['contact']['email'] = 'persisted@example.com'
+    user_id = client.post('/api/user-profile', json=data).get_json()['data']['user_id']
+
+    # 新的存储实例（如重启后或另一个worker）读到同一份档案
+    store = ProfileStore(main.profile_store.path)
+    assert json.loads(store.get_document(user_id))['profile']['contact']['email'] == 'persisted@example.com'
+    assert user_id in store.find_by_email('persisted@example.com')
+    body = client.get(f"/api/user-profile/{user_id}").get_json()
+    assert body['data']['profile']['contact']['email'] == 'persisted@example.com'
+
+
+def test_parse_database_url():
+    assert parse_database_url('sqlite:////var/lib/app.db') == '/var/lib/app.db'
+    for url in ('postgres://db', 'sqlite:///', 'sqlite:///:memory:'):
+        with pytest.raises(ValueError):
+            parse_database_url(url)
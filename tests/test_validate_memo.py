@@ -0,0 +1,66 @@
+"""
+验证结果备忘表：规范化内容哈希、命中时结果与首次计算一致、参数不同不共用结果、LRU淘汰
+"""
+
+import copy
+import json
+
+from app.cache import MemoCache, content_hash
+from app.main import validation_memo
+
+
+def without_timestamp(response):
+    body = response.get_json()
+    body.pop('timestamp')
+    return body
+
+
+def test_content_hash_is_canonical():
+    assert content_hash({'a': 1, 'b': [1, 2]}, 'detailed') == content_hash({'b': [1, 2], 'a': 1}, 'detailed')
+    assert content_hash({'a': 1}, 'detailed') != content_hash({'a': 1}, 'simple')
+    assert content_hash({'a': 1}) != content_hash({'a': 2})
+
+
+def test_validate_hit_returns_same_result(client, sample_profile):
+    validation_memo.clear()
+    validation_memo.reset_stats()
+    first = client.post('/api/user-profile/u1/validate', json=sample_profile)
+    # 键顺序不同的相同内容命中备忘表；user_id 不参与计算
+    reordered = json.loads(json.dumps(sample_profile, sort_keys=True))
+    second = client.post('/api/user-profile/u2/validate', json=reordered)
+    assert validation_memo.stats()['hits'] == 1 and validation_memo.stats()['misses'] == 1
+
+    expected = without_timestamp(first)
+    expected['user_id'] = 'u2'
+    assert without_timestamp(second) == expected
+
+    simple = client.post('/api/user-profile/u1/validate?format=simple', json=sample_profile)
+    assert 'validation_report' not in simple.get_json()
+    partial = client.post('/api/user-profile/u1/validate?include_skills=false', json=sample_profile)
+    assert partial.get_json()['query_params']['include_skills'] is False
+    assert validation_memo.stats()['misses'] == 3
+
+
+def test_invalid_result_is_memoized(client, sample_profile):
+    invalid = copy.deepcopy(sample_profile)
+    del invalid['contact']
+    first = client.post('/api/user-profile/u1/validate', json=invalid)
+    hits = validation_memo.stats()['hits']
+    second = client.post('/api/user-profile/u1/validate', json=invalid)
+    assert first.status_code == second.status_code == 400
+    assert validation_memo.stats()['hits'] == hits + 1
+    assert without_timestamp(first) == without_timestamp(second)
+
+
+def test_memo_cache_evicts_least_recently_used():
+    memo = MemoCache(max_entries=2)
+    memo.put(b'a', 1)
+    memo.put(b'b', 2)
+    assert memo.get(b'a') == 1
+    memo.put(b'c', 3)
+    assert memo.get(b'b') is None and memo.get(b'a') == 1 and memo.get(b'c') == 3
+    assert memo.stats()['evictions'] == 1
+
+    disabled = MemoCache(max_entries=0)
+    disabled.put(b'a', 1)
+    assert disabled.get(b'a') is None
@@ -0,0 +1,87 @@
+"""
+验证接口的 include_* / format 参数：部分校验与完整校验结果一致
+"""
+
+import copy
+import itertools
+
+import pytest
+
+from app.main import run_validation, validation_memo
+
+FLAGS = list(itertools.product([True, False], repeat=3))
+
+
+def validate(client, data, include_skills=True, include_education=True, include_work=True, fmt='detailed'):
+    query = (f"include_skills={str(include_skills).lower()}&include_education={str(include_education).lower()}"
+             f"&include_work={str(include_work).lower()}&format={fmt}")
+    return client.post(f"/api/user-profile/u1/validate?{query}", json=data)
+
+
+@pytest.mark.parametrize('flags', FLAGS)
+def test_valid_profile_matches_full_validation(sample_profile, flags):
+    full = run_validation(sample_profile)
+    partial = run_validation(sample_profile, *flags)
+    assert partial == full
+
+
+@pytest.mark.parametrize('flags', FLAGS)
+def test_simple_format_skips_report(sample_profile, flags):
+    result = run_validation(sample_profile, *flags, with_report=False)
+    assert 'validation_report' not in result
+    assert result['score'] == run_validation(sample_profile)['score']
+
+
+@pytest.mark.parametrize('section, field, flag_index', [
+    ('skills', 'level', 0),
+    ('education', 'graduation_date', 1),
+    ('work_experience', 'description', 2),
+])
+def test_excluded_section_is_not_validated(sample_profile, section, field, flag_index):
+    data = copy.deepcopy(sample_profile)
+    data[section][0][field] = 'invalid'
+    assert 'error' in run_validation(data)
+
+    flags = [True, True, True]
+    flags[flag_index] = False
+    assert 'error' not in run_validation(data, *flags)
+
+    # 其余段落仍然校验
+    for other in range(3):
+        if other != flag_index:
+            flags = [True, True, True]
+            flags[other] = False
+            assert 'error' in run_validation(data, *flags)
+
+
+def test_included_sections_report_same_errors(sample_profile):
+    data = copy.deepcopy(sample_profile)
+    data['skills'][0]['level'] = 11
+    data['work_experience'][0]['description'] = 'short'
+    full = run_validation(data)['error']
+    partial = run_validation(data, True, False, False)['error']
+    assert 'skills.0.level' in full and 'skills.0.level' in partial
+    assert 'work_experience' in full and 'work_experience' not in partial
+
+
+def test_endpoint_formats(client, sample_profile):
+    validation_memo.clear()
+    detailed = validate(client, sample_profile).get_json()
+    simple = validate(client, sample_profile, fmt='simple').get_json()
+    partial = validate(client, sample_profile, include_skills=False, include_work=False).get_json()
+
+    assert detailed['success'] and simple['success'] and partial['success']
+    assert 'validation_report' not in simple
+    assert simple['score'] == detailed['score'] == partial['score']
+    assert partial['validation_report'] == detailed['validation_report']
+    assert partial['query_params'] == {'include_skills': False, 'include_education': True,
+                                       'include_work': False, 'format': 'detailed'}
+
+
+def test_endpoint_rejects_invalid_included_section(client, sample_profile):
+    data = copy.deepcopy(sample_profile)
+    data['education'][0]['gpa'] = 9
+    assert validate(client, data, include_education=False).status_code == 200
+    response = validate(client, data)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
@@ -0,0 +1,27 @@
+"""
+预热：访问所有路由但不向存储写入档案，不修改全局查重模式；fork之前可关闭预热打开的全部连接
+"""
+
+import app.main as main
+from app.warmup import warm_up
+
+
+def test_warm_up_is_read_only():
+    before = list(main.profile_store.iter_by_user_id())
+    main.app.config['DEDUP_MODE'] = 'merge'
+    try:
+        result = warm_up(main.app)
+        assert main.app.config['DEDUP_MODE'] == 'merge'
+    finally:
+        main.app.config['DEDUP_MODE'] = 'flag'
+    assert result['requests'] > 10 and result['server_errors'] == 0
+    assert list(main.profile_store.iter_by_user_id()) == before
+
+
+def test_close_connections_after_warm_up():
+    warm_up(main.app)
+    # 预热经 /api/status 访问任务表
+    assert main.job_queue.store.open_connections() > 0
+    main.close_connections()
+    assert [store.open_connections() for store in main.database_stores()] == [0, 0, 0]
+    assert main.id_generator.worker_id is None